@@ -0,0 +1,174 @@
+"""
+Бенчмарки обработки аудио VTTv2
+
+Запуск (из platforms/mlx):
+    python benchmarks/bench_audio.py resample --seconds 60
+    python benchmarks/bench_audio.py dynamics --decode --config config.yaml
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from common import SAMPLE_RATE, load_audio, load_engine, timed
+
+# isort: split
+from audio.dynamics import AutomaticGainControl, SpectralNoiseGate  # noqa: E402
+from audio.processor import AudioProcessor  # noqa: E402
+from audio.resampler import PolyphaseResampler  # noqa: E402
+
+
+def _sine(rate: int, frequency: float, seconds: float) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return np.sin(2 * np.pi * frequency * t).astype(np.float32)
+
+
+def bench_resample(args):
+    """Пропускная способность и качество ресемплинга в 16 кГц"""
+    try:
+        from scipy.signal import resample_poly
+    except ImportError:
+        resample_poly = None
+
+    print(f"{'rate':>6} {'mode':>10} {'time, s':>9} {'x realtime':>11} {'rms err':>10}")
+    for src_rate in args.rates:
+        samples = int(src_rate * args.seconds)
+        audio = np.random.default_rng(0).standard_normal(samples).astype(np.float32)
+        resampler = PolyphaseResampler(src_rate, 16000)
+
+        batch_time = timed(resampler.resample, audio)
+
+        def streaming():
+            for start in range(0, len(audio), args.block):
+                resampler.process(audio[start:start + args.block])
+            resampler.flush()
+        stream_time = timed(streaming)
+
+        # Качество: синус 1 кГц против аналитического эталона на 16 кГц
+        resampled = resampler.resample(_sine(src_rate, 1000.0, 1.0))
+        reference = _sine(16000, 1000.0, 1.0)
+        error = np.sqrt(np.mean((resampled[100:-100] - reference[100:-100]) ** 2))
+
+        print(
+            f"{src_rate:>6} {'batch':>10} {batch_time:>9.3f} {args.seconds / batch_time:>11.0f} "
+            f"{error:>10.2e}"
+        )
+        print(
+            f"{src_rate:>6} {'stream':>10} {stream_time:>9.3f} {args.seconds / stream_time:>11.0f} "
+            f"{'':>10}"
+        )
+
+        if resample_poly is not None:
+            g = np.gcd(src_rate, 16000)
+            ref_time = timed(resample_poly, audio, 16000 // g, src_rate // g)
+            ref_out = resample_poly(_sine(src_rate, 1000.0, 1.0), 16000 // g, src_rate // g)
+            ref_error = np.sqrt(np.mean((ref_out[100:-100] - reference[100:-100]) ** 2))
+            print(
+                f"{src_rate:>6} {'scipy':>10} {ref_time:>9.3f} {args.seconds / ref_time:>11.0f} "
+                f"{ref_error:>10.2e}"
+            )
+
+
+def noisy_fixtures(seconds: float = 10.0, seed: int = 0) -> dict:
+    """
+    Синтетические зашумленные фикстуры: "речь" (гармоники с паузами)
+    на фоне белого шума и гула, плюс громкий короткий звук (кашель) в начале
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = (np.sin(2 * np.pi * 3 * t) > 0.2) & ((t % 3.0) < 2.2)
+    speech = 0.1 * voiced * syllables
+
+    fixtures = {}
+    for snr_name, noise_level in (("snr20", 0.01), ("snr10", 0.03), ("snr5", 0.06)):
+        hum = 0.5 * noise_level * np.sin(2 * np.pi * 50 * t)
+        noise = noise_level * rng.standard_normal(len(t)) + hum
+        audio = speech + noise
+        audio[:int(0.1 * SAMPLE_RATE)] += 0.9 * rng.standard_normal(int(0.1 * SAMPLE_RATE))
+        fixtures[snr_name] = audio.astype(np.float32)
+    return fixtures
+
+
+def _current_path(audio: np.ndarray) -> np.ndarray:
+    """Текущий путь: пиковая нормализация всей записи"""
+    return AudioProcessor.prepare_for_whisper(audio.copy())
+
+
+def _dynamics_path(audio: np.ndarray, block: int = 1600) -> np.ndarray:
+    """Потоковый путь: гейт + АРУ по блокам (как во время записи), затем подготовка"""
+    stages = [SpectralNoiseGate(SAMPLE_RATE), AutomaticGainControl(SAMPLE_RATE)]
+    parts = []
+    for start in range(0, len(audio), block):
+        frames = audio[start:start + block]
+        for stage in stages:
+            frames = stage.process(frames)
+        parts.append(frames)
+    tail = np.empty(0, dtype=np.float32)
+    for stage in stages:
+        tail = np.concatenate((stage.process(tail) if len(tail) else tail, stage.flush()))
+    parts.append(tail)
+    return AudioProcessor.prepare_for_whisper(np.concatenate(parts))
+
+
+def bench_dynamics(args):
+    """Стоимость гейта/АРУ и влияние на время декодирования против текущего пути"""
+    fixtures = noisy_fixtures(args.seconds)
+    for path in args.fixtures:
+        fixtures[Path(path).stem] = load_audio(path)
+
+    engine = load_engine(args.config) if args.decode else None
+    if engine is not None:
+        # Прогрев: загрузка модели не должна попасть в замер
+        engine.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    print(f"{'fixture':>10} {'path':>9} {'prep, ms':>9} {'x realtime':>11} {'decode, s':>10}  text")
+    for name, audio in fixtures.items():
+        seconds = len(audio) / SAMPLE_RATE
+        for path_name, path in (("current", _current_path), ("gate+agc", _dynamics_path)):
+            prep_time = timed(path, audio)
+            decode_time, text = float("nan"), ""
+            if engine is not None:
+                prepared = path(audio)
+                start = time.perf_counter()
+                text = engine.transcribe(prepared)
+                decode_time = time.perf_counter() - start
+            print(
+                f"{name:>10} {path_name:>9} {prep_time * 1000:>9.1f} {seconds / prep_time:>11.0f} "
+                f"{decode_time:>10.2f}  {text[:40]}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки обработки аудио VTTv2")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    resample = subparsers.add_parser("resample", help="Полифазный ресемплинг")
+    resample.add_argument("--seconds", type=float, default=60.0, help="Длительность сигнала")
+    resample.add_argument(
+        "--rates", type=int, nargs="+", default=[48000, 44100], help="Входные частоты"
+    )
+    resample.add_argument("--block", type=int, default=1024, help="Размер блока в потоковом режиме")
+    resample.set_defaults(func=bench_resample)
+
+    dynamics = subparsers.add_parser("dynamics", help="Шумовой гейт и АРУ на зашумленных фикстурах")
+    dynamics.add_argument(
+        "--seconds", type=float, default=10.0, help="Длительность синтетических фикстур"
+    )
+    dynamics.add_argument(
+        "--fixtures", nargs="*", default=[], help="Дополнительные WAV/FLAC фикстуры"
+    )
+    dynamics.add_argument("--decode", action="store_true", help="Замерить время декодирования")
+    dynamics.add_argument(
+        "--config", default="config.yaml", help="Путь к config.yaml (для --decode)"
+    )
+    dynamics.set_defaults(func=bench_dynamics)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Бенчмарк декодирования
+
+- policy: фиксированные параметры из конфига против DecodePolicy (латентность, WER);
+- context: фразы подряд без контекста и с контекстом предыдущих (повторы fallback, WER).
+
+Запуск (из platforms/mlx):
+    python benchmarks/bench_decode.py --config config.yaml --fixtures fixtures/
+    python benchmarks/bench_decode.py --mode context --fixtures fixtures/dictation/
+
+Фикстуры: wav/flac файлы, эталонный текст - .txt с тем же именем (для WER).
+В режиме context фикстуры идут по имени как последовательные фразы одного документа.
+"""
+import argparse
+import time
+
+from common import load_config, load_fixtures, word_error_rate
+
+# isort: split
+from transcription.engine import TranscriptionEngineWrapper  # noqa: E402
+
+
+def _run(wrapper: TranscriptionEngineWrapper, audio) -> tuple[float, str, str]:
+    """Транскрипция фикстуры: (время, текст, выбранные параметры)"""
+    options = wrapper._decode_options(audio)
+    start = time.perf_counter()
+    text = wrapper.transcribe(audio)
+    elapsed = time.perf_counter() - start
+    params = f"bs={options.beam_size} bo={options.best_of} t={len(options.temperature)}"
+    return elapsed, text, params
+
+
+def bench_context(config, fixtures) -> None:
+    """Повторы с более высокой температурой без контекста и с контекстом предыдущих фраз"""
+    modes = {}
+    cold_config = config.model_copy(deep=True)
+    cold_config.transcription.context.enabled = False
+    modes["cold"] = TranscriptionEngineWrapper(cold_config)
+    context_config = config.model_copy(deep=True)
+    context_config.transcription.context.enabled = True
+    modes["context"] = TranscriptionEngineWrapper(context_config)
+
+    print(f"{'fixture':>12} {'mode':>8} {'fallbacks':>9} {'time, s':>8} {'wer':>6}")
+    totals = {mode: [0, 0.0, 0] for mode in modes}
+    for name, audio, reference in fixtures:
+        for mode, wrapper in modes.items():
+            start = time.perf_counter()
+            result = wrapper.transcribe_detailed(audio, app_id="bench")
+            elapsed = time.perf_counter() - start
+            wer = word_error_rate(reference, result.text) if reference else float("nan")
+            totals[mode][0] += result.fallbacks or 0
+            if reference:
+                totals[mode][1] += wer
+                totals[mode][2] += 1
+            fallbacks = "n/a" if result.fallbacks is None else str(result.fallbacks)
+            print(f"{name:>12} {mode:>8} {fallbacks:>9} {elapsed:>8.2f} {wer:>6.2f}")
+
+    print()
+    for mode, (fallbacks, wer_sum, scored) in totals.items():
+        mean_wer = wer_sum / scored if scored else float("nan")
+        print(f"{mode:>8}: fallbacks {fallbacks}, mean WER {mean_wer:.3f}")
+    print(f"Избежано повторов: {totals['cold'][0] - totals['context'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Латентность и точность декодирования")
+    parser.add_argument("--config", default="config.yaml", help="Путь к config.yaml")
+    parser.add_argument("--fixtures", required=True, help="Директория с фикстурами")
+    parser.add_argument(
+        "--mode", choices=("policy", "context"), default="policy", help="Что сравнивать"
+    )
+    parser.add_argument("--budget", type=float, default=None, help="Бюджет латентности (сек)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        parser.error(f"Нет фикстур в {args.fixtures}")
+
+    config = load_config(args.config)
+    config.transcription.two_tier.enabled = False
+    if args.mode == "context":
+        bench_context(config, fixtures)
+        return
+    # Контекст меняет результат от порядка фикстур - сравниваем параметры без него
+    config.transcription.context.enabled = False
+
+    modes = {}
+    config.transcription.decode_policy.enabled = False
+    modes["config"] = TranscriptionEngineWrapper(config)
+    policy_config = config.model_copy(deep=True)
+    policy_config.transcription.decode_policy.enabled = True
+    policy_config.transcription.decode_policy.latency_budget = args.budget
+    modes["policy"] = TranscriptionEngineWrapper(policy_config)
+
+    # Прогрев модели, чтобы загрузка не попала в замер
+    for wrapper in modes.values():
+        wrapper.transcribe(fixtures[0][1])
+
+    print(
+        f"{'fixture':>12} {'dur, s':>7} {'mode':>7} {'params':>14} {'time, s':>8} {'rtf':>6} "
+        f"{'wer':>6}"
+    )
+    totals = {mode: [0.0, 0.0, 0] for mode in modes}
+    for name, audio, reference in fixtures:
+        duration = len(audio) / 16000
+        for mode, wrapper in modes.items():
+            elapsed, text, params = _run(wrapper, audio)
+            wer = word_error_rate(reference, text) if reference else float("nan")
+            totals[mode][0] += elapsed
+            if reference:
+                totals[mode][1] += wer
+                totals[mode][2] += 1
+            print(
+                f"{name:>12} {duration:>7.1f} {mode:>7} {params:>14} "
+                f"{elapsed:>8.2f} {elapsed / duration:>6.2f} {wer:>6.2f}"
+            )
+
+    print()
+    for mode, (elapsed, wer_sum, scored) in totals.items():
+        mean_wer = wer_sum / scored if scored else float("nan")
+        print(f"{mode:>7}: total {elapsed:.2f} s, mean WER {mean_wer:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Бенчмарк движков транскрипции: real-time factor на одном и том же CPU
+
+Каждый движок декодирует одинаковые фикстуры с одинаковыми параметрами
+(по умолчанию жадное декодирование); контекст, кэш языка, политика и
+двухуровневый режим отключены.
+
+Запуск (из platforms/mlx):
+    python benchmarks/bench_engines.py --fixtures fixtures/ --engines whisper_cpp faster_whisper
+    python benchmarks/bench_engines.py --fixtures fixtures/ --engines whisper_cpp --threads 8
+
+whisper_cpp_bindings - whisper.cpp в процессе (whisper_cpp.backend: bindings).
+
+Фикстуры: wav/flac файлы, эталонный текст - .txt с тем же именем (для WER)
+"""
+import argparse
+import time
+
+from common import load_config, load_fixtures, word_error_rate
+
+# isort: split
+from transcription.engine import TranscriptionEngineWrapper  # noqa: E402
+from transcription.policy import DecodeOptions  # noqa: E402
+
+# Варианты whisper.cpp: имя в бенчмарке -> whisper_cpp.backend
+_WHISPER_CPP_BACKENDS = {"whisper_cpp": "subprocess", "whisper_cpp_bindings": "bindings"}
+
+
+def _threads(config, engine: str) -> str:
+    """Количество потоков движка из конфигурации"""
+    if engine in _WHISPER_CPP_BACKENDS:
+        return str(config.transcription.whisper_cpp.threads)
+    if engine == "faster_whisper":
+        return str(config.transcription.faster_whisper.cpu_threads)
+    return "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTF движков транскрипции на одинаковых фикстурах")
+    parser.add_argument("--config", default="config.yaml", help="Путь к config.yaml")
+    parser.add_argument("--fixtures", required=True, help="Директория с фикстурами")
+    parser.add_argument(
+        "--engines", nargs="+", default=["whisper_cpp", "faster_whisper"],
+        choices=("whisper_cpp", "whisper_cpp_bindings", "mlx_whisper", "faster_whisper"),
+        help="Движки для сравнения"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=None, help="Потоков CPU для всех движков (иначе из конфига)"
+    )
+    parser.add_argument("--beam", type=int, default=1, help="Beam size (1 - жадное декодирование)")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Повторов каждой фикстуры (берется лучшее время)"
+    )
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        parser.error(f"Нет фикстур в {args.fixtures}")
+    options = DecodeOptions(beam_size=args.beam, best_of=args.beam, reason="bench")
+
+    print(
+        f"{'engine':>15} {'threads':>7} {'load, s':>8} {'audio, s':>9} {'decode, s':>10} "
+        f"{'rtf':>6} {'wer':>6}"
+    )
+    for engine in args.engines:
+        config = load_config(args.config)
+        config.transcription.engine = "whisper_cpp" if engine in _WHISPER_CPP_BACKENDS else engine
+        if engine in _WHISPER_CPP_BACKENDS:
+            config.transcription.whisper_cpp.backend = _WHISPER_CPP_BACKENDS[engine]
+        config.transcription.two_tier.enabled = False
+        config.transcription.decode_policy.enabled = False
+        config.transcription.context.enabled = False
+        config.transcription.language_cache.enabled = False
+        # Замер конкретного движка: без переключения на резервный при ошибке
+        config.transcription.fallback.engines = []
+        if engine == "faster_whisper" and config.transcription.faster_whisper is None:
+            from config.loader import FasterWhisperConfig
+            config.transcription.faster_whisper = FasterWhisperConfig()
+        if args.threads is not None:
+            if config.transcription.whisper_cpp:
+                config.transcription.whisper_cpp.threads = args.threads
+            if config.transcription.faster_whisper:
+                config.transcription.faster_whisper.cpu_threads = args.threads
+
+        start = time.perf_counter()
+        try:
+            transcriber = TranscriptionEngineWrapper(config).engine
+        except Exception as e:
+            print(f"{engine:>15} недоступен: {e}")
+            continue
+        load_time = time.perf_counter() - start
+
+        # Прогрев (загрузка весов, JIT/кэши), чтобы не попал в замер
+        transcriber.transcribe_detailed(fixtures[0][1], options)
+
+        audio_total = decode_total = wer_sum = 0.0
+        scored = 0
+        for _, audio, reference in fixtures:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = transcriber.transcribe_detailed(audio, options)
+                best = min(best, time.perf_counter() - start)
+            audio_total += len(audio) / 16000
+            decode_total += best
+            if reference:
+                wer_sum += word_error_rate(reference, result.text)
+                scored += 1
+
+        wer = wer_sum / scored if scored else float("nan")
+        print(
+            f"{engine:>15} {_threads(config, engine):>7} {load_time:>8.2f} {audio_total:>9.1f} "
+            f"{decode_total:>10.2f} {decode_total / audio_total:>6.3f} {wer:>6.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Бенчмарк истории транскриптов VTTv2 (SQLite FTS5)
+
+Запуск (из platforms/mlx):
+    python benchmarks/bench_history.py --entries 300000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import common  # noqa: F401 - src/src в пути
+import numpy as np
+
+# isort: split
+from config.loader import HistoryConfig  # noqa: E402
+from storage.history import TranscriptHistory  # noqa: E402
+
+_WORDS = (
+    "встреча бюджет проект задача отчет клиент договор релиз сервер модель запись текст "
+    "транскрипция диктовка письмо звонок команда неделя квартал план срок ошибка тест "
+    "meeting budget release deploy review"
+).split()
+
+
+def _texts(count: int, rng: np.random.Generator) -> list[str]:
+    lengths = rng.integers(5, 40, size=count)
+    picks = rng.integers(0, len(_WORDS), size=int(lengths.sum()))
+    texts, offset = [], 0
+    for length in lengths:
+        texts.append(" ".join(_WORDS[i] for i in picks[offset:offset + length]))
+        offset += length
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк истории транскриптов VTTv2")
+    parser.add_argument("--entries", type=int, default=300000, help="Записей в истории")
+    parser.add_argument("--queries", type=int, default=200, help="Запросов на тип поиска")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        history = TranscriptHistory(
+            HistoryConfig(path=str(Path(directory) / "history.db"), batch_size=512)
+        )
+
+        start = time.perf_counter()
+        for text in _texts(args.entries, rng):
+            history.add(
+                text, app_id="com.apple.Notes", engine="mlx_whisper", audio_duration=5.0,
+                elapsed=0.5
+            )
+        enqueue_time = time.perf_counter() - start
+        history.flush()
+        total_time = time.perf_counter() - start
+        size_mb = sum(p.stat().st_size for p in Path(directory).iterdir()) / 1024 / 1024
+        print(
+            f"Запись: {args.entries} за {total_time:.1f}с ({args.entries / total_time:.0f}/с), "
+            f"add() в среднем {enqueue_time / args.entries * 1e6:.1f} мкс, база {size_mb:.0f} MB"
+        )
+
+        queries = {
+            "prefix": [_WORDS[i][:4] for i in rng.integers(0, len(_WORDS), args.queries)],
+            "words": [
+                f"{_WORDS[a]} {_WORDS[b][:3]}"
+                for a, b in rng.integers(0, len(_WORDS), (args.queries, 2))
+            ],
+            "phrase": [
+                f'"{_WORDS[a]} {_WORDS[b]}"'
+                for a, b in rng.integers(0, len(_WORDS), (args.queries, 2))
+            ],
+        }
+        print(f"{'query':>8} {'p50, ms':>8} {'p99, ms':>8} {'hits':>6}")
+        for kind, items in queries.items():
+            latencies, hits = [], 0
+            for query in items:
+                start = time.perf_counter()
+                hits += len(history.search(query, limit=20))
+                latencies.append((time.perf_counter() - start) * 1000)
+            print(
+                f"{kind:>8} {np.percentile(latencies, 50):>8.2f} "
+                f"{np.percentile(latencies, 99):>8.2f} "
+                f"{hits / len(items):>6.1f}"
+            )
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Бенчмарк постобработки текста VTTv2 (словарь Ахо-Корасик, паразиты, числа)
+
+Запуск (из platforms/mlx):
+    python benchmarks/bench_text.py --vocabulary 10000
+"""
+import argparse
+import time
+
+import common  # noqa: F401 - src/src в пути
+import numpy as np
+
+# isort: split
+from config.loader import TextProcessingConfig  # noqa: E402
+from text.processor import StreamingTextProcessor, TextProcessor  # noqa: E402
+
+_WORDS = (
+    "встреча бюджет проект задача отчет клиент договор релиз сервер модель запись текст "
+    "транскрипция диктовка письмо звонок команда неделя квартал план срок ошибка тест "
+    "двадцать пять тысяч сто э эм ну так"
+).split()
+
+_LETTERS = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+
+
+def _vocabulary(size: int, rng: np.random.Generator) -> dict:
+    vocabulary = {}
+    while len(vocabulary) < size:
+        words = [
+            "".join(rng.choice(list(_LETTERS), size=rng.integers(3, 9)))
+            for _ in range(rng.integers(1, 4))
+        ]
+        vocabulary[" ".join(words)] = "_".join(words).upper()
+    # Часть фраз - реальные слова, чтобы замены срабатывали
+    for word in _WORDS[:10]:
+        vocabulary[f"{word} {_WORDS[-5]}"] = word.upper()
+    return vocabulary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк постобработки текста VTTv2")
+    parser.add_argument("--vocabulary", type=int, default=10000, help="Фраз в словаре")
+    parser.add_argument("--texts", type=int, default=2000, help="Фраз для обработки")
+    parser.add_argument("--words", type=int, default=40, help="Слов во фразе")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = _vocabulary(args.vocabulary, rng)
+    start = time.perf_counter()
+    processor = TextProcessor(TextProcessingConfig(enabled=True), vocabulary=vocabulary)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(
+        f"Словарь: {len(vocabulary)} фраз, {len(processor.matcher)} состояний, построение "
+        f"{build_ms:.0f} мс"
+    )
+
+    texts = [" ".join(rng.choice(_WORDS, size=args.words)) for _ in range(args.texts)]
+    print(f"{'mode':>10} {'p50, мкс':>10} {'p99, мкс':>10} {'мкс/слово':>10}")
+    for mode in ("process", "streaming"):
+        latencies = []
+        for text in texts:
+            start = time.perf_counter()
+            if mode == "process":
+                processor.process(text)
+            else:
+                streaming = StreamingTextProcessor(processor)
+                for word in text.split(" "):
+                    streaming.feed(word + " ")
+                streaming.finish()
+            latencies.append((time.perf_counter() - start) * 1e6)
+        print(
+            f"{mode:>10} {np.percentile(latencies, 50):>10.0f} "
+            f"{np.percentile(latencies, 99):>10.0f} "
+            f"{np.median(latencies) / args.words:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Общие функции бенчмарков VTTv2
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# Импорты как в main.py (src/src в пути)
+SRC_DIR = Path(__file__).parent.parent / "src" / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+def timed(func, *args, repeat: int = 3) -> float:
+    """Лучшее время из repeat запусков (сек)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_config(config_path: str):
+    """Конфигурация из config.yaml (относительные пути - от его директории)"""
+    from config.loader import Config
+
+    config_file = Path(config_path).resolve()
+    return Config.from_yaml(str(config_file), config_file.parent)
+
+
+def load_engine(config_path: str):
+    """Движок транскрипции из config.yaml"""
+    from transcription.engine import TranscriptionEngineWrapper
+
+    return TranscriptionEngineWrapper(load_config(config_path))
+
+
+def load_audio(path: str) -> np.ndarray:
+    """Чтение аудио файла в float32 моно 16 кГц"""
+    import soundfile as sf
+    from audio.processor import AudioProcessor
+
+    audio, rate = sf.read(path, dtype="float32", always_2d=True)
+    audio = AudioProcessor.concatenate_mono([audio])
+    if rate != SAMPLE_RATE:
+        audio = AudioProcessor.resample(audio, rate, SAMPLE_RATE)
+    return audio
+
+
+def load_fixtures(directory: str) -> list[tuple[str, np.ndarray, str]]:
+    """
+    Фикстуры из директории: аудио (wav/flac) и эталонный текст с тем же именем (.txt)
+
+    Returns:
+        Список (имя, аудио, эталон); эталон пустой, если .txt нет
+    """
+    fixtures = []
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() not in (".wav", ".flac"):
+            continue
+        reference_file = path.with_suffix(".txt")
+        reference = (
+            reference_file.read_text(encoding="utf-8").strip() if reference_file.exists() else ""
+        )
+        fixtures.append((path.stem, load_audio(str(path)), reference))
+    return fixtures
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER: расстояние Левенштейна по словам / количество слов эталона"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return float(bool(hyp))
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
@@ -0,0 +1,262 @@
+"""
+Потоковая обработка динамики аудио для VTTv2: АРУ и спектральный шумовой гейт
+
+Обе стадии работают по блокам во время записи (тот же интерфейс
+process/flush/reset, что и у PolyphaseResampler), поэтому к моменту
+остановки записи аудио уже обработано.
+"""
+import numpy as np
+
+_EPS = 1e-10
+
+# Поправка на смещение оценки шума по минимуму (минимум ниже среднего уровня)
+_NOISE_BIAS = 2.0
+
+
+def _db_to_amplitude(db: float) -> float:
+    return float(10.0 ** (db / 20.0))
+
+
+class AutomaticGainControl:
+    """
+    Блочная автоматическая регулировка усиления (АРУ)
+
+    Усиление считается по RMS коротких кадров и сглаживается с быстрой
+    атакой (уменьшение) и медленным восстановлением (увеличение), поэтому
+    одиночный громкий звук (кашель) приглушается локально, а не делает тихой
+    всю запись, как пиковая нормализация. В тишине усиление не растет,
+    чтобы не поднимать фоновый шум. Внутри кадра усиление меняется линейно
+    (без ступенек), выход ограничивается диапазоном [-1, 1].
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        target_level_db: float = -20.0,
+        max_gain_db: float = 30.0,
+        min_gain_db: float = -20.0,
+        silence_level_db: float = -40.0,
+        attack_ms: float = 10.0,
+        release_ms: float = 300.0,
+        frame_ms: float = 10.0
+    ):
+        """
+        Инициализация АРУ
+
+        Args:
+            sample_rate: Частота дискретизации
+            target_level_db: Целевой RMS уровень (dBFS)
+            max_gain_db: Максимальное усиление (dB)
+            min_gain_db: Минимальное усиление (dB)
+            silence_level_db: Уровень, ниже которого кадр считается тишиной (dBFS)
+            attack_ms: Постоянная времени уменьшения усиления
+            release_ms: Постоянная времени увеличения усиления
+            frame_ms: Длина кадра оценки уровня
+        """
+        self.frame_size = max(1, int(sample_rate * frame_ms / 1000))
+        self.target = _db_to_amplitude(target_level_db)
+        self.max_gain = _db_to_amplitude(max_gain_db)
+        self.min_gain = _db_to_amplitude(min_gain_db)
+        self.silence = _db_to_amplitude(silence_level_db)
+        self.attack = 1.0 - np.exp(-frame_ms / max(attack_ms, _EPS))
+        self.release = 1.0 - np.exp(-frame_ms / max(release_ms, _EPS))
+        self.reset()
+
+    def reset(self):
+        """Сброс состояния (начало нового потока)"""
+        self.gain = 1.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Обработка блока (выход той же длины, без задержки)
+
+        Args:
+            block: Моно блок float32
+
+        Returns:
+            Обработанный блок float32
+        """
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        n = len(block)
+        if n == 0:
+            return block
+
+        # RMS всех кадров блока одним векторным шагом (последний кадр может быть неполным)
+        starts = np.arange(0, n, self.frame_size)
+        squares = np.add.reduceat(block.astype(np.float64) ** 2, starts)
+        lengths = np.diff(np.append(starts, n))
+        rms = np.sqrt(squares / lengths)
+        desired = np.clip(self.target / np.maximum(rms, _EPS), self.min_gain, self.max_gain)
+
+        # Сглаживание усиления (рекурсия по кадрам, их ~100 в секунду)
+        gains = np.empty(len(starts) + 1)
+        gains[0] = gain = self.gain
+        for i, (level, wanted) in enumerate(zip(rms, desired)):
+            if level < self.silence:
+                wanted = min(wanted, gain)  # В тишине не усиливаем шум
+            coef = self.attack if wanted < gain else self.release
+            gain += coef * (wanted - gain)
+            gains[i + 1] = gain
+        self.gain = gain
+
+        # Линейная интерполяция усиления внутри кадров
+        positions = np.append(starts, n)
+        envelope = np.interp(np.arange(n), positions, gains).astype(np.float32)
+        out = block * envelope
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def flush(self) -> np.ndarray:
+        """АРУ не задерживает сигнал - хвоста нет"""
+        return np.empty(0, dtype=np.float32)
+
+
+class SpectralNoiseGate:
+    """
+    Спектральный шумовой гейт (STFT с перекрытием 50%)
+
+    Профиль шума по частотам оценивается отслеживанием минимума сглаженной
+    мощности: быстро вниз и медленно вверх, поэтому речь (в том числе в
+    начале записи) не принимается за шум. Бины, не превышающие профиль шума
+    на threshold_db, ослабляются на attenuation_db; маска сглаживается по
+    времени и частоте, чтобы избежать "музыкального" шума. Из-за перекрытия
+    окон выход задержан на hop сэмплов; остаток выдает flush().
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: float = 32.0,
+        threshold_db: float = 6.0,
+        attenuation_db: float = -20.0,
+        noise_update: float = 0.01
+    ):
+        """
+        Инициализация гейта
+
+        Args:
+            sample_rate: Частота дискретизации
+            frame_ms: Длина окна STFT
+            threshold_db: Превышение над шумом, при котором бин открыт
+            attenuation_db: Ослабление закрытых бинов
+            noise_update: Относительный рост оценки шума за кадр
+        """
+        frame = int(sample_rate * frame_ms / 1000)
+        self.frame_size = frame + (frame % 2)
+        self.hop = self.frame_size // 2
+        # sqrt-Hann для анализа и синтеза: сумма квадратов при перекрытии 50% равна 1
+        self.window = np.sqrt(np.hanning(self.frame_size + 1)[:-1]).astype(np.float32)
+        self.threshold = _db_to_amplitude(threshold_db)
+        self.floor = _db_to_amplitude(attenuation_db)
+        self.noise_update = noise_update
+        self.reset()
+
+    def reset(self):
+        """Сброс состояния (начало нового потока)"""
+        bins = self.frame_size // 2 + 1
+        self._input = np.zeros(self.hop, dtype=np.float32)  # Хвост входа для перекрытия
+        self._overlap = np.zeros(self.hop, dtype=np.float32)  # Хвост синтеза
+        self._noise = np.zeros(bins)  # Оценка мощности шума по бинам
+        self._smoothed = np.zeros(bins)
+        self._mask = np.ones(bins)
+        self._frames_seen = 0
+        self._skip = self.hop  # Первые hop сэмплов синтеза относятся к нулевому префиксу
+        self._pending = 0  # Входных сэмплов, еще не выданных на выход
+
+    def _update_noise(self, magnitude: np.ndarray):
+        """Обновление профиля шума по кадру (отслеживание минимума)"""
+        # Сглаженная по времени мощность снижает разброс оценки по отдельным кадрам
+        power = magnitude ** 2
+        if self._frames_seen == 0:
+            self._smoothed = power
+            self._noise = power.copy()
+        else:
+            self._smoothed = 0.7 * self._smoothed + 0.3 * power
+        self._frames_seen += 1
+
+        # Вниз - быстро (шум не громче тишины), вверх - медленно (речь не считается шумом)
+        falling = self._smoothed < self._noise
+        self._noise = np.where(
+            falling,
+            self._noise + 0.5 * (self._smoothed - self._noise),
+            self._noise * (1.0 + self.noise_update)
+        )
+
+    @staticmethod
+    def _smooth_frequency(masks: np.ndarray) -> np.ndarray:
+        """
+        Сглаживание маски по частоте
+
+        Края дополняются повтором крайних бинов: DC и Найквист не смешиваются.
+        """
+        padded = np.pad(masks, ((0, 0), (1, 1)), mode="edge")
+        return (padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]) / 3.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Обработка блока
+
+        Args:
+            block: Моно блок float32
+
+        Returns:
+            Готовые выходные сэмплы (задержка hop сэмплов)
+        """
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        data = np.concatenate((self._input, block))
+        frames_count = (len(data) - self.hop) // self.hop
+        self._pending += len(block)
+        if frames_count <= 0:
+            self._input = data
+            return np.empty(0, dtype=np.float32)
+
+        # Все полные кадры блока - одним векторным FFT
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.frame_size)
+        frames = windows[::self.hop][:frames_count]
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        magnitude = np.abs(spectrum)
+
+        masks = np.empty_like(magnitude)
+        for i, frame_magnitude in enumerate(magnitude):
+            self._update_noise(frame_magnitude)
+            # Смещение оценки по минимуму компенсируется множителем _NOISE_BIAS
+            open_bins = self._smoothed > self.threshold ** 2 * _NOISE_BIAS * self._noise
+            target = np.where(open_bins, 1.0, self.floor)
+            # Быстрое открытие, плавное закрытие
+            coef = np.where(target > self._mask, 0.8, 0.2)
+            self._mask += coef * (target - self._mask)
+            masks[i] = self._mask
+        smoothed = self._smooth_frequency(masks)
+
+        synthesized = (
+            np.fft.irfft(spectrum * smoothed, n=self.frame_size, axis=1).astype(np.float32)
+        )
+        synthesized *= self.window
+
+        # Overlap-add: каждый кадр дает hop готовых сэмплов
+        out = np.empty(frames_count * self.hop, dtype=np.float32)
+        overlap = self._overlap
+        for i in range(frames_count):
+            out[i * self.hop:(i + 1) * self.hop] = overlap + synthesized[i, :self.hop]
+            overlap = synthesized[i, self.hop:]
+        self._overlap = overlap.copy()
+        self._input = data[frames_count * self.hop:].copy()
+
+        if self._skip:
+            skipped = min(self._skip, len(out))
+            out = out[skipped:]
+            self._skip -= skipped
+        self._pending -= len(out)
+        return out
+
+    def flush(self) -> np.ndarray:
+        """
+        Завершение потока: выдача задержанных сэмплов
+
+        Returns:
+            Хвост выхода (после него состояние сбрасывается)
+        """
+        pending = self._pending
+        tail = self.process(np.zeros(self.frame_size + self.hop, dtype=np.float32))[:pending]
+        self.reset()
+        return tail
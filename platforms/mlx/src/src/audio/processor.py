@@ -2,22 +2,58 @@
 Обработка аудио данных для VTTv2
 """
 import logging
+from collections.abc import Sequence
 import numpy as np
-from typing import Optional
+
+from .resampler import PolyphaseResampler
 
 logger = logging.getLogger(__name__)
 
+# Размер блока для однопроходного поиска пика (ограничивает временный буфер)
+_PEAK_BLOCK_SIZE = 65536
+
+# Масштаб конвертации int16 -> float32 в диапазон [-1, 1)
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
 
 class AudioProcessor:
     """Обработка аудио данных"""
     
     @staticmethod
-    def normalize_audio(audio_data: np.ndarray) -> np.ndarray:
+    def peak_amplitude(audio_data: np.ndarray) -> float:
+        """
+        Пиковая амплитуда за один проход по данным
+
+        Временный буфер ограничен _PEAK_BLOCK_SIZE сэмплами, поэтому
+        поиск пика не создает копию всего аудио (в отличие от np.abs(x).max()).
+
+        Args:
+            audio_data: Входные аудио данные
+
+        Returns:
+            Максимальное абсолютное значение (0.0 для пустых данных)
+        """
+        flat = audio_data.reshape(-1)
+        if flat.size == 0:
+            return 0.0
+
+        scratch = np.empty(min(flat.size, _PEAK_BLOCK_SIZE), dtype=flat.dtype)
+        peak = 0.0
+        for start in range(0, flat.size, _PEAK_BLOCK_SIZE):
+            block = flat[start:start + _PEAK_BLOCK_SIZE]
+            out = scratch[:block.size]
+            np.abs(block, out=out)
+            peak = max(peak, float(out.max()))
+        return peak
+
+    @staticmethod
+    def normalize_audio(audio_data: np.ndarray, inplace: bool = False) -> np.ndarray:
         """
         Нормализация аудио данных
         
         Args:
             audio_data: Входные аудио данные
+            inplace: Нормализовать в том же буфере (без копии)
         
         Returns:
             Нормализованные аудио данные
@@ -26,12 +62,76 @@ class AudioProcessor:
             return audio_data
         
         # Нормализация к диапазону [-1, 1]
-        max_val = np.abs(audio_data).max()
+        max_val = AudioProcessor.peak_amplitude(audio_data)
         if max_val > 0:
-            audio_data = audio_data / max_val
+            if inplace:
+                np.divide(audio_data, max_val, out=audio_data)
+            else:
+                audio_data = audio_data / max_val
         
         return audio_data
     
+    @staticmethod
+    def concatenate_mono(
+        chunks: Sequence[np.ndarray],
+        out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Склейка чанков записи в один моно буфер float32
+
+        Сведение в моно и приведение к float32 (включая масштабирование int16)
+        выполняются при копировании каждого чанка в заранее выделенный буфер,
+        поэтому склейка делает ровно одну копию аудио.
+
+        Args:
+            chunks: Чанки float32 или int16 формы (frames,) или (frames, channels)
+            out: Заранее выделенный буфер (опционально)
+
+        Returns:
+            Одномерный float32 массив со всеми сэмплами
+        """
+        total = sum(len(chunk) for chunk in chunks)
+        if out is None:
+            out = np.empty(total, dtype=np.float32)
+        elif out.shape != (total,) or out.dtype != np.float32:
+            raise ValueError(
+                f"Неверный буфер: ожидается ({total},) float32, получено {out.shape} {out.dtype}"
+            )
+
+        pos = 0
+        for chunk in chunks:
+            frames = len(chunk)
+            target = out[pos:pos + frames]
+            if chunk.ndim > 1 and chunk.shape[1] > 1:
+                np.mean(chunk, axis=1, dtype=np.float32, out=target)
+                if chunk.dtype == np.int16:
+                    target *= _INT16_SCALE
+            elif chunk.dtype == np.int16:
+                np.multiply(chunk.reshape(-1), _INT16_SCALE, out=target)
+            else:
+                target[...] = chunk.reshape(-1)
+            pos += frames
+
+        return out
+
+    @staticmethod
+    def resample(audio_data: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+        """
+        Полифазный ресемплинг сигнала целиком
+
+        Для потоковой обработки по блокам используйте PolyphaseResampler
+        напрямую (process/flush).
+
+        Args:
+            audio_data: Моно сигнал
+            src_rate: Исходная частота дискретизации
+            dst_rate: Целевая частота дискретизации
+
+        Returns:
+            Сигнал float32 на частоте dst_rate
+        """
+        return PolyphaseResampler(src_rate, dst_rate).resample(audio_data)
+
     @staticmethod
     def validate_audio(
         audio_data: np.ndarray,
@@ -63,23 +163,30 @@ class AudioProcessor:
     @staticmethod
     def prepare_for_whisper(audio_data: np.ndarray) -> np.ndarray:
         """
-        Подготовка аудио данных для whisper.cpp
+        Подготовка аудио данных для Whisper
+
+        Единый этап подготовки: сведение в моно, приведение к float32 и
+        нормализация по пику. Буфер float32 моно (как его отдает
+        AudioRecorder) нормализуется на месте без копирования; в остальных
+        случаях делается ровно одна копия.
         
         Args:
             audio_data: Входные аудио данные
         
         Returns:
-            Подготовленные аудио данные
+            Подготовленные аудио данные (float32, моно, [-1, 1])
         """
-        # Нормализация
-        audio_data = AudioProcessor.normalize_audio(audio_data)
-        
-        # Конвертация в моно если нужно
-        if len(audio_data.shape) > 1:
-            audio_data = np.mean(audio_data, axis=1)
+        # Конвертация в моно если нужно (одна копия сразу в float32)
+        if audio_data.ndim > 1:
+            if audio_data.shape[1] > 1:
+                audio_data = np.mean(audio_data, axis=1, dtype=np.float32)
+            else:
+                audio_data = audio_data.reshape(-1)
         
-        # Конвертация в float32
-        audio_data = audio_data.astype(np.float32)
+        # Конвертация в float32 (без копии если тип уже float32)
+        audio_data = audio_data.astype(np.float32, copy=False)
+        if not audio_data.flags.writeable:
+            audio_data = audio_data.copy()
         
-        return audio_data
-
+        # Нормализация на месте
+        return AudioProcessor.normalize_audio(audio_data, inplace=True)
@@ -2,13 +2,32 @@
 Запись аудио с микрофона для VTTv2
 """
 import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
 import numpy as np
 import sounddevice as sd
-from typing import Optional, List
-from queue import Queue
+
+from .dynamics import AutomaticGainControl, SpectralNoiseGate
+from .processor import AudioProcessor
+from .resampler import PolyphaseResampler
+from .ring_buffer import AudioRingBuffer
 
 logger = logging.getLogger(__name__)
 
+# Период выгрузки кадров из кольцевого буфера (сек)
+DRAIN_INTERVAL = 0.05
+
+
+@dataclass
+class CaptureStats:
+    """Счетчики захвата аудио (метрики вместо логов в realtime callback)"""
+    callbacks: int = 0
+    input_overflows: int = 0
+    input_underflows: int = 0
+    dropped_frames: int = 0
+
 
 class AudioRecorder:
     """Запись аудио с микрофона"""
@@ -28,12 +47,180 @@ class AudioRecorder:
         self.device_index = self.audio_config.device_index
         self.chunk_size = self.audio_config.chunk_size
         self.max_duration = self.audio_config.max_recording_duration
+        self.capture_dtype = self.audio_config.capture_dtype
+
+        # Захват на родной частоте устройства с ресемплингом в sample_rate
+        self.capture_rate = self._resolve_capture_rate()
+        self.resampler: PolyphaseResampler | None = None
+        if self.capture_rate != self.sample_rate:
+            self.resampler = PolyphaseResampler(self.capture_rate, self.sample_rate)
+
+        # Потоковые стадии обработки, выполняемые по мере выгрузки во время записи
+        self.stages = self._build_stages()
+
+        # Теплый поток: устройство открыто постоянно, pre-roll хранится в кольцевом буфере
+        self.warm_stream = self.audio_config.warm_stream
+        self.preroll_frames = (
+            int(self.capture_rate * self.audio_config.preroll_ms / 1000) if self.warm_stream else 0
+        )
         
+        # Кольцевой буфер - единственный канал между realtime callback и потоком выгрузки
+        # (один писатель, один читатель, без блокировок и аллокаций в callback)
+        capacity = self.preroll_frames + int(
+            self.capture_rate * self.audio_config.ring_buffer_seconds
+        )
+        self.ring_buffer = AudioRingBuffer(
+            capacity, channels=self.channels, dtype=self.capture_dtype
+        )
+
+        self.stats = CaptureStats()
+        self._stats_at_start = CaptureStats()
+        self.stream = None
         self.is_recording = False
-        self.audio_queue: Queue = Queue()
-        self.recorded_audio: List[np.ndarray] = []
+        self.recorded_audio: list[np.ndarray] = []
+        self._read_index = 0
+        self._stop_index: int | None = None
+        self._drain_thread: threading.Thread | None = None
+        self._drain_stop = threading.Event()
+        # Выгрузка и фиксация конца записи не пересекаются
+        self._drain_lock = threading.Lock()
+
+        logger.info(
+            f"AudioRecorder инициализирован (sample_rate={self.sample_rate}, "
+            f"channels={self.channels}, "
+            f"dtype={self.capture_dtype}, capture_rate={self.capture_rate})"
+        )
+
+    def _resolve_capture_rate(self) -> int:
+        """Частота захвата: sample_rate, явное значение или родная частота устройства"""
+        capture_rate = self.audio_config.capture_sample_rate
+        if capture_rate is None:
+            return self.sample_rate
+        if capture_rate == "native":
+            device_info = sd.query_devices(self.device_index, 'input')
+            native_rate = int(device_info['default_samplerate'])
+            logger.info(f"Родная частота устройства: {native_rate} Гц")
+            return native_rate
+        return int(capture_rate)
+
+    def _build_stages(self) -> list:
+        """Цепочка потоковой обработки: ресемплинг -> шумовой гейт -> АРУ"""
+        stages = []
+        if self.resampler is not None:
+            stages.append(self.resampler)
+
+        gate_config = self.audio_config.noise_gate
+        if gate_config.enabled:
+            stages.append(SpectralNoiseGate(
+                self.sample_rate,
+                threshold_db=gate_config.threshold_db,
+                attenuation_db=gate_config.attenuation_db
+            ))
+
+        agc_config = self.audio_config.agc
+        if agc_config.enabled:
+            stages.append(AutomaticGainControl(
+                self.sample_rate,
+                target_level_db=agc_config.target_level_db,
+                max_gain_db=agc_config.max_gain_db,
+                attack_ms=agc_config.attack_ms,
+                release_ms=agc_config.release_ms
+            ))
+
+        return stages
+
+    def _flush_stages(self) -> np.ndarray:
+        """Выдача хвостов всех стадий по порядку цепочки"""
+        tail = np.empty(0, dtype=np.float32)
+        for stage in self.stages:
+            processed = stage.process(tail) if len(tail) else tail
+            tail = np.concatenate((processed, stage.flush()))
+        return tail
+
+    def _audio_callback(self, indata, frames, time_info, status):
+        """
+        Callback для записи аудио (realtime поток PortAudio)
+
+        Только копирует блок в заранее выделенный кольцевой буфер и
+        увеличивает счетчики: без логирования, блокировок и аллокаций.
+        """
+        self.stats.callbacks += 1
+        if status:
+            if status.input_overflow:
+                self.stats.input_overflows += 1
+            if status.input_underflow:
+                self.stats.input_underflows += 1
+
+        self.ring_buffer.write(indata)
+
+    def _drain(self):
+        """
+        Выгрузка новых кадров из кольцевого буфера в список чанков
+
+        После остановки записи - только до зафиксированного конца (_stop_index).
+        """
+        with self._drain_lock:
+            self._drain_locked()
+
+    def _drain_locked(self):
+        ring = self.ring_buffer
+        stop = ring.write_index
+        if self._stop_index is not None:
+            stop = min(self._stop_index, stop)
+
+        # Читатель отстал больше чем на емкость буфера - кадры потеряны
+        oldest = ring.oldest_index
+        if self._read_index < oldest:
+            self.stats.dropped_frames += oldest - self._read_index
+            self._read_index = oldest
         
-        logger.info(f"AudioRecorder инициализирован (sample_rate={self.sample_rate}, channels={self.channels})")
+        if stop > self._read_index:
+            frames = ring.read(self._read_index, stop)
+            self._read_index = stop
+            if self.stages:
+                # Потоковая обработка по мере выгрузки (к остановке записи все готово);
+                # конвертация в float32 моно выполняется здесь для каждой порции
+                frames = AudioProcessor.concatenate_mono([frames])
+                for stage in self.stages:
+                    frames = stage.process(frames)
+            self.recorded_audio.append(frames)
+
+    def _drain_loop(self):
+        """Фоновая выгрузка кадров во время записи"""
+        while not self._drain_stop.wait(DRAIN_INTERVAL):
+            self._drain()
+
+    def _open_stream(self):
+        """Создание и запуск входного потока"""
+        self.stream = sd.InputStream(
+            channels=self.channels,
+            device=self.device_index,
+            blocksize=self.chunk_size,
+            samplerate=self.capture_rate,
+            callback=self._audio_callback,
+            dtype=self.capture_dtype
+        )
+        self.stream.start()
+
+    def _close_stream(self):
+        """Остановка и закрытие входного потока"""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def open_stream(self):
+        """
+        Открытие теплого потока заранее (только в режиме warm_stream)
+
+        После этого start_recording не открывает устройство, а только
+        запоминает индекс начала записи.
+        """
+        if not self.warm_stream or self.stream is not None:
+            return
+
+        self._open_stream()
+        logger.info(f"Теплый поток открыт (pre-roll {self.audio_config.preroll_ms} мс)")
     
     def start_recording(self):
         """Начало записи аудио"""
@@ -41,36 +228,35 @@ class AudioRecorder:
             logger.warning("Запись уже идет")
             return
         
-        self.is_recording = True
         self.recorded_audio = []
-        self.audio_queue = Queue()
-        
-        def audio_callback(indata, frames, time_info, status):
-            """Callback для записи аудио"""
-            if status:
-                logger.warning(f"Статус записи: {status}")
-            
-            if self.is_recording:
-                # Конвертация в numpy array
-                audio_data = indata.copy()
-                self.audio_queue.put(audio_data)
+        self._stop_index = None
+        for stage in self.stages:
+            stage.reset()
+        self._stats_at_start = CaptureStats(**vars(self.stats))
         
-        try:
-            # Начало записи
-            self.stream = sd.InputStream(
-                samplerate=self.sample_rate,
-                channels=self.channels,
-                device=self.device_index,
-                blocksize=self.chunk_size,
-                callback=audio_callback,
-                dtype='float32'
+        if self.warm_stream and self.stream is not None:
+            # Устройство уже открыто: только отмечаем индекс начала (с учетом pre-roll)
+            self._read_index = max(
+                self.ring_buffer.write_index - self.preroll_frames, self.ring_buffer.oldest_index
             )
-            self.stream.start()
-            logger.info("Запись аудио начата")
-        except Exception as e:
-            logger.error(f"Ошибка начала записи: {e}")
-            self.is_recording = False
-            raise
+        else:
+            self._read_index = self.ring_buffer.write_index
+            try:
+                # Начало записи
+                self._open_stream()
+            except Exception as e:
+                logger.error(f"Ошибка начала записи: {e}")
+                self.stream = None
+                raise
+
+        self.is_recording = True
+        self._drain_stop.clear()
+        self._drain_thread = threading.Thread(
+            target=self._drain_loop, name="audio-drain", daemon=True
+        )
+        self._drain_thread.start()
+
+        logger.info("Запись аудио начата" + (" (теплый поток)" if self.warm_stream else ""))
     
     def stop_recording(self) -> Optional[np.ndarray]:
         """
@@ -86,43 +272,58 @@ class AudioRecorder:
         self.is_recording = False
         
         try:
-            # Остановка потока
-            if hasattr(self, 'stream'):
-                self.stream.stop()
-                self.stream.close()
+            if not self.warm_stream:
+                self._close_stream()
+            # Фиксируем конец записи (теплый поток продолжает писать в буфер):
+            # под блокировкой, чтобы фоновая выгрузка не прочитала кадры после остановки
+            with self._drain_lock:
+                self._stop_index = self.ring_buffer.write_index
+
+            self._drain_stop.set()
+            if self._drain_thread is not None:
+                self._drain_thread.join()
+                self._drain_thread = None
+            self._drain()
+            if self.stages:
+                self.recorded_audio.append(self._flush_stages())
             
-            # Сборка всех записанных данных
-            audio_chunks = []
-            while not self.audio_queue.empty():
-                chunk = self.audio_queue.get()
-                audio_chunks.append(chunk)
+            self._log_capture_stats()
             
+            audio_chunks = [chunk for chunk in self.recorded_audio if len(chunk)]
             if not audio_chunks:
                 logger.warning("Нет аудио данных")
                 return None
             
-            # Объединение всех чанков
-            audio_data = np.concatenate(audio_chunks, axis=0)
-            
-            # Конвертация в моно (если stereo)
-            if len(audio_data.shape) > 1 and audio_data.shape[1] > 1:
-                audio_data = np.mean(audio_data, axis=1)
+            # Объединение всех чанков со сведением в моно float32
+            # (одна копия; конвертация int16 выполняется здесь же одним векторным шагом)
+            audio_data = AudioProcessor.concatenate_mono(audio_chunks)
+            self.recorded_audio = []
             
             duration = len(audio_data) / self.sample_rate
             logger.info(f"Запись остановлена: {duration:.2f} секунд, {len(audio_data)} сэмплов")
             
-            return audio_data.astype(np.float32)
+            return audio_data
             
         except Exception as e:
             logger.error(f"Ошибка остановки записи: {e}")
             return None
     
+    def _log_capture_stats(self):
+        """Сводка проблем захвата за запись (вне realtime потока)"""
+        start = self._stats_at_start
+        overflows = self.stats.input_overflows - start.input_overflows
+        underflows = self.stats.input_underflows - start.input_underflows
+        dropped = self.stats.dropped_frames - start.dropped_frames
+        if overflows or underflows or dropped:
+            logger.warning(
+                f"Проблемы захвата аудио: overflow={overflows}, underflow={underflows}, "
+                f"потеряно кадров={dropped}"
+            )
+
     def cleanup(self):
         """Очистка ресурсов"""
-        if hasattr(self, 'stream') and self.stream.active:
-            self.stream.stop()
-            self.stream.close()
+        self._drain_stop.set()
+        self._close_stream()
         
         self.is_recording = False
         self.recorded_audio = []
-
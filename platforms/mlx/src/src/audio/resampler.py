@@ -0,0 +1,176 @@
+"""
+Полифазный ресемплер для VTTv2
+
+Позволяет захватывать аудио на родной частоте устройства (44.1/48 кГц)
+и приводить его к частоте Whisper (16 кГц) без ресемплинга на уровне ОС.
+"""
+import math
+
+import numpy as np
+
+# Количество входных сэмплов, обрабатываемых за один векторный шаг в batch режиме
+_BATCH_BLOCK_SIZE = 16384
+
+
+class PolyphaseResampler:
+    """
+    Полифазный ресемплер с рациональным коэффициентом up/down
+
+    Фильтр - windowed-sinc (окно Кайзера), разложенный на up фаз.
+    Каждый выходной сэмпл - скалярное
+    произведение одной фазы с окном входа; все выходы блока считаются одним
+    векторным шагом. Состояние (хвост входа и позиция) сохраняется между
+    вызовами process(), поэтому потоковая обработка по блокам дает тот же
+    результат, что и обработка всего сигнала целиком.
+    """
+
+    def __init__(
+        self,
+        src_rate: int,
+        dst_rate: int,
+        zero_crossings: int = 16,
+        beta: float = 8.6,
+        rolloff: float = 0.94
+    ):
+        """
+        Инициализация ресемплера
+
+        Args:
+            src_rate: Входная частота дискретизации
+            dst_rate: Выходная частота дискретизации
+            zero_crossings: Полуширина фильтра в нулях sinc (качество/скорость)
+            beta: Параметр окна Кайзера (подавление в полосе заграждения)
+            rolloff: Частота среза относительно Найквиста выходной частоты
+        """
+        if src_rate <= 0 or dst_rate <= 0:
+            raise ValueError(f"Неверные частоты дискретизации: {src_rate} -> {dst_rate}")
+
+        g = math.gcd(src_rate, dst_rate)
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.up = dst_rate // g
+        self.down = src_rate // g
+
+        # Прототип ФНЧ на повышенной частоте (src_rate * up); нечетная длина
+        # дает целую групповую задержку, которую можно точно компенсировать
+        factor = max(self.up, self.down)
+        length = 2 * zero_crossings * factor + 1
+        cutoff = rolloff / factor
+        t = np.arange(length) - (length - 1) / 2.0
+        h = cutoff * np.sinc(cutoff * t) * np.kaiser(length, beta)
+        h *= self.up / h.sum()
+
+        # Дополнение нулями до кратного up и разложение на фазы:
+        # phases[p, k] = h[p + k * up] - коэффициент для входа x[base - k]
+        self.taps = -(-length // self.up)
+        h = np.concatenate((h, np.zeros(self.taps * self.up - length)))
+        self._phases = h.reshape(self.taps, self.up).T.astype(np.float32).copy()
+        # Компенсация групповой задержки фильтра (в отсчетах повышенной частоты)
+        self._delay = (length - 1) // 2
+        self._tap_offsets = np.arange(self.taps)
+
+        self.reset()
+
+    @property
+    def is_passthrough(self) -> bool:
+        """Частоты совпадают - ресемплинг не нужен"""
+        return self.up == self.down
+
+    def reset(self):
+        """Сброс состояния (начало нового потока)"""
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0  # Входных сэмплов получено
+        self._next_out = 0  # Индекс следующего выходного сэмпла
+
+    def output_length(self, input_length: int) -> int:
+        """Длина выхода для входа заданной длины"""
+        return -(-input_length * self.up // self.down)
+
+    def _ready_outputs(self, total_in: int) -> int:
+        """Количество выходных сэмплов, для которых уже есть весь вход"""
+        last = total_in * self.up - 1 - self._delay
+        if last < 0:
+            return 0
+        return last // self.down + 1
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Ресемплинг очередного блока (потоковый режим)
+
+        Args:
+            block: Моно блок входных сэмплов
+
+        Returns:
+            Выходные сэмплы float32, готовые на данный момент
+        """
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        if self.is_passthrough:
+            self._consumed += len(block)
+            self._next_out += len(block)
+            return block
+
+        window = np.concatenate((self._history, block))
+        total_in = self._consumed + len(block)
+        end_out = self._ready_outputs(total_in)
+
+        if end_out > self._next_out:
+            n = np.arange(self._next_out, end_out, dtype=np.int64)
+            m = n * self.down + self._delay
+            base = m // self.up
+            phase = m % self.up
+            # Локальный индекс в window: глобальный индекс минус начало истории
+            local = base - (self._consumed - len(self._history))
+            idx = local[:, None] - self._tap_offsets[None, :]
+            out = np.einsum('ij,ij->i', window[idx], self._phases[phase])
+        else:
+            out = np.empty(0, dtype=np.float32)
+
+        self._history = window[len(window) - (self.taps - 1):].copy()
+        self._consumed = total_in
+        self._next_out = max(self._next_out, end_out)
+        return out.astype(np.float32, copy=False)
+
+    def flush(self) -> np.ndarray:
+        """
+        Завершение потока: выдача оставшихся выходных сэмплов
+
+        Returns:
+            Хвост выхода (после него состояние сбрасывается)
+        """
+        expected = self.output_length(self._consumed)
+        remaining = expected - self._next_out
+        if remaining <= 0 or self.is_passthrough:
+            self.reset()
+            return np.empty(0, dtype=np.float32)
+
+        # Дополняем вход нулями, чтобы стали готовы все оставшиеся выходы
+        last_base = ((expected - 1) * self.down + self._delay) // self.up
+        padding = last_base - self._consumed + 1
+        tail = self.process(np.zeros(padding, dtype=np.float32))[:remaining]
+        self.reset()
+        return tail
+
+    def resample(self, audio_data: np.ndarray) -> np.ndarray:
+        """
+        Ресемплинг сигнала целиком (batch режим)
+
+        Args:
+            audio_data: Моно сигнал
+
+        Returns:
+            Сигнал на частоте dst_rate (float32)
+        """
+        audio_data = np.asarray(audio_data, dtype=np.float32).reshape(-1)
+        if self.is_passthrough:
+            return audio_data
+
+        self.reset()
+        out = np.empty(self.output_length(len(audio_data)), dtype=np.float32)
+        pos = 0
+        for start in range(0, len(audio_data), _BATCH_BLOCK_SIZE):
+            chunk = self.process(audio_data[start:start + _BATCH_BLOCK_SIZE])
+            out[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+        tail = self.flush()
+        out[pos:pos + len(tail)] = tail
+        return out
@@ -0,0 +1,124 @@
+"""
+Кольцевой буфер аудио для VTTv2
+"""
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Кольцевой буфер фиксированного размера для аудио кадров
+
+    Память выделяется один раз при создании, запись не аллоцирует.
+    Позиции адресуются монотонным индексом кадра (write_index), поэтому
+    читатель может запомнить индекс и позже прочитать данные начиная с него,
+    пока они не перезаписаны.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.float32):
+        """
+        Инициализация буфера
+
+        Args:
+            capacity: Емкость буфера в кадрах
+            channels: Количество каналов
+            dtype: Тип сэмплов
+        """
+        if capacity <= 0:
+            raise ValueError(f"Емкость буфера должна быть положительной: {capacity}")
+
+        self.capacity = capacity
+        self.channels = channels
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self.write_index = 0  # Всего записано кадров (монотонно растет)
+
+    @property
+    def dtype(self):
+        """Тип сэмплов буфера"""
+        return self._data.dtype
+
+    @property
+    def oldest_index(self) -> int:
+        """Индекс самого старого кадра, который еще доступен для чтения"""
+        return max(0, self.write_index - self.capacity)
+
+    def write(self, block: np.ndarray):
+        """
+        Запись блока кадров (без выделения памяти)
+
+        Args:
+            block: Блок формы (frames, channels) или (frames,)
+        """
+        frames = len(block)
+        if frames == 0:
+            return
+
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+
+        if frames > self.capacity:
+            # Сохраняем только последние capacity кадров
+            skipped = frames - self.capacity
+            block = block[skipped:]
+            self.write_index += skipped
+            frames = self.capacity
+
+        pos = self.write_index % self.capacity
+        first = min(frames, self.capacity - pos)
+        self._data[pos:pos + first] = block[:first]
+        if first < frames:
+            self._data[:frames - first] = block[first:]
+
+        # Индекс обновляется после данных: читатель видит только записанные кадры
+        self.write_index += frames
+
+    def read(
+        self, start: int, stop: int | None = None, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Чтение кадров [start, stop) по монотонным индексам
+
+        Args:
+            start: Индекс первого кадра
+            stop: Индекс после последнего кадра (по умолчанию write_index)
+            out: Буфер для результата (опционально)
+
+        Returns:
+            Копия кадров формы (stop - start, channels)
+
+        Raises:
+            ValueError: Если диапазон уже перезаписан или еще не записан
+        """
+        if stop is None:
+            stop = self.write_index
+        if start < self.oldest_index or stop > self.write_index or start > stop:
+            raise ValueError(
+                f"Диапазон [{start}, {stop}) недоступен "
+                f"(доступно [{self.oldest_index}, {self.write_index}))"
+            )
+
+        frames = stop - start
+        if out is None:
+            out = np.empty((frames, self.channels), dtype=self._data.dtype)
+
+        pos = start % self.capacity
+        first = min(frames, self.capacity - pos)
+        out[:first] = self._data[pos:pos + first]
+        if first < frames:
+            out[first:frames] = self._data[:frames - first]
+
+        return out
+
+    def latest(self, frames: int) -> np.ndarray:
+        """
+        Последние записанные кадры (не больше доступного)
+
+        Args:
+            frames: Желаемое количество кадров
+
+        Returns:
+            Копия последних кадров
+        """
+        stop = self.write_index
+        start = max(stop - frames, self.oldest_index)
+        return self.read(start, stop)
@@ -5,7 +5,7 @@
 import os
 import logging
 from pathlib import Path
-from typing import Optional, Literal
+from typing import Any, Optional, Literal
 from pydantic import BaseModel, Field, field_validator, model_validator
 import yaml
 
@@ -16,22 +16,33 @@ logger = logging.getLogger(__name__)
 class MLXWhisperConfig(BaseModel):
     """Конфигурация MLX Whisper"""
     model_name: str = Field("mlx-community/whisper-medium", description="Название модели MLX (например, mlx-community/whisper-medium)")
-    language: str = Field("ru", description="Язык транскрипции")
+    language: str = Field("ru", description="Язык транскрипции (auto - автоопределение)")
     temperature: float = Field(0.0, ge=0.0, le=1.0, description="Temperature")
     beam_size: int = Field(5, ge=1, description="Beam size")
     best_of: int = Field(5, ge=1, description="Best of")
     no_speech_threshold: float = Field(0.6, ge=0.0, le=1.0, description="No speech threshold")
     compression_ratio_threshold: float = Field(2.4, ge=0.0, description="Compression ratio threshold")
 
+    @field_validator('language', mode='before')
+    @classmethod
+    def normalize_language(cls, v):
+        """Код языка в нижнем регистре; пусто/null - автоопределение"""
+        return str(v).strip().lower() if v else "auto"
+
 
 class WhisperCppConfig(BaseModel):
     """Конфигурация whisper.cpp"""
+    backend: Literal["subprocess", "bindings"] = Field(
+        "subprocess",
+        description="subprocess - whisper-cli на каждую фразу, "
+                    "bindings - libwhisper в процессе (pywhispercpp)"
+    )
     binary_path: str = Field(..., description="Путь к бинарнику whisper")
     model_path: str = Field(..., description="Путь к модели")
     use_coreml: bool = Field(True, description="Использовать Core ML")
     use_metal: bool = Field(True, description="Использовать Metal")
     threads: int = Field(8, ge=1, le=16, description="Количество потоков")
-    language: str = Field("ru", description="Язык транскрипции")
+    language: str = Field("ru", description="Язык транскрипции (auto - автоопределение)")
     temperature: float = Field(0.0, ge=0.0, le=1.0, description="Temperature")
     beam_size: int = Field(5, ge=1, description="Beam size")
     best_of: int = Field(5, ge=1, description="Best of")
@@ -39,12 +50,189 @@ class WhisperCppConfig(BaseModel):
     no_speech_threshold: float = Field(0.6, ge=0.0, le=1.0, description="No speech threshold")
     compression_ratio_threshold: float = Field(2.4, ge=0.0, description="Compression ratio threshold")
 
+    @field_validator('language', mode='before')
+    @classmethod
+    def normalize_language(cls, v):
+        """Код языка в нижнем регистре; пусто/null - автоопределение"""
+        return str(v).strip().lower() if v else "auto"
+
+
+class FasterWhisperConfig(BaseModel):
+    """Конфигурация faster-whisper (CTranslate2, CPU)"""
+    model_name: str = Field(
+        "medium", description="Модель (tiny/base/small/medium/large-v3, repo на HF или путь)"
+    )
+    device: Literal["cpu", "cuda", "auto"] = Field("cpu", description="Устройство инференса")
+    compute_type: str = Field(
+        "int8", description="Тип вычислений CTranslate2 (int8, int8_float32, float32)"
+    )
+    cpu_threads: int = Field(
+        4, ge=0, le=64, description="Потоков CPU (0 - по умолчанию CTranslate2)"
+    )
+    num_workers: int = Field(1, ge=1, description="Параллельных транскрипций")
+    download_root: str | None = Field(
+        None, description="Директория кэша моделей (None - кэш Hugging Face)"
+    )
+    language: str = Field("ru", description="Язык транскрипции (auto - автоопределение)")
+    temperature: float = Field(0.0, ge=0.0, le=1.0, description="Temperature")
+    beam_size: int = Field(5, ge=1, description="Beam size")
+    best_of: int = Field(5, ge=1, description="Best of")
+    no_speech_threshold: float = Field(0.6, ge=0.0, le=1.0, description="No speech threshold")
+    compression_ratio_threshold: float = Field(
+        2.4, ge=0.0, description="Compression ratio threshold"
+    )
+    vad_filter: bool = Field(False, description="Отбрасывать тишину встроенным VAD (Silero)")
+
+    @field_validator('language', mode='before')
+    @classmethod
+    def normalize_language(cls, v):
+        """Код языка в нижнем регистре; пусто/null - автоопределение"""
+        return str(v).strip().lower() if v else "auto"
+
+
+class TwoTierConfig(BaseModel):
+    """Конфигурация двухуровневого декодирования (быстрый черновик + проверка)"""
+    enabled: bool = Field(False, description="Включено двухуровневое декодирование")
+    draft_engine: str = Field(
+        "mlx_whisper", description="Движок быстрого уровня (имя в реестре движков)"
+    )
+    draft_model: str = Field(
+        "mlx-community/whisper-tiny",
+        description="Модель быстрого уровня (model_name или model_path)"
+    )
+    max_duration: float = Field(
+        5.0, ge=0.0, description="Максимальная длительность фразы без проверки (сек)"
+    )
+    min_avg_logprob: float = Field(
+        -0.4, le=0.0, description="Минимальный avg_logprob для пропуска проверки"
+    )
+    max_no_speech_prob: float = Field(
+        0.3, ge=0.0, le=1.0, description="Максимальная вероятность отсутствия речи"
+    )
+
+
+class DecodePolicyConfig(BaseModel):
+    """Конфигурация политики параметров декодирования"""
+    enabled: bool = Field(
+        True, description="Выбирать beam/best_of по фразе (иначе - из конфигурации движка)"
+    )
+    short_max_duration: float = Field(
+        3.0, ge=0.0, description="Короткая команда: жадное декодирование (сек)"
+    )
+    long_min_duration: float = Field(
+        20.0, ge=0.0, description="Длинная диктовка: beam search (сек)"
+    )
+    min_speech_ratio: float = Field(
+        0.05, ge=0.0, le=1.0, description="Ниже - почти тишина, без повторов"
+    )
+    latency_budget: float | None = Field(
+        None, gt=0.0, description="Бюджет задержки декодирования (сек)"
+    )
+    expected_rtf: float = Field(
+        0.15, gt=0.0, description="Ожидаемый real-time factor жадного декодирования"
+    )
+    beam_cost_factor: float = Field(
+        2.5, ge=1.0, description="Во сколько раз beam search дороже жадного"
+    )
+    temperature_fallback: list[float] = Field(
+        [0.0, 0.2, 0.4, 0.6, 0.8, 1.0], min_length=1,
+        description="Температуры (повтор только при неудаче)"
+    )
+
+
+class LanguageCacheConfig(BaseModel):
+    """Конфигурация кэша языка (только при language: auto)"""
+    enabled: bool = Field(True, description="Повторно использовать определенный язык приложения")
+    min_language_prob: float = Field(
+        0.8, ge=0.0, le=1.0, description="Минимальная вероятность языка для кэширования"
+    )
+    min_avg_logprob: float = Field(
+        -0.8, le=0.0, description="Ниже - язык из кэша под сомнением, определяем заново"
+    )
+
+
+class FallbackEngineConfig(BaseModel):
+    """Резервный движок в цепочке"""
+    engine: str = Field(..., description="Движок (имя в реестре движков)")
+    model: str | None = Field(None, description="Модель вместо указанной в конфигурации движка")
+
+
+class FallbackConfig(BaseModel):
+    """Конфигурация резервных движков и circuit breaker"""
+    engines: list[FallbackEngineConfig] = Field(
+        default_factory=list, description="Резервные движки по порядку (после основного)"
+    )
+    failure_threshold: int = Field(3, ge=1, description="Ошибок подряд до отключения движка")
+    reset_timeout: float = Field(
+        60.0, gt=0.0, description="Пауза до пробного вызова отключенного движка (сек)"
+    )
+
+
+class TimeoutConfig(BaseModel):
+    """Конфигурация дедлайнов транскрипции по измеренному real-time factor"""
+    enabled: bool = Field(True, description="Дедлайн вызова по длительности аудио и RTF движка")
+    window: int = Field(20, ge=1, description="Сколько последних вызовов движка учитывать")
+    percentile: float = Field(90.0, ge=50.0, le=100.0, description="Перцентиль RTF окна")
+    safety_factor: float = Field(3.0, ge=1.0, description="Запас над оценкой RTF")
+    initial_rtf: float = Field(1.0, gt=0.0, description="RTF до первых замеров движка")
+    min_timeout: float = Field(10.0, gt=0.0, description="Минимальный дедлайн (сек)")
+    max_timeout: float = Field(600.0, gt=0.0, description="Максимальный дедлайн (сек)")
+    cold_timeout: float = Field(
+        300.0, gt=0.0, description="Дедлайн первого вызова (загрузка модели, сек)"
+    )
+
+
+class PromptContextConfig(BaseModel):
+    """Конфигурация контекста между фразами (initial_prompt)"""
+    enabled: bool = Field(True, description="Передавать недавние транскрипты как initial_prompt")
+    max_utterances: int = Field(
+        3, ge=1, le=20, description="Сколько последних фраз хранить для приложения"
+    )
+    max_chars: int = Field(300, ge=0, le=1000, description="Максимальная длина prompt (символов)")
+    idle_reset_seconds: float = Field(
+        600.0, gt=0.0, description="Сброс контекста приложения после паузы (сек)"
+    )
+    vocabulary: list[str] = Field(
+        default_factory=list, description="Общий словарь (имена, термины)"
+    )
+    app_vocabulary: dict[str, list[str]] = Field(
+        default_factory=dict, description="Словари по bundle id приложения"
+    )
+
 
 class TranscriptionConfig(BaseModel):
     """Конфигурация транскрипции"""
-    engine: Literal["whisper_cpp", "mlx_whisper"] = Field("mlx_whisper", description="Движок транскрипции")
-    whisper_cpp: Optional[WhisperCppConfig] = Field(None, description="Настройки whisper.cpp")
-    mlx_whisper: Optional[MLXWhisperConfig] = Field(None, description="Настройки MLX Whisper")
+    engine: str = Field(
+        "mlx_whisper",
+        description="Движок транскрипции: whisper_cpp, mlx_whisper, faster_whisper "
+                    "или плагин (entry point vtt2.engines)"
+    )
+    timestamps: Literal["none", "segment", "word"] = Field(
+        "segment",
+        description="Тайминги в результате: none, segment (сегменты) или word (сегменты и слова)"
+    )
+    whisper_cpp: WhisperCppConfig | None = Field(None, description="Настройки whisper.cpp")
+    mlx_whisper: MLXWhisperConfig | None = Field(None, description="Настройки MLX Whisper")
+    faster_whisper: FasterWhisperConfig | None = Field(
+        None, description="Настройки faster-whisper (CPU)"
+    )
+    engine_options: dict[str, dict[str, Any]] = Field(
+        default_factory=dict, description="Настройки движков-плагинов по имени (схема - у плагина)"
+    )
+    two_tier: TwoTierConfig = Field(
+        default_factory=TwoTierConfig, description="Двухуровневое декодирование"
+    )
+    decode_policy: DecodePolicyConfig = Field(
+        default_factory=DecodePolicyConfig, description="Политика декодирования"
+    )
+    context: PromptContextConfig = Field(
+        default_factory=PromptContextConfig, description="Контекст между фразами"
+    )
+    language_cache: LanguageCacheConfig = Field(
+        default_factory=LanguageCacheConfig, description="Кэш языка при auto"
+    )
+    fallback: FallbackConfig = Field(default_factory=FallbackConfig, description="Резервные движки")
+    timeout: TimeoutConfig = Field(default_factory=TimeoutConfig, description="Дедлайны по RTF")
     
     @model_validator(mode='after')
     def validate_engine_config(self):
@@ -54,9 +242,41 @@ class TranscriptionConfig(BaseModel):
         if self.engine == "mlx_whisper" and not self.mlx_whisper:
             # Создаем дефолтную конфигурацию если не указана
             self.mlx_whisper = MLXWhisperConfig()
+        if self.engine == "faster_whisper" and not self.faster_whisper:
+            self.faster_whisper = FasterWhisperConfig()
+        if self.two_tier.enabled:
+            if self.two_tier.draft_engine == "whisper_cpp" and not self.whisper_cpp:
+                raise ValueError("быстрый уровень whisper_cpp требует whisper_cpp конфигурацию")
+            if self.two_tier.draft_engine == "mlx_whisper" and not self.mlx_whisper:
+                self.mlx_whisper = MLXWhisperConfig()
+            if self.two_tier.draft_engine == "faster_whisper" and not self.faster_whisper:
+                self.faster_whisper = FasterWhisperConfig()
+        for fallback in self.fallback.engines:
+            if fallback.engine == "whisper_cpp" and not self.whisper_cpp:
+                raise ValueError("резервный движок whisper_cpp требует whisper_cpp конфигурацию")
+            if fallback.engine == "mlx_whisper" and not self.mlx_whisper:
+                self.mlx_whisper = MLXWhisperConfig()
+            if fallback.engine == "faster_whisper" and not self.faster_whisper:
+                self.faster_whisper = FasterWhisperConfig()
         return self
 
 
+class AGCConfig(BaseModel):
+    """Конфигурация автоматической регулировки усиления"""
+    enabled: bool = Field(False, description="Включена АРУ")
+    target_level_db: float = Field(-20.0, le=0.0, description="Целевой RMS уровень (dBFS)")
+    max_gain_db: float = Field(30.0, ge=0.0, description="Максимальное усиление (dB)")
+    attack_ms: float = Field(10.0, gt=0.0, description="Время атаки (мс)")
+    release_ms: float = Field(300.0, gt=0.0, description="Время восстановления (мс)")
+
+
+class NoiseGateConfig(BaseModel):
+    """Конфигурация спектрального шумового гейта"""
+    enabled: bool = Field(False, description="Включен шумовой гейт")
+    threshold_db: float = Field(6.0, ge=0.0, description="Превышение над шумом для открытия (dB)")
+    attenuation_db: float = Field(-20.0, le=0.0, description="Ослабление шума (dB)")
+
+
 class AudioConfig(BaseModel):
     """Конфигурация аудио"""
     sample_rate: int = Field(16000, description="Частота дискретизации")
@@ -64,6 +284,25 @@ class AudioConfig(BaseModel):
     device_index: Optional[int] = Field(None, description="Индекс устройства")
     chunk_size: int = Field(1024, ge=256, description="Размер чанка")
     max_recording_duration: int = Field(3600, ge=1, description="Максимальная длительность записи (сек)")
+    warm_stream: bool = Field(False, description="Держать входной поток открытым между записями")
+    preroll_ms: int = Field(
+        300, ge=0, le=5000, description="Pre-roll перед нажатием клавиши в теплом режиме (мс)"
+    )
+    capture_dtype: Literal["float32", "int16"] = Field(
+        "float32", description="Формат сэмплов захвата (int16 - вдвое меньше памяти)"
+    )
+    capture_sample_rate: Literal["native"] | int | None = Field(
+        None, description="Частота захвата (None = sample_rate, native = родная частота устройства)"
+    )
+    ring_buffer_seconds: float = Field(
+        2.0, ge=0.5, le=60.0, description="Емкость кольцевого буфера захвата (сек)"
+    )
+    agc: AGCConfig = Field(
+        default_factory=AGCConfig, description="Автоматическая регулировка усиления"
+    )
+    noise_gate: NoiseGateConfig = Field(
+        default_factory=NoiseGateConfig, description="Спектральный шумовой гейт"
+    )
 
 
 class UIConfig(BaseModel):
@@ -71,6 +310,14 @@ class UIConfig(BaseModel):
     auto_paste_enabled: bool = Field(True, description="Автовставка включена")
     auto_paste_method: Literal["cgevent", "clipboard"] = Field("cgevent", description="Метод автовставки")
     hotkey: str = Field("option+space", description="Горячая клавиша")
+    cancel_hotkey: str | None = Field(
+        None, description="Горячая клавиша отмены транскрипции (None - нет)"
+    )
+    double_tap_cancel: float = Field(
+        0.4, ge=0.0,
+        description="Двойное нажатие горячей клавиши быстрее (сек) отменяет транскрипцию "
+                    "(0 - выключено)"
+    )
 
 
 class MenuBarConfig(BaseModel):
@@ -83,6 +330,43 @@ class MenuBarConfig(BaseModel):
 class TextProcessingConfig(BaseModel):
     """Конфигурация постобработки текста"""
     enabled: bool = Field(False, description="Включена постобработка")
+    vocabulary: dict[str, str] = Field(
+        default_factory=dict, description="Замены: фраза -> текст (без учета регистра)"
+    )
+    vocabulary_file: str | None = Field(None, description="Файл замен: строки \"фраза<TAB>замена\"")
+    remove_fillers: bool = Field(True, description="Удалять слова-паразиты")
+    fillers: list[str] = Field(
+        default_factory=lambda: ["э", "эм", "ээ", "ммм", "uh", "um", "uhm", "erm"],
+        description="Слова-паразиты (удаляются вместе с запятой после них)"
+    )
+    capitalize: bool = Field(True, description="Заглавная буква в начале предложений")
+    normalize_numbers: bool = Field(True, description="Числительные словами -> цифры")
+    min_number: int = Field(10, ge=0, description="Однословные числа меньше этого остаются словами")
+
+
+class MemoryGuardConfig(BaseModel):
+    """Конфигурация защиты памяти при декодировании длинных записей"""
+    enabled: bool = Field(
+        True, description="Оценивать память перед декодированием и держаться в memory_limit_mb"
+    )
+    chunk_seconds: float = Field(
+        300.0, ge=30.0, description="Длина фрагмента при декодировании по частям (сек)"
+    )
+    audio_copies: float = Field(
+        4.0, ge=1.0,
+        description="Копий аудио float32 при декодировании (запись, подготовка, движок)"
+    )
+    decode_overhead_mb: int = Field(
+        512, ge=0, description="Активации и буферы движка на окно 30 с (MB)"
+    )
+    low_memory_engine: str | None = Field(
+        None,
+        description="Движок меньшей модели, если не хватает памяти и фрагментам "
+                    "(None - не используется)"
+    )
+    low_memory_model: str | None = Field(
+        None, description="Меньшая модель (model_name или model_path)"
+    )
 
 
 class PerformanceConfig(BaseModel):
@@ -90,6 +374,46 @@ class PerformanceConfig(BaseModel):
     use_neural_engine: bool = Field(True, description="Использовать Neural Engine")
     max_concurrent_tasks: int = Field(1, ge=1, description="Максимум одновременных задач")
     memory_limit_mb: int = Field(16384, ge=1024, description="Лимит памяти (MB)")
+    memory_guard: MemoryGuardConfig = Field(
+        default_factory=MemoryGuardConfig, description="Защита памяти"
+    )
+
+
+class SpoolConfig(BaseModel):
+    """Конфигурация спула записей на диске"""
+    enabled: bool = Field(False, description="Сохранять записи на диск до завершения транскрипции")
+    directory: str = Field(
+        "spool", description="Каталог спула (относительно проекта или абсолютный)"
+    )
+    format: Literal["flac", "opus"] = Field(
+        "flac", description="Сжатие записей: flac (без потерь) или opus"
+    )
+    max_size_mb: int = Field(500, ge=1, description="Максимальный размер спула (MB)")
+    max_age_days: float = Field(7.0, gt=0.0, description="Сколько дней хранить записи")
+    max_attempts: int = Field(3, ge=1, description="Попыток транскрипции записи после перезапусков")
+
+
+class HistoryConfig(BaseModel):
+    """Конфигурация истории транскриптов (SQLite FTS5)"""
+    enabled: bool = Field(
+        False, description="Сохранять транскрипты в историю (открытым текстом в SQLite)"
+    )
+    path: str = Field("history.db", description="Файл базы (относительно проекта или абсолютный)")
+    batch_size: int = Field(64, ge=1, description="Максимум записей в одной транзакции")
+    flush_interval: float = Field(
+        1.0, ge=0.0, description="Сколько ждать соседние записи для пакета (сек)"
+    )
+    max_entries: int | None = Field(
+        1000, ge=1, description="Хранить последние N записей (None - все)"
+    )
+
+
+class StorageConfig(BaseModel):
+    """Конфигурация хранения записей"""
+    spool: SpoolConfig = Field(default_factory=SpoolConfig, description="Спул записей")
+    history: HistoryConfig = Field(
+        default_factory=HistoryConfig, description="История транскриптов"
+    )
 
 
 class LoggingConfig(BaseModel):
@@ -97,6 +421,52 @@ class LoggingConfig(BaseModel):
     level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = Field("INFO", description="Уровень логирования")
     format: str = Field("%(asctime)s %(levelname)s %(name)s %(message)s", description="Формат логов")
     file: Optional[str] = Field(None, description="Файл логов (None = только консоль)")
+    json_format: bool = Field(False, description="JSON-строки с job_id и этапом вместо текста")
+    max_size_mb: int = Field(
+        10, ge=0, description="Размер файла логов до ротации (0 - без ротации)"
+    )
+    backup_count: int = Field(5, ge=0, description="Сколько старых файлов логов хранить")
+
+
+class MetricsConfig(BaseModel):
+    """Конфигурация метрик (текстовый формат Prometheus)"""
+    enabled: bool = Field(False, description="HTTP-эндпоинт /metrics")
+    host: str = Field("127.0.0.1", description="Адрес эндпоинта (по умолчанию только локальный)")
+    port: int = Field(9464, ge=0, le=65535, description="Порт эндпоинта")
+
+
+class TracingConfig(BaseModel):
+    """Конфигурация трассировки диктовки (OTLP/JSON)"""
+    enabled: bool = Field(False, description="Спаны этапов каждой фразы")
+    exporter: Literal["file", "otlp"] = Field(
+        "file", description="file - JSON Lines, otlp - POST на коллектор"
+    )
+    path: str = Field(
+        "traces.jsonl", description="Файл трасс (относительно проекта или абсолютный)"
+    )
+    endpoint: str = Field(
+        "http://127.0.0.1:4318/v1/traces", description="OTLP/HTTP эндпоинт коллектора"
+    )
+    service_name: str = Field("vtt2", description="service.name в ресурсе трасс")
+
+
+class ProfilingConfig(BaseModel):
+    """Конфигурация профилирования медленных фраз"""
+    enabled: bool = Field(False, description="Снимать профиль фраз, превысивших порог")
+    threshold: float = Field(
+        5.0, gt=0.0, description="Порог задержки от остановки записи до вставки (сек)"
+    )
+    interval_ms: float = Field(10.0, ge=1.0, description="Интервал сэмплирования стеков (мс)")
+    max_duration: float = Field(
+        60.0, gt=0.0, description="Максимальная длительность сэмплирования фразы (сек)"
+    )
+    max_depth: int = Field(128, ge=1, description="Максимальная глубина стека")
+    format: Literal["speedscope", "collapsed"] = Field(
+        "speedscope", description="speedscope JSON или collapsed stacks"
+    )
+    directory: str = Field(
+        "profiles", description="Каталог профилей (относительно проекта или абсолютный)"
+    )
 
 
 class AppConfig(BaseModel):
@@ -114,7 +484,11 @@ class Config(BaseModel):
     menu_bar: MenuBarConfig
     text_processing: TextProcessingConfig
     performance: PerformanceConfig
+    storage: StorageConfig = Field(default_factory=StorageConfig)
     logging: LoggingConfig
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
+    profiling: ProfilingConfig = Field(default_factory=ProfilingConfig)
     
     @model_validator(mode='after')
     def validate_paths(self) -> 'Config':
@@ -136,6 +510,18 @@ class Config(BaseModel):
         
         return self
     
+    @model_validator(mode='after')
+    def validate_low_memory_engine(self) -> 'Config':
+        """Конфигурация движка меньшей модели защиты памяти"""
+        engine = self.performance.memory_guard.low_memory_engine
+        if engine == "whisper_cpp" and not self.transcription.whisper_cpp:
+            raise ValueError("движок меньшей модели whisper_cpp требует whisper_cpp конфигурацию")
+        if engine == "mlx_whisper" and not self.transcription.mlx_whisper:
+            self.transcription.mlx_whisper = MLXWhisperConfig()
+        if engine == "faster_whisper" and not self.transcription.faster_whisper:
+            self.transcription.faster_whisper = FasterWhisperConfig()
+        return self
+
     @classmethod
     def from_yaml(cls, config_path: str, project_root: Optional[Path] = None) -> 'Config':
         """
@@ -241,5 +627,35 @@ class Config(BaseModel):
                     (project_root / model_path).resolve()
                 )
         
+        # Разрешение каталога спула и базы истории (~ раскрывается при открытии)
+        storage = config_data['storage'] = config_data.get('storage') or {}
+        spool = storage['spool'] = storage.get('spool') or {}
+        directory = spool.get('directory', SpoolConfig.model_fields['directory'].default)
+        if not directory.startswith('~') and not Path(directory).is_absolute():
+            spool['directory'] = str((project_root / directory).resolve())
+        history = storage['history'] = storage.get('history') or {}
+        history_path = history.get('path', HistoryConfig.model_fields['path'].default)
+        if not history_path.startswith('~') and not Path(history_path).is_absolute():
+            history['path'] = str((project_root / history_path).resolve())
+
+        # Разрешение файла трасс
+        tracing = config_data.get('tracing') or {}
+        traces_path = tracing.get('path')
+        if traces_path and not traces_path.startswith('~') and not Path(traces_path).is_absolute():
+            tracing['path'] = str((project_root / traces_path).resolve())
+
+        # Разрешение каталога профилей
+        profiling = config_data['profiling'] = config_data.get('profiling') or {}
+        profiles_dir = profiling.get('directory', ProfilingConfig.model_fields['directory'].default)
+        if not profiles_dir.startswith('~') and not Path(profiles_dir).is_absolute():
+            profiling['directory'] = str((project_root / profiles_dir).resolve())
+
+        # Разрешение файла словаря замен
+        text_processing = config_data.get('text_processing') or {}
+        vocabulary_file = text_processing.get('vocabulary_file')
+        if (vocabulary_file and not vocabulary_file.startswith('~')
+                and not Path(vocabulary_file).is_absolute()):
+            text_processing['vocabulary_file'] = str((project_root / vocabulary_file).resolve())
+
         return config_data
 
@@ -4,18 +4,36 @@ Voice-to-Text для macOS с MLX Whisper
 """
 import sys
 import argparse
+import asyncio
 import threading
 import time
 from pathlib import Path
 import rumps
 
 # Импорт модулей
-from utils.logger import setup_logging
+from utils.logger import log_context, setup_logging
+from utils.tracing import Tracer
+from utils.profiler import SlowJobProfiler
+from utils.memory import MemoryAccounting, current_rss_bytes
+from utils.metrics import (
+    MetricFamily,
+    MetricsRegistry,
+    Sample,
+    engine_collector,
+    process_collector,
+    start_http_server,
+)
 from config.loader import Config
 from system.permissions import PermissionsChecker
 from audio.recorder import AudioRecorder
 from audio.processor import AudioProcessor
 from transcription.engine import TranscriptionEngineWrapper
+from transcription.registry import REGISTRY, capabilities_of
+from transcription.deadline import TranscriptionCancelledError
+from storage.history import TranscriptHistory
+from storage.spool import AudioSpool
+from text.processor import TextProcessor
+from pipeline.core import DictationPipeline, PipelineLoop
 from system.text_injector import TextInjector
 from system.hotkeys import HotkeyManager
 
@@ -26,6 +44,53 @@ try:
 except ImportError:
     APPHELPER_AVAILABLE = False
 
+# Метрики приложения (текстовый формат Prometheus, эндпоинт - metrics.enabled)
+METRICS = MetricsRegistry()
+RECORDINGS = METRICS.counter(
+    "vtt2_recordings_total", "Обработанные записи по результату", ["status"]
+)
+AUDIO_SECONDS = METRICS.counter("vtt2_audio_seconds_total", "Секунд обработанного аудио")
+DECODE_SECONDS = METRICS.histogram(
+    "vtt2_decode_seconds", "Время транскрипции фразы (сек)", ["engine"]
+)
+RTF = METRICS.histogram(
+    "vtt2_rtf", "Real-time factor транскрипции фразы", ["engine"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+)
+QUEUE_DEPTH = METRICS.gauge("vtt2_queue_depth", "Записи в обработке и в ожидании")
+PASTE_FAILURES = METRICS.counter("vtt2_paste_failures_total", "Неудачные автовставки")
+METRICS.add_collector(process_collector)
+
+
+def memory_collector(memory: MemoryAccounting, engine: TranscriptionEngineWrapper):
+    """Коллектор памяти по этапам и решений защиты памяти"""
+    def collect():
+        stages = memory.stats()
+        families = [
+            MetricFamily(
+                "vtt2_stage_peak_rss_bytes", "gauge", "Пиковая резидентная память этапа (байт)",
+                [Sample("", {"stage": name}, stats.peak_rss) for name, stats in stages.items()],
+            ),
+            MetricFamily(
+                "vtt2_stage_buffer_bytes", "gauge", "Максимальный объем буферов NumPy этапа (байт)",
+                [
+                    Sample("", {"stage": name}, stats.max_buffer_bytes)
+                    for name, stats in stages.items()
+                ],
+            ),
+        ]
+        if engine.memory_guard is not None:
+            stats = engine.memory_guard.stats
+            families.append(MetricFamily(
+                "vtt2_memory_guard_total", "counter", "Решения защиты памяти",
+                [
+                    Sample("", {"mode": mode}, getattr(stats, mode))
+                    for mode in ("full", "chunked", "low_memory")
+                ],
+            ))
+        return families
+    return collect
+
 
 class VTT2App(rumps.App):
     """Главное приложение VTTv2"""
@@ -44,13 +109,19 @@ class VTT2App(rumps.App):
         self.logger = setup_logging(
             level=config.logging.level,
             format_string=config.logging.format,
-            log_file=config.logging.file
+            log_file=config.logging.file,
+            json_format=config.logging.json_format,
+            max_bytes=config.logging.max_size_mb * 1024 * 1024,
+            backup_count=config.logging.backup_count
         )
         
-        # Состояние приложения
+        # Состояние приложения (запись переключают меню и поток горячих клавиш)
+        self._state_lock = threading.Lock()
         self.is_recording = False
-        self.is_processing = False
         self.last_text = ""
+        # Токены отмены записей в транскрипции (горячая клавиша отмены, двойное нажатие)
+        self._cancels = set()
+        self._last_hotkey = 0.0
         
         # Инициализация компонентов
         self._init_components()
@@ -61,6 +132,9 @@ class VTT2App(rumps.App):
         # Запуск горячих клавиш
         self._start_hotkeys()
         
+        # Записи, не транскрибированные до перезапуска
+        self._replay_spool()
+
         self.logger.info("VTTv2 запущен")
     
     def _init_components(self):
@@ -81,9 +155,50 @@ class VTT2App(rumps.App):
             
             # Инициализация сервисов
             self.audio_recorder = AudioRecorder(self.config)
+            self.audio_recorder.open_stream()  # Только для audio.warm_stream
             self.audio_processor = AudioProcessor()
             self.transcription_engine = TranscriptionEngineWrapper(self.config)
+            # Память по этапам; защита памяти оценивает декодирование от текущей памяти процесса
+            self.memory = MemoryAccounting()
+            if self.transcription_engine.memory_guard is not None:
+                self.transcription_engine.memory_guard.rss = current_rss_bytes
             self.text_injector = TextInjector(self.config)
+            # Трассировка этапов фразы (выключенная - пустые контекстные менеджеры)
+            self.tracer = Tracer(self.config.tracing)
+            self.text_injector.trace_span = self.tracer.span
+            self._trace = None
+            # Профиль фраз дольше порога (выключенный - без фонового потока)
+            self.profiler = SlowJobProfiler(self.config.profiling)
+            self.text_processor = None
+            if self.config.text_processing.enabled:
+                self.text_processor = TextProcessor(self.config.text_processing)
+            self.spool = None
+            if self.config.storage.spool.enabled:
+                self.spool = AudioSpool(self.config.storage.spool, self.config.audio.sample_rate)
+            self.history = None
+            if self.config.storage.history.enabled:
+                self.history = TranscriptHistory(self.config.storage.history)
+            # Конвейер записи: корутины в цикле событий фонового потока, движки - в пуле потоков
+            self.pipeline = DictationPipeline(
+                self.transcription_engine, self.audio_processor, self.memory, self.tracer,
+                text_processor=self.text_processor,
+                max_concurrent=self.config.performance.max_concurrent_tasks
+            )
+            self.pipeline.log_stage = lambda stage: log_context(stage=stage)
+            self.loop = PipelineLoop()
+
+            METRICS.add_collector(engine_collector(self.transcription_engine))
+            METRICS.add_collector(memory_collector(self.memory, self.transcription_engine))
+            self.metrics_server = None
+            if self.config.metrics.enabled:
+                try:
+                    self.metrics_server = start_http_server(
+                        METRICS, self.config.metrics.port, self.config.metrics.host
+                    )
+                except OSError as e:
+                    self.logger.warning(
+                        f"Эндпоинт метрик не запущен (порт {self.config.metrics.port}): {e}"
+                    )
             
             self.logger.info("Все компоненты инициализированы")
             
@@ -121,6 +236,7 @@ class VTT2App(rumps.App):
             rumps.separator,
             rumps.MenuItem("📋 Копировать текст", callback=self.copy_text),
             rumps.MenuItem("📝 Показать текст", callback=self.show_text),
+            rumps.MenuItem("🔎 Поиск в истории", callback=self.search_history),
             rumps.separator,
             rumps.MenuItem("ℹ️ О программе", callback=self.show_about),
             rumps.MenuItem("🔍 Health Check", callback=self.health_check),
@@ -135,12 +251,28 @@ class VTT2App(rumps.App):
             self.hotkey_manager = HotkeyManager(hotkey_string, callback=self._on_hotkey_pressed)
             self.hotkey_manager.start()
             self.logger.info(f"Горячие клавиши активированы: {hotkey_string}")
+            if self.config.ui.cancel_hotkey:
+                self.cancel_hotkey_manager = HotkeyManager(
+                    self.config.ui.cancel_hotkey, callback=self._on_cancel_pressed
+                )
+                self.cancel_hotkey_manager.start()
+                self.logger.info(f"Отмена транскрипции: {self.config.ui.cancel_hotkey}")
         except Exception as e:
             self.logger.error(f"Ошибка горячих клавиш: {e}")
     
+    @property
+    def is_processing(self) -> bool:
+        """Есть записи в транскрипции"""
+        return hasattr(self, 'pipeline') and self.pipeline.busy
+
     def _on_hotkey_pressed(self):
         """Обработка нажатия горячей клавиши"""
-        if self.is_processing:
+        now = time.monotonic()
+        double_tap = now - self._last_hotkey <= self.config.ui.double_tap_cancel
+        self._last_hotkey = now
+        if double_tap and not self.is_recording and self._cancels:
+            # Первое нажатие остановило запись, второе - отменяет ее транскрипцию
+            self.cancel_processing()
             return
         
         if self.is_recording:
@@ -148,6 +280,29 @@ class VTT2App(rumps.App):
         else:
             self.start_recording()
     
+    def _on_cancel_pressed(self):
+        """Горячая клавиша отмены: запись останавливается, транскрипция отменяется"""
+        if self.is_recording:
+            self.stop_recording()
+        self.cancel_processing()
+
+    def cancel_processing(self):
+        """Отмена транскрипции записей в обработке (движок сразу свободен для следующей)"""
+        with self._state_lock:
+            cancels = list(self._cancels)
+        if not cancels:
+            return
+        self.logger.info(f"Отмена транскрипции: записей {len(cancels)}")
+        for cancel in cancels:
+            cancel.cancel()
+
+    def _track_cancel(self):
+        """Токен отмены новой записи (регистрируется до постановки в очередь)"""
+        cancel = self.transcription_engine.cancel_token()
+        with self._state_lock:
+            self._cancels.add(cancel)
+        return cancel
+
     @rumps.clicked("🎤 Начать запись")
     def toggle_recording(self, _):
         """Переключение записи"""
@@ -158,31 +313,41 @@ class VTT2App(rumps.App):
     
     def start_recording(self):
         """Начало записи"""
-        if self.is_recording or self.is_processing:
-            return
+        with self._state_lock:
+            # Новая запись - только если есть свободный поток транскрипции
+            if self.is_recording or self.pipeline.saturated:
+                return
+            self.is_recording = True
         
         try:
-            self.is_recording = True
             self.title = self.config.menu_bar.icon_recording
             self._update_status("ЗАПИСЬ")
             
-            self.audio_recorder.start_recording()
+            self._trace = self.tracer.start_trace("dictation")
+            with self.tracer.span("start_recording", parent=self._trace):
+                self.audio_recorder.start_recording()
             self.logger.info("Запись начата")
             
         except Exception as e:
+            self.tracer.end_trace(self._trace, error=str(e))
             self.logger.error(f"Ошибка начала записи: {e}")
-            self.is_recording = False
+            with self._state_lock:
+                self.is_recording = False
             self.title = self.config.menu_bar.icon_idle
             self._update_status("Ошибка")
             rumps.alert("Ошибка", f"Не удалось начать запись: {e}")
     
     def stop_recording(self):
         """Остановка записи и обработка"""
-        if not self.is_recording:
-            return
+        with self._state_lock:
+            if not self.is_recording:
+                return
+            self.is_recording = False
         
+        trace, self._trace = self._trace, None
+        # Задержка фразы - от остановки записи до вставки
+        profile = self.profiler.begin()
         try:
-            self.is_recording = False
             self._update_status("Обработка...")
             
             # Сохраняем активное приложение перед обработкой (для автовставки)
@@ -192,82 +357,203 @@ class VTT2App(rumps.App):
                 if not saved:
                     self.logger.warning("⚠️ Не удалось сохранить активное приложение, автовставка может не работать")
             
+            # Целевое приложение - для контекста между фразами
+            app_id = self.text_injector.saved_app
+
             # Остановка записи
-            audio_data = self.audio_recorder.stop_recording()
+            with self.tracer.span("stop_recording", parent=trace), \
+                    self.memory.stage("recording") as usage:
+                audio_data = self.audio_recorder.stop_recording()
+                usage.add(audio_data)
             
             if audio_data is None or len(audio_data) == 0:
+                self.tracer.end_trace(trace, error="Нет аудио данных")
+                self.profiler.end(profile)
                 self.logger.warning("Нет аудио данных")
                 self.title = self.config.menu_bar.icon_idle
                 self._update_status("Готов")
                 return
             
-            # Обработка в отдельном потоке
-            threading.Thread(
-                target=self._process_audio,
-                args=(audio_data,),
-                daemon=True
-            ).start()
+            # Запись на диск до постановки в очередь (в фоне, без копии) - не теряется
+            # при ошибке подготовки или транскрипции, отмене в очереди или падении
+            job_id = self.spool.submit(audio_data, app_id) if self.spool else None
+
+            # Обработка в цикле событий конвейера
+            cancel = self._track_cancel()
+            self.loop.submit(
+                self._process_audio(audio_data, app_id, job_id, False, trace, profile, cancel)
+            )
             
         except Exception as e:
+            self.tracer.end_trace(trace, error=str(e))
+            self.profiler.end(profile)
             self.logger.error(f"Ошибка остановки записи: {e}")
             self.title = self.config.menu_bar.icon_idle
             self._update_status("Ошибка")
     
-    def _process_audio(self, audio_data):
-        """Обработка аудио в отдельном потоке"""
+    async def _process_audio(
+        self, audio_data, app_id=None, job_id=None, replay=False, trace=None, profile=None,
+        cancel=None
+    ):
+        """
+        Обработка записи (задача цикла событий конвейера)
+
+        Args:
+            audio_data: Записанное аудио
+            app_id: Bundle id целевого приложения
+            job_id: Задача в спуле записей
+            replay: Запись из спула после перезапуска (без автовставки)
+            trace: Трасса фразы (корневой спан, начат при старте записи)
+            profile: Отслеживание задержки фразы профилировщиком
+            cancel: Токен отмены транскрипции
+        """
+        if trace is None:
+            trace = self.tracer.start_trace("dictation", replay=replay)
+        if trace is not None:
+            trace.set(job_id=job_id, app_id=app_id)
+        # Все записи лога обработки помечаются задачей (JSON-логи: поле job_id)
+        QUEUE_DEPTH.inc()
+        try:
+            with log_context(job_id=job_id, app_id=app_id), self.tracer.activate(trace):
+                await self._process_job(audio_data, app_id, job_id, replay, trace, profile, cancel)
+        finally:
+            QUEUE_DEPTH.dec()
+            with self._state_lock:
+                self._cancels.discard(cancel)
+
+    async def _process_job(self, audio_data, app_id, job_id, replay, trace, profile, cancel):
+        """Транскрипция, постобработка и вставка одной записи"""
+        # Трасса и профиль завершаются после вставки (в главном потоке) или здесь
+        pasting = False
         try:
-            self.is_processing = True
             self._update_status("Транскрипция...")
+            if self.spool:
+                self.spool.mark_started(job_id)
             
-            # Подготовка аудио
-            audio_data = self.audio_processor.prepare_for_whisper(audio_data)
-            
-            # Транскрипция
-            text = self.transcription_engine.transcribe(audio_data)
+            # Подготовка, транскрипция и постобработка (в двухуровневом режиме
+            # черновик показывается сразу)
+            result = await self.pipeline.transcribe(
+                audio_data, app_id, on_partial=self._on_draft, cancel=cancel
+            )
+            text = result.text
+            self._observe(result)
+            if self.spool:
+                self.spool.mark_done(job_id, len(text))
+            if self.history:
+                self.history.add_result(result, app_id=app_id, job_id=job_id)
             
             if not text or not text.strip():
                 self.logger.warning("Пустой результат транскрипции")
+                RECORDINGS.inc(status="empty")
                 self._finalize_processing(None)
                 return
             
+            if replay:
+                # Целевое приложение уже не активно - текст доступен через "Копировать текст"
+                self.last_text = text
+                rumps.notification("VTTv2", "Восстановлена запись", text[:100])
+                self._finalize_processing(text)
+                return
+
             # Автовставка (в главном потоке для правильной работы CGEvent)
             if self.config.ui.auto_paste_enabled:
                 self.logger.info(f"Автовставка текста: {len(text)} символов")
                 # Выполняем вставку в главном потоке через PyObjCTools
+                pasting = True
                 if APPHELPER_AVAILABLE:
-                    def do_paste():
-                        try:
-                            success = self.text_injector.paste_text(text)
-                            if success:
-                                self.logger.info("✅ Автовставка выполнена успешно")
-                            else:
-                                self.logger.warning("⚠️ Автовставка не удалась, текст скопирован в буфер обмена")
-                        except Exception as e:
-                            self.logger.error(f"Ошибка автовставки: {e}")
-                    
-                    AppHelper.callAfter(do_paste)
+                    AppHelper.callAfter(self._paste, text, job_id, trace, profile)
                 else:
                     # Fallback - выполняем напрямую (может не работать в некоторых случаях)
-                    try:
-                        success = self.text_injector.paste_text(text)
-                        if success:
-                            self.logger.info("✅ Автовставка выполнена успешно")
-                        else:
-                            self.logger.warning("⚠️ Автовставка не удалась, текст скопирован в буфер обмена")
-                    except Exception as e:
-                        self.logger.error(f"Ошибка автовставки: {e}")
+                    self._paste(text, job_id, trace, profile)
             
+            RECORDINGS.inc(status="ok")
             self.last_text = text
             self._finalize_processing(text)
             
+        except TranscriptionCancelledError:
+            RECORDINGS.inc(status="cancelled")
+            self.tracer.end_trace(trace, error="Транскрипция отменена")
+            self.logger.info("Транскрипция отменена")
+            if self.spool:
+                self.spool.mark_cancelled(job_id)
+            self._finalize_processing(None)
+            self._update_status("Отменено")
         except Exception as e:
+            RECORDINGS.inc(status="failed")
+            self.tracer.end_trace(trace, error=str(e))
             self.logger.error(f"Ошибка обработки аудио: {e}")
+            if self.spool:
+                self.spool.mark_failed(job_id, str(e))
             self._finalize_processing(None)
+        finally:
+            if not pasting:
+                self.tracer.end_trace(trace)
+                self.profiler.end(profile, job_id)
+
+    def _paste(self, text, job_id=None, trace=None, profile=None):
+        """Автовставка текста в активное приложение"""
+        try:
+            with log_context(job_id=job_id, stage="paste"), \
+                    self.tracer.span("paste_text", parent=trace) as span:
+                success = self.text_injector.paste_text(text)
+                span.set(success=success, chars=len(text))
+            if success:
+                self.logger.info("✅ Автовставка выполнена успешно")
+            else:
+                PASTE_FAILURES.inc()
+                self.logger.warning("⚠️ Автовставка не удалась, текст скопирован в буфер обмена")
+        except Exception as e:
+            PASTE_FAILURES.inc()
+            self.logger.error(f"Ошибка автовставки: {e}")
+        finally:
+            self.tracer.end_trace(trace)
+            self.profiler.end(profile, job_id)
+
+    @staticmethod
+    def _observe(result):
+        """Метрики транскрипции фразы"""
+        engine = result.engine or "unknown"
+        AUDIO_SECONDS.inc(result.audio_duration)
+        DECODE_SECONDS.observe(result.elapsed, engine=engine)
+        if result.rtf is not None:
+            RTF.observe(result.rtf, engine=engine)
+
+    def _replay_spool(self):
+        """Транскрипция записей из спула, не обработанных до перезапуска"""
+        if not self.spool:
+            return
+        jobs = self.spool.pending()
+        if not jobs:
+            return
+        self.logger.info(f"Восстановление необработанных записей: {len(jobs)}")
+
+        async def replay():
+            for job in jobs:
+                # Текущая диктовка важнее - ждем ее завершения
+                while self.is_recording or self.is_processing:
+                    await asyncio.sleep(0.5)
+                try:
+                    audio_data = await asyncio.to_thread(self.spool.load, job.job_id)
+                except Exception as e:
+                    self.logger.error(f"Не удалось прочитать запись {job.job_id}: {e}")
+                    self.spool.mark_failed(job.job_id, str(e))
+                    continue
+                await self._process_audio(
+                    audio_data, job.app_id, job.job_id, replay=True, cancel=self._track_cancel()
+                )
+
+        self.loop.submit(replay())
+
+    def _on_draft(self, draft_text: str):
+        """Показ черновика быстрого уровня, пока большая модель его проверяет"""
+        preview = draft_text[:40] + "..." if len(draft_text) > 40 else draft_text
+        self._update_status(f"Черновик: {preview}")
     
     def _finalize_processing(self, text):
         """Завершение обработки"""
-        self.is_processing = False
-        self.title = self.config.menu_bar.icon_idle
+        if not self.is_recording:
+            # При max_concurrent_tasks > 1 следующая запись могла начаться во время транскрипции
+            self.title = self.config.menu_bar.icon_idle
         
         if text:
             self._update_status("Готов")
@@ -302,14 +588,39 @@ class VTT2App(rumps.App):
         display_text = self.last_text[:500] + "..." if len(self.last_text) > 500 else self.last_text
         rumps.alert("Последний текст", display_text)
     
+    @rumps.clicked("🔎 Поиск в истории")
+    def search_history(self, _):
+        """Поиск по истории транскриптов"""
+        if not self.history:
+            rumps.alert("История отключена", "Включите storage.history в config.yaml")
+            return
+
+        response = rumps.Window(
+            message='Слова (по началу) или "точная фраза". Пусто - последние записи',
+            title="Поиск в истории",
+            ok="Найти",
+            cancel="Отмена",
+            dimensions=(320, 24),
+        ).run()
+        if not response.clicked:
+            return
+
+        query = response.text.strip()
+        entries = self.history.search(query, limit=10) if query else self.history.recent(limit=10)
+        if not entries:
+            rumps.alert("Поиск в истории", "Ничего не найдено")
+            return
+
+        listing = "\n\n".join(entry.summary(width=120) for entry in entries)
+        if rumps.alert("Поиск в истории", listing, ok="Копировать первый", cancel="Закрыть") == 1:
+            import pyperclip
+            pyperclip.copy(entries[0].text)
+
     @rumps.clicked("ℹ️ О программе")
     def show_about(self, _):
         """О программе"""
         # Определяем название движка для отображения
-        engine_name = {
-            "mlx_whisper": "MLX Whisper",
-            "whisper_cpp": "whisper.cpp"
-        }.get(self.config.transcription.engine, self.config.transcription.engine)
+        engine_name = REGISTRY.description(self.config.transcription.engine)
         
         rumps.alert(
             "VTTv2",
@@ -340,11 +651,45 @@ class VTT2App(rumps.App):
         checks.append(f"TextInjector: {'✅' if hasattr(self, 'text_injector') else '❌'}")
         
         # Проверка текущего движка
-        engine_name = {
-            "mlx_whisper": "MLX Whisper",
-            "whisper_cpp": "whisper.cpp"
-        }.get(self.config.transcription.engine, self.config.transcription.engine)
+        engine_name = REGISTRY.description(self.config.transcription.engine)
         checks.append(f"Движок ({engine_name}): ✅")
+        if (hasattr(self, 'transcription_engine')
+                and self.transcription_engine.draft_engine is not None):
+            tier_stats = self.transcription_engine.tier_stats
+            checks.append(
+                f"Быстрый уровень: {tier_stats.fast_tier_ratio:.0%} "
+                f"({tier_stats.fast_tier}/{tier_stats.utterances})"
+            )
+
+        if hasattr(self, 'transcription_engine') and self.transcription_engine.context is not None:
+            context_stats = self.transcription_engine.context.stats
+            checks.append(
+                f"Контекст: {context_stats.prompted} фраз, "
+                f"избежано повторов: {context_stats.fallbacks_avoided:.1f}"
+            )
+        if (hasattr(self, 'transcription_engine')
+                and self.transcription_engine.languages is not None):
+            language_stats = self.transcription_engine.languages.stats
+            checks.append(
+                f"Кэш языка: {language_stats.hit_ratio:.0%} фраз без определения "
+                f"(определений: {language_stats.detections})"
+            )
+        if hasattr(self, 'transcription_engine') and self.transcription_engine.rtf is not None:
+            rtf = self.transcription_engine.rtf.estimate(self.transcription_engine.slots[0].name)
+            if rtf is not None:
+                checks.append(f"RTF ({self.transcription_engine.slots[0].name}): {rtf:.2f}")
+        if hasattr(self, 'transcription_engine') and len(self.transcription_engine.slots) > 1:
+            fallback_stats = self.transcription_engine.fallback_stats
+            for slot in self.transcription_engine.slots:
+                checks.append(
+                    f"  {slot.name}: {slot.breaker.state}, фраз: {slot.served}, "
+                    f"ошибок: {slot.failures} (таймаутов: {slot.timeouts}), отключений: "
+                    f"{slot.breaker.opens}"
+                )
+            checks.append(
+                f"Резервирование: спасено фраз {fallback_stats.recovered}, "
+                f"потеряно {fallback_stats.failed}"
+            )
         
         status_text = "\n".join(checks)
         rumps.alert("Health Check", status_text)
@@ -354,6 +699,19 @@ class VTT2App(rumps.App):
         """Выход из приложения"""
         if hasattr(self, 'hotkey_manager'):
             self.hotkey_manager.stop()
+        if hasattr(self, 'cancel_hotkey_manager'):
+            self.cancel_hotkey_manager.stop()
+        if hasattr(self, 'audio_recorder'):
+            self.audio_recorder.cleanup()
+        if hasattr(self, 'loop'):
+            self.loop.stop()
+            self.pipeline.close()
+        if getattr(self, 'spool', None):
+            self.spool.close()
+        if getattr(self, 'history', None):
+            self.history.close()
+        if getattr(self, 'metrics_server', None):
+            self.metrics_server.shutdown()
         rumps.quit_application()
 
 
@@ -394,20 +752,12 @@ def health_check_command(config_path: str = "config.yaml"):
     engine_type = config.transcription.engine
     checks["engine"] = engine_type
     
-    if engine_type == "mlx_whisper":
-        try:
-            from transcription.mlx_engine import MLXWhisperTranscriber
-            transcriber = MLXWhisperTranscriber(config)
-            checks["mlx_whisper"] = "✅"
-        except Exception as e:
-            checks["mlx_whisper"] = f"❌ {e}"
-    elif engine_type == "whisper_cpp":
-        try:
-            from transcription.whisper_cpp import WhisperCppTranscriber
-            transcriber = WhisperCppTranscriber(config)
-            checks["whisper_cpp"] = "✅"
-        except Exception as e:
-            checks["whisper_cpp"] = f"❌ {e}"
+    try:
+        transcriber = REGISTRY.create(engine_type, config)
+        checks[engine_type] = f"✅ ({capabilities_of(transcriber)})"
+    except Exception as e:
+        checks[engine_type] = f"❌ {e}"
+    checks["engines_available"] = ", ".join(REGISTRY.names())
     
     # Вывод результатов
     print("\n=== Результаты Health Check ===")
@@ -437,6 +787,54 @@ def health_check_command(config_path: str = "config.yaml"):
         return 0  # Возвращаем 0, так как это не критично для health check
 
 
+def history_command(query: str, config_path: str = "config.yaml", limit: int = 20):
+    """Поиск по истории транскриптов из CLI"""
+    project_root = Path.cwd()
+    if not (project_root / config_path).exists():
+        # Попробуем найти относительно src/
+        project_root = Path(__file__).parent.parent.parent
+
+    config = Config.from_yaml(str(project_root / config_path), project_root)
+    if not config.storage.history.enabled:
+        print("История отключена: включите storage.history в config.yaml")
+        return
+    history = TranscriptHistory(config.storage.history)
+    try:
+        start = time.perf_counter()
+        entries = (
+            history.search(query, limit=limit) if query.strip() else history.recent(limit=limit)
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for entry in entries:
+            print(entry.summary(width=160))
+        print(f"\nНайдено: {len(entries)} из {history.count()} записей за {elapsed_ms:.1f} мс")
+    finally:
+        history.close()
+    return 0
+
+
+def metrics_command(config_path: str = "config.yaml"):
+    """Снимок метрик запущенного экземпляра из CLI"""
+    import urllib.error
+    import urllib.request
+
+    project_root = Path.cwd()
+    if not (project_root / config_path).exists():
+        # Попробуем найти относительно src/
+        project_root = Path(__file__).parent.parent.parent
+
+    config = Config.from_yaml(str(project_root / config_path), project_root)
+    url = f"http://{config.metrics.host}:{config.metrics.port}/metrics"
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            print(response.read().decode("utf-8"), end="")
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Метрики недоступны ({url}): {e}")
+        print("   Запущен ли VTTv2 с metrics.enabled: true?")
+        return 1
+    return 0
+
+
 def main():
     """Главная функция"""
     parser = argparse.ArgumentParser(description="VTTv2 - Voice-to-Text для macOS")
@@ -450,11 +848,33 @@ def main():
         default='config.yaml',
         help='Путь к config.yaml'
     )
+    parser.add_argument(
+        '--history',
+        nargs='?',
+        const='',
+        metavar='ЗАПРОС',
+        help='Поиск по истории транскриптов (без запроса - последние записи)'
+    )
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=20,
+        help='Максимум результатов --history'
+    )
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help='Снимок метрик запущенного экземпляра (текстовый формат Prometheus)'
+    )
     
     args = parser.parse_args()
     
     if args.health:
         return health_check_command(args.config)
+    if args.history is not None:
+        return history_command(args.history, args.config, args.limit)
+    if args.metrics:
+        return metrics_command(args.config)
     
     # Обычный запуск приложения
     project_root = Path.cwd()
@@ -475,7 +895,10 @@ def main():
     setup_logging(
         level=config.logging.level,
         format_string=config.logging.format,
-        log_file=config.logging.file
+        log_file=config.logging.file,
+        json_format=config.logging.json_format,
+        max_bytes=config.logging.max_size_mb * 1024 * 1024,
+        backup_count=config.logging.backup_count
     )
     
     # Запуск приложения
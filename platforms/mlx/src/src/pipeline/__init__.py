@@ -0,0 +1 @@
+"""Модуль ядра конвейера диктовки (asyncio)"""
@@ -0,0 +1,239 @@
+"""
+Асинхронное ядро конвейера диктовки
+
+Подготовка аудио, транскрипция и постобработка текста записи - корутина
+DictationPipeline.transcribe; промежуточный текст - асинхронный итератор
+stream. Блокирующие движки выполняются в пуле потоков размером
+performance.max_concurrent_tasks: параллельность задается явно, а отмена
+и таймаут - средствами asyncio (отмена задачи прерывает и декодирование
+через токен отмены движка). Синхронный код (меню rumps, горячие
+клавиши) запускает корутины в цикле событий фонового потока PipelineLoop.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import threading
+from collections.abc import AsyncIterator, Callable, Coroutine
+from contextlib import nullcontext
+from dataclasses import replace
+from typing import Any, NamedTuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineEvent(NamedTuple):
+    """Событие потока транскрипции"""
+    kind: str  # partial - промежуточный текст, final - результат
+    text: str
+    result: Any = None  # TranscriptionResult (только final)
+
+
+class PipelineLoop:
+    """Цикл событий в фоновом потоке для синхронных вызывающих"""
+
+    def __init__(self, name: str = "pipeline-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            # Незавершенные задачи отменяются при остановке
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Запуск корутины из любого потока (future.cancel() отменяет задачу)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Остановка цикла (задачи отменяются)"""
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+
+
+class DictationPipeline:
+    """Подготовка аудио -> транскрипция -> постобработка текста"""
+
+    def __init__(
+        self,
+        engine,
+        audio_processor,
+        memory,
+        tracer,
+        text_processor=None,
+        max_concurrent: int = 1
+    ):
+        """
+        Инициализация конвейера
+
+        Args:
+            engine: TranscriptionEngineWrapper
+            audio_processor: AudioProcessor
+            memory: MemoryAccounting (память по этапам)
+            tracer: Tracer (спаны этапов)
+            text_processor: TextProcessor (None - без постобработки)
+            max_concurrent: Записей, транскрибируемых одновременно
+        """
+        self.engine = engine
+        self.audio_processor = audio_processor
+        self.memory = memory
+        self.tracer = tracer
+        self.text_processor = text_processor
+        self.max_concurrent = max_concurrent
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix="transcribe"
+        )
+        # Записи в обработке и в очереди: меняются в цикле событий,
+        # читаются из потока UI (saturated перед новой записью)
+        self._active = 0
+        self._active_lock = threading.Lock()
+        # Поля логов этапа (устанавливается приложением, например log_context)
+        self.log_stage: Callable[[str], Any] = lambda stage: nullcontext()
+
+    @property
+    def active(self) -> int:
+        """Записей в обработке и в очереди"""
+        with self._active_lock:
+            return self._active
+
+    @property
+    def busy(self) -> bool:
+        """Есть записи в обработке"""
+        return self.active > 0
+
+    @property
+    def saturated(self) -> bool:
+        """Все потоки транскрипции заняты"""
+        return self.active >= self.max_concurrent
+
+    async def transcribe(
+        self,
+        audio_data: np.ndarray,
+        app_id: str | None = None,
+        on_partial: Callable[[str], None] | None = None,
+        timeout: float | None = None,
+        cancel=None
+    ):
+        """
+        Транскрипция записи
+
+        Args:
+            audio_data: Записанное аудио
+            app_id: Bundle id целевого приложения (контекст между фразами)
+            on_partial: Колбэк промежуточного текста (вызывается из потока транскрипции)
+            timeout: Предел ожидания результата (сек)
+            cancel: Токен отмены (CancelToken); отмена из любого потока прерывает декодирование
+
+        Returns:
+            TranscriptionResult с обработанным текстом
+
+        Raises:
+            asyncio.TimeoutError: Результат не получен за timeout
+            asyncio.CancelledError: Задача отменена (запись из очереди не декодируется)
+            TranscriptionCancelledError: Отменен токен cancel
+        """
+        loop = asyncio.get_running_loop()
+        if cancel is None:
+            cancel = self.engine.cancel_token()
+        # Контекст логов и трассы переходит в поток транскрипции
+        call = functools.partial(
+            contextvars.copy_context().run,
+            self._run, audio_data, app_id, on_partial, cancel
+        )
+        with self._active_lock:
+            self._active += 1
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, call), timeout)
+        except (TimeoutError, asyncio.CancelledError):
+            # Поток транскрипции освобождается, не дожидаясь конца декодирования
+            cancel.cancel()
+            raise
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    async def stream(
+        self,
+        audio_data: np.ndarray,
+        app_id: str | None = None,
+        timeout: float | None = None,
+        cancel=None
+    ) -> AsyncIterator[PipelineEvent]:
+        """
+        Транскрипция записи с промежуточным текстом
+
+        Выдает события partial (черновик двухуровневого режима или текст
+        потокового движка) и последним - final. Выход из итерации отменяет
+        транскрипцию.
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def on_partial(text: str) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, text)
+
+        task = asyncio.ensure_future(
+            self.transcribe(audio_data, app_id, on_partial, timeout, cancel)
+        )
+        # Промежуточный текст поставлен в очередь раньше завершения задачи
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (text := await events.get()) is not None:
+                yield PipelineEvent("partial", text)
+            result = await task
+            yield PipelineEvent("final", result.text, result)
+        finally:
+            task.cancel()
+
+    def close(self) -> None:
+        """Остановка потоков транскрипции (записи в очереди отменяются)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _process_text(self, text: str) -> str:
+        return self.text_processor.process(text) if self.text_processor and text else text
+
+    def _run(self, audio_data: np.ndarray, app_id: str | None, on_partial, cancel):
+        """Этапы записи (в потоке транскрипции)"""
+        # Запись отменена, пока ждала свободного потока
+        cancel.check()
+        with self.tracer.span("prepare_for_whisper"), \
+                self.memory.stage("prepare", audio_data) as usage:
+            prepared = self.audio_processor.prepare_for_whisper(audio_data)
+            if prepared is not audio_data:
+                usage.add(prepared)
+            audio_data = prepared
+
+        on_draft = None
+        if on_partial is not None:
+            def on_draft(text):
+                on_partial(self._process_text(text))
+
+        # Транскрипция (в двухуровневом режиме черновик передается сразу)
+        with self.log_stage("transcription"), self.tracer.span("transcribe") as span, \
+                self.memory.stage("transcription", audio_data) as usage:
+            result = self.engine.transcribe_detailed(
+                audio_data, on_draft=on_draft, app_id=app_id, cancel=cancel
+            )
+            span.set(engine=result.engine, model=result.model, language=result.language,
+                     audio_duration=result.audio_duration, rtf=result.rtf)
+        if self.engine.memory_guard is not None:
+            # Фактический пик уточняет оценку памяти следующих фраз
+            self.engine.memory_guard.observe(usage.growth)
+
+        if self.text_processor:
+            with self.log_stage("text_processing"), self.tracer.span("text_processing"):
+                result = replace(result, text=self._process_text(result.text))
+        return result
@@ -0,0 +1 @@
+"""Модуль для хранения записей (спул аудио, история транскриптов)"""
@@ -0,0 +1,248 @@
+"""
+История транскриптов в SQLite с полнотекстовым индексом (FTS5)
+
+Запись - пакетами из фонового потока: вставка текста в приложение не
+ждет диска. Поиск по префиксам и фразам идет по индексу FTS5 и занимает
+миллисекунды даже на сотнях тысяч записей.
+"""
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    app_id TEXT,
+    engine TEXT,
+    model TEXT,
+    language TEXT,
+    audio_duration REAL,
+    elapsed REAL,
+    job_id TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_created ON transcripts(created);
+-- Индекс без копии текста (external content); префиксные индексы 2-3 символа
+-- ускоряют поиск по мере ввода
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+    text, content='transcripts', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN
+    INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_ad AFTER DELETE ON transcripts BEGIN
+    INSERT INTO transcripts_fts(transcripts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_INSERT = """
+INSERT INTO transcripts
+    (created, app_id, engine, model, language, audio_duration, elapsed, job_id, text)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_COLUMNS = "id, created, app_id, engine, model, language, audio_duration, elapsed, job_id, text"
+
+# Слова запроса (все остальное - синтаксис FTS5, в запрос не попадает)
+_WORD = re.compile(r"\w+")
+
+
+class HistoryEntry(NamedTuple):
+    """Запись истории"""
+    id: int
+    created: float  # Время транскрипции (unix)
+    app_id: str | None
+    engine: str | None
+    model: str | None
+    language: str | None
+    audio_duration: float | None  # Длительность аудио (сек)
+    elapsed: float | None  # Время транскрипции (сек)
+    job_id: str | None  # Запись в спуле (аудио, если еще хранится)
+    text: str
+
+    def summary(self, width: int = 80) -> str:
+        """Строка для меню и CLI: время, приложение, начало текста"""
+        text = " ".join(self.text.split())
+        if len(text) > width:
+            text = text[:width - 3] + "..."
+        app = f" [{self.app_id}]" if self.app_id else ""
+        return f"{time.strftime('%d.%m.%Y %H:%M', time.localtime(self.created))}{app} {text}"
+
+
+def match_expression(query: str) -> str | None:
+    """
+    Выражение MATCH для запроса пользователя
+
+    "в кавычках" - точная фраза; иначе все слова, каждое как префикс
+    (поиск по мере ввода: "транс" находит "транскрипция").
+
+    Returns:
+        Выражение FTS5 или None - в запросе нет слов
+    """
+    query = query.strip()
+    if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+        words = _WORD.findall(query[1:-1])
+        return f'"{" ".join(words)}"' if words else None
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class TranscriptHistory:
+    """История транскриптов"""
+
+    def __init__(self, history_config):
+        """
+        Инициализация истории
+
+        Args:
+            history_config: HistoryConfig
+        """
+        self.config = history_config
+        self.path = Path(history_config.path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._connect()
+        try:
+            # WAL: чтение (поиск из меню) не блокируется записью фонового потока
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        self._reader = self._connect(check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+        logger.info(f"История транскриптов: {self.path}")
+
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=5.0, **kwargs)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(
+        self,
+        text: str,
+        app_id: str | None = None,
+        engine: str | None = None,
+        model: str | None = None,
+        language: str | None = None,
+        audio_duration: float | None = None,
+        elapsed: float | None = None,
+        job_id: str | None = None
+    ) -> None:
+        """Добавление транскрипта (асинхронно, пакетом с соседними)"""
+        if not text:
+            return
+        self._queue.put(
+            (time.time(), app_id, engine, model, language, audio_duration, elapsed, job_id, text)
+        )
+
+    def add_result(self, result, app_id: str | None = None, job_id: str | None = None) -> None:
+        """Добавление TranscriptionResult"""
+        self.add(
+            result.text, app_id=app_id, engine=result.engine or None, model=result.model or None,
+            language=result.language, audio_duration=result.audio_duration,
+            elapsed=result.elapsed, job_id=job_id,
+        )
+
+    def search(self, query: str, limit: int = 20) -> list[HistoryEntry]:
+        """
+        Поиск по истории (новые записи первыми)
+
+        Args:
+            query: Слова (префиксы) или "точная фраза"
+            limit: Максимум результатов
+        """
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        sql = (
+            f"SELECT {_COLUMNS} FROM transcripts WHERE id IN "
+            "(SELECT rowid FROM transcripts_fts WHERE transcripts_fts MATCH ? ORDER BY rowid DESC "
+            "LIMIT ?) "
+            f"ORDER BY id DESC"
+        )
+        with self._read_lock:
+            rows = self._reader.execute(sql, (expression, limit)).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def recent(self, limit: int = 20) -> list[HistoryEntry]:
+        """Последние записи"""
+        with self._read_lock:
+            rows = self._reader.execute(
+                f"SELECT {_COLUMNS} FROM transcripts ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def count(self) -> int:
+        """Количество записей"""
+        with self._read_lock:
+            return self._reader.execute("SELECT count(*) FROM transcripts").fetchone()[0]
+
+    def flush(self) -> None:
+        """Ожидание записи всех добавленных транскриптов"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Запись очереди и закрытие базы"""
+        self._queue.put(None)
+        self._writer.join()
+        self._reader.close()
+
+    def _write_loop(self) -> None:
+        """Фоновый поток: вставка пакетами в одной транзакции"""
+        conn = self._connect()
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = []
+            if item is None:
+                stop = True
+            else:
+                batch.append(item)
+            # Добираем пакет: что уже в очереди и что придет за flush_interval
+            deadline = time.monotonic() + self.config.flush_interval
+            while not stop and len(batch) < self.config.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            try:
+                if batch:
+                    with conn:
+                        conn.executemany(_INSERT, batch)
+                    self._apply_retention(conn)
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка записи истории: {e}")
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+        conn.close()
+
+    def _apply_retention(self, conn: sqlite3.Connection) -> None:
+        """Удаление самых старых записей сверх max_entries"""
+        if not self.config.max_entries:
+            return
+        with conn:
+            conn.execute(
+                "DELETE FROM transcripts WHERE id <= (SELECT max(id) FROM transcripts) - ?",
+                (self.config.max_entries,)
+            )
@@ -0,0 +1,297 @@
+"""
+Спул записей на диске: аудио не теряется при падении приложения или движка
+
+Каждая запись сжимается (FLAC или Opus) и сохраняется фоновым потоком,
+состояние задач пишется в журнал только дописыванием (journal.jsonl).
+После перезапуска незавершенные записи транскрибируются повторно.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+_JOURNAL = "journal.jsonl"
+
+# Состояния задачи
+RECORDED = "recorded"  # Аудио сохранено, транскрипция не начата
+STARTED = "started"  # Транскрипция начата (не завершена - падение или перезапуск)
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"  # Отменена пользователем - не повторяется
+
+# Формат файла: (расширение, format и subtype soundfile)
+_FORMATS = {
+    "flac": (".flac", "FLAC", "PCM_16"),
+    "opus": (".opus", "OGG", "OPUS"),
+}
+
+
+@dataclass
+class SpoolJob:
+    """Запись в спуле"""
+    job_id: str
+    created: float  # Время записи (unix)
+    app_id: str | None = None  # Целевое приложение
+    state: str = RECORDED
+    attempts: int = 0  # Сколько раз начиналась транскрипция
+    path: Path | None = None  # Файл аудио (None - еще не записан)
+    size: int = 0  # Размер файла (байт)
+
+
+class AudioSpool:
+    """
+    Журналируемый спул записей
+
+    Запись на диск не задерживает транскрипцию: submit() только копирует
+    буфер и ставит задачу в очередь фонового потока. Журнал и файлы пишет
+    один поток, поэтому порядок событий в журнале совпадает с порядком
+    вызовов.
+    """
+
+    def __init__(self, spool_config, sample_rate: int):
+        """
+        Инициализация спула
+
+        Args:
+            spool_config: SpoolConfig
+            sample_rate: Частота дискретизации записей
+        """
+        self.config = spool_config
+        self.sample_rate = sample_rate
+        self.directory = Path(spool_config.directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._extension, self._format, self._subtype = _FORMATS[spool_config.format]
+
+        self._lock = threading.Lock()
+        self._jobs: dict[str, SpoolJob] = self._load()
+        self._journal = open(self.directory / _JOURNAL, "a", encoding="utf-8")
+
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="spool-writer", daemon=True)
+        self._writer.start()
+        self._queue.put((self._apply_retention, ()))
+
+        logger.info(f"Спул записей: {self.directory} ({len(self.pending())} незавершенных)")
+
+    def _load(self) -> dict[str, SpoolJob]:
+        """Состояние задач из журнала и файлов аудио"""
+        jobs: dict[str, SpoolJob] = {}
+        journal = self.directory / _JOURNAL
+        if journal.exists():
+            with open(journal, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Недописанная строка при падении - пропускаем
+                        continue
+                    job = jobs.get(event["id"])
+                    if job is None:
+                        job = jobs[event["id"]] = SpoolJob(
+                            event["id"], event["ts"], event.get("app_id")
+                        )
+                    job.state = event["state"]
+                    job.attempts = event.get("attempts", job.attempts)
+
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":
+                # Недописанный файл при падении
+                path.unlink(missing_ok=True)
+                continue
+            if path.suffix not in (".flac", ".opus"):
+                continue
+            job = jobs.get(path.stem)
+            if job is None:
+                # Аудио записано, но падение случилось до записи в журнал
+                job = jobs[path.stem] = SpoolJob(path.stem, path.stat().st_mtime)
+            job.path = path
+            job.size = path.stat().st_size
+        # Задачи без аудио восстановить нельзя
+        return {job_id: job for job_id, job in jobs.items() if job.path is not None}
+
+    @staticmethod
+    def new_job_id() -> str:
+        """Идентификатор задачи (до сохранения аудио: для логов и трассы записи)"""
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def submit(
+        self, audio_data: np.ndarray, app_id: str | None = None, job_id: str | None = None
+    ) -> str:
+        """
+        Сохранение записи (асинхронно, без копии)
+
+        Буфер передается фоновому потоку как есть и становится доступным
+        только для чтения: подготовка к транскрипции нормализует копию, а
+        на диск попадает записанное аудио.
+
+        Args:
+            audio_data: Аудио float32 моно
+            app_id: Bundle id целевого приложения
+            job_id: Идентификатор из new_job_id (по умолчанию - новый)
+
+        Returns:
+            Идентификатор задачи
+        """
+        job = SpoolJob(job_id or self.new_job_id(), time.time(), app_id)
+        audio_data.flags.writeable = False
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._queue.put((self._write_audio, (job, audio_data)))
+        return job.job_id
+
+    def mark_started(self, job_id: str | None) -> None:
+        """Начало транскрипции задачи"""
+        self._update(job_id, STARTED)
+
+    def mark_done(self, job_id: str | None, chars: int = 0) -> None:
+        """Задача транскрибирована"""
+        self._update(job_id, DONE, chars=chars)
+
+    def mark_failed(self, job_id: str | None, error: str) -> None:
+        """Транскрипция задачи не удалась (задача повторится после перезапуска)"""
+        self._update(job_id, FAILED, error=error)
+
+    def mark_cancelled(self, job_id: str | None) -> None:
+        """Транскрипция задачи отменена (после перезапуска не повторяется)"""
+        self._update(job_id, CANCELLED)
+
+    def _update(self, job_id: str | None, state: str, **details) -> None:
+        if job_id is None:
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.state = state
+            if state == STARTED:
+                job.attempts += 1
+            details["attempts"] = job.attempts
+        self._queue.put((self._append_event, (job, state, details)))
+
+    def pending(self) -> list[SpoolJob]:
+        """Незавершенные задачи (по времени записи), которые еще можно повторить"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if self._is_pending(job)]
+        return sorted(jobs, key=lambda job: job.created)
+
+    def _is_pending(self, job: SpoolJob) -> bool:
+        return job.state not in (DONE, CANCELLED) and job.attempts < self.config.max_attempts
+
+    def load(self, job_id: str) -> np.ndarray:
+        """
+        Аудио задачи
+
+        Raises:
+            KeyError: Если задачи нет или аудио еще не записано
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+        if job.path is None:
+            raise KeyError(f"Аудио задачи {job_id} еще не записано")
+        audio_data, _ = sf.read(str(job.path), dtype="float32")
+        return audio_data
+
+    def flush(self) -> None:
+        """Ожидание записи всех поставленных в очередь событий"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Запись очереди и остановка фонового потока"""
+        self._queue.put(None)
+        self._writer.join()
+        self._journal.close()
+
+    def _write_loop(self) -> None:
+        """Фоновый поток: файлы аудио, журнал, очистка"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                handler, args = item
+                handler(*args)
+            except Exception as e:
+                logger.error(f"Ошибка записи спула: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write_audio(self, job: SpoolJob, audio_data: np.ndarray) -> None:
+        path = self.directory / f"{job.job_id}{self._extension}"
+        # Во временный файл и переименование: в спуле нет недописанного аудио
+        tmp_path = path.with_name(path.name + ".tmp")
+        sf.write(
+            str(tmp_path), audio_data, self.sample_rate, format=self._format, subtype=self._subtype
+        )
+        os.replace(tmp_path, path)
+        with self._lock:
+            job.path = path
+            job.size = path.stat().st_size
+        self._append_event(job, RECORDED, {"app_id": job.app_id})
+        logger.debug("Запись сохранена в спул: %s (%.0f KB)", path.name, job.size / 1024)
+        self._apply_retention()
+
+    def _append_event(self, job: SpoolJob, state: str, details: dict) -> None:
+        created = job.created if state == RECORDED else time.time()
+        event = {"id": job.job_id, "ts": created, "state": state, **details}
+        self._journal.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        if state in (DONE, FAILED, CANCELLED):
+            self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        """Удаление записей старше max_age_days и самых старых завершенных сверх max_size_mb"""
+        now = time.time()
+        max_age = self.config.max_age_days * 86400
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created)
+            expired = [job for job in jobs if job.path is not None and now - job.created > max_age]
+            total = sum(job.size for job in jobs if job not in expired)
+            for job in jobs:
+                if total <= self.config.max_size_mb * 1024 * 1024:
+                    break
+                # Незавершенные записи по размеру не удаляются - только по возрасту
+                if job not in expired and job.path is not None and not self._is_pending(job):
+                    expired.append(job)
+                    total -= job.size
+            for job in expired:
+                del self._jobs[job.job_id]
+
+        if not expired:
+            return
+        for job in expired:
+            job.path.unlink(missing_ok=True)
+        self._compact()
+        logger.info(f"Спул: удалено записей по возрасту/размеру: {len(expired)}")
+
+    def _compact(self) -> None:
+        """Перезапись журнала: одна строка на оставшуюся задачу"""
+        with self._lock:
+            events = [
+                {
+                    "id": job.job_id, "ts": job.created, "state": job.state, "app_id": job.app_id,
+                    "attempts": job.attempts
+                }
+                for job in sorted(self._jobs.values(), key=lambda job: job.created)
+                if job.path is not None
+            ]
+        journal = self.directory / _JOURNAL
+        tmp_path = journal.with_name(_JOURNAL + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal.close()
+        os.replace(tmp_path, journal)
+        self._journal = open(journal, "a", encoding="utf-8")
@@ -1,10 +1,11 @@
 """
 Вставка текста в место курсора через macOS API
 """
+import contextlib
 import logging
-import time
-import sys
 import subprocess
+import sys
+import time
 
 try:
     from Quartz import (
@@ -49,6 +50,8 @@ class TextInjector:
         self.config = config
         self.method = config.ui.auto_paste_method
         self.saved_app = None  # Сохраненное активное приложение
+        # Спан этапа для трассировки: вызывается с именем этапа, возвращает контекстный менеджер
+        self.trace_span = contextlib.nullcontext
         
         if not PYOBJC_AVAILABLE:
             logger.error("PyObjC недоступен - автовставка невозможна")
@@ -75,6 +78,11 @@ class TextInjector:
     
     def restore_active_app(self):
         """Восстановление активного приложения"""
+        with self.trace_span("restore_active_app"):
+            return self._activate_saved_app()
+
+    def _activate_saved_app(self):
+        """Активация сохраненного приложения с проверкой"""
         if not self.saved_app:
             logger.warning("Нет сохраненного приложения для восстановления")
             return False
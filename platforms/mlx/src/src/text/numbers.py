@@ -0,0 +1,151 @@
+"""
+Числительные словами -> цифры ("двадцать пять" -> "25", "two hundred" -> "200")
+
+Поддерживаются количественные числительные в именительном падеже (русские)
+и английские; падежные формы и порядковые остаются словами.
+"""
+import re
+
+_SMALL = {
+    "ноль": 0, "нуль": 0,
+    "один": 1, "одна": 1, "одно": 1, "два": 2, "две": 2, "три": 3, "четыре": 4,
+    "пять": 5, "шесть": 6, "семь": 7, "восемь": 8, "девять": 9, "десять": 10,
+    "одиннадцать": 11, "двенадцать": 12, "тринадцать": 13, "четырнадцать": 14, "пятнадцать": 15,
+    "шестнадцать": 16, "семнадцать": 17, "восемнадцать": 18, "девятнадцать": 19,
+    "двадцать": 20, "тридцать": 30, "сорок": 40, "пятьдесят": 50, "шестьдесят": 60,
+    "семьдесят": 70, "восемьдесят": 80, "девяносто": 90,
+    "сто": 100, "двести": 200, "триста": 300, "четыреста": 400, "пятьсот": 500,
+    "шестьсот": 600, "семьсот": 700, "восемьсот": 800, "девятьсот": 900,
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70,
+    "eighty": 80, "ninety": 90,
+}
+
+# Множитель сотен (английский: "five hundred")
+_HUNDRED = {"hundred": 100}
+
+_SCALES = {
+    "тысяча": 10**3, "тысячи": 10**3, "тысяч": 10**3,
+    "миллион": 10**6, "миллиона": 10**6, "миллионов": 10**6,
+    "миллиард": 10**9, "миллиарда": 10**9, "миллиардов": 10**9,
+    "thousand": 10**3, "million": 10**6, "billion": 10**9,
+}
+
+# Начала порядковых и падежных форм ("двадцать третьем", "twenty-first")
+_ORDINAL_STEMS = (
+    "перв", "втор", "трет", "четв", "четыр", "пят", "шест", "сед", "сем", "вос", "девя", "десят",
+    "одн", "дву", "двух", "трех", "трёх", "сорок", "девяност", "сот", "тысячн", "миллионн",
+    "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+)
+
+_WORD = re.compile(r"\w+")
+# Между словами одного числа - только пробелы или дефис ("twenty-one")
+_JOINER = re.compile(r"\s*-?\s*")
+
+
+def is_number_word(word: str) -> bool:
+    """Слово - часть числительного"""
+    word = word.lower()
+    return word in _SMALL or word in _HUNDRED or word in _SCALES
+
+
+class _Number:
+    """Разбор одного числа слово за словом"""
+
+    def __init__(self):
+        self.total = 0  # Завершенные разряды (тысячи, миллионы)
+        self.current = 0  # Часть меньше тысячи
+        self.scale = 0  # Последний разряд (следующий должен быть меньше)
+        self.words = 0
+
+    @property
+    def value(self) -> int:
+        return self.total + self.current
+
+    def add(self, word: str) -> bool:
+        """Добавление слова; False - слово начинает новое число"""
+        if word in _SMALL:
+            value = _SMALL[word]
+            # "двадцать пять" - да, "двадцать тридцать" и "пять двадцать" - нет
+            if self.current % 10 ** len(str(value)) != 0 or (value == 0 and self.words):
+                return False
+            self.current += value
+        elif word in _HUNDRED:
+            if self.current >= 10 or (self.current == 0 and self.words):
+                return False
+            self.current = (self.current or 1) * 100
+        else:
+            scale = _SCALES[word]
+            if self.scale and scale >= self.scale:
+                return False
+            self.total += (self.current or 1) * scale
+            self.current = 0
+            self.scale = scale
+        self.words += 1
+        return True
+
+
+def find_numbers(text: str) -> list[tuple[int, int, int | None]]:
+    """
+    Числа, записанные словами
+
+    Подряд идущие слова, не складывающиеся в одно число ("пять двадцать",
+    "один два три"), - время, телефон или перечисление, а число перед
+    порядковым или падежным ("двадцать третьем") - часть составного
+    числительного; значение у них None.
+
+    Returns:
+        Список (начало, конец, значение)
+    """
+    words = list(_WORD.finditer(text))
+    numbers = []
+    index = 0
+    while index < len(words):
+        match = words[index]
+        index += 1
+        if not is_number_word(match.group()):
+            continue
+        number = _Number()
+        number.add(match.group().lower())
+        start, end = match.span()
+        ambiguous = False
+        while index < len(words) and _JOINER.fullmatch(text, end, words[index].start()):
+            word = words[index].group().lower()
+            # "one hundred and five"
+            if (word == "and" and number.current % 100 == 0 and number.value
+                    and index + 1 < len(words) and is_number_word(words[index + 1].group())):
+                index += 1
+                word = words[index].group().lower()
+            elif not is_number_word(word):
+                ambiguous = ambiguous or word.startswith(_ORDINAL_STEMS)
+                break
+            if not number.add(word):
+                ambiguous = True
+            end = words[index].end()
+            index += 1
+        numbers.append((start, end, None if ambiguous else number.value))
+    return numbers
+
+
+def normalize_numbers(text: str, min_number: int = 10) -> str:
+    """
+    Замена чисел словами на цифры
+
+    Args:
+        text: Текст
+        min_number: Однословные числа меньше этого остаются словами ("один из них")
+    """
+    parts = []
+    position = 0
+    for start, end, value in find_numbers(text):
+        if value is None or (value < min_number and _WORD.fullmatch(text, start, end)):
+            continue
+        parts.append(text[position:start])
+        parts.append(str(value))
+        position = end
+    if not parts:
+        return text
+    parts.append(text[position:])
+    return "".join(parts)
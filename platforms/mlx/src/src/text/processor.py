@@ -0,0 +1,174 @@
+"""
+Постобработка транскрипта: замены по словарю, слова-паразиты, числа, регистр
+
+Все шаги - один проход по тексту (словарь - автомат Ахо-Корасик, остальное -
+регулярные выражения), обработка фразы занимает десятки микросекунд и не
+зависит от размера словаря.
+"""
+import logging
+import re
+
+from .numbers import is_number_word, normalize_numbers
+from .vocabulary import VocabularyMatcher, load_vocabulary_file
+
+logger = logging.getLogger(__name__)
+
+# Пробелы перед знаками препинания и запятая перед концом предложения
+# (остаются после удаления слов-паразитов)
+_SPACE_BEFORE_PUNCT = re.compile(r"[ \t]+(?=[,.!?;:…])")
+_ORPHAN_PUNCT = re.compile(r"(?<=[.!?…])[ \t]+[,.;:]+(?=\s|$)")
+_LEADING_PUNCT = re.compile(r"^[ \t]*(?:[,.;:]+(?=\s|$))?[ \t]*")
+_COMMA_BEFORE_END = re.compile(r",+(?=[.!?…])")
+_SPACES = re.compile(r"[ \t]{2,}")
+_SENTENCE_END = re.compile(r"[.!?…]\s*$")
+# Слово в начале предложения: начало текста или после . ! ? …
+_SENTENCE_WORD = re.compile(r"(?:^\s*|(?<=[.!?…])\s+)(\w+)")
+_WORD = re.compile(r"\w+")
+
+
+class TextProcessor:
+    """Постобработка текста по TextProcessingConfig"""
+
+    def __init__(self, text_config, vocabulary: dict[str, str] | None = None):
+        """
+        Инициализация (построение автомата словаря)
+
+        Args:
+            text_config: TextProcessingConfig
+            vocabulary: Словарь замен (по умолчанию - из конфига и vocabulary_file)
+        """
+        self.config = text_config
+        if vocabulary is None:
+            vocabulary = {}
+            if text_config.vocabulary_file:
+                try:
+                    vocabulary.update(load_vocabulary_file(text_config.vocabulary_file))
+                except OSError as e:
+                    logger.warning(f"Файл словаря не прочитан: {e}")
+            vocabulary.update(text_config.vocabulary)
+        fillers = text_config.fillers if text_config.remove_fillers else ()
+        self.matcher = VocabularyMatcher(vocabulary, fillers)
+        logger.info(f"Постобработка текста: {len(vocabulary)} замен, {len(fillers)} слов-паразитов")
+
+    @property
+    def max_words(self) -> int:
+        """Слов в самой длинной фразе словаря"""
+        return self.matcher.max_words
+
+    def process(self, text: str) -> str:
+        """Обработка законченного текста"""
+        return self._process(text, sentence_start=True).rstrip(" \t,")
+
+    def _process(self, text: str, sentence_start: bool) -> str:
+        """
+        Обработка фрагмента текста
+
+        Args:
+            text: Фрагмент (границы - начала слов)
+            sentence_start: Фрагмент начинает предложение
+        """
+        text = self.matcher.replace(text)
+        if self.config.normalize_numbers:
+            text = normalize_numbers(text, self.config.min_number)
+        text = _ORPHAN_PUNCT.sub("", text)
+        text = _SPACE_BEFORE_PUNCT.sub("", text)
+        text = _COMMA_BEFORE_END.sub("", text)
+        text = _SPACES.sub(" ", text)
+        if sentence_start:
+            # Запятая или точка, оставшаяся от удаленного первого слова
+            text = _LEADING_PUNCT.sub("", text, count=1)
+        if self.config.capitalize:
+            text = self._capitalize(text, sentence_start)
+        return text
+
+    @staticmethod
+    def _capitalize(text: str, sentence_start: bool) -> str:
+        """Заглавная буква в начале предложений (iPhone и т.п. не трогаются)"""
+        def upper(match: re.Match) -> str:
+            word = match.group(1)
+            if not word.islower() or (match.start() == 0 and not sentence_start):
+                return match.group()
+            prefix = match.group()[:match.start(1) - match.start()]
+            return prefix + word[0].upper() + word[1:]
+        return _SENTENCE_WORD.sub(upper, text)
+
+
+class StreamingTextProcessor:
+    """
+    Постобработка текста, поступающего частями (потоковая транскрипция)
+
+    Последние слова придерживаются, пока фраза словаря или число на конце
+    может продолжиться в следующей части; остальное обрабатывается и
+    отдается сразу. Результат совпадает с TextProcessor.process для всего текста.
+    """
+
+    def __init__(self, processor: TextProcessor):
+        """
+        Args:
+            processor: TextProcessor
+        """
+        self.processor = processor
+        self._buffer = ""
+        self._sentence_start = True
+
+    def feed(self, chunk: str) -> str:
+        """
+        Добавление части текста
+
+        Returns:
+            Обработанный текст, готовый к выводу (может быть пустым)
+        """
+        self._buffer += chunk
+        cut = self._safe_cut()
+        if cut <= 0:
+            return ""
+        piece, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return self._emit(piece)
+
+    def finish(self) -> str:
+        """Обработка остатка (конец текста)"""
+        piece, self._buffer = self._buffer, ""
+        text = self._emit(piece).rstrip(" \t,")
+        self._sentence_start = True
+        return text
+
+    def _emit(self, piece: str) -> str:
+        text = self.processor._process(piece, self._sentence_start)
+        if text.strip():
+            self._sentence_start = _SENTENCE_END.search(text) is not None
+        return text
+
+    def _safe_cut(self) -> int:
+        """Граница (начало слова), до которой текст уже не изменится"""
+        buffer = self._buffer
+        words = list(_WORD.finditer(buffer))
+        # Последнее слово может быть недописанным
+        hold = max(self.processor.max_words, 1) + (1 if buffer and buffer[-1].isalnum() else 0)
+        if len(words) <= hold:
+            return 0
+        matches = self.processor.matcher.find(buffer)
+        removed = [(m.start, m.end) for m in matches if not m.replacement]
+        numbers = self.processor.config.normalize_numbers
+        for index in range(len(words) - hold, 0, -1):
+            cut = words[index].start()
+            # Совпадение словаря не разрывается; удаляемое слово на границе
+            # склеивает пробелы и знаки с обеих сторон
+            if any(
+                m.start < cut < m.end or (m.start == cut and not m.replacement) for m in matches
+            ):
+                continue
+            # Число перед границей может продолжиться (в т.ч. через слово-паразит)
+            # или оказаться частью составного числительного ("двадцать | третьем")
+            if numbers and self._number_before(words, index, removed):
+                continue
+            return cut
+        return 0
+
+    @staticmethod
+    def _number_before(words, index: int, removed) -> bool:
+        """Последнее неудаляемое слово перед words[index] - часть числа"""
+        for word in reversed(words[:index]):
+            if any(start <= word.start() < end for start, end in removed):
+                continue
+            return is_number_word(word.group()) or word.group().lower() == "and"
+        return False
@@ -0,0 +1,157 @@
+"""
+Замены по словарю: автомат Ахо-Корасик по целым словам
+"""
+import re
+from collections import deque
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+# Пробелы и запятая после удаленного слова-паразита ("э, ", "ну ")
+_TRAILING = re.compile(r"\s*,?\s*")
+
+
+class Match(NamedTuple):
+    """Найденное вхождение словаря"""
+    start: int
+    end: int
+    replacement: str
+
+
+def _normalize(phrase: str) -> str:
+    return " ".join(phrase.lower().split())
+
+
+def _lower(text: str) -> str:
+    """Нижний регистр без изменения длины (смещения совпадают с исходным текстом)"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # Редкие символы, меняющие длину (İ), остаются как есть
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def load_vocabulary_file(path: str) -> dict[str, str]:
+    """
+    Словарь из файла: строка "фраза<TAB>замена", # - комментарий
+
+    Raises:
+        FileNotFoundError: Если файла нет
+    """
+    vocabulary = {}
+    with open(Path(path).expanduser(), encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            phrase, _, replacement = line.partition("\t")
+            vocabulary[phrase] = replacement
+    return vocabulary
+
+
+class VocabularyMatcher:
+    """
+    Поиск фраз словаря за один проход по тексту
+
+    Автомат строится один раз; поиск - O(длина текста + число вхождений)
+    независимо от размера словаря (10 тысяч фраз стоят столько же, сколько
+    десять). Совпадение засчитывается только по границам слов, без учета
+    регистра; из пересекающихся выбирается самое левое, затем самое длинное.
+    """
+
+    def __init__(self, vocabulary: dict[str, str], removals: Iterable[str] = ()):
+        """
+        Построение автомата
+
+        Args:
+            vocabulary: Фраза -> замена
+            removals: Фразы для удаления (слова-паразиты) вместе с запятой после них
+        """
+        entries: list[tuple[str, str | None]] = [(_normalize(p), r) for p, r in vocabulary.items()]
+        entries += [(_normalize(p), None) for p in removals]
+
+        self._goto: list[dict[str, int]] = [{}]
+        # Выходы состояния: (длина фразы, замена; None - удаление), включая суффиксы по fail
+        self._out: list[list[tuple[int, str | None]]] = [[]]
+        self.max_words = 0
+        for phrase, replacement in entries:
+            if not phrase:
+                continue
+            self.max_words = max(self.max_words, phrase.count(" ") + 1)
+            state = 0
+            for char in phrase:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            # Повтор фразы - последняя замена побеждает
+            self._out[state] = [(len(phrase), replacement)]
+
+        self._fail = [0] * len(self._goto)
+        order = deque(self._goto[0].values())
+        while order:
+            state = order.popleft()
+            for char, nxt in self._goto[state].items():
+                order.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self._goto) - 1
+
+    def find(self, text: str) -> list[Match]:
+        """Непересекающиеся вхождения (по границам слов), слева направо"""
+        if len(self._goto) == 1:
+            return []
+        goto, fail, out = self._goto, self._fail, self._out
+        lowered = _lower(text)
+        length = len(text)
+        candidates = []
+        state = 0
+        for index, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            end = index + 1
+            if end < length and text[end].isalnum():
+                continue
+            for size, replacement in out[state]:
+                start = end - size
+                if start == 0 or not text[start - 1].isalnum():
+                    candidates.append((start, -size, replacement))
+
+        matches = []
+        position = 0
+        for start, size, replacement in sorted(candidates, key=lambda c: c[:2]):
+            if start < position:
+                continue
+            end = start - size
+            if replacement is None:
+                # Удаление вместе с запятой и пробелами после фразы
+                end = _TRAILING.match(text, end).end()
+                replacement = ""
+            matches.append(Match(start, end, replacement))
+            position = end
+        return matches
+
+    def replace(self, text: str) -> str:
+        """Текст с заменами"""
+        matches = self.find(text)
+        if not matches:
+            return text
+        parts = []
+        position = 0
+        for match in matches:
+            parts.append(text[position:match.start])
+            parts.append(match.replacement)
+            position = match.end
+        parts.append(text[position:])
+        return "".join(parts)
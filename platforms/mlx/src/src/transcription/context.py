@@ -0,0 +1,133 @@
+"""
+Контекст между фразами: initial_prompt из недавних транскриптов и словаря приложения
+"""
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Ключ контекста, когда активное приложение неизвестно
+_DEFAULT_APP = ""
+
+
+@dataclass
+class ContextStats:
+    """Статистика повторов с более высокой температурой (с контекстом и без)"""
+    prompted: int = 0  # Фраз, декодированных с контекстом
+    prompted_fallbacks: int = 0
+    cold: int = 0  # Фраз без контекста (первая в приложении, после паузы)
+    cold_fallbacks: int = 0
+
+    def record(self, prompted: bool, fallbacks: int | None) -> None:
+        """Учет фразы (fallbacks=None - движок не сообщает повторы)"""
+        if fallbacks is None:
+            return
+        if prompted:
+            self.prompted += 1
+            self.prompted_fallbacks += fallbacks
+        else:
+            self.cold += 1
+            self.cold_fallbacks += fallbacks
+
+    @property
+    def fallbacks_avoided(self) -> float:
+        """
+        Оценка избежанных повторов
+
+        Разница частот без контекста и с ним, умноженная на фразы с контекстом.
+        """
+        if not self.prompted or not self.cold:
+            return 0.0
+        cold_rate = self.cold_fallbacks / self.cold
+        prompted_rate = self.prompted_fallbacks / self.prompted
+        return (cold_rate - prompted_rate) * self.prompted
+
+
+class PromptContext:
+    """
+    Скользящий контекст недавних транскриптов по приложениям
+
+    Для каждого приложения (bundle id из TextInjector.saved_app) хранится
+    несколько последних фраз. Вместе со словарем приложения они передаются
+    модели как initial_prompt: стиль пунктуации и имена собственные
+    сохраняются между диктовками в одном документе.
+    """
+
+    def __init__(self, context_config):
+        """
+        Инициализация контекста
+
+        Args:
+            context_config: PromptContextConfig
+        """
+        self.config = context_config
+        self._history: dict[str, deque[str]] = {}
+        self._last_update: dict[str, float] = {}
+        self.stats = ContextStats()
+
+    def _key(self, app_id: str | None) -> str:
+        return app_id or _DEFAULT_APP
+
+    def vocabulary(self, app_id: str | None) -> list[str]:
+        """Словарь приложения вместе с общим словарем"""
+        terms = list(self.config.vocabulary)
+        if app_id:
+            terms.extend(t for t in self.config.app_vocabulary.get(app_id, []) if t not in terms)
+        return terms
+
+    def prompt(self, app_id: str | None) -> str | None:
+        """
+        Prompt для следующей фразы в приложении
+
+        Args:
+            app_id: Bundle id целевого приложения (None - неизвестно)
+
+        Returns:
+            Текст prompt или None, если контекста нет
+        """
+        key = self._key(app_id)
+        last = self._last_update.get(key)
+        if last is not None and time.monotonic() - last > self.config.idle_reset_seconds:
+            # Долгая пауза - скорее всего, другой документ
+            logger.debug("Контекст %s сброшен после паузы", key or "по умолчанию")
+            self._drop(key)
+
+        terms = self.vocabulary(app_id)
+        vocabulary = ", ".join(terms) + "." if terms else ""
+        history = " ".join(self._history.get(key, ()))
+
+        # Словарь всегда в начале; из истории - самый свежий хвост в пределах max_chars
+        budget = self.config.max_chars - len(vocabulary) - (1 if vocabulary else 0)
+        if len(history) > budget:
+            history = history[len(history) - budget:] if budget > 0 else ""
+            space = history.find(" ")
+            history = history[space + 1:] if space >= 0 else ""
+
+        prompt = " ".join(part for part in (vocabulary, history) if part)
+        return prompt or None
+
+    def add(self, app_id: str | None, text: str) -> None:
+        """Добавление транскрипта в контекст приложения"""
+        text = text.strip()
+        if not text:
+            return
+        key = self._key(app_id)
+        history = self._history.get(key)
+        if history is None:
+            history = self._history[key] = deque(maxlen=self.config.max_utterances)
+        history.append(text)
+        self._last_update[key] = time.monotonic()
+
+    def clear(self, app_id: str | None = None) -> None:
+        """Сброс контекста приложения (None - всех приложений)"""
+        if app_id is None:
+            self._history.clear()
+            self._last_update.clear()
+            return
+        self._drop(self._key(app_id))
+
+    def _drop(self, key: str) -> None:
+        self._history.pop(key, None)
+        self._last_update.pop(key, None)
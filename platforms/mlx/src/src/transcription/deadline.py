@@ -0,0 +1,227 @@
+"""
+Дедлайны транскрипции по измеренному real-time factor и отмена фразы
+"""
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import TypeVar
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TranscriptionTimeoutError(RuntimeError):
+    """Транскрипция не уложилась в дедлайн"""
+
+
+class TranscriptionCancelledError(Exception):
+    """Транскрипция отменена (не ошибка движка: резервные движки не пробуются)"""
+
+
+class EngineBusyError(Exception):
+    """Движок дорабатывает брошенный вызов (не ошибка движка: не учитывается circuit breaker)"""
+
+
+class CancelToken:
+    """
+    Отмена транскрипции фразы
+
+    Движки проверяют флаг между сегментами и фрагментами или регистрируют
+    колбэк прерывания (завершение процесса whisper-cli, выход из ожидания
+    непрерываемого вызова). Отмена вызывается из любого потока.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Отмена (повторная - без действия)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Ошибка прерывания транскрипции: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Колбэк прерывания (уже отмененная фраза - вызывается сразу)
+
+        Returns:
+            Функция снятия колбэка (после завершения вызова)
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def check(self) -> None:
+        """
+        Raises:
+            TranscriptionCancelledError: Фраза отменена
+        """
+        if self._event.is_set():
+            raise TranscriptionCancelledError("транскрипция отменена")
+
+
+class RTFTracker:
+    """
+    Скользящий real-time factor по движку и модели
+
+    Дедлайн вызова - длительность аудио, умноженная на высокий перцентиль
+    недавнего RTF движка с запасом: трехсекундная фраза ждет секунды, а не
+    часы, и при этом медленная, но рабочая модель не обрывается.
+    """
+
+    def __init__(self, timeout_config):
+        """
+        Инициализация трекера
+
+        Args:
+            timeout_config: TimeoutConfig
+        """
+        self.config = timeout_config
+        self._samples: dict[str, deque[float]] = {}
+        self._warm: set = set()
+
+    def record(self, key: str, elapsed: float, audio_duration: float) -> None:
+        """
+        Учет успешного вызова
+
+        Первый вызов движка включает загрузку модели - в RTF не учитывается.
+        """
+        if audio_duration <= 0:
+            return
+        if key not in self._warm:
+            self._warm.add(key)
+            return
+        samples = self._samples.setdefault(key, deque(maxlen=self.config.window))
+        samples.append(elapsed / audio_duration)
+
+    def estimate(self, key: str) -> float | None:
+        """Оценка RTF (перцентиль окна) или None - замеров еще нет"""
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        return float(np.percentile(samples, self.config.percentile))
+
+    def timeout(self, key: str, audio_duration: float) -> float:
+        """
+        Дедлайн вызова (сек)
+
+        Args:
+            key: Движок и модель
+            audio_duration: Длительность аудио (сек)
+        """
+        if key not in self._warm:
+            # Холодный движок: загрузка (или скачивание) модели
+            return self.config.cold_timeout
+        rtf = self.estimate(key)
+        if rtf is None:
+            rtf = self.config.initial_rtf
+        timeout = audio_duration * rtf * self.config.safety_factor
+        return min(max(timeout, self.config.min_timeout), self.config.max_timeout)
+
+
+class DeadlineRunner:
+    """
+    Выполнение непрерываемого вызова с дедлайном и отменой
+
+    Декодирование MLX и контекста whisper.cpp в процессе нельзя прервать
+    изнутри. Вызов выполняется в фоновом потоке; по дедлайну фраза уходит
+    на резервный движок, а брошенный вызов дорабатывает сам. По отмене
+    текущий вызов доводится до конца в пределах дедлайна (MLX проверяет
+    отмену перед каждым окном Whisper) - поток не бросается. Пока брошенный
+    вызов не завершился, новые вызовы сразу получают EngineBusyError (фраза
+    идет на резервный движок) - модель не используется из двух потоков
+    одновременно.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._pending: threading.Thread | None = None
+
+    @property
+    def busy(self) -> bool:
+        """Выполняется вызов, превысивший дедлайн"""
+        return self._pending is not None and self._pending.is_alive()
+
+    def run(
+        self, fn: Callable[[], T], timeout: float | None, cancel: CancelToken | None = None
+    ) -> T:
+        """
+        Вызов fn с дедлайном
+
+        Args:
+            fn: Вызов декодирования
+            timeout: Дедлайн (сек); None - без ограничения
+            cancel: Отмена фразы (без дедлайна и отмены - вызов в текущем потоке)
+
+        Raises:
+            TranscriptionTimeoutError: Дедлайн превышен
+            TranscriptionCancelledError: Фраза отменена
+            EngineBusyError: Движок дорабатывает брошенный вызов
+        """
+        if self.busy:
+            raise EngineBusyError(f"{self.name} занят брошенной фразой")
+        if cancel is not None:
+            cancel.check()
+        if timeout is None and cancel is None:
+            return fn()
+
+        done = threading.Event()
+        outcome = {}
+
+        def target():
+            try:
+                outcome['result'] = fn()
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        thread = threading.Thread(target=target, name=f"{self.name}-decode", daemon=True)
+        thread.start()
+        # Отмена прерывает ожидание
+        remove = cancel.on_cancel(done.set) if cancel is not None else lambda: None
+        try:
+            finished = done.wait(timeout)
+        finally:
+            remove()
+        if not outcome and finished:
+            # Отмена: текущий вызов завершается в пределах дедлайна, движок не остается занятым
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0.0))
+            if thread.is_alive():
+                self._pending = thread
+                logger.warning(f"{self.name}: фраза отменена, декодирование брошено по дедлайну")
+            raise TranscriptionCancelledError(f"{self.name}: транскрипция отменена")
+        if not outcome:
+            self._pending = thread
+            logger.error(f"❌ {self.name}: превышен дедлайн {timeout:.1f}с")
+            raise TranscriptionTimeoutError(f"{self.name}: превышен дедлайн {timeout:.1f}с")
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
@@ -2,26 +2,70 @@
 Абстракция движка транскрипции
 """
 import logging
-import numpy as np
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
 from typing import Protocol
 
-from .whisper_cpp import WhisperCppTranscriber
-from .mlx_engine import MLXWhisperTranscriber
+import numpy as np
+
+from .context import PromptContext
+from .deadline import (
+    CancelToken,
+    EngineBusyError,
+    RTFTracker,
+    TranscriptionCancelledError,
+    TranscriptionTimeoutError,
+)
+from .fallback import CircuitBreaker, EngineSlot, FallbackStats
+from .language import AUTO_LANGUAGE, LanguageCache
+from .memory_guard import MemoryGuard, chunk_bounds, estimate_model_mb
+from .policy import DecodeOptions, DecodePolicy
+from .registry import REGISTRY, EngineCapabilities, capabilities_of
+from .result import TranscriptionResult, merge_results
 
 logger = logging.getLogger(__name__)
 
 
 class TranscriptionEngine(Protocol):
     """Протокол для движка транскрипции"""
-    
-    def transcribe(self, audio_data: np.ndarray) -> str:
+
+    def transcribe(self, audio_data: np.ndarray, options: DecodeOptions | None = None) -> str:
         """Транскрибация аудио"""
         ...
 
+    def transcribe_detailed(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions | None = None
+    ) -> TranscriptionResult:
+        """Транскрибация аудио с метаданными уверенности"""
+        ...
+
+    # Возможности (CAPABILITIES) определяют необязательные методы:
+    # streaming - transcribe_detailed(audio_data, options, on_partial=callback),
+    # batching - transcribe_batch(chunks, options) -> список результатов
+
+
+@dataclass
+class TierStats:
+    """Статистика двухуровневого декодирования"""
+    utterances: int = 0
+    fast_tier: int = 0  # Обслужено быстрым уровнем без большой модели
+    corrected: int = 0  # Большая модель изменила черновик
+
+    @property
+    def fast_tier_ratio(self) -> float:
+        """Доля фраз, обслуженных быстрым уровнем"""
+        return self.fast_tier / self.utterances if self.utterances else 0.0
+
 
 class TranscriptionEngineWrapper:
     """Обертка для движка транскрипции"""
     
+    # Конец предыдущего фрагмента - initial_prompt следующего (символов)
+    _CHUNK_PROMPT_CHARS = 200
+
     def __init__(self, config):
         """
         Инициализация движка транскрипции
@@ -30,25 +74,168 @@ class TranscriptionEngineWrapper:
             config: Конфигурация приложения
         """
         self.config = config
+        self.sample_rate = config.audio.sample_rate
+        # Движки создаются по имени через реестр (встроенные и entry points vtt2.engines)
+        self.registry = REGISTRY
         
         # Выбор движка
-        engine_type = config.transcription.engine
+        self.engine_type = config.transcription.engine
+
+        # Цепочка движков: основной, затем резервные по порядку
+        fallback = config.transcription.fallback
+        chain = [(self.engine_type, None)] + [(e.engine, e.model) for e in fallback.engines]
+        self.slots = [
+            EngineSlot(
+                engine_type, model,
+                breaker=CircuitBreaker(fallback.failure_threshold, fallback.reset_timeout)
+            )
+            for engine_type, model in chain
+        ]
+        self.fallback_stats = FallbackStats()
+        self.load_times: dict[str, float] = {}  # Время создания движков (сек) по имени
+        self.engine = self._create_primary_engine()
+
+        # Дедлайны вызовов по скользящему RTF движков
+        self.rtf: RTFTracker | None = None
+        if config.transcription.timeout.enabled:
+            self.rtf = RTFTracker(config.transcription.timeout)
+
+        # Параметры декодирования по фразе (длительность, доля речи, бюджет задержки)
+        self.policy = DecodePolicy(config.transcription.decode_policy, self.sample_rate)
+
+        # Двухуровневое декодирование: быстрый черновик + проверка большой моделью
+        self.two_tier = config.transcription.two_tier
+        self.draft_engine: TranscriptionEngine | None = None
+        self.tier_stats = TierStats()
+        if self.two_tier.enabled and self.capabilities.streaming:
+            # Промежуточный текст дает сам движок - отдельная модель черновика не нужна
+            logger.info(
+                f"Двухуровневое декодирование: черновик - промежуточный текст {self.engine_type}"
+            )
+        elif self.two_tier.enabled:
+            self.draft_engine = self._create_engine(
+                self.two_tier.draft_engine, model=self.two_tier.draft_model
+            )
+            logger.info(
+                f"Двухуровневое декодирование: черновик {self.two_tier.draft_engine} "
+                f"({self.two_tier.draft_model})"
+            )
+
+        # Контекст между фразами (initial_prompt по целевому приложению)
+        self.context: PromptContext | None = None
+        if config.transcription.context.enabled:
+            self.context = PromptContext(config.transcription.context)
+
+        # Кэш языка: при auto язык приложения определяется один раз, а не на каждую фразу
+        self.languages: LanguageCache | None = None
+        engine_config = self.registry.options(self.engine_type, config.transcription)
+        if engine_config.language == AUTO_LANGUAGE and config.transcription.language_cache.enabled:
+            self.languages = LanguageCache(config.transcription.language_cache)
+
+        # Защита памяти: длинные записи фрагментами или меньшей моделью
+        guard_config = config.performance.memory_guard
+        self.memory_guard: MemoryGuard | None = None
+        self.low_memory_slot: EngineSlot | None = None
+        if guard_config.enabled:
+            self.memory_guard = MemoryGuard(
+                guard_config, config.performance.memory_limit_mb, self.sample_rate
+            )
+            if guard_config.low_memory_engine:
+                self.low_memory_slot = EngineSlot(
+                    guard_config.low_memory_engine, guard_config.low_memory_model,
+                    breaker=CircuitBreaker(fallback.failure_threshold, fallback.reset_timeout)
+                )
+
+    def _create_primary_engine(self) -> TranscriptionEngine | None:
+        """
+        Создание основного движка
+
+        Без резервных движков ошибка создания - фатальная. С резервными
+        приложение стартует, а фразы транскрибируются резервным движком.
+
+        Returns:
+            Экземпляр движка или None (основной движок недоступен)
+        """
+        primary = self.slots[0]
+        try:
+            primary.engine = self._create_engine(primary.engine_type)
+        except (RuntimeError, FileNotFoundError) as e:
+            if len(self.slots) == 1:
+                raise
+            logger.error(
+                f"❌ Основной движок {primary.name} недоступен: {e}, используются резервные"
+            )
+            primary.breaker.force_open()
+        return primary.engine
+
+    def _create_engine(self, engine_type: str, model: str | None = None) -> TranscriptionEngine:
+        """
+        Создание движка по имени
+
+        Args:
+            engine_type: Имя движка в реестре (whisper_cpp, mlx_whisper, faster_whisper, плагины)
+            model: Модель вместо указанной в конфигурации движка
         
-        if engine_type == "whisper_cpp":
-            self.engine = WhisperCppTranscriber(config)
-            logger.info("Используется движок: whisper.cpp")
-        elif engine_type == "mlx_whisper":
-            self.engine = MLXWhisperTranscriber(config)
-            logger.info("Используется движок: MLX Whisper (Apple Silicon)")
-        else:
-            raise ValueError(f"Неизвестный движок: {engine_type}")
+        Returns:
+            Экземпляр движка
+
+        Raises:
+            ValueError: Неизвестный движок
+        """
+        start_time = time.perf_counter()
+        engine = self.registry.create(engine_type, self.config, model=model)
+        logger.info(
+            f"Используется движок: {self.registry.spec(engine_type).description or engine_type} "
+            f"({capabilities_of(engine)})"
+        )
+        self.load_times[f"{engine_type}:{model}" if model else engine_type] = (
+            time.perf_counter() - start_time
+        )
+        return engine
+
+    @property
+    def capabilities(self) -> EngineCapabilities:
+        """Возможности основного движка"""
+        return capabilities_of(self.engine)
+
+    @staticmethod
+    def cancel_token() -> CancelToken:
+        """Токен отмены фразы (для transcribe_detailed)"""
+        return CancelToken()
+
+    def _timeout(self, key: str, audio_data: np.ndarray) -> float | None:
+        """Дедлайн вызова движка key для фразы (None - дедлайны выключены)"""
+        if self.rtf is None:
+            return None
+        return self.rtf.timeout(key, len(audio_data) / self.sample_rate)
+
+    def _record_rtf(self, key: str, elapsed: float, audio_data: np.ndarray) -> None:
+        """Учет времени успешного вызова в RTF движка"""
+        if self.rtf is not None:
+            self.rtf.record(key, elapsed, len(audio_data) / self.sample_rate)
     
-    def transcribe(self, audio_data: np.ndarray) -> str:
+    def _decode_options(self, audio_data: np.ndarray) -> DecodeOptions:
+        """Параметры декодирования основного движка для фразы"""
+        engine_config = self.registry.options(self.engine_type, self.config.transcription)
+        if not self.policy.config.enabled:
+            return DecodePolicy.from_engine_config(engine_config)
+        return self.policy.choose(
+            audio_data, beam_size=engine_config.beam_size, best_of=engine_config.best_of
+        )
+
+    def transcribe(
+        self,
+        audio_data: np.ndarray,
+        on_draft: Callable[[str], None] | None = None,
+        app_id: str | None = None
+    ) -> str:
         """
         Транскрибация аудио данных
         
         Args:
             audio_data: numpy array с аудио данными
+            on_draft: Колбэк для черновика быстрого уровня (если он проверяется большой моделью)
+            app_id: Bundle id целевого приложения (для контекста между фразами)
         
         Returns:
             Транскрибированный текст
@@ -56,5 +243,297 @@ class TranscriptionEngineWrapper:
         Raises:
             RuntimeError: При ошибке транскрипции
         """
-        return self.engine.transcribe(audio_data)
+        return self.transcribe_detailed(audio_data, on_draft=on_draft, app_id=app_id).text
+
+    def transcribe_detailed(
+        self,
+        audio_data: np.ndarray,
+        on_draft: Callable[[str], None] | None = None,
+        app_id: str | None = None,
+        cancel: CancelToken | None = None
+    ) -> TranscriptionResult:
+        """
+        Транскрибация аудио данных с метаданными и контекстом приложения
+
+        Args:
+            audio_data: numpy array с аудио данными
+            on_draft: Колбэк для черновика быстрого уровня
+            app_id: Bundle id целевого приложения (для контекста между фразами)
+            cancel: Отмена фразы (прерывает декодирование, резервные движки не пробуются)
+
+        Returns:
+            Результат транскрипции
+
+        Raises:
+            RuntimeError: При ошибке транскрипции
+            TranscriptionCancelledError: Фраза отменена
+        """
+        prompt = self.context.prompt(app_id) if self.context else None
+        language = self.languages.lookup(app_id) if self.languages else None
+        result = self._transcribe_tiers(
+            audio_data, on_draft, initial_prompt=prompt, language=language, cancel=cancel
+        )
+
+        if self.languages:
+            self.languages.update(app_id, result, detected=language is None)
+            if language is not None and not self.languages.is_confident(result):
+                # Язык из кэша под сомнением - повторное декодирование с определением языка
+                logger.info(f"Низкая уверенность с языком {language}, повторное определение языка")
+                self.languages.stats.redetections += 1
+                redetected = self._transcribe_tiers(
+                    audio_data, None, initial_prompt=prompt, cancel=cancel
+                )
+                self.languages.update(app_id, redetected, detected=True)
+                if self.languages.is_confident(redetected) or redetected.language != language:
+                    result = redetected
+
+        if self.context:
+            self.context.stats.record(prompt is not None, result.fallbacks)
+            self.context.add(app_id, result.text)
+        return result
+
+    def _transcribe_tiers(
+        self,
+        audio_data: np.ndarray,
+        on_draft: Callable[[str], None] | None,
+        **overrides
+    ) -> TranscriptionResult:
+        """
+        Транскрибация основным движком или двумя уровнями
+
+        В двухуровневом режиме быстрая модель сразу дает черновик. Короткие
+        уверенные фразы на этом заканчиваются; остальные черновики
+        передаются в on_draft и проверяются (исправляются) большой моделью.
+
+        Args:
+            audio_data: numpy array с аудио данными
+            on_draft: Колбэк для черновика быстрого уровня
+            **overrides: Поля DecodeOptions по фразе (initial_prompt, language)
+
+        Returns:
+            Результат транскрипции
+        """
+        options = self._decode_options(audio_data).with_updates(**overrides)
+        if self.draft_engine is None:
+            # Потоковый движок показывает промежуточный текст вместо черновика
+            return self._transcribe_guarded(
+                audio_data, options, on_partial=on_draft if self.two_tier.enabled else None
+            )
+
+        self.tier_stats.utterances += 1
+        # Черновик всегда жадный и без повторов - его задача быть быстрым
+        draft_key = f"{self.two_tier.draft_engine}:{self.two_tier.draft_model}"
+        draft_options = DecodeOptions(
+            reason="черновик", timeout=self._timeout(draft_key, audio_data), **overrides
+        )
+        try:
+            start = time.monotonic()
+            draft = self.draft_engine.transcribe_detailed(audio_data, draft_options)
+            self._record_rtf(draft_key, time.monotonic() - start, audio_data)
+        except TranscriptionCancelledError:
+            raise
+        except Exception as e:
+            # Без черновика фраза не теряется - ее транскрибирует большая модель
+            logger.warning(f"Ошибка быстрого уровня: {e}, транскрипция без черновика")
+            return self._transcribe_guarded(audio_data, options)
+
+        if self._is_confident_draft(draft, len(audio_data) / self.sample_rate):
+            self.tier_stats.fast_tier += 1
+            logger.info(
+                f"Черновик принят без проверки (logprob={draft.avg_logprob:.2f}, "
+                f"быстрый уровень: {self.tier_stats.fast_tier_ratio:.0%})"
+            )
+            return draft
+
+        if on_draft and draft.text:
+            try:
+                on_draft(draft.text)
+            except Exception as e:
+                logger.warning(f"Ошибка обработки черновика: {e}")
+
+        final = self._transcribe_guarded(audio_data, options)
+        if final.text != draft.text:
+            self.tier_stats.corrected += 1
+        logger.info(
+            "Черновик проверен большой моделью "
+            f"({'исправлен' if final.text != draft.text else 'подтвержден'}, "
+            f"быстрый уровень: {self.tier_stats.fast_tier_ratio:.0%})"
+        )
+        return final
+
+    def _slot_model_mb(self, slot: EngineSlot) -> float:
+        """Оценка памяти модели движка (MB)"""
+        engine_config = self.registry.options(slot.engine_type, self.config.transcription)
+        model = (
+            slot.model
+            or getattr(engine_config, "model_path", None)
+            or getattr(engine_config, "model_name", None)
+        )
+        return estimate_model_mb(model or "", getattr(engine_config, "compute_type", None))
+
+    def _slot_loaded(self, slot: EngineSlot) -> bool:
+        """Модель движка уже в памяти процесса"""
+        if slot.engine is None or not capabilities_of(slot.engine).in_process:
+            # Внешний процесс (whisper-cli) загружает модель заново на каждую фразу
+            return False
+        return slot.served > 0
+
+    def _transcribe_guarded(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions,
+        on_partial: Callable[[str], None] | None = None
+    ) -> TranscriptionResult:
+        """
+        Транскрибация цепочкой движков в пределах лимита памяти
+
+        Оценка памяти - по первому доступному движку цепочки. Если запись
+        целиком не укладывается в performance.memory_limit_mb, она
+        декодируется фрагментами и/или меньшей моделью.
+        """
+        duration = len(audio_data) / self.sample_rate
+        slots = self.slots
+        chunk_seconds = None
+        if self.memory_guard is not None:
+            slot = next((s for s in self.slots if s.breaker.allow()), self.slots[0])
+            low_memory_mb = (
+                self._slot_model_mb(self.low_memory_slot) if self.low_memory_slot else None
+            )
+            plan = self.memory_guard.plan(
+                duration, self._slot_model_mb(slot), self._slot_loaded(slot), low_memory_mb
+            )
+            # Меньшая модель первой; при ее ошибке фраза не теряется - остальная цепочка
+            slots = [self.low_memory_slot] + self.slots if plan.low_memory else self.slots
+            chunk_seconds = plan.chunk_seconds
+
+        if chunk_seconds is None:
+            return self._transcribe_with_fallback(audio_data, options, slots, on_partial)
+        return self._transcribe_chunked(audio_data, options, chunk_seconds, slots)
+
+    def _transcribe_chunked(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions,
+        chunk_seconds: float,
+        slots: list[EngineSlot]
+    ) -> TranscriptionResult:
+        """Транскрибация фрагментами (срезы без копирования аудио)"""
+        bounds = chunk_bounds(audio_data, int(chunk_seconds * self.sample_rate), self.sample_rate)
+        logger.info(f"Запись декодируется фрагментами: {len(bounds)} по {chunk_seconds:.0f} с")
+        offsets = [start / self.sample_rate for start, _ in bounds]
+
+        # Движок с пакетным декодированием - все фрагменты одним вызовом
+        slot = next((s for s in slots if s.breaker.allow()), None)
+        if slot is not None and slot.engine is not None and capabilities_of(slot.engine).batching:
+            slot.calls += 1
+            try:
+                results = slot.engine.transcribe_batch(
+                    [audio_data[start:end] for start, end in bounds], options
+                )
+            except (RuntimeError, MemoryError) as e:
+                logger.warning(
+                    f"Пакетное декодирование {slot.name} не удалось: {e}, фрагменты по одному"
+                )
+            else:
+                slot.breaker.record_success()
+                slot.served += 1
+                return merge_results(results, offsets)
+
+        results = []
+        for start, end in bounds:
+            if results and results[-1].text:
+                # Контекст фрагмента - конец предыдущего (стиль, имена, незаконченная фраза)
+                options = options.with_updates(
+                    initial_prompt=results[-1].text[-self._CHUNK_PROMPT_CHARS:]
+                )
+            results.append(self._transcribe_with_fallback(audio_data[start:end], options, slots))
+        return merge_results(results, offsets)
+
+    def _transcribe_with_fallback(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions,
+        slots: list[EngineSlot] | None = None,
+        on_partial: Callable[[str], None] | None = None
+    ) -> TranscriptionResult:
+        """
+        Транскрибация первым исправным движком цепочки
+
+        При ошибке или превышении дедлайна фраза повторяется на следующем
+        движке. Движок после серии ошибок отключается circuit breaker и
+        пропускается до пробного вызова - фразы не ждут заведомо неудачной
+        попытки.
+
+        Движок, занятый брошенным по дедлайну вызовом, пропускается без
+        учета ошибки: он исправен и освободится сам.
+
+        Args:
+            audio_data: numpy array с аудио данными
+            options: Параметры декодирования
+            slots: Цепочка движков (по умолчанию - основной и резервные)
+            on_partial: Колбэк промежуточного текста (только потоковым движкам)
+
+        Raises:
+            RuntimeError: Если отказали все движки
+        """
+        errors = []
+        for index, slot in enumerate(slots or self.slots):
+            if options.cancel is not None:
+                # Отмененная фраза не уходит на следующий движок (и следующий фрагмент)
+                options.cancel.check()
+            if not slot.breaker.allow():
+                continue
+            slot.calls += 1
+            try:
+                if slot.engine is None:
+                    # Резервные движки создаются при первой необходимости (не
+                    # держим модели в памяти)
+                    slot.engine = self._create_engine(slot.engine_type, model=slot.model)
+                start = time.monotonic()
+                extra = {}
+                if on_partial and capabilities_of(slot.engine).streaming:
+                    extra["on_partial"] = on_partial
+                timeout = self._timeout(slot.name, audio_data)
+                result = slot.engine.transcribe_detailed(
+                    audio_data, options.with_updates(timeout=timeout), **extra
+                )
+                self._record_rtf(slot.name, time.monotonic() - start, audio_data)
+            except EngineBusyError as e:
+                errors.append(f"{slot.name}: {e}")
+                logger.warning(f"Движок {slot.name} пропущен: {e}")
+                continue
+            except (RuntimeError, FileNotFoundError, MemoryError) as e:
+                if isinstance(e, TranscriptionTimeoutError):
+                    slot.timeouts += 1
+                slot.failures += 1
+                slot.breaker.record_failure()
+                errors.append(f"{slot.name}: {e}")
+                logger.error(
+                    f"Движок {slot.name} не справился: {e} "
+                    f"(ошибок: {slot.failures}, состояние: {slot.breaker.state})"
+                )
+                continue
+
+            slot.breaker.record_success()
+            slot.served += 1
+            if index > 0:
+                self.fallback_stats.recovered += 1
+                logger.warning(f"Фраза транскрибирована резервным движком {slot.name}")
+            return result
+
+        self.fallback_stats.failed += 1
+        if not errors:
+            raise RuntimeError("Все движки транскрипции временно отключены")
+        raise RuntimeError("Ошибка всех движков транскрипции: " + "; ".join(errors))
 
+    def _is_confident_draft(self, draft: TranscriptionResult, duration: float) -> bool:
+        """Короткая уверенная фраза - большая модель не нужна"""
+        if duration > self.two_tier.max_duration:
+            return False
+        if draft.avg_logprob is None or draft.no_speech_prob is None:
+            # Движок не сообщает уверенность - всегда проверяем
+            return False
+        return (
+            draft.avg_logprob >= self.two_tier.min_avg_logprob
+            and draft.no_speech_prob <= self.two_tier.max_no_speech_prob
+        )
@@ -0,0 +1,95 @@
+"""
+Резервные движки транскрипции и circuit breaker
+"""
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"  # Движок работает
+OPEN = "open"  # Движок отключен после серии ошибок
+HALF_OPEN = "half_open"  # Пробный вызов после паузы
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker движка
+
+    После failure_threshold ошибок подряд движок отключается на
+    reset_timeout секунд: фразы сразу идут на следующий движок, не
+    тратя время на заведомо неудачную попытку. Затем один пробный
+    вызов: успех - движок снова в работе, ошибка - еще пауза.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 60.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self.opens = 0  # Сколько раз движок отключался
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние (open переходит в half_open по истечении паузы)"""
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Можно ли вызывать движок"""
+        return self.state != OPEN
+
+    def record_success(self) -> None:
+        """Успешный вызов"""
+        self._failures = 0
+        self._state = CLOSED
+
+    def record_failure(self) -> None:
+        """Неудачный вызов"""
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = OPEN
+            self._opened_at = self._clock()
+            self._failures = 0
+            self.opens += 1
+
+    def force_open(self) -> None:
+        """Отключение движка сразу (например, не удалось создать)"""
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._failures = 0
+        self.opens += 1
+
+
+@dataclass
+class EngineSlot:
+    """Движок в цепочке резервирования со статистикой"""
+    engine_type: str
+    model: str | None = None  # None - модель из конфигурации движка
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    engine: object | None = None  # Создается при первом использовании
+    calls: int = 0
+    failures: int = 0
+    timeouts: int = 0  # Из них - превышен дедлайн
+    served: int = 0  # Фраз, успешно обработанных этим движком
+
+    @property
+    def name(self) -> str:
+        """Имя для логов и статистики"""
+        return f"{self.engine_type}:{self.model}" if self.model else self.engine_type
+
+
+@dataclass
+class FallbackStats:
+    """Статистика резервирования"""
+    recovered: int = 0  # Фраз, спасенных резервным движком
+    failed: int = 0  # Фраз, на которых отказали все движки
@@ -0,0 +1,229 @@
+"""
+Интеграция с faster-whisper (CTranslate2) для транскрипции на CPU
+
+Модель загружается один раз при инициализации и остается в памяти процесса:
+- int8 квантизация весов - быстрый инференс на CPU без GPU
+- количество потоков задается в конфигурации (cpu_threads)
+- без запуска внешнего процесса на каждую фразу (в отличие от whisper.cpp)
+"""
+import logging
+import time
+
+import numpy as np
+
+from .deadline import CancelToken, TranscriptionCancelledError, TranscriptionTimeoutError
+from .language import AUTO_LANGUAGE
+from .policy import DecodeOptions, DecodePolicy
+from .registry import EngineCapabilities
+from .result import SegmentTable, TranscriptionResult, WordTable
+
+logger = logging.getLogger(__name__)
+
+# Импорт faster_whisper (может быть не установлен в тестовой среде)
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+    WhisperModel = None
+
+
+class FasterWhisperTranscriber:
+    """Транскрипция через faster-whisper (CTranslate2, CPU)"""
+
+    SUPPORTS_BEAM_SEARCH = True
+    CAPABILITIES = EngineCapabilities(timestamps=True, in_process=True, cancellable=True)
+
+    def __init__(self, config, model_name: str | None = None):
+        """
+        Инициализация faster-whisper транскрибатора
+
+        Args:
+            config: Конфигурация приложения
+            model_name: Модель вместо faster_whisper.model_name (например, для быстрого уровня)
+
+        Raises:
+            RuntimeError: Если faster-whisper не установлен или модель не загружается
+        """
+        self.config = config
+        self.fw_config = config.transcription.faster_whisper
+        self.model_name = model_name or self.fw_config.model_name
+
+        # Guard-проверки
+        self._check_dependencies()
+
+        self.model = self._load_model()
+
+        logger.info("FasterWhisperTranscriber инициализирован")
+        logger.info(
+            f"Модель faster-whisper: {self.model_name} "
+            f"({self.fw_config.device}, {self.fw_config.compute_type}, потоков: "
+            f"{self.fw_config.cpu_threads})"
+        )
+
+    def _check_dependencies(self):
+        """Проверка наличия faster-whisper"""
+        if not FASTER_WHISPER_AVAILABLE:
+            logger.error("❌ faster-whisper не установлен")
+            logger.error("Установите: pip install faster-whisper")
+            raise RuntimeError("faster-whisper не установлен")
+
+    def _load_model(self):
+        """Загрузка модели CTranslate2 (скачивается из Hugging Face при первом использовании)"""
+        start_time = time.time()
+        try:
+            model = WhisperModel(
+                self.model_name,
+                device=self.fw_config.device,
+                compute_type=self.fw_config.compute_type,
+                cpu_threads=self.fw_config.cpu_threads,
+                num_workers=self.fw_config.num_workers,
+                download_root=self.fw_config.download_root,
+            )
+        except Exception as e:
+            logger.error(f"❌ Не удалось загрузить модель faster-whisper: {e}")
+            raise RuntimeError(f"Не удалось загрузить модель faster-whisper: {e}") from e
+        logger.info(f"Модель faster-whisper загружена за {time.time() - start_time:.2f}с")
+        return model
+
+    def transcribe(self, audio_data: np.ndarray, options: DecodeOptions | None = None) -> str:
+        """
+        Транскрибация аудио данных
+
+        Args:
+            audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
+
+        Returns:
+            Транскрибированный текст
+
+        Raises:
+            RuntimeError: При ошибке транскрипции
+        """
+        return self.transcribe_detailed(audio_data, options).text
+
+    def transcribe_detailed(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions | None = None
+    ) -> TranscriptionResult:
+        """
+        Транскрибация аудио данных с метаданными уверенности
+
+        Args:
+            audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
+
+        Returns:
+            Результат транскрипции
+
+        Raises:
+            RuntimeError: При ошибке транскрипции
+        """
+        start_time = time.time()
+
+        logger.info(f"Начало транскрипции faster-whisper: {len(audio_data)} сэмплов")
+
+        if options is None:
+            options = DecodePolicy.from_engine_config(self.fw_config)
+        language = options.language or self.fw_config.language
+
+        try:
+            segments, info = self.model.transcribe(
+                np.asarray(audio_data, dtype=np.float32),
+                language=None if language == AUTO_LANGUAGE else language,
+                beam_size=options.beam_size,
+                best_of=options.best_of,
+                # Список температур: следующие используются только при неудаче декодирования
+                temperature=list(options.temperature),
+                compression_ratio_threshold=self.fw_config.compression_ratio_threshold,
+                no_speech_threshold=self.fw_config.no_speech_threshold,
+                initial_prompt=options.initial_prompt,
+                vad_filter=self.fw_config.vad_filter,
+                word_timestamps=self.config.transcription.timestamps == "word",
+            )
+            # Сегменты - ленивый генератор: декодирование происходит при итерации,
+            # поэтому дедлайн и отмена проверяются между сегментами и декодирование
+            # останавливается чисто - следующее окно просто не запрашивается
+            segments = self._collect_segments(segments, start_time, options.timeout, options.cancel)
+        except (TranscriptionTimeoutError, TranscriptionCancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка транскрипции faster-whisper: {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            raise RuntimeError(f"Ошибка транскрипции faster-whisper: {e}") from e
+
+        text = "".join(seg.text for seg in segments).strip()
+        segment_table, word_table = self._build_timings(segments)
+        elapsed = time.time() - start_time
+        logger.info(
+            f"Транскрипция faster-whisper завершена за {elapsed:.2f}с: {len(text)} символов"
+        )
+
+        return TranscriptionResult(
+            text=text,
+            avg_logprob=float(np.mean([seg.avg_logprob for seg in segments])) if segments else None,
+            no_speech_prob=float(max(seg.no_speech_prob for seg in segments)) if segments else None,
+            language=info.language,
+            # Вероятность есть только при определении языка моделью
+            language_prob=info.language_probability if language == AUTO_LANGUAGE else None,
+            engine="faster_whisper",
+            model=self.model_name,
+            audio_duration=len(audio_data) / 16000,
+            elapsed=elapsed,
+            fallbacks=sum(1 for seg in segments if seg.temperature > 0),
+            segments=segment_table,
+            words=word_table,
+        )
+
+    def _collect_segments(
+        self,
+        segments,
+        start_time: float,
+        timeout: float | None,
+        cancel: CancelToken | None = None
+    ) -> list:
+        """
+        Декодирование сегментов с дедлайном
+
+        Raises:
+            TranscriptionTimeoutError: Если дедлайн превышен
+            TranscriptionCancelledError: Если фраза отменена
+        """
+        collected = []
+        for segment in segments:
+            collected.append(segment)
+            if cancel is not None and cancel.cancelled:
+                segments.close()
+                logger.warning("faster-whisper: фраза отменена, декодирование остановлено")
+                cancel.check()
+            if timeout is not None and time.time() - start_time > timeout:
+                segments.close()
+                logger.error(
+                    f"❌ faster-whisper: превышен дедлайн {timeout:.1f}с, декодирование остановлено"
+                )
+                raise TranscriptionTimeoutError(f"faster-whisper: превышен дедлайн {timeout:.1f}с")
+        return collected
+
+    def _build_timings(self, segments: list) -> tuple:
+        """
+        Компактные таблицы сегментов и слов из сегментов faster-whisper
+
+        Returns:
+            (SegmentTable или None, WordTable или None)
+        """
+        mode = self.config.transcription.timestamps
+        if mode == "none" or not segments:
+            return None, None
+
+        segment_builder = SegmentTable.builder()
+        word_builder = WordTable.builder() if mode == "word" else None
+        for index, seg in enumerate(segments):
+            segment_builder.append(
+                seg.start, seg.end, seg.text, seg.avg_logprob, seg.no_speech_prob
+            )
+            if word_builder is not None:
+                for word in seg.words or ():
+                    word_builder.append(word.start, word.end, word.word, word.probability, index)
+        return segment_builder.build(), word_builder.build() if word_builder is not None else None
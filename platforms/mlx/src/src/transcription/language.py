@@ -0,0 +1,104 @@
+"""
+Кэш определения языка: повторное использование языка при language=auto
+"""
+import logging
+from dataclasses import dataclass
+
+from .result import TranscriptionResult
+
+logger = logging.getLogger(__name__)
+
+# Значение language в конфигурации движка для автоопределения
+AUTO_LANGUAGE = "auto"
+
+# Ключ кэша, когда активное приложение неизвестно
+_DEFAULT_APP = ""
+
+
+@dataclass
+class LanguageStats:
+    """Статистика кэша языка"""
+    hits: int = 0  # Фраз, декодированных с языком из кэша (без определения)
+    detections: int = 0  # Проходов определения языка
+    redetections: int = 0  # Из них - из-за низкой уверенности в языке из кэша
+
+    @property
+    def hit_ratio(self) -> float:
+        """Доля фраз без прохода определения языка"""
+        utterances = self.hits + self.detections - self.redetections
+        return (self.hits - self.redetections) / utterances if utterances else 0.0
+
+
+class LanguageCache:
+    """
+    Язык по приложениям для режима language=auto
+
+    Определение языка - отдельный проход по первому 30-секундному окну
+    на каждую фразу. Уверенно определенный язык приложения передается
+    движку явно, и определение пропускается; фраза, декодированная с
+    языком из кэша неуверенно, декодируется повторно с определением языка.
+    """
+
+    def __init__(self, language_config):
+        """
+        Инициализация кэша
+
+        Args:
+            language_config: LanguageCacheConfig
+        """
+        self.config = language_config
+        self._languages: dict[str, str] = {}
+        self.stats = LanguageStats()
+
+    def _key(self, app_id: str | None) -> str:
+        return app_id or _DEFAULT_APP
+
+    def lookup(self, app_id: str | None) -> str | None:
+        """
+        Язык для следующей фразы приложения
+
+        Returns:
+            Код языка или None - нужно определение языка
+        """
+        return self._languages.get(self._key(app_id))
+
+    def is_confident(self, result: TranscriptionResult) -> bool:
+        """
+        Достаточно ли уверенный результат
+
+        Вероятность языка, если движок ее сообщает (whisper.cpp при -l auto),
+        иначе - средний log-prob токенов: при неверном языке декодер уверен
+        заметно хуже. Движок без метрик уверенности считается уверенным.
+        """
+        if result.language_prob is not None:
+            return result.language_prob >= self.config.min_language_prob
+        if result.avg_logprob is not None:
+            return result.avg_logprob >= self.config.min_avg_logprob
+        return True
+
+    def update(self, app_id: str | None, result: TranscriptionResult, detected: bool) -> None:
+        """
+        Учет результата фразы
+
+        Args:
+            app_id: Bundle id целевого приложения
+            result: Результат транскрипции
+            detected: Язык определялся (а не взят из кэша)
+        """
+        if not detected:
+            self.stats.hits += 1
+            return
+
+        self.stats.detections += 1
+        key = self._key(app_id)
+        if not result.language or not result.text or not self.is_confident(result):
+            # Неуверенное определение не кэшируем - следующая фраза определит заново
+            self._languages.pop(key, None)
+            return
+        if self._languages.get(key) != result.language:
+            logger.info(f"Язык {key or 'по умолчанию'}: {result.language}")
+        self._languages[key] = result.language
+
+    def clear(self) -> None:
+        """Сброс кэша"""
+        self._languages.clear()
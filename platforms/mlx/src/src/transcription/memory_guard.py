@@ -0,0 +1,231 @@
+"""
+Защита от нехватки памяти при декодировании длинных записей
+
+Перед декодированием потребность в памяти оценивается по длительности
+аудио и размеру модели: процесс + модель (если еще не загружена) +
+активации декодера + копии аудио и log-mel спектрограмма. Если оценка
+не укладывается в performance.memory_limit_mb, запись декодируется
+фрагментами (пик памяти - по фрагменту, а не по всей записи) или меньшей
+моделью.
+"""
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# log-mel спектрограмма: 100 кадров в секунду x 128 полос float32
+MEL_BYTES_PER_SECOND = 100 * 128 * 4
+
+# Размер весов fp16 по имени модели (MB); первое совпадение подстроки
+_MODEL_SIZES_MB = (
+    ("large-v3-turbo", 1620), ("turbo", 1620), ("large", 3100),
+    ("medium", 1530), ("small", 490), ("base", 150), ("tiny", 80),
+)
+# Множитель размера по квантизации (имя модели или compute_type)
+_QUANTIZATION = (
+    ("q4", 0.3), ("4bit", 0.3), ("q5", 0.36), ("q8", 0.55), ("8bit", 0.55), ("int8", 0.55),
+    ("float32", 2.0),
+)
+DEFAULT_MODEL_MB = 1530.0
+
+# Короче - рост памяти определяется активациями, а не аудио (не уточняет оценку)
+_MIN_OBSERVE_SECONDS = 10.0
+
+# Разрез фрагментов: поиск самого тихого кадра в последних секундах фрагмента
+_CUT_SEARCH_SECONDS = 5.0
+_CUT_FRAME_SECONDS = 0.02
+
+
+def estimate_model_mb(model: str, compute_type: str | None = None) -> float:
+    """
+    Память модели (MB)
+
+    Файл или каталог модели - по размеру на диске, иначе по имени
+    (tiny ... large-v3) с учетом квантизации.
+
+    Args:
+        model: model_name, repo на HF или путь к модели
+        compute_type: Тип вычислений (faster-whisper: int8, float32)
+    """
+    path = Path(model).expanduser()
+    if path.is_file():
+        return path.stat().st_size / MB
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / MB
+    name = model.lower()
+    size = next((mb for key, mb in _MODEL_SIZES_MB if key in name), DEFAULT_MODEL_MB)
+    quantization = f"{name} {compute_type or ''}".lower()
+    return size * next((factor for key, factor in _QUANTIZATION if key in quantization), 1.0)
+
+
+def chunk_bounds(
+    audio_data: np.ndarray, chunk_samples: int, sample_rate: int
+) -> list[tuple[int, int]]:
+    """
+    Границы фрагментов не длиннее chunk_samples
+
+    Разрез - в самом тихом кадре последних секунд фрагмента (пауза между
+    словами), чтобы не резать слово пополам.
+
+    Returns:
+        Список (начало, конец) в сэмплах
+    """
+    frame = max(1, int(sample_rate * _CUT_FRAME_SECONDS))
+    search = int(sample_rate * _CUT_SEARCH_SECONDS)
+    bounds = []
+    start, total = 0, len(audio_data)
+    while total - start > chunk_samples:
+        end = start + chunk_samples
+        low = max(start + chunk_samples // 2, end - search)
+        frames = (end - low) // frame
+        cut = end
+        if frames:
+            blocks = audio_data[low:low + frames * frame].reshape(frames, frame)
+            energy = np.einsum('ij,ij->i', blocks, blocks)
+            cut = low + int(np.argmin(energy)) * frame + frame // 2
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, total))
+    return bounds
+
+
+class MemoryPlan(NamedTuple):
+    """Решение защиты памяти для фразы"""
+    low_memory: bool  # Декодировать меньшей моделью
+    chunk_seconds: float | None  # Длина фрагмента (None - запись целиком)
+    estimate_mb: float  # Оценка пика памяти
+    limit_mb: float
+
+    @property
+    def mode(self) -> str:
+        if self.low_memory:
+            return "low_memory"
+        return "chunked" if self.chunk_seconds else "full"
+
+
+@dataclass
+class MemoryGuardStats:
+    """Статистика защиты памяти"""
+    full: int = 0  # Фраз целиком основной моделью
+    chunked: int = 0  # Фраз фрагментами
+    low_memory: int = 0  # Фраз меньшей моделью
+
+
+class MemoryGuard:
+    """Выбор режима декодирования под лимит памяти"""
+
+    def __init__(self, guard_config, memory_limit_mb: float, sample_rate: int):
+        """
+        Инициализация защиты
+
+        Args:
+            guard_config: MemoryGuardConfig
+            memory_limit_mb: performance.memory_limit_mb
+            sample_rate: Частота дискретизации аудио
+        """
+        self.config = guard_config
+        self.limit_mb = float(memory_limit_mb)
+        self.sample_rate = sample_rate
+        # Текущая резидентная память процесса (байты); задается приложением
+        self.rss: Callable[[], int | None] | None = None
+        # Измеренный рост памяти на секунду аудио (байты), уточняет оценку вверх
+        self.observed_bytes_per_second = 0.0
+        self.stats = MemoryGuardStats()
+        self._last: tuple[float, bool] | None = None  # (секунд за вызов, модель загружена)
+
+    def bytes_per_second(self) -> float:
+        """Память на секунду аудио: копии float32 и log-mel"""
+        estimate = self.sample_rate * 4 * self.config.audio_copies + MEL_BYTES_PER_SECOND
+        return max(estimate, self.observed_bytes_per_second)
+
+    def estimate_mb(
+        self, seconds: float, model_mb: float, loaded: bool, base_mb: float = 0.0
+    ) -> float:
+        """Оценка пика памяти декодирования seconds секунд аудио (MB)"""
+        model = 0.0 if loaded else model_mb
+        audio_mb = seconds * self.bytes_per_second() / MB
+        return base_mb + model + self.config.decode_overhead_mb + audio_mb
+
+    def plan(
+        self,
+        duration: float,
+        model_mb: float,
+        loaded: bool,
+        low_memory_mb: float | None = None
+    ) -> MemoryPlan:
+        """
+        Режим декодирования фразы
+
+        Args:
+            duration: Длительность аудио (сек)
+            model_mb: Память основной модели
+            loaded: Модель уже в памяти процесса
+            low_memory_mb: Память меньшей модели (None - не настроена); используется,
+                только пока основная модель не загружена
+        """
+        rss = self.rss() if self.rss else None
+        # Основная модель остается в памяти: меньшая загрузится рядом с ней
+        low_memory_allowed = low_memory_mb is not None and not loaded
+        # Без замера памяти процесса модель считается еще не загруженной
+        base_mb = rss / MB if rss is not None else 0.0
+        loaded = loaded and rss is not None
+        chunk = self.config.chunk_seconds
+        chunk_seconds = chunk if duration > chunk else None
+
+        estimate = self.estimate_mb(duration, model_mb, loaded, base_mb)
+        if estimate <= self.limit_mb:
+            return self._choose(MemoryPlan(False, None, estimate, self.limit_mb), duration, loaded)
+        candidates = [(estimate, MemoryPlan(False, None, estimate, self.limit_mb), loaded)]
+        if chunk_seconds:
+            chunked = self.estimate_mb(chunk, model_mb, loaded, base_mb)
+            if chunked <= self.limit_mb:
+                return self._choose(
+                    MemoryPlan(False, chunk, chunked, self.limit_mb), duration, loaded
+                )
+            candidates.append((chunked, MemoryPlan(False, chunk, chunked, self.limit_mb), loaded))
+        if low_memory_allowed:
+            small = self.estimate_mb(min(duration, chunk), low_memory_mb, False, base_mb)
+            candidates.append((small, MemoryPlan(True, chunk_seconds, small, self.limit_mb), False))
+        # Ничто не укладывается в лимит - режим с наименьшей оценкой (при равенстве -
+        # основная модель)
+        _, plan, plan_loaded = min(candidates, key=lambda candidate: candidate[0])
+        return self._choose(plan, duration, plan_loaded)
+
+    def _choose(self, plan: MemoryPlan, duration: float, loaded: bool) -> MemoryPlan:
+        setattr(self.stats, plan.mode, getattr(self.stats, plan.mode) + 1)
+        self._last = (plan.chunk_seconds or duration, loaded)
+        if plan.mode != "full":
+            logger.warning(
+                f"Оценка памяти для {duration:.0f} с аудио выше лимита {plan.limit_mb:.0f} MB: "
+                f"{plan.mode}, оценка {plan.estimate_mb:.0f} MB"
+            )
+        elif plan.estimate_mb > plan.limit_mb:
+            logger.warning(
+                f"Оценка памяти {plan.estimate_mb:.0f} MB выше лимита {plan.limit_mb:.0f} MB"
+            )
+        return plan
+
+    def observe(self, growth_bytes: int) -> None:
+        """
+        Фактический рост памяти при декодировании последней фразы
+
+        Рост с уже загруженной моделью сверх оценки активаций уточняет
+        память на секунду аудио (только вверх - защита консервативна).
+        """
+        if self._last is None:
+            return
+        seconds, loaded = self._last
+        self._last = None
+        if not loaded or seconds < _MIN_OBSERVE_SECONDS:
+            return
+        per_second = (growth_bytes - self.config.decode_overhead_mb * MB) / seconds
+        if per_second > self.bytes_per_second():
+            logger.info(f"Оценка памяти на секунду аудио уточнена: {per_second / MB:.2f} MB")
+            self.observed_bytes_per_second = per_second
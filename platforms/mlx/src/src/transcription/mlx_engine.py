@@ -11,6 +11,19 @@ import logging
 import numpy as np
 from typing import Optional
 import os
+import sys
+from contextlib import contextmanager
+
+from .deadline import (
+    DeadlineRunner,
+    EngineBusyError,
+    TranscriptionCancelledError,
+    TranscriptionTimeoutError,
+)
+from .language import AUTO_LANGUAGE
+from .policy import DecodeOptions, DecodePolicy
+from .registry import EngineCapabilities
+from .result import SegmentTable, TranscriptionResult, WordTable
 
 logger = logging.getLogger(__name__)
 
@@ -26,18 +39,24 @@ except ImportError:
 class MLXWhisperTranscriber:
     """Транскрипция через MLX Whisper (оптимизировано для Apple Silicon)"""
     
-    def __init__(self, config):
+    # Beam search в mlx_whisper не реализован (NotImplementedError)
+    SUPPORTS_BEAM_SEARCH = False
+    CAPABILITIES = EngineCapabilities(timestamps=True, in_process=True, cancellable=True)
+
+    def __init__(self, config, model_name: str | None = None):
         """
         Инициализация MLX Whisper транскрибатора
         
         Args:
             config: Конфигурация приложения
+            model_name: Модель вместо mlx_whisper.model_name (например, для быстрого уровня)
         
         Raises:
             RuntimeError: Если MLX не может загрузить модель
         """
         self.config = config
         self.mlx_config = config.transcription.mlx_whisper
+        self.model_name = model_name or self.mlx_config.model_name
         
         # Guard-проверки
         self._check_dependencies()
@@ -45,8 +64,11 @@ class MLXWhisperTranscriber:
         # Проверка наличия модели в локальном кэше
         self._check_model_cache()
         
+        # Декодирование MLX не прерывается - дедлайн через фоновый поток
+        self._runner = DeadlineRunner("MLX Whisper")
+
         logger.info("MLXWhisperTranscriber инициализирован")
-        logger.info(f"Модель MLX: {self.mlx_config.model_name}")
+        logger.info(f"Модель MLX: {self.model_name}")
     
     def _check_dependencies(self):
         """Проверка наличия MLX зависимостей"""
@@ -76,7 +98,7 @@ class MLXWhisperTranscriber:
             
             # Преобразуем имя модели в формат кэша
             # Например: "mlx-community/whisper-medium" -> "models--mlx-community--whisper-medium"
-            model_cache_name = f"models--{self.mlx_config.model_name.replace('/', '--')}"
+            model_cache_name = f"models--{self.model_name.replace('/', '--')}"
             model_cache_path = os.path.join(cache_dir, model_cache_name)
             
             if os.path.exists(model_cache_path):
@@ -100,17 +122,38 @@ class MLXWhisperTranscriber:
                 logger.debug(f"Ожидаемый путь к кэшу: {model_cache_path}")
         except Exception as e:
             logger.debug(f"Не удалось проверить кэш модели: {e}")
-    
-    def transcribe(self, audio_data: np.ndarray) -> str:
+
+    def transcribe(self, audio_data: np.ndarray, options: DecodeOptions | None = None) -> str:
         """
         Транскрибация аудио данных
         
         Args:
             audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
         
         Returns:
             Транскрибированный текст
         
+        Raises:
+            RuntimeError: При ошибке транскрипции
+        """
+        return self.transcribe_detailed(audio_data, options).text
+
+    def transcribe_detailed(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions | None = None
+    ) -> TranscriptionResult:
+        """
+        Транскрибация аудио данных с метаданными уверенности
+
+        Args:
+            audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
+
+        Returns:
+            Результат транскрипции
+
         Raises:
             RuntimeError: При ошибке транскрипции
         """
@@ -120,39 +163,62 @@ class MLXWhisperTranscriber:
         logger.info(f"Начало транскрипции MLX: {len(audio_data)} сэмплов")
         
         try:
-            # MLX Whisper ожидает аудио как numpy array
-            # Конвертируем в float32 если нужно
-            if audio_data.dtype != np.float32:
-                audio_data = audio_data.astype(np.float32)
+            # MLX Whisper ожидает float32 моно; подготовленное через
+            # AudioProcessor.prepare_for_whisper аудио проходит без копий
+            audio_data = np.asarray(audio_data, dtype=np.float32)
             
-            # Нормализация аудио (MLX ожидает значения в диапазоне [-1, 1])
-            max_val = max(abs(audio_data.max()), abs(audio_data.min()))
-            if max_val > 1.0:
-                audio_data = audio_data / max_val
+            # Защита от ненормализованного входа (MLX ожидает значения в диапазоне [-1, 1]).
+            # Редукции min/max не выделяют память; деление (копия) только если вне диапазона
+            if audio_data.size and (audio_data.max() > 1.0 or audio_data.min() < -1.0):
+                audio_data = audio_data / max(abs(audio_data.max()), abs(audio_data.min()))
             
             # MLX Whisper transcribe принимает аудио и путь к модели
             # Модель загружается из локального кэша (если уже скачана) или из Hugging Face (только при первом использовании)
             # После первой загрузки модель работает полностью локально без интернета
-            logger.debug(f"Загрузка модели из кэша или Hugging Face: {self.mlx_config.model_name}")
-            result = whisper.transcribe(
-                audio_data,
-                path_or_hf_repo=self.mlx_config.model_name,
-                language=self.mlx_config.language,
-                temperature=self.mlx_config.temperature,
-                compression_ratio_threshold=self.mlx_config.compression_ratio_threshold,
-                no_speech_threshold=self.mlx_config.no_speech_threshold,
-                verbose=False,
-            )
+            if options is None:
+                options = DecodePolicy.from_engine_config(self.mlx_config)
+            if options.beam_size > 1 and not self.SUPPORTS_BEAM_SEARCH:
+                logger.debug(
+                    "MLX Whisper не поддерживает beam search (beam_size=%d), жадное декодирование",
+                    options.beam_size
+                )
+
+            # Язык из кэша (при auto) имеет приоритет; None - определение языка моделью
+            language = options.language or self.mlx_config.language
+
+            logger.debug("Загрузка модели из кэша или Hugging Face: %s", self.model_name)
+            def decode():
+                with self._cancel_between_windows(options.cancel):
+                    return whisper.transcribe(
+                        audio_data,
+                        path_or_hf_repo=self.model_name,
+                        language=None if language == AUTO_LANGUAGE else language,
+                        # Кортеж температур: следующие - только при неудаче декодирования
+                        temperature=(
+                            options.temperature if options.has_fallback
+                            else options.temperature[0]
+                        ),
+                        compression_ratio_threshold=self.mlx_config.compression_ratio_threshold,
+                        no_speech_threshold=self.mlx_config.no_speech_threshold,
+                        # best_of используется только при temperature > 0
+                        best_of=options.best_of,
+                        initial_prompt=options.initial_prompt,
+                        # Пословные тайминги - выравнивание по cross-attention, дополнительное время
+                        word_timestamps=self.config.transcription.timestamps == "word",
+                        verbose=False,
+                    )
+
+            result = self._runner.run(decode, options.timeout, options.cancel)
             
             # Извлечение текста из результата
             # MLX Whisper возвращает словарь с ключом "text"
+            segments = []
             if isinstance(result, dict):
                 text = result.get("text", "").strip()
+                segments = [seg for seg in result.get("segments", []) if isinstance(seg, dict)]
                 # Если текст пустой, пробуем извлечь из сегментов
-                if not text and "segments" in result:
-                    segments = result.get("segments", [])
-                    if segments:
-                        text = " ".join([seg.get("text", "") for seg in segments if isinstance(seg, dict)]).strip()
+                if not text and segments:
+                    text = " ".join([seg.get("text", "") for seg in segments]).strip()
             elif isinstance(result, str):
                 text = result.strip()
             else:
@@ -162,11 +228,87 @@ class MLXWhisperTranscriber:
             elapsed = time.time() - start_time
             logger.info(f"Транскрипция MLX завершена за {elapsed:.2f}с: {len(text)} символов")
             
-            return text
+            # Уверенность: средний log-prob сегментов и худшая вероятность отсутствия речи
+            logprobs = [seg["avg_logprob"] for seg in segments if "avg_logprob" in seg]
+            no_speech = [seg["no_speech_prob"] for seg in segments if "no_speech_prob" in seg]
+            # Сегмент с temperature > 0 был декодирован повторно (fallback)
+            temperatures = [seg["temperature"] for seg in segments if "temperature" in seg]
+            segment_table, word_table = self._build_timings(segments)
             
+            return TranscriptionResult(
+                text=text,
+                avg_logprob=float(np.mean(logprobs)) if logprobs else None,
+                no_speech_prob=float(max(no_speech)) if no_speech else None,
+                language=result.get("language") if isinstance(result, dict) else None,
+                engine="mlx_whisper",
+                model=self.model_name,
+                audio_duration=len(audio_data) / 16000,
+                elapsed=elapsed,
+                fallbacks=sum(1 for t in temperatures if t > 0) if temperatures else None,
+                segments=segment_table,
+                words=word_table,
+            )
+
+        except (TranscriptionTimeoutError, TranscriptionCancelledError, EngineBusyError):
+            raise
         except Exception as e:
             logger.error(f"Ошибка транскрипции MLX: {e}")
             import traceback
             logger.debug(traceback.format_exc())
             raise RuntimeError(f"Ошибка транскрипции MLX: {e}") from e
 
+    @contextmanager
+    def _cancel_between_windows(self, cancel):
+        """
+        Проверка отмены перед каждым окном Whisper (30 с)
+
+        mlx_whisper декодирует запись окнами, вызывая model.decode на каждое;
+        проверка перед вызовом останавливает отмененную фразу между окнами,
+        а запись декодируется целиком, как без отмены.
+        """
+        holder = getattr(sys.modules.get("mlx_whisper.transcribe"), "ModelHolder", None)
+        if cancel is None or holder is None:
+            yield
+            return
+
+        import mlx.core as mx
+        # Та же модель, что загрузит transcribe (fp16 по умолчанию)
+        model = holder.get_model(self.model_name, mx.float16)
+        decode = model.decode
+
+        def checked_decode(segment, decode_options):
+            cancel.check()
+            return decode(segment, decode_options)
+
+        model.decode = checked_decode
+        try:
+            yield
+        finally:
+            del model.decode
+
+    def _build_timings(self, segments: list) -> tuple:
+        """
+        Компактные таблицы сегментов и слов из результата mlx_whisper
+
+        Returns:
+            (SegmentTable или None, WordTable или None)
+        """
+        mode = self.config.transcription.timestamps
+        if mode == "none" or not segments:
+            return None, None
+
+        nan = float("nan")
+        segment_builder = SegmentTable.builder()
+        word_builder = WordTable.builder() if mode == "word" else None
+        for index, seg in enumerate(segments):
+            segment_builder.append(
+                seg.get("start", nan), seg.get("end", nan), seg.get("text", ""),
+                seg.get("avg_logprob", nan), seg.get("no_speech_prob", nan),
+            )
+            if word_builder is not None:
+                for word in seg.get("words", ()):
+                    word_builder.append(
+                        word["start"], word["end"], word["word"],
+                        word.get("probability", nan), index
+                    )
+        return segment_builder.build(), word_builder.build() if word_builder is not None else None
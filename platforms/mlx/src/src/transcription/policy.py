@@ -0,0 +1,167 @@
+"""
+Политика параметров декодирования по длительности, доле речи и бюджету задержки
+"""
+import logging
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from .deadline import CancelToken
+
+logger = logging.getLogger(__name__)
+
+# Длина кадра оценки доли речи (сек)
+_SPEECH_FRAME_SECONDS = 0.03
+
+
+@dataclass(frozen=True)
+class DecodeOptions:
+    """Параметры декодирования одной фразы"""
+    beam_size: int = 1  # 1 = жадное декодирование
+    best_of: int = 1  # Кандидатов при сэмплировании (temperature > 0)
+    temperature: tuple[float, ...] = (0.0,)  # Последующие значения - fallback при неудаче
+    initial_prompt: str | None = None  # Контекст предыдущих фраз и словарь приложения
+    language: str | None = None  # Язык вместо конфигурации движка (например, из кэша при auto)
+    # Дедлайн вызова (сек), None - без дедлайна
+    timeout: float | None = field(default=None, compare=False)
+    cancel: CancelToken | None = field(default=None, compare=False)  # Отмена фразы
+    reason: str = field(default="", compare=False)  # Почему выбраны эти параметры (для логов)
+
+    @property
+    def has_fallback(self) -> bool:
+        """Разрешен ли повтор с более высокой температурой при неудаче"""
+        return len(self.temperature) > 1
+
+    def with_updates(self, **changes) -> 'DecodeOptions':
+        """Копия с измененными полями"""
+        return replace(self, **changes)
+
+
+def speech_ratio(audio_data: np.ndarray, sample_rate: int, threshold_db: float = -40.0) -> float:
+    """
+    Доля кадров с речью (энергетический детектор)
+
+    Args:
+        audio_data: Моно аудио float32
+        sample_rate: Частота дискретизации
+        threshold_db: Порог RMS кадра относительно пика записи (dB)
+
+    Returns:
+        Доля кадров выше порога (0..1)
+    """
+    frame = max(1, int(sample_rate * _SPEECH_FRAME_SECONDS))
+    frames = len(audio_data) // frame
+    if frames == 0:
+        return 0.0
+
+    blocks = audio_data[:frames * frame].reshape(frames, frame)
+    energy = np.einsum('ij,ij->i', blocks, blocks) / frame
+    peak = energy.max()
+    if peak <= 0:
+        return 0.0
+    threshold = peak * 10.0 ** (threshold_db / 10.0)
+    return float(np.count_nonzero(energy > threshold)) / frames
+
+
+class DecodePolicy:
+    """
+    Выбор параметров декодирования для каждой фразы
+
+    - короткие команды: жадное декодирование;
+    - длинная диктовка: beam search (если позволяет бюджет задержки);
+    - почти тишина: жадное декодирование без повторов;
+    - повтор с более высокой температурой - только при неудаче декодирования
+      (порог compression ratio / logprob), а не сэмплирование всегда.
+    """
+
+    def __init__(self, policy_config, sample_rate: int = 16000):
+        """
+        Инициализация политики
+
+        Args:
+            policy_config: DecodePolicyConfig
+            sample_rate: Частота дискретизации аудио
+        """
+        self.config = policy_config
+        self.sample_rate = sample_rate
+        self.expected_rtf = policy_config.expected_rtf
+
+    @staticmethod
+    def from_engine_config(engine_config) -> DecodeOptions:
+        """
+        Единые параметры из конфигурации движка (политика выключена)
+
+        Args:
+            engine_config: MLXWhisperConfig или WhisperCppConfig
+
+        Returns:
+            Параметры декодирования
+        """
+        return DecodeOptions(
+            beam_size=engine_config.beam_size,
+            best_of=engine_config.best_of,
+            temperature=(engine_config.temperature,),
+            reason="config",
+        )
+
+    def _fallback_temperatures(self) -> tuple[float, ...]:
+        return tuple(self.config.temperature_fallback)
+
+    def choose(
+        self,
+        audio_data: np.ndarray,
+        latency_budget: float | None = None,
+        beam_size: int = 5,
+        best_of: int = 5
+    ) -> DecodeOptions:
+        """
+        Выбор параметров для фразы
+
+        Args:
+            audio_data: Подготовленное аудио
+            latency_budget: Бюджет задержки декодирования (сек), по умолчанию из конфигурации
+            beam_size: Beam size для длинной диктовки
+            best_of: Кандидатов при fallback-сэмплировании
+
+        Returns:
+            Параметры декодирования
+        """
+        duration = len(audio_data) / self.sample_rate
+        budget = latency_budget if latency_budget is not None else self.config.latency_budget
+
+        ratio = speech_ratio(audio_data, self.sample_rate)
+        if ratio < self.config.min_speech_ratio:
+            options = DecodeOptions(reason=f"мало речи ({ratio:.0%})")
+        elif duration <= self.config.short_max_duration:
+            options = DecodeOptions(
+                best_of=best_of,
+                temperature=self._fallback_temperatures(),
+                reason=f"короткая фраза ({duration:.1f}с)",
+            )
+        elif duration >= self.config.long_min_duration:
+            options = DecodeOptions(
+                beam_size=beam_size,
+                best_of=best_of,
+                temperature=self._fallback_temperatures(),
+                reason=f"длинная диктовка ({duration:.1f}с)",
+            )
+            # Beam search дороже примерно в beam_cost_factor раз
+            estimate = duration * self.expected_rtf * self.config.beam_cost_factor
+            if budget is not None and estimate > budget:
+                options = options.with_updates(
+                    beam_size=1,
+                    reason=f"длинная диктовка, beam не укладывается в бюджет ({estimate:.1f}с > "
+                           f"{budget:.1f}с)",
+                )
+        else:
+            options = DecodeOptions(
+                best_of=best_of,
+                temperature=self._fallback_temperatures(),
+                reason=f"средняя фраза ({duration:.1f}с)",
+            )
+
+        logger.debug(
+            f"Параметры декодирования: beam={options.beam_size}, best_of={options.best_of}, "
+            f"temperature={options.temperature} ({options.reason})"
+        )
+        return options
@@ -0,0 +1,178 @@
+"""
+Реестр движков транскрипции
+
+Встроенные движки зарегистрированы строкой импорта и загружаются только
+при создании: при выбранном whisper.cpp модули MLX и faster-whisper не
+импортируются. Сторонние движки подключаются entry points группы
+vtt2.engines: имя точки входа - значение transcription.engine, объект -
+EngineSpec или класс движка (конструктор config, model=None, options=None).
+Настройки стороннего движка - transcription.engine_options.<имя>,
+проверяются pydantic-схемой из EngineSpec.options.
+"""
+import importlib
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from importlib.metadata import EntryPoint, entry_points
+from types import SimpleNamespace
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "vtt2.engines"
+
+# Настройки стороннего движка без схемы: значения по умолчанию для политики декодирования
+_DEFAULT_OPTIONS = {"language": "auto", "temperature": 0.0, "beam_size": 1, "best_of": 1}
+
+
+@dataclass(frozen=True)
+class EngineCapabilities:
+    """Возможности движка (по ним конвейер выбирает быстрый путь)"""
+    # Промежуточный текст при декодировании: transcribe_detailed(..., on_partial=)
+    streaming: bool = False
+    batching: bool = False  # Несколько фрагментов за вызов: transcribe_batch(chunks, options)
+    timestamps: bool = False  # Тайминги сегментов и слов в результате
+    in_process: bool = True  # Модель живет в процессе (а не загружается внешним процессом на вызов)
+    # Отмена прерывает вызов изнутри (иначе вызов доводится до конца в пределах дедлайна)
+    cancellable: bool = False
+
+    def __str__(self) -> str:
+        flags = [
+            name
+            for name in ("streaming", "batching", "timestamps", "in_process", "cancellable")
+            if getattr(self, name)
+        ]
+        return ", ".join(flags) or "-"
+
+
+DEFAULT_CAPABILITIES = EngineCapabilities()
+
+
+def capabilities_of(engine: Any) -> EngineCapabilities:
+    """Возможности созданного движка (атрибут CAPABILITIES класса)"""
+    return getattr(engine, "CAPABILITIES", DEFAULT_CAPABILITIES)
+
+
+@dataclass(frozen=True)
+class EngineSpec:
+    """Движок в реестре"""
+    name: str
+    # "модуль:атрибут" (".модуль" - в пакете transcription) или объект
+    factory: str | Callable[..., Any]
+    description: str = ""
+    model_arg: str = "model"  # Аргумент factory для модели вместо модели из настроек
+    config_section: str | None = None  # Секция настроек встроенного движка (transcription.<секция>)
+    # pydantic-схема transcription.engine_options.<имя> стороннего движка
+    options: type | None = None
+
+
+def create_whisper_cpp(config, model_path: str | None = None):
+    """whisper.cpp: whisper-cli на фразу или libwhisper в процессе (whisper_cpp.backend)"""
+    if config.transcription.whisper_cpp.backend == "bindings":
+        from .whisper_cpp_bindings import WhisperCppBindingsTranscriber
+        return WhisperCppBindingsTranscriber(config, model_path=model_path)
+    from .whisper_cpp import WhisperCppTranscriber
+    return WhisperCppTranscriber(config, model_path=model_path)
+
+
+class EngineRegistry:
+    """Имена движков -> способ создания и схема настроек"""
+
+    def __init__(self, group: str = ENTRY_POINT_GROUP):
+        self.group = group
+        self._specs: dict[str, EngineSpec] = {}
+        self._factories: dict[str, Callable[..., Any]] = {}
+
+    def register(self, spec: EngineSpec) -> None:
+        """Регистрация движка (повторная - замена)"""
+        self._specs[spec.name] = spec
+        self._factories.pop(spec.name, None)
+
+    def _entry_points(self) -> dict[str, EntryPoint]:
+        return {ep.name: ep for ep in entry_points(group=self.group)}
+
+    def names(self) -> list[str]:
+        """Встроенные и установленные движки (точки входа не загружаются)"""
+        return sorted(set(self._specs) | set(self._entry_points()))
+
+    def spec(self, name: str) -> EngineSpec:
+        """
+        Описание движка
+
+        Raises:
+            ValueError: Движок не зарегистрирован и не установлен
+        """
+        spec = self._specs.get(name)
+        if spec is not None:
+            return spec
+        entry_point = self._entry_points().get(name)
+        if entry_point is None:
+            raise ValueError(f"Неизвестный движок: {name} (доступны: {', '.join(self.names())})")
+        loaded = entry_point.load()
+        spec = loaded if isinstance(loaded, EngineSpec) else EngineSpec(
+            name, loaded,
+            description=getattr(loaded, "DESCRIPTION", name),
+            options=getattr(loaded, "OPTIONS", None),
+        )
+        logger.info(f"Движок {name} подключен из {entry_point.value}")
+        self._specs[name] = spec
+        return spec
+
+    def description(self, name: str) -> str:
+        """Название движка для показа (неизвестный - имя)"""
+        try:
+            return self.spec(name).description or name
+        except Exception:
+            return name
+
+    def factory(self, name: str) -> Callable[..., Any]:
+        """Класс или функция создания движка (импорт модуля - при первом вызове)"""
+        factory = self._factories.get(name)
+        if factory is None:
+            factory = self.spec(name).factory
+            if isinstance(factory, str):
+                module, _, attribute = factory.partition(":")
+                factory = getattr(importlib.import_module(module, package=__package__), attribute)
+            self._factories[name] = factory
+        return factory
+
+    def options(self, name: str, transcription_config) -> Any:
+        """Настройки движка: секция встроенного или проверенные engine_options стороннего"""
+        spec = self.spec(name)
+        if spec.config_section:
+            return getattr(transcription_config, spec.config_section)
+        raw = dict((getattr(transcription_config, "engine_options", None) or {}).get(name) or {})
+        if spec.options is not None:
+            return spec.options.model_validate(raw)
+        return SimpleNamespace(**{**_DEFAULT_OPTIONS, **raw})
+
+    def create(self, name: str, config, model: str | None = None) -> Any:
+        """
+        Создание движка
+
+        Args:
+            name: Имя движка (transcription.engine)
+            config: Конфигурация приложения
+            model: Модель вместо указанной в настройках движка
+        """
+        spec = self.spec(name)
+        kwargs = {spec.model_arg: model} if model else {}
+        if not spec.config_section:
+            kwargs["options"] = self.options(name, config.transcription)
+        return self.factory(name)(config, **kwargs)
+
+
+REGISTRY = EngineRegistry()
+REGISTRY.register(EngineSpec(
+    "mlx_whisper", ".mlx_engine:MLXWhisperTranscriber", "MLX Whisper (Apple Silicon)",
+    model_arg="model_name", config_section="mlx_whisper",
+))
+REGISTRY.register(EngineSpec(
+    "whisper_cpp", ".registry:create_whisper_cpp", "whisper.cpp",
+    model_arg="model_path", config_section="whisper_cpp",
+))
+REGISTRY.register(EngineSpec(
+    "faster_whisper", ".faster_whisper_engine:FasterWhisperTranscriber",
+    "faster-whisper (CTranslate2, CPU)",
+    model_arg="model_name", config_section="faster_whisper",
+))
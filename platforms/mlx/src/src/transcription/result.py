@@ -0,0 +1,281 @@
+"""
+Результат транскрипции
+"""
+from array import array
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Segment(NamedTuple):
+    """Сегмент транскрипции (представление строки SegmentTable)"""
+    start: float  # Начало (сек)
+    end: float  # Конец (сек)
+    text: str
+    avg_logprob: float  # nan - движок не сообщает
+    no_speech_prob: float  # nan - движок не сообщает
+
+
+class Word(NamedTuple):
+    """Слово с таймингом (представление строки WordTable)"""
+    start: float
+    end: float
+    text: str
+    probability: float  # nan - движок не сообщает
+    segment: int  # Индекс сегмента
+
+
+class _TextColumn:
+    """Тексты строк одной строкой со смещениями - без объекта str на строку"""
+
+    def __init__(self, texts: str, offsets: np.ndarray):
+        self.texts = texts
+        self.offsets = offsets  # int32, len = строк + 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.texts[self.offsets[index]:self.offsets[index + 1]]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.texts.encode('utf-8')) + self.offsets.nbytes
+
+
+class _TableBuilder:
+    """Построчное накопление колонок в array (компактно, без списков float)"""
+
+    def __init__(self, columns: tuple):
+        self._columns = {name: array(code) for name, code in columns}
+        self._texts = []
+        self._offsets = array('i', [0])
+        self._length = 0
+
+    def append(self, text: str, **values) -> None:
+        self._texts.append(text)
+        self._length += len(text)
+        self._offsets.append(self._length)
+        for name, column in self._columns.items():
+            column.append(values[name])
+
+    def build(self) -> tuple:
+        columns = {
+            name: np.frombuffer(column, dtype=column.typecode)
+            for name, column in self._columns.items()
+        }
+        text = _TextColumn("".join(self._texts), np.frombuffer(self._offsets, dtype=np.int32))
+        return text, columns
+
+
+class SegmentTable:
+    """
+    Сегменты транскрипции в колонках NumPy
+
+    Часовая запись - тысячи сегментов: колонки float32 и общий текст со
+    смещениями занимают в разы меньше памяти, чем список словарей.
+    """
+
+    _COLUMNS = (('start', 'f'), ('end', 'f'), ('avg_logprob', 'f'), ('no_speech_prob', 'f'))
+
+    def __init__(self, text: _TextColumn, start, end, avg_logprob, no_speech_prob):
+        self._text = text
+        self.start = start
+        self.end = end
+        self.avg_logprob = avg_logprob
+        self.no_speech_prob = no_speech_prob
+
+    @classmethod
+    def builder(cls) -> '_SegmentBuilder':
+        """Построитель таблицы (append по сегменту, затем build)"""
+        return _SegmentBuilder()
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, index: int) -> Segment:
+        if index < 0:
+            index += len(self)
+        return Segment(
+            float(self.start[index]), float(self.end[index]), self._text[index],
+            float(self.avg_logprob[index]), float(self.no_speech_prob[index]),
+        )
+
+    def __iter__(self) -> Iterator[Segment]:
+        return (self[i] for i in range(len(self)))
+
+    def text(self, index: int) -> str:
+        """Текст сегмента"""
+        return self._text[index]
+
+    def at(self, seconds: float) -> int:
+        """Индекс сегмента, идущего в момент seconds (-1 - нет)"""
+        index = int(np.searchsorted(self.start, seconds, side='right')) - 1
+        if index >= 0 and seconds <= self.end[index]:
+            return index
+        return -1
+
+    @property
+    def nbytes(self) -> int:
+        """Занимаемая память (байт)"""
+        return self._text.nbytes + sum(
+            c.nbytes for c in (self.start, self.end, self.avg_logprob, self.no_speech_prob)
+        )
+
+
+class _SegmentBuilder(_TableBuilder):
+    def __init__(self):
+        super().__init__(SegmentTable._COLUMNS)
+
+    def append(self, start: float, end: float, text: str,
+               avg_logprob: float = float('nan'), no_speech_prob: float = float('nan')) -> None:
+        super().append(
+            text, start=start, end=end, avg_logprob=avg_logprob, no_speech_prob=no_speech_prob
+        )
+
+    def build(self) -> SegmentTable:
+        text, columns = super().build()
+        return SegmentTable(text, **columns)
+
+
+class WordTable:
+    """Слова с таймингами в колонках NumPy"""
+
+    _COLUMNS = (('start', 'f'), ('end', 'f'), ('probability', 'f'), ('segment', 'i'))
+
+    def __init__(self, text: _TextColumn, start, end, probability, segment):
+        self._text = text
+        self.start = start
+        self.end = end
+        self.probability = probability
+        self.segment = segment
+
+    @classmethod
+    def builder(cls) -> '_WordBuilder':
+        """Построитель таблицы (append по слову, затем build)"""
+        return _WordBuilder()
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, index: int) -> Word:
+        if index < 0:
+            index += len(self)
+        return Word(
+            float(self.start[index]), float(self.end[index]), self._text[index],
+            float(self.probability[index]), int(self.segment[index]),
+        )
+
+    def __iter__(self) -> Iterator[Word]:
+        return (self[i] for i in range(len(self)))
+
+    def at(self, seconds: float) -> int:
+        """Индекс слова, звучащего в момент seconds (-1 - нет)"""
+        index = int(np.searchsorted(self.start, seconds, side='right')) - 1
+        if index >= 0 and seconds <= self.end[index]:
+            return index
+        return -1
+
+    @property
+    def nbytes(self) -> int:
+        """Занимаемая память (байт)"""
+        return self._text.nbytes + sum(
+            c.nbytes for c in (self.start, self.end, self.probability, self.segment)
+        )
+
+
+class _WordBuilder(_TableBuilder):
+    def __init__(self):
+        super().__init__(WordTable._COLUMNS)
+
+    def append(self, start: float, end: float, text: str,
+               probability: float = float('nan'), segment: int = 0) -> None:
+        super().append(text, start=start, end=end, probability=probability, segment=segment)
+
+    def build(self) -> WordTable:
+        text, columns = super().build()
+        return WordTable(text, **columns)
+
+
+@dataclass
+class TranscriptionResult:
+    """Результат транскрипции с метаданными уверенности"""
+    text: str
+    avg_logprob: float | None = None  # Средний log-prob токенов (None - движок не сообщает)
+    no_speech_prob: float | None = None  # Вероятность отсутствия речи
+    language: str | None = None
+    language_prob: float | None = None  # Вероятность определенного языка (если движок сообщает)
+    engine: str = ""
+    model: str = ""
+    audio_duration: float = 0.0  # Длительность аудио (сек)
+    elapsed: float = 0.0  # Время транскрипции (сек)
+    fallbacks: int | None = None  # Сегментов, повторно декодированных с temperature > 0
+    segments: SegmentTable | None = None  # None - тайминги не запрашивались
+    words: WordTable | None = None  # None - пословные тайминги не запрашивались
+
+    @property
+    def rtf(self) -> float | None:
+        """Real-time factor: время транскрипции / длительность аудио"""
+        if self.audio_duration <= 0:
+            return None
+        return self.elapsed / self.audio_duration
+
+
+def merge_results(
+    results: Sequence[TranscriptionResult], offsets: Sequence[float]
+) -> TranscriptionResult:
+    """
+    Результат записи из результатов ее фрагментов
+
+    Args:
+        results: Результаты фрагментов по порядку
+        offsets: Начало каждого фрагмента в записи (сек) - сдвиг таймингов
+
+    Returns:
+        Объединенный результат (уверенность - средняя по длительности)
+    """
+    first = next((r for r in results if r.text.strip()), results[0])
+    weighted = [(r.avg_logprob, r.audio_duration) for r in results if r.avg_logprob is not None]
+    total = sum(duration for _, duration in weighted)
+    if total > 0:
+        avg_logprob = sum(value * duration for value, duration in weighted) / total
+    else:
+        avg_logprob = weighted[0][0] if weighted else None
+    no_speech = [r.no_speech_prob for r in results if r.no_speech_prob is not None]
+    fallbacks = [r.fallbacks for r in results if r.fallbacks is not None]
+
+    segments = None
+    if all(r.segments is not None for r in results):
+        builder = SegmentTable.builder()
+        for result, offset in zip(results, offsets):
+            for segment in result.segments:
+                builder.append(segment.start + offset, segment.end + offset, segment.text,
+                               segment.avg_logprob, segment.no_speech_prob)
+        segments = builder.build()
+    words = None
+    if all(r.words is not None for r in results):
+        builder = WordTable.builder()
+        base = 0
+        for result, offset in zip(results, offsets):
+            for word in result.words:
+                builder.append(
+                    word.start + offset, word.end + offset, word.text, word.probability,
+                    word.segment + base
+                )
+            base += len(result.segments) if result.segments is not None else 0
+        words = builder.build()
+
+    return TranscriptionResult(
+        text=" ".join(r.text.strip() for r in results if r.text.strip()),
+        avg_logprob=avg_logprob,
+        # Речь хотя бы в одном фрагменте - речь в записи
+        no_speech_prob=min(no_speech) if no_speech else None,
+        language=first.language,
+        language_prob=first.language_prob,
+        engine=first.engine,
+        model=first.model,
+        audio_duration=sum(r.audio_duration for r in results),
+        elapsed=sum(r.elapsed for r in results),
+        fallbacks=sum(fallbacks) if fallbacks else None,
+        segments=segments,
+        words=words,
+    )
@@ -1,33 +1,50 @@
 """
 Интеграция с whisper.cpp для транскрипции
 """
+import json
 import logging
+import math
+import re
 import subprocess
-import sys
 import tempfile
 from pathlib import Path
 from typing import Optional
+
 import numpy as np
 import soundfile as sf
 
+from .deadline import CancelToken, TranscriptionCancelledError, TranscriptionTimeoutError
+from .language import AUTO_LANGUAGE
+from .policy import DecodeOptions, DecodePolicy
+from .registry import EngineCapabilities
+from .result import SegmentTable, TranscriptionResult, WordTable
+
 logger = logging.getLogger(__name__)
 
+# Строка stderr whisper.cpp при -l auto: "auto-detected language: ru (p = 0.987654)"
+_DETECTED_LANGUAGE = re.compile(r"auto-detected language:\s*(\w+)\s*\(p\s*=\s*([\d.]+)\)")
+
 
 class WhisperCppTranscriber:
     """Транскрипция через whisper.cpp"""
     
-    def __init__(self, config):
+    # whisper-cli загружает модель заново на каждую фразу
+    CAPABILITIES = EngineCapabilities(timestamps=True, in_process=False, cancellable=True)
+
+    def __init__(self, config, model_path: str | None = None):
         """
         Инициализация whisper.cpp транскрибатора
         
         Args:
             config: Конфигурация приложения
+            model_path: Модель вместо whisper_cpp.model_path (например, для быстрого уровня)
         
         Raises:
             FileNotFoundError: Если бинарник или модель не найдены (fail fast)
         """
         self.config = config
         self.whisper_config = config.transcription.whisper_cpp
+        self.model_path = model_path or self.whisper_config.model_path
         
         # Guard-проверки при инициализации
         self._check_binary()
@@ -42,11 +59,11 @@ class WhisperCppTranscriber:
         if not binary_path.exists():
             logger.error(f"❌ Бинарник whisper.cpp не найден: {binary_path}")
             logger.error("Скомпилируйте whisper.cpp или укажите правильный путь в config.yaml")
-            sys.exit(1)
+            raise FileNotFoundError(f"Бинарник whisper.cpp не найден: {binary_path}")
         
         if not binary_path.is_file():
             logger.error(f"❌ Путь не является файлом: {binary_path}")
-            sys.exit(1)
+            raise FileNotFoundError(f"Путь не является файлом: {binary_path}")
         
         # Проверка исполняемости
         if not (binary_path.stat().st_mode & 0o111):
@@ -56,30 +73,55 @@ class WhisperCppTranscriber:
     
     def _check_model(self):
         """Проверка наличия модели (guard-проверка)"""
-        model_path = Path(self.whisper_config.model_path)
+        model_path = Path(self.model_path)
         
         if not model_path.exists():
             logger.error(f"❌ Модель не найдена: {model_path}")
             logger.error("Скачайте модель ggml-large-v3.bin и разместите в models/")
             logger.error("Или укажите правильный путь в config.yaml")
-            sys.exit(1)
+            raise FileNotFoundError(f"Модель не найдена: {model_path}")
         
         if not model_path.is_file():
             logger.error(f"❌ Путь не является файлом: {model_path}")
-            sys.exit(1)
+            raise FileNotFoundError(f"Путь не является файлом: {model_path}")
         
         logger.info(f"✅ Модель найдена: {model_path} ({model_path.stat().st_size / 1024 / 1024:.1f} MB)")
-    
-    def transcribe(self, audio_data: np.ndarray) -> str:
+
+    def transcribe(self, audio_data: np.ndarray, options: DecodeOptions | None = None) -> str:
         """
         Транскрибация аудио данных
         
         Args:
             audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
         
         Returns:
             Транскрибированный текст
         
+        Raises:
+            RuntimeError: При ошибке транскрипции
+        """
+        return self.transcribe_detailed(audio_data, options).text
+
+    def transcribe_detailed(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions | None = None
+    ) -> TranscriptionResult:
+        """
+        Транскрибация аудио данных с метаданными
+
+        Тайминги сегментов - из JSON вывода whisper-cli (-oj), слов и
+        avg_logprob - из полного JSON с токенами (-ojf). no_speech_prob
+        whisper-cli не сообщает.
+
+        Args:
+            audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
+
+        Returns:
+            Результат транскрипции
+
         Raises:
             RuntimeError: При ошибке транскрипции
         """
@@ -90,30 +132,33 @@ class WhisperCppTranscriber:
         
         # Сохранение аудио во временный WAV файл
         temp_wav = None
+        output_file = None
         try:
             with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
                 temp_wav = tmp.name
                 # Сохранение как WAV файл
                 sf.write(temp_wav, audio_data, self.config.audio.sample_rate, subtype='PCM_16')
-                logger.debug(f"Аудио сохранено во временный файл: {temp_wav}")
+                logger.debug("Аудио сохранено во временный файл: %s", temp_wav)
             
             # Построение команды whisper.cpp
-            cmd, output_file = self._build_command(temp_wav)
+            cmd, output_file = self._build_command(temp_wav, options)
             
-            logger.debug(f"Выполнение команды: {' '.join(cmd)}")
+            logger.debug("Выполнение команды: %s", " ".join(cmd))
             
-            # Запуск whisper.cpp
-            result = subprocess.run(
+            # Запуск whisper.cpp (по таймауту процесс завершается - фраза уходит на
+            # резервный движок)
+            timeout = options.timeout if options and options.timeout else None
+            result = self._run_process(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.config.audio.max_recording_duration * 2  # Таймаут = 2x длительности записи
+                # Без дедлайна от обертки - верхняя граница 2x максимальной длительности записи
+                timeout or self.config.audio.max_recording_duration * 2,
+                options.cancel if options else None
             )
             
             # Детальное логирование для отладки
-            logger.debug(f"whisper.cpp stdout: {result.stdout}")
+            logger.debug("whisper.cpp stdout: %s", result.stdout)
             if result.stderr:
-                logger.debug(f"whisper.cpp stderr: {result.stderr}")
+                logger.debug("whisper.cpp stderr: %s", result.stderr)
             
             if result.returncode != 0:
                 logger.error(f"Ошибка whisper.cpp (код {result.returncode})")
@@ -132,21 +177,39 @@ class WhisperCppTranscriber:
                 raise RuntimeError(f"Ошибка транскрипции: {result.stderr}")
             
             # Парсинг результата из файла
-            text = self._parse_output(output_file)
-            
-            # Удаление временного файла результата
-            if Path(output_file).exists():
-                Path(output_file).unlink()
-                logger.debug(f"Временный файл результата удален: {output_file}")
+            if output_file.endswith('.json'):
+                parsed = self._parse_json(output_file)
+            else:
+                parsed = TranscriptionResult(text=self._parse_output(output_file))
+            text = parsed.text
             
             elapsed = time.time() - start_time
             logger.info(f"Транскрипция завершена за {elapsed:.2f}с: {len(text)} символов")
             
-            return text.strip()
+            language, language_prob = self._parse_language(result.stderr)
+            language = language or parsed.language
+            if language is None:
+                requested = (options.language if options else None) or self.whisper_config.language
+                language = None if requested == AUTO_LANGUAGE else requested
             
-        except subprocess.TimeoutExpired:
-            logger.error("Таймаут транскрипции")
-            raise RuntimeError("Таймаут транскрипции")
+            return TranscriptionResult(
+                text=text.strip(),
+                avg_logprob=parsed.avg_logprob,
+                language=language,
+                language_prob=language_prob,
+                engine="whisper_cpp",
+                model=Path(self.model_path).name,
+                audio_duration=len(audio_data) / self.config.audio.sample_rate,
+                elapsed=elapsed,
+                segments=parsed.segments,
+                words=parsed.words,
+            )
+
+        except subprocess.TimeoutExpired as e:
+            logger.error(f"Таймаут транскрипции ({e.timeout:.1f}с), процесс whisper.cpp завершен")
+            raise TranscriptionTimeoutError(f"Таймаут транскрипции ({e.timeout:.1f}с)") from e
+        except TranscriptionCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Ошибка транскрипции: {e}")
             raise
@@ -154,16 +217,51 @@ class WhisperCppTranscriber:
             # Очистка временного файла
             if temp_wav and Path(temp_wav).exists():
                 Path(temp_wav).unlink()
-                logger.debug(f"Временный файл удален: {temp_wav}")
-    
-    def _build_command(self, wav_file: str) -> list:
+                logger.debug("Временный файл удален: %s", temp_wav)
+            # Файл результата остается и после завершения процесса по отмене или таймауту
+            if output_file and Path(output_file).exists():
+                Path(output_file).unlink()
+                logger.debug("Временный файл результата удален: %s", output_file)
+
+    @staticmethod
+    def _run_process(
+        cmd: list, timeout: float, cancel: CancelToken | None
+    ) -> subprocess.CompletedProcess:
+        """
+        Запуск whisper-cli с таймаутом; отмена фразы завершает процесс
+
+        Raises:
+            subprocess.TimeoutExpired: Таймаут (процесс завершен)
+            TranscriptionCancelledError: Фраза отменена (процесс завершен)
+        """
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        remove = cancel.on_cancel(process.kill) if cancel is not None else lambda: None
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        finally:
+            remove()
+        if cancel is not None and cancel.cancelled:
+            logger.warning("Фраза отменена, процесс whisper.cpp завершен")
+            cancel.check()
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def _build_command(self, wav_file: str, options: DecodeOptions | None = None) -> list:
         """Построение команды для whisper.cpp"""
+        if options is None:
+            options = DecodePolicy.from_engine_config(self.whisper_config)
+
         binary_path = Path(self.whisper_config.binary_path)
         cmd = [str(binary_path.resolve())]
         
         # Основные параметры
-        cmd.extend(['-m', str(Path(self.whisper_config.model_path).resolve())])
-        cmd.extend(['-l', self.whisper_config.language])
+        cmd.extend(['-m', str(Path(self.model_path).resolve())])
+        # Язык из кэша (при auto) имеет приоритет над конфигурацией
+        language = options.language or self.whisper_config.language
+        cmd.extend(['-l', language])
         cmd.extend(['-f', wav_file])
         
         # Опции производительности
@@ -173,24 +271,40 @@ class WhisperCppTranscriber:
         cmd.extend(['-t', str(self.whisper_config.threads)])
         
         # Параметры качества
-        cmd.extend(['-tp', str(self.whisper_config.temperature)])
-        cmd.extend(['-bs', str(self.whisper_config.beam_size)])
-        cmd.extend(['-bo', str(self.whisper_config.best_of)])
+        cmd.extend(['-tp', str(options.temperature[0])])
+        if options.has_fallback:
+            # whisper.cpp повышает температуру на фиксированный шаг при неудаче
+            cmd.extend(['-tpi', str(round(options.temperature[1] - options.temperature[0], 4))])
+        else:
+            cmd.append('-nf')  # Без повторов с более высокой температурой
+        cmd.extend(['-bs', str(options.beam_size)])
+        cmd.extend(['-bo', str(options.best_of)])
         cmd.extend(['-nth', str(self.whisper_config.no_speech_threshold)])
         cmd.extend(['-et', str(self.whisper_config.compression_ratio_threshold)])
+        if options.initial_prompt:
+            cmd.extend(['--prompt', options.initial_prompt])
         
-        # Вывод только текста в файл
         # Определяем имя выходного файла (без расширения)
         output_file = Path(wav_file).stem
         output_dir = Path(wav_file).parent
         output_path = output_dir / output_file
         
-        cmd.append('-otxt')
-        cmd.append('-nt')
-        cmd.append('-np')  # Не печатать прогресс
+        timestamps = self.config.transcription.timestamps
+        if timestamps == "none":
+            # Вывод только текста в файл
+            cmd.append('-otxt')
+            cmd.append('-nt')
+            extension = '.txt'
+        else:
+            # JSON с таймингами сегментов; полный - с токенами (пословные тайминги и p)
+            cmd.append('-ojf' if timestamps == "word" else '-oj')
+            extension = '.json'
+        if language != AUTO_LANGUAGE:
+            # -np подавляет и строку "auto-detected language" - при auto она нужна
+            cmd.append('-np')  # Не печатать прогресс
         cmd.extend(['-of', str(output_path)])
         
-        return cmd, str(output_path) + '.txt'
+        return cmd, str(output_path) + extension
     
     def _parse_output(self, output_file: str) -> str:
         """
@@ -213,9 +327,111 @@ class WhisperCppTranscriber:
             with open(output_path, 'r', encoding='utf-8') as f:
                 text = f.read().strip()
             
-            logger.debug(f"Прочитано {len(text)} символов из {output_file}")
+            logger.debug("Прочитано %d символов из %s", len(text), output_file)
             return text
         except Exception as e:
             logger.error(f"Ошибка чтения файла результата: {e}")
             return ""
 
+    def _parse_json(self, output_file: str) -> TranscriptionResult:
+        """
+        Парсинг JSON вывода whisper.cpp (-oj / -ojf)
+
+        Args:
+            output_file: Путь к JSON файлу
+
+        Returns:
+            Результат с текстом, таблицами таймингов, языком и avg_logprob (по токенам)
+        """
+        output_path = Path(output_file)
+        if not output_path.exists():
+            logger.error(f"Файл результата не найден: {output_file}")
+            return TranscriptionResult(text="")
+
+        try:
+            # Токен может разрезать многобайтный символ - такие байты заменяются
+            with open(output_path, encoding='utf-8', errors='replace') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка чтения файла результата: {e}")
+            return TranscriptionResult(text="")
+
+        transcription = data.get("transcription", [])
+        segment_builder = SegmentTable.builder()
+        word_builder = WordTable.builder()
+        has_tokens = False
+        logprob_sum = 0.0
+        token_count = 0
+        for index, seg in enumerate(transcription):
+            offsets = seg.get("offsets", {})
+            segment_builder.append(
+                offsets.get("from", 0) / 1000.0, offsets.get("to", 0) / 1000.0, seg.get("text", "")
+            )
+            tokens = [
+                t for t in seg.get("tokens", ()) if not self._is_special_token(t.get("text", ""))
+            ]
+            if not tokens:
+                continue
+            has_tokens = True
+            for token in tokens:
+                if token.get("p", 0.0) > 0.0:
+                    logprob_sum += math.log(token["p"])
+                    token_count += 1
+            self._append_words(word_builder, seg.get("text", ""), tokens, index)
+
+        # Как -otxt: сегмент на строку
+        text = "\n".join(seg.get("text", "") for seg in transcription).strip()
+        return TranscriptionResult(
+            text=text,
+            avg_logprob=logprob_sum / token_count if token_count else None,
+            language=data.get("result", {}).get("language"),
+            segments=segment_builder.build() if transcription else None,
+            words=word_builder.build() if has_tokens else None,
+        )
+
+    @staticmethod
+    def _is_special_token(text: str) -> bool:
+        """Служебный токен whisper.cpp ([_BEG_], [_TT_150], <|endoftext|>)"""
+        return text.startswith("[_") or text.startswith("<|")
+
+    @staticmethod
+    def _append_words(builder, segment_text: str, tokens: list, segment_index: int) -> None:
+        """
+        Слова сегмента из токенов: новое слово начинается с токена с пробелом
+
+        Текст слов берется из текста сегмента, если число слов совпадает
+        (токены могут разрезать многобайтные символы), иначе - из токенов.
+        """
+        groups = []
+        for token in tokens:
+            if not groups or token.get("text", "").startswith(" "):
+                groups.append([])
+            groups[-1].append(token)
+
+        words = segment_text.split()
+        use_segment_words = len(words) == len(groups)
+        for i, group in enumerate(groups):
+            text = (
+                words[i] if use_segment_words else "".join(t.get("text", "") for t in group).strip()
+            )
+            probabilities = [t.get("p", float("nan")) for t in group]
+            builder.append(
+                group[0].get("offsets", {}).get("from", 0) / 1000.0,
+                group[-1].get("offsets", {}).get("to", 0) / 1000.0,
+                text,
+                sum(probabilities) / len(probabilities),
+                segment_index,
+            )
+
+    @staticmethod
+    def _parse_language(stderr: str) -> tuple:
+        """
+        Определенный язык и его вероятность из stderr whisper.cpp
+
+        Returns:
+            (язык, вероятность) или (None, None), если язык не определялся
+        """
+        match = _DETECTED_LANGUAGE.search(stderr or "")
+        if not match:
+            return None, None
+        return match.group(1), float(match.group(2))
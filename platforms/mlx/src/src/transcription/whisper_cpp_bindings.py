@@ -0,0 +1,248 @@
+"""
+whisper.cpp внутри процесса приложения через Python bindings (pywhispercpp)
+
+В отличие от WhisperCppTranscriber (запуск whisper-cli на каждую фразу):
+- контекст whisper (модель) загружается один раз и переиспользуется;
+- float32 буфер NumPy передается напрямую - без WAV файла и парсинга stdout;
+- пул потоков whisper задается whisper_cpp.threads.
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .deadline import (
+    DeadlineRunner,
+    EngineBusyError,
+    TranscriptionCancelledError,
+    TranscriptionTimeoutError,
+)
+from .language import AUTO_LANGUAGE
+from .policy import DecodeOptions, DecodePolicy
+from .registry import EngineCapabilities
+from .result import SegmentTable, TranscriptionResult
+
+logger = logging.getLogger(__name__)
+
+# Импорт pywhispercpp (может быть не установлен в тестовой среде)
+try:
+    from pywhispercpp.model import Model as WhisperCppModel
+    PYWHISPERCPP_AVAILABLE = True
+except ImportError:
+    PYWHISPERCPP_AVAILABLE = False
+    WhisperCppModel = None
+
+# Стратегии сэмплирования whisper_full (enum whisper_sampling_strategy)
+_SAMPLING_GREEDY = 0
+_SAMPLING_BEAM_SEARCH = 1
+
+
+class WhisperCppBindingsTranscriber:
+    """Транскрипция через whisper.cpp в процессе приложения (pywhispercpp)"""
+
+    CAPABILITIES = EngineCapabilities(timestamps=True, in_process=True)
+
+    def __init__(self, config, model_path: str | None = None):
+        """
+        Инициализация транскрибатора
+
+        Args:
+            config: Конфигурация приложения
+            model_path: Модель вместо whisper_cpp.model_path (например, для быстрого уровня)
+
+        Raises:
+            FileNotFoundError: Если модель не найдена
+            RuntimeError: Если pywhispercpp не установлен или модель не загружается
+        """
+        self.config = config
+        self.whisper_config = config.transcription.whisper_cpp
+        self.model_path = model_path or self.whisper_config.model_path
+
+        # Guard-проверки
+        self._check_dependencies()
+        self._check_model()
+
+        self.model = self._load_model()
+        # Контекст whisper не потокобезопасен
+        self._lock = threading.Lock()
+        # whisper_full не прерывается из Python - дедлайн через фоновый поток
+        self._runner = DeadlineRunner("whisper.cpp (bindings)")
+
+        logger.info("WhisperCppBindingsTranscriber инициализирован")
+
+    def _check_dependencies(self):
+        """Проверка наличия pywhispercpp"""
+        if not PYWHISPERCPP_AVAILABLE:
+            logger.error("❌ pywhispercpp не установлен")
+            logger.error(
+                "Установите: pip install pywhispercpp (или whisper_cpp.backend: subprocess)"
+            )
+            raise RuntimeError("pywhispercpp не установлен")
+
+    def _check_model(self):
+        """Проверка наличия модели (guard-проверка)"""
+        model_path = Path(self.model_path)
+        if not model_path.is_file():
+            logger.error(f"❌ Модель не найдена: {model_path}")
+            logger.error(
+                "Скачайте модель ggml и разместите в models/ или укажите путь в config.yaml"
+            )
+            raise FileNotFoundError(f"Модель не найдена: {model_path}")
+
+    def _load_model(self):
+        """Загрузка контекста whisper (один раз на процесс)"""
+        start_time = time.time()
+        try:
+            model = WhisperCppModel(
+                str(Path(self.model_path).resolve()),
+                params_sampling_strategy=_SAMPLING_GREEDY,
+                n_threads=self.whisper_config.threads,
+                print_progress=False,
+                print_realtime=False,
+            )
+        except Exception as e:
+            logger.error(f"❌ Не удалось загрузить модель whisper.cpp: {e}")
+            raise RuntimeError(f"Не удалось загрузить модель whisper.cpp: {e}") from e
+        logger.info(
+            f"✅ Контекст whisper.cpp загружен за {time.time() - start_time:.2f}с "
+            f"({Path(self.model_path).name}, потоков: {self.whisper_config.threads})"
+        )
+        return model
+
+    def transcribe(self, audio_data: np.ndarray, options: DecodeOptions | None = None) -> str:
+        """
+        Транскрибация аудио данных
+
+        Args:
+            audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
+
+        Returns:
+            Транскрибированный текст
+
+        Raises:
+            RuntimeError: При ошибке транскрипции
+        """
+        return self.transcribe_detailed(audio_data, options).text
+
+    def transcribe_detailed(
+        self,
+        audio_data: np.ndarray,
+        options: DecodeOptions | None = None
+    ) -> TranscriptionResult:
+        """
+        Транскрибация аудио данных с метаданными
+
+        Args:
+            audio_data: numpy array с аудио данными (float32, моно, 16kHz)
+            options: Параметры декодирования (по умолчанию - из конфигурации)
+
+        Returns:
+            Результат транскрипции
+
+        Raises:
+            RuntimeError: При ошибке транскрипции
+        """
+        start_time = time.time()
+
+        logger.info(f"Начало транскрипции whisper.cpp (bindings): {len(audio_data)} сэмплов")
+
+        if options is None:
+            options = DecodePolicy.from_engine_config(self.whisper_config)
+        language = options.language or self.whisper_config.language
+
+        params = self._build_params(options, language)
+
+        def decode():
+            with self._lock:
+                audio = np.ascontiguousarray(audio_data, dtype=np.float32)
+                detected = (None, None)
+                call_params = params
+                if language == AUTO_LANGUAGE:
+                    detected = self._detect_language(audio)
+                    call_params = {**params, 'language': detected[0]}
+                return self.model.transcribe(audio, **call_params), detected
+
+        try:
+            segments, (detected_language, language_prob) = self._runner.run(
+                decode, options.timeout, options.cancel
+            )
+        except (TranscriptionTimeoutError, TranscriptionCancelledError, EngineBusyError):
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка транскрипции whisper.cpp (bindings): {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            raise RuntimeError(f"Ошибка транскрипции: {e}") from e
+
+        # Как -otxt у whisper-cli: сегмент на строку - текст совпадает с subprocess вариантом
+        text = "\n".join(seg.text for seg in segments).strip()
+        segment_table = self._build_segments(segments)
+        elapsed = time.time() - start_time
+        logger.info(f"Транскрипция завершена за {elapsed:.2f}с: {len(text)} символов")
+
+        return TranscriptionResult(
+            text=text,
+            language=detected_language or (None if language == AUTO_LANGUAGE else language),
+            language_prob=language_prob,
+            engine="whisper_cpp",
+            model=Path(self.model_path).name,
+            audio_duration=len(audio_data) / self.config.audio.sample_rate,
+            elapsed=elapsed,
+            segments=segment_table,
+        )
+
+    def _detect_language(self, audio: np.ndarray) -> tuple[str, float]:
+        """
+        Определение языка по первому окну (как whisper-cli при -l auto)
+
+        whisper_full определяет язык тем же проходом, но вероятность пишет
+        только в лог; отдельное определение перед декодированием с найденным
+        языком стоит лишь повторного расчета мел-спектрограммы.
+
+        Returns:
+            (язык, вероятность)
+        """
+        (code, prob), _ = self.model.auto_detect_language(
+            audio, n_threads=self.whisper_config.threads
+        )
+        logger.debug(f"whisper.cpp (bindings): определен язык {code} (p = {prob:.3f})")
+        return code, float(prob)
+
+    def _build_segments(self, segments: list) -> SegmentTable | None:
+        """
+        Таблица сегментов (t0/t1 whisper.cpp - в сотых долях секунды)
+
+        Пословные тайминги через pywhispercpp недоступны - только сегменты.
+        """
+        if self.config.transcription.timestamps == "none" or not segments:
+            return None
+        builder = SegmentTable.builder()
+        for seg in segments:
+            builder.append(seg.t0 / 100.0, seg.t1 / 100.0, seg.text)
+        return builder.build()
+
+    def _build_params(self, options: DecodeOptions, language: str) -> dict:
+        """Параметры whisper_full - те же, что флаги команды WhisperCppTranscriber"""
+        return {
+            # Как whisper-cli: beam search только при beam_size > 1
+            'strategy': _SAMPLING_BEAM_SEARCH if options.beam_size > 1 else _SAMPLING_GREEDY,
+            'language': language,
+            'n_threads': self.whisper_config.threads,
+            'temperature': options.temperature[0],
+            # Шаг повышения температуры при неудаче; 0 - без повторов (как -nf)
+            'temperature_inc': (
+                round(options.temperature[1] - options.temperature[0], 4)
+                if options.has_fallback else 0.0
+            ),
+            'no_speech_thold': self.whisper_config.no_speech_threshold,
+            'entropy_thold': self.whisper_config.compression_ratio_threshold,
+            'greedy': {'best_of': options.best_of},
+            # patience не передается и в whisper-cli (-bp) - значение whisper.cpp по умолчанию
+            'beam_search': {'beam_size': options.beam_size, 'patience': -1.0},
+            'initial_prompt': options.initial_prompt or "",
+            # Как -nt у whisper-cli: без таймингов декодирование немного быстрее
+            'no_timestamps': self.config.transcription.timestamps == "none",
+        }
@@ -1,17 +1,113 @@
 """
 Настройка логирования для VTTv2
 Формат: ts level service msg meta
+
+Записи из рабочих потоков (захват, транскрипция, UI) только кладутся в
+очередь (QueueHandler); форматирование и запись в консоль/файл выполняет
+отдельный поток (QueueListener), поэтому DEBUG не задерживает захват и
+декодирование.
 """
+import atexit
+import contextlib
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import time
+from collections.abc import Iterator
 from pathlib import Path
-from typing import Optional
+
+# Контекст записи (идентификатор задачи и этап конвейера) текущего потока
+_context: contextvars.ContextVar[dict] = contextvars.ContextVar("vtt2_log_context", default={})
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+@contextlib.contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """
+    Поля, добавляемые ко всем записям внутри блока (job_id, stage, ...)
+
+    Пример:
+        with log_context(job_id=job_id, stage="transcription"):
+            ...
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class _ContextFilter(logging.Filter):
+    """Копирование контекста в запись (в потоке, который пишет в лог)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _context.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке
+
+    Стандартный prepare() форматирует запись целиком; здесь только
+    подставляются аргументы (объекты могут измениться, пока запись в очереди)
+    и сериализуется traceback - остальное делает поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON (ts, level, service, msg, контекст)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+            + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "service": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        entry.update(getattr(record, "context", None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    """Текстовый формат с контекстом в конце строки (meta)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            text += " " + " ".join(f"{key}={value}" for key, value in context.items())
+        return text
 
 
 def setup_logging(
     level: str = "INFO",
-    format_string: Optional[str] = None,
-    log_file: Optional[str] = None
+    format_string: str | None = None,
+    log_file: str | None = None,
+    json_format: bool = False,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5
 ) -> logging.Logger:
     """
     Настройка логирования для приложения
@@ -20,34 +116,69 @@ def setup_logging(
         level: Уровень логирования (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         format_string: Формат логов (по умолчанию: ts level service msg)
         log_file: Путь к файлу логов (None = только консоль)
+        json_format: JSON-строки вместо текста (для сбора логов)
+        max_bytes: Размер файла логов до ротации (0 - без ротации)
+        backup_count: Сколько старых файлов логов хранить
     
     Returns:
         Настроенный logger
     """
+    global _listener
+
     if format_string is None:
         format_string = "%(asctime)s %(levelname)s %(name)s %(message)s"
     
     # Конвертация строки уровня в константу
     numeric_level = getattr(logging, level.upper(), logging.INFO)
     
-    # Создание handlers
+    # Создание handlers (выполняются в потоке QueueListener)
     handlers = [logging.StreamHandler(sys.stdout)]
     
     if log_file:
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
-        handlers.append(logging.FileHandler(log_file))
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        ))
+
+    formatter = JsonFormatter() if json_format else _TextFormatter(format_string)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(_ContextFilter())
+    previous, _listener = _listener, logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
     
     # Настройка базового логирования
     logging.basicConfig(
         level=numeric_level,
-        format=format_string,
-        handlers=handlers,
+        handlers=[queue_handler],
         force=True  # Перезаписываем существующую конфигурацию
     )
+    # Повторная настройка: очередь старого слушателя дописывается, его файлы закрываются
+    if previous is not None:
+        _stop_listener(previous)
     
     logger = logging.getLogger("vtt2")
-    logger.info(f"Логирование инициализировано (уровень: {level})")
+    logger.info("Логирование инициализировано (уровень: %s)", level)
     
     return logger
 
+
+def stop_logging() -> None:
+    """Запись оставшихся в очереди сообщений и остановка потока логирования"""
+    global _listener
+    if _listener is not None:
+        _stop_listener(_listener)
+        _listener = None
+
+
+def _stop_listener(listener: logging.handlers.QueueListener) -> None:
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()  # sys.stdout StreamHandler не закрывает
+
+
+atexit.register(stop_logging)
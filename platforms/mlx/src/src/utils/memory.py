@@ -0,0 +1,126 @@
+"""
+Учет памяти по этапам обработки фразы
+
+Для каждого этапа (запись, подготовка аудио, транскрипция) запоминаются
+резидентная память процесса и размер буферов NumPy. Пик этапа берется из
+getrusage: если пик процесса вырос во время этапа, он достигнут в этом
+этапе - кратковременные копии аудио не теряются между замерами.
+"""
+import logging
+import os
+import resource
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def peak_rss_bytes() -> int:
+    """Пиковая резидентная память процесса за все время (getrusage)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: байты на macOS, килобайты на Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> int | None:
+    """Текущая резидентная память (None - без psutil на macOS)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class StageUsage:
+    """Замер одного выполнения этапа (байты)"""
+    stage: str
+    rss_start: int
+    rss_end: int = 0
+    peak_rss: int = 0
+    buffer_bytes: int = 0  # Буферы NumPy этапа (вход и результат)
+
+    def add(self, *buffers) -> None:
+        """Учет буферов этапа (ndarray или None)"""
+        self.buffer_bytes += sum(
+            getattr(buffer, "nbytes", 0) for buffer in buffers if buffer is not None
+        )
+
+    @property
+    def growth(self) -> int:
+        """Рост памяти от начала этапа до пика"""
+        return max(0, self.peak_rss - self.rss_start)
+
+
+@dataclass
+class StageStats:
+    """Статистика этапа по всем выполнениям (байты)"""
+    calls: int = 0
+    peak_rss: int = 0
+    max_growth: int = 0
+    max_buffer_bytes: int = 0
+    last: StageUsage | None = None
+
+
+class MemoryAccounting:
+    """Пиковая память и буферы NumPy по этапам обработки"""
+
+    def __init__(self):
+        self._stages: dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, *buffers) -> Iterator[StageUsage]:
+        """
+        Замер этапа (контекстный менеджер)
+
+        Args:
+            name: Имя этапа
+            *buffers: Входные буферы этапа; результат добавляется через usage.add()
+        """
+        start_peak = peak_rss_bytes()
+        start = current_rss_bytes()
+        usage = StageUsage(name, start if start is not None else start_peak)
+        usage.add(*buffers)
+        try:
+            yield usage
+        finally:
+            end_peak = peak_rss_bytes()
+            end = current_rss_bytes()
+            usage.rss_end = end if end is not None else end_peak
+            # Пик процесса вырос во время этапа - он достигнут в этом этапе
+            usage.peak_rss = (
+                end_peak if end_peak > start_peak else max(usage.rss_start, usage.rss_end)
+            )
+            self._record(usage)
+
+    def _record(self, usage: StageUsage) -> None:
+        with self._lock:
+            stats = self._stages.setdefault(usage.stage, StageStats())
+            stats.calls += 1
+            stats.peak_rss = max(stats.peak_rss, usage.peak_rss)
+            stats.max_growth = max(stats.max_growth, usage.growth)
+            stats.max_buffer_bytes = max(stats.max_buffer_bytes, usage.buffer_bytes)
+            stats.last = usage
+        logger.debug(
+            "Память этапа %s: пик %.0f MB (+%.0f MB), буферы %.1f MB",
+            usage.stage, usage.peak_rss / MB, usage.growth / MB, usage.buffer_bytes / MB
+        )
+
+    def stats(self) -> dict[str, StageStats]:
+        """Копия статистики по этапам"""
+        with self._lock:
+            return {name: replace(stats) for name, stats in self._stages.items()}
@@ -0,0 +1,336 @@
+"""
+Метрики VTTv2 в текстовом формате Prometheus
+
+Счетчики, gauge и гистограммы - словари под блокировкой: обновление стоит
+около микросекунды и может оставаться включенным постоянно. Значения,
+которые дешевле прочитать в момент запроса (память процесса, статистика
+движков), отдаются коллекторами.
+"""
+import logging
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+
+from .memory import current_rss_bytes, peak_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Sample(NamedTuple):
+    """Значение метрики: суффикс имени (_bucket, _sum, ...), метки, значение"""
+    suffix: str
+    labels: dict[str, str]
+    value: float
+
+
+class MetricFamily(NamedTuple):
+    """Метрика со всеми значениями (для вывода)"""
+    name: str
+    type: str  # counter, gauge, histogram
+    help: str
+    samples: list[Sample]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """Метрика с метками; значения - по кортежу значений меток"""
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        try:
+            key = tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            key = None
+        if key is None or len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name}: ожидаются метки {self.labelnames}, получены {tuple(labels)}"
+            )
+        return key
+
+    def _labels(self, key: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            items = list(self._values.items())
+        return MetricFamily(self.name, self.type, self.help, [
+            Sample("", self._labels(key), value) for key, value in items
+        ])
+
+
+class Counter(_Metric):
+    """Монотонный счетчик"""
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Счетчик не уменьшается")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Текущее значение"""
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (кумулятивно при выводе)"""
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        # Корзина с первой границей >= value (le - включительно); последняя - +Inf
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                item = self._values[key] = _HistogramValue(len(self.buckets) + 1)
+            item.counts[index] += 1
+            item.sum += value
+            item.count += 1
+
+    def collect(self) -> MetricFamily:
+        samples = []
+        with self._lock:
+            items = [
+                (key, list(item.counts), item.sum, item.count) for key, item in self._values.items()
+            ]
+        for key, counts, total, count in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append(
+                    Sample("_bucket", {**labels, "le": _format_value(bound)}, cumulative)
+                )
+            samples.append(Sample("_sum", labels, total))
+            samples.append(Sample("_count", labels, count))
+        return MetricFamily(self.name, self.type, self.help, samples)
+
+
+class MetricsRegistry:
+    """Набор метрик и коллекторов"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика уже зарегистрирована: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """Функция, возвращающая метрики в момент запроса"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self) -> list[MetricFamily]:
+        """Все метрики (ошибка коллектора не ломает остальной вывод)"""
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.warning(f"Ошибка коллектора метрик: {e}")
+        return families
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)"""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for sample in family.samples:
+                labels = ""
+                if sample.labels:
+                    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in sample.labels.items())
+                    labels = "{" + pairs + "}"
+                lines.append(f"{family.name}{sample.suffix}{labels} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes() -> int | None:
+    """Резидентная память процесса (если текущая недоступна - пиковая)"""
+    rss = current_rss_bytes()
+    return rss if rss is not None else peak_rss_bytes()
+
+
+def process_collector() -> list[MetricFamily]:
+    """Метрики процесса"""
+    rss = process_rss_bytes()
+    return [MetricFamily(
+        "vtt2_process_resident_memory_bytes", "gauge", "Резидентная память процесса (байт)",
+        [Sample("", {}, rss)] if rss is not None else []
+    )]
+
+
+def engine_collector(engine):
+    """
+    Коллектор статистики движков (читается в момент запроса)
+
+    Args:
+        engine: TranscriptionEngineWrapper
+    """
+    def collect():
+        families = [
+            MetricFamily("vtt2_model_load_seconds", "gauge", "Время загрузки движка (сек)", [
+                Sample("", {"engine": name}, seconds) for name, seconds in engine.load_times.items()
+            ]),
+        ]
+        for suffix, help, attribute in (
+            ("calls", "Вызовы движка", "calls"),
+            ("failures", "Ошибки движка", "failures"),
+            ("timeouts", "Превышения дедлайна", "timeouts"),
+        ):
+            families.append(MetricFamily(f"vtt2_engine_{suffix}_total", "counter", help, [
+                Sample("", {"engine": slot.name}, getattr(slot, attribute)) for slot in engine.slots
+            ]))
+        # Circuit breaker и резервирование
+        families.append(MetricFamily(
+            "vtt2_engine_breaker_open", "gauge", "Движок отключен circuit breaker (1 - да)",
+            [
+                Sample("", {"engine": slot.name}, int(slot.breaker.state == "open"))
+                for slot in engine.slots
+            ],
+        ))
+        families.append(MetricFamily(
+            "vtt2_engine_breaker_opens_total", "counter", "Отключения движка circuit breaker",
+            [Sample("", {"engine": slot.name}, slot.breaker.opens) for slot in engine.slots],
+        ))
+        fallback_stats = engine.fallback_stats
+        families.append(MetricFamily(
+            "vtt2_fallback_recovered_total", "counter", "Фразы, спасенные резервным движком",
+            [Sample("", {}, fallback_stats.recovered)],
+        ))
+        families.append(MetricFamily(
+            "vtt2_fallback_failed_total", "counter", "Фразы, на которых отказали все движки",
+            [Sample("", {}, fallback_stats.failed)],
+        ))
+        if engine.languages is not None:
+            stats = engine.languages.stats
+            families.append(MetricFamily("vtt2_language_cache_hits_total", "counter",
+                                         "Фразы с языком из кэша", [Sample("", {}, stats.hits)]))
+            families.append(MetricFamily("vtt2_language_detections_total", "counter",
+                                         "Проходы определения языка",
+                                         [Sample("", {}, stats.detections)]))
+        return families
+    return collect
+
+
+def start_http_server(
+    registry: MetricsRegistry, port: int, host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """
+    HTTP-эндпоинт /metrics в фоновом потоке
+
+    Raises:
+        OSError: Порт занят
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Запросы сборщика - каждые несколько секунд, в лог не пишем
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Метрики: http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,216 @@
+"""
+Профилирование медленных фраз: сэмплирование стеков всех потоков
+
+Фраза регистрируется при остановке записи и снимается после вставки.
+Пока фраза укладывается в порог, фоновый поток только спит до ее
+дедлайна. Если фраза его превысила - поток раз в interval_ms снимает
+стеки всех потоков (sys._current_frames) до ее завершения и пишет
+профиль: speedscope JSON (https://www.speedscope.app) или collapsed
+stacks (flamegraph.pl, speedscope), в имени файла - job_id.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Кадр стека: функция, файл, строка
+Frame = tuple[str, str, int]
+
+
+class _Job:
+    """Отслеживаемая фраза"""
+
+    __slots__ = ("job_id", "start", "deadline", "latency", "samples", "sampled_from")
+
+    def __init__(self, job_id: str | None, start: float, deadline: float):
+        self.job_id = job_id
+        self.start = start
+        self.deadline = deadline
+        self.latency = 0.0
+        # (поток, стек от корня) -> число сэмплов
+        self.samples: Counter = Counter()
+        self.sampled_from: float | None = None
+
+
+def _stack(frame, max_depth: int) -> tuple[Frame, ...]:
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        code = frame.f_code
+        stack.append((getattr(code, "co_qualname", code.co_name), code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def render_collapsed(samples: Counter) -> str:
+    """Collapsed stacks: "поток;функция (файл:строка);... число" на строку"""
+    lines = []
+    for (thread, stack), count in samples.most_common():
+        frames = [thread] + [
+            f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack
+        ]
+        lines.append(f"{';'.join(frames)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def render_speedscope(samples: Counter, interval: float, name: str) -> dict:
+    """Профиль speedscope: по профилю типа sampled на поток, веса - секунды"""
+    frames: list[dict] = []
+    index: dict[Frame, int] = {}
+    threads: dict[str, dict] = {}
+    for (thread, stack), count in samples.most_common():
+        profile = threads.setdefault(thread, {
+            "type": "sampled", "name": thread, "unit": "seconds",
+            "startValue": 0, "endValue": 0, "samples": [], "weights": [],
+        })
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            ids.append(index[frame])
+        profile["samples"].append(ids)
+        profile["weights"].append(count * interval)
+        profile["endValue"] += count * interval
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "vtt2",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": list(threads.values()),
+    }
+
+
+class SlowJobProfiler:
+    """Профилировщик фраз, превысивших порог задержки"""
+
+    def __init__(self, profiling_config=None):
+        """
+        Инициализация профилировщика
+
+        Args:
+            profiling_config: ProfilingConfig (None или enabled=false - выключен)
+        """
+        self.config = profiling_config
+        self.enabled = bool(profiling_config and profiling_config.enabled)
+        self._jobs: dict[int, _Job] = {}
+        self._finished: list[_Job] = []
+        self._cond = threading.Condition()
+        self._pending = 0
+        if self.enabled:
+            self.interval = profiling_config.interval_ms / 1000.0
+            self._thread = threading.Thread(target=self._run, name="slow-job-profiler", daemon=True)
+            self._thread.start()
+            logger.info(
+                f"Профилирование медленных фраз: > {profiling_config.threshold:.1f} с -> "
+                f"{profiling_config.directory}"
+            )
+
+    def begin(self) -> _Job | None:
+        """Начало фразы (None - профилирование выключено)"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        job = _Job(None, now, now + self.config.threshold)
+        with self._cond:
+            self._jobs[id(job)] = job
+            self._cond.notify()
+        return job
+
+    def end(self, job: _Job | None, job_id: str | None = None) -> None:
+        """
+        Завершение фразы; профиль медленной пишется в фоне
+
+        Args:
+            job: Результат begin()
+            job_id: Задача в спуле (в имени файла профиля)
+        """
+        if job is None:
+            return
+        with self._cond:
+            if self._jobs.pop(id(job), None) is None:
+                return
+            job.job_id = job_id
+            job.latency = time.monotonic() - job.start
+            if job.samples:
+                self._finished.append(job)
+                self._pending += 1
+            self._cond.notify()
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Ожидание записи профилей завершенных фраз"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def _run(self) -> None:
+        """Фоновый поток: сон до дедлайна, сэмплирование медленных фраз, запись профилей"""
+        own = threading.get_ident()
+        while True:
+            with self._cond:
+                finished, self._finished = self._finished, []
+                now = time.monotonic()
+                slow = [job for job in self._jobs.values() if job.deadline <= now]
+                if not finished and not slow:
+                    deadlines = [job.deadline for job in self._jobs.values()]
+                    self._cond.wait(min(deadlines) - now if deadlines else None)
+                    continue
+            for job in finished:
+                self._write(job)
+            if slow:
+                self._sample(slow, own)
+                time.sleep(self.interval)
+
+    def _sample(self, jobs: list[_Job], own: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        now = time.monotonic()
+        stacks = [
+            (names.get(ident, str(ident)), _stack(frame, self.config.max_depth))
+            for ident, frame in sys._current_frames().items() if ident != own
+        ]
+        with self._cond:
+            for job in jobs:
+                # Фраза могла завершиться, пока снимались стеки
+                if id(job) not in self._jobs:
+                    continue
+                if job.sampled_from is None:
+                    job.sampled_from = now
+                if now - job.sampled_from <= self.config.max_duration:
+                    job.samples.update(stacks)
+
+    def _write(self, job: _Job) -> None:
+        try:
+            directory = Path(self.config.directory).expanduser()
+            directory.mkdir(parents=True, exist_ok=True)
+            tag = re.sub(r"[^\w.-]", "_", job.job_id or "job")
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            if self.config.format == "speedscope":
+                path = directory / f"slow-{tag}-{stamp}.speedscope.json"
+                data = json.dumps(
+                    render_speedscope(
+                        job.samples, self.interval, f"vtt2 {job.job_id or ''}".strip()
+                    )
+                )
+            else:
+                path = directory / f"slow-{tag}-{stamp}.collapsed.txt"
+                data = render_collapsed(job.samples)
+            path.write_text(data, encoding="utf-8")
+            logger.warning(
+                f"Медленная фраза {job.job_id}: {job.latency:.1f} с "
+                f"(порог {self.config.threshold:.1f} с), профиль: {path}"
+            )
+        except OSError as e:
+            logger.warning(f"Не удалось записать профиль фразы {job.job_id}: {e}")
+        finally:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
@@ -0,0 +1,251 @@
+"""
+Трассировка диктовки: спаны этапов в формате OTLP/JSON (OpenTelemetry)
+
+Каждая фраза - трасса с корневым спаном "dictation" и дочерними спанами
+этапов (запись, подготовка аудио, транскрипция, вставка). Законченная
+трасса экспортируется из фонового потока: в файл JSON Lines (формат
+приемника otlpjsonfile) или POST на OTLP/HTTP коллектор. Выключенный
+трейсер возвращает общий пустой контекстный менеджер.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+SCOPE_NAME = "vtt2"
+
+# Текущий спан потока (родитель для вложенных спанов)
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "vtt2_current_span", default=None
+)
+
+
+def _attribute(key: str, value: Any) -> dict:
+    """Атрибут в формате OTLP/JSON"""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Span:
+    """Спан этапа; корневой спан собирает спаны своей трассы"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error",
+        "_spans"
+    )
+
+    def __init__(
+        self, name: str, trace_id: str, parent_id: str | None = None, spans: list | None = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes: dict[str, Any] = {}
+        self.error: str | None = None
+        # Общий список спанов трассы (у корня и всех потомков один и тот же)
+        self._spans = spans if spans is not None else []
+        self._spans.append(self)
+
+    def child(self, name: str) -> "Span":
+        return Span(name, self.trace_id, self.span_id, self._spans)
+
+    def set(self, **attributes) -> None:
+        """Атрибуты спана (engine, rtf, ...)"""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration(self) -> float:
+        """Длительность (сек)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _SpanScope:
+    """Контекстный менеджер спана: делает спан текущим, фиксирует ошибку и конец"""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.span.end()
+        _current.reset(self._token)
+        return False
+
+
+class _Activation:
+    """Контекстный менеджер: спан (трасса) текущим без завершения"""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, *exc) -> bool:
+        _current.reset(self._token)
+        return False
+
+
+class _NoopSpan:
+    """Пустой спан (трассировка выключена или нет текущей трассы)"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Трейсер диктовки"""
+
+    def __init__(self, tracing_config=None):
+        """
+        Инициализация трейсера
+
+        Args:
+            tracing_config: TracingConfig (None или enabled=false - трассировка выключена)
+        """
+        self.config = tracing_config
+        self.enabled = bool(tracing_config and tracing_config.enabled)
+        self._queue: queue.Queue | None = None
+        if self.enabled:
+            self._queue = queue.Queue(maxsize=1000)
+            threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True).start()
+            if tracing_config.exporter == "file":
+                target = tracing_config.path
+            else:
+                target = tracing_config.endpoint
+            logger.info(f"Трассировка: {tracing_config.exporter} ({target})")
+
+    def start_trace(self, name: str = "dictation", **attributes) -> Span | None:
+        """Корневой спан новой трассы (None - трассировка выключена)"""
+        if not self.enabled:
+            return None
+        root = Span(name, os.urandom(16).hex())
+        root.set(**attributes)
+        return root
+
+    def span(self, name: str, parent: Span | None = None, **attributes):
+        """
+        Дочерний спан этапа (контекстный менеджер)
+
+        Args:
+            name: Имя этапа
+            parent: Родитель (по умолчанию - текущий спан потока)
+        """
+        parent = parent or _current.get()
+        if parent is None:
+            return _NOOP
+        span = parent.child(name)
+        if attributes:
+            span.set(**attributes)
+        return _SpanScope(span)
+
+    def activate(self, span: Span | None):
+        """Спан текущим в этом потоке (вложенные спаны - его потомки)"""
+        return _Activation(span) if span is not None else _NOOP
+
+    def end_trace(self, root: Span | None, error: str | None = None) -> None:
+        """Завершение трассы и экспорт (в фоне)"""
+        if root is None or root.end_ns is not None:
+            return
+        if error:
+            root.error = error
+        root.end()
+        try:
+            self._queue.put_nowait(list(root._spans))
+        except queue.Full:
+            logger.warning("Очередь экспорта трасс переполнена, трасса отброшена")
+
+    def flush(self) -> None:
+        """Ожидание экспорта завершенных трасс"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def _payload(self, spans: list[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", self.config.service_name)]},
+            "scopeSpans": [
+                {"scope": {"name": SCOPE_NAME}, "spans": [span.to_otlp() for span in spans]}
+            ],
+        }]}
+
+    def _export_loop(self) -> None:
+        """Фоновый поток экспорта"""
+        while True:
+            spans = self._queue.get()
+            try:
+                payload = json.dumps(self._payload(spans), ensure_ascii=False)
+                if self.config.exporter == "file":
+                    path = Path(self.config.path).expanduser()
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write(payload + "\n")
+                else:
+                    request = urllib.request.Request(
+                        self.config.endpoint, data=payload.encode("utf-8"),
+                        headers={"Content-Type": "application/json"}, method="POST"
+                    )
+                    with urllib.request.urlopen(request, timeout=5):
+                        pass
+            except (OSError, urllib.error.URLError) as e:
+                logger.warning(f"Ошибка экспорта трассы: {e}")
+            finally:
+                self._queue.task_done()
@@ -3,7 +3,10 @@
 """
 import pytest
 import numpy as np
+from src.audio.dynamics import AutomaticGainControl, SpectralNoiseGate
 from src.audio.processor import AudioProcessor
+from src.audio.resampler import PolyphaseResampler
+from src.audio.ring_buffer import AudioRingBuffer
 
 
 class TestAudioProcessor:
@@ -104,3 +107,322 @@ class TestAudioProcessor:
         assert np.all(prepared <= 1.0)
         assert prepared.dtype == np.float32
 
+
+    def test_prepare_for_whisper_inplace(self):
+        """Тест нормализации float32 моно буфера на месте"""
+        audio_data = np.array([0.5, -0.25, 0.1], dtype=np.float32)
+
+        prepared = AudioProcessor.prepare_for_whisper(audio_data)
+
+        assert np.shares_memory(prepared, audio_data)
+        np.testing.assert_allclose(prepared, [1.0, -0.5, 0.2], rtol=1e-6)
+
+    def test_peak_amplitude(self):
+        """Тест однопроходного поиска пика (включая несколько блоков)"""
+        audio_data = np.zeros(200000, dtype=np.float32)
+        audio_data[150000] = -0.75
+        audio_data[10] = 0.5
+
+        assert AudioProcessor.peak_amplitude(audio_data) == 0.75
+        assert AudioProcessor.peak_amplitude(np.array([], dtype=np.float32)) == 0.0
+
+    def test_concatenate_mono_stereo(self):
+        """Тест склейки стерео чанков со сведением в моно"""
+        chunks = [
+            np.array([[1.0, 0.0], [0.5, 0.5]], dtype=np.float32),
+            np.array([[0.0, -1.0]], dtype=np.float32),
+        ]
+
+        audio = AudioProcessor.concatenate_mono(chunks)
+
+        assert audio.dtype == np.float32
+        np.testing.assert_allclose(audio, [0.5, 0.5, -0.5])
+
+    def test_concatenate_mono_single_channel(self):
+        """Тест склейки моно чанков формы (frames, 1)"""
+        chunks = [np.ones((4, 1), dtype=np.float32), np.zeros((2, 1), dtype=np.float32)]
+
+        audio = AudioProcessor.concatenate_mono(chunks)
+
+        assert audio.shape == (6,)
+        np.testing.assert_array_equal(audio, [1, 1, 1, 1, 0, 0])
+
+
+    def test_concatenate_mono_int16(self):
+        """Тест конвертации int16 чанков в float32 при склейке"""
+        chunks = [
+            np.array([[16384], [-32768]], dtype=np.int16),
+            np.array([[8192, -8192]], dtype=np.int16),
+        ]
+
+        audio = AudioProcessor.concatenate_mono(chunks)
+
+        assert audio.dtype == np.float32
+        np.testing.assert_allclose(audio, [0.5, -1.0, 0.0])
+
+
+class TestAudioMemory:
+    """Тесты выделения памяти при подготовке аудио (не больше одной копии)"""
+
+    SAMPLES = 16000 * 30  # 30 секунд
+
+    @staticmethod
+    def _peak_traced(func, *args):
+        """Пиковый объем памяти, выделенной во время вызова"""
+        import tracemalloc
+
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            result = func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, peak
+
+    def test_prepare_for_whisper_no_copy(self):
+        """Подготовка float32 моно буфера не создает копию"""
+        audio_data = np.random.randn(self.SAMPLES).astype(np.float32)
+
+        _, peak = self._peak_traced(AudioProcessor.prepare_for_whisper, audio_data)
+
+        assert peak < audio_data.nbytes // 4
+
+    def test_prepare_for_whisper_stereo_single_copy(self):
+        """Подготовка стерео данных делает не больше одной моно копии"""
+        stereo = np.random.randn(self.SAMPLES, 2).astype(np.float32)
+
+        prepared, peak = self._peak_traced(AudioProcessor.prepare_for_whisper, stereo)
+
+        assert peak < prepared.nbytes * 1.25
+
+    def test_recording_pipeline_single_copy(self):
+        """Склейка чанков + подготовка + транскрипция MLX: ровно одна копия"""
+        from unittest.mock import MagicMock, patch
+
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        chunks = [np.random.randn(1024, 1).astype(np.float32) for _ in range(self.SAMPLES // 1024)]
+        total_bytes = sum(chunk.nbytes for chunk in chunks)
+
+        mock_config = MagicMock()
+        mock_config.transcription.mlx_whisper.model_name = "mlx-community/whisper-medium"
+        mock_config.transcription.mlx_whisper.temperature = 0.0
+        mock_config.transcription.mlx_whisper.beam_size = 5
+        mock_config.transcription.mlx_whisper.best_of = 5
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'), \
+                patch.object(MLXWhisperTranscriber, '_check_model_cache'), \
+                patch('mlx_whisper.transcribe', return_value={"text": "ok"}) as mock_transcribe:
+            transcriber = MLXWhisperTranscriber(mock_config)
+
+            def pipeline():
+                audio = AudioProcessor.concatenate_mono(chunks)
+                audio = AudioProcessor.prepare_for_whisper(audio)
+                transcriber.transcribe(audio)
+                return audio
+
+            audio, peak = self._peak_traced(pipeline)
+
+        assert np.shares_memory(mock_transcribe.call_args[0][0], audio)
+        assert peak < total_bytes * 1.25
+
+
+class TestAudioRingBuffer:
+    """Тесты кольцевого буфера pre-roll"""
+
+    def test_write_and_read_with_wraparound(self):
+        """Тест записи с переходом через границу буфера"""
+        ring = AudioRingBuffer(capacity=8)
+
+        ring.write(np.arange(6, dtype=np.float32))
+        ring.write(np.arange(6, 11, dtype=np.float32))
+
+        assert ring.write_index == 11
+        assert ring.oldest_index == 3
+        np.testing.assert_array_equal(ring.read(3, 11).ravel(), np.arange(3, 11))
+
+    def test_latest_returns_last_frames(self):
+        """Тест чтения последних кадров (pre-roll)"""
+        ring = AudioRingBuffer(capacity=16, channels=2)
+        block = np.arange(20, dtype=np.float32).reshape(10, 2)
+
+        ring.write(block)
+
+        np.testing.assert_array_equal(ring.latest(3), block[-3:])
+        # Больше чем записано - возвращается все доступное
+        assert len(ring.latest(100)) == 10
+
+    def test_block_larger_than_capacity(self):
+        """Тест записи блока больше емкости буфера"""
+        ring = AudioRingBuffer(capacity=4)
+
+        ring.write(np.arange(10, dtype=np.float32))
+
+        assert ring.write_index == 10
+        np.testing.assert_array_equal(ring.latest(4).ravel(), [6, 7, 8, 9])
+
+    def test_read_overwritten_range_raises(self):
+        """Тест чтения уже перезаписанного диапазона"""
+        ring = AudioRingBuffer(capacity=4)
+        ring.write(np.arange(10, dtype=np.float32))
+
+        with pytest.raises(ValueError, match="недоступен"):
+            ring.read(0, 5)
+
+    def test_write_does_not_allocate(self):
+        """Тест что запись в буфер не выделяет память"""
+        import tracemalloc
+
+        ring = AudioRingBuffer(capacity=16000)
+        block = np.random.randn(1024, 1).astype(np.float32)
+
+        tracemalloc.start()
+        try:
+            for _ in range(50):
+                ring.write(block)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert peak < block.nbytes
+
+    def test_int16_buffer(self):
+        """Тест буфера int16 (вдвое меньше памяти чем float32)"""
+        ring = AudioRingBuffer(capacity=1000, dtype=np.int16)
+
+        ring.write(np.array([1, -2, 3], dtype=np.int16))
+
+        assert ring.dtype == np.int16
+        assert ring.read(0).dtype == np.int16
+        np.testing.assert_array_equal(ring.read(0).ravel(), [1, -2, 3])
+
+
+class TestPolyphaseResampler:
+    """Тесты полифазного ресемплера"""
+
+    @staticmethod
+    def _sine(rate, frequency=1000.0, duration=1.0):
+        t = np.arange(int(rate * duration)) / rate
+        return np.sin(2 * np.pi * frequency * t).astype(np.float32)
+
+    @pytest.mark.parametrize("src_rate", [48000, 44100, 22050, 8000])
+    def test_quality_against_reference(self, src_rate):
+        """Синус после ресемплинга совпадает с синусом, сгенерированным на 16 кГц"""
+        resampled = AudioProcessor.resample(self._sine(src_rate), src_rate, 16000)
+        reference = self._sine(16000)
+
+        assert len(resampled) == len(reference)
+        # Края исключаем (переходный процесс фильтра)
+        error = resampled[100:-100] - reference[100:-100]
+        assert np.sqrt(np.mean(error ** 2)) < 1e-4
+
+    def test_streaming_matches_batch(self):
+        """Потоковая обработка блоками произвольного размера совпадает с batch"""
+        audio = np.random.default_rng(0).standard_normal(44100).astype(np.float32)
+        resampler = PolyphaseResampler(44100, 16000)
+        batch = resampler.resample(audio)
+
+        parts = []
+        for start in range(0, len(audio), 1000):
+            parts.append(resampler.process(audio[start:start + 1000]))
+        parts.append(resampler.flush())
+        streamed = np.concatenate(parts)
+
+        assert len(streamed) == len(batch)
+        np.testing.assert_allclose(streamed, batch, atol=1e-6)
+
+    def test_stopband_attenuation(self):
+        """Частоты выше Найквиста целевой частоты подавляются (нет алиасинга)"""
+        resampled = AudioProcessor.resample(self._sine(48000, frequency=12000.0), 48000, 16000)
+
+        assert np.sqrt(np.mean(resampled[100:-100] ** 2)) < 1e-2
+
+    def test_passthrough_same_rate(self):
+        """Совпадающие частоты - без изменений"""
+        audio = self._sine(16000)
+        resampler = PolyphaseResampler(16000, 16000)
+
+        assert resampler.is_passthrough
+        np.testing.assert_array_equal(resampler.resample(audio), audio)
+
+    def test_invalid_rates(self):
+        """Неверные частоты отклоняются"""
+        with pytest.raises(ValueError, match="Неверные частоты"):
+            PolyphaseResampler(0, 16000)
+
+
+class TestAudioDynamics:
+    """Тесты АРУ и спектрального шумового гейта"""
+
+    SAMPLE_RATE = 16000
+
+    @staticmethod
+    def _process_blocks(stage, audio, block=1000):
+        parts = [stage.process(audio[i:i + block]) for i in range(0, len(audio), block)]
+        parts.append(stage.flush())
+        return np.concatenate(parts)
+
+    def _tone(self, seconds, amplitude, frequency=440.0):
+        t = np.arange(int(self.SAMPLE_RATE * seconds)) / self.SAMPLE_RATE
+        return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+    def test_agc_cough_does_not_silence_utterance(self):
+        """Громкий короткий звук не делает тихой всю запись (в отличие от пиковой нормализации)"""
+        cough = self._tone(0.1, 1.0)
+        speech = self._tone(2.0, 0.05)
+        audio = np.concatenate((cough, speech))
+
+        agc_out = self._process_blocks(AutomaticGainControl(self.SAMPLE_RATE), audio)
+        peak_out = AudioProcessor.normalize_audio(audio)
+
+        tail = slice(-self.SAMPLE_RATE, None)
+        assert agc_out[tail].std() > 2 * peak_out[tail].std()
+        assert np.all(np.abs(agc_out) <= 1.0)
+
+    def test_agc_does_not_boost_silence(self):
+        """В тишине усиление не растет"""
+        agc = AutomaticGainControl(self.SAMPLE_RATE)
+        quiet = np.random.default_rng(0).standard_normal(self.SAMPLE_RATE).astype(np.float32) * 1e-4
+
+        out = agc.process(quiet)
+
+        assert agc.gain <= 1.0
+        assert out.std() <= quiet.std() * 1.01
+
+    def test_noise_gate_preserves_length(self):
+        """Потоковый выход гейта совпадает по длине со входом"""
+        audio = self._tone(1.3, 0.3)
+
+        out = self._process_blocks(SpectralNoiseGate(self.SAMPLE_RATE), audio, block=777)
+
+        assert len(out) == len(audio)
+
+    def test_noise_gate_attenuates_noise_keeps_tone(self):
+        """Гейт ослабляет стационарный шум и сохраняет тон"""
+        rng = np.random.default_rng(0)
+        seconds = 4.0
+        tone = self._tone(seconds, 0.3)
+        # Тон звучит только во второй половине каждой секунды
+        t = np.arange(len(tone)) / self.SAMPLE_RATE
+        speech_mask = (t % 1.0) >= 0.5
+        noise = (0.02 * rng.standard_normal(len(tone))).astype(np.float32)
+        audio = tone * speech_mask + noise
+
+        out = self._process_blocks(SpectralNoiseGate(self.SAMPLE_RATE), audio)
+
+        # Начало каждой паузы/речи исключаем (переходы маски)
+        quiet = ((t % 1.0) > 0.1) & ((t % 1.0) < 0.45) & (t > 1.0)
+        loud = ((t % 1.0) > 0.6) & (t > 1.0)
+        assert out[quiet].std() < noise[quiet].std() / 2
+        assert out[loud].std() > 0.8 * audio[loud].std()
+
+    def test_noise_gate_mask_smoothing_edges(self):
+        """Сглаживание маски по частоте не переносит открытый DC на Найквист"""
+        masks = np.full((2, 9), 0.1)
+        masks[:, 0] = 1.0
+
+        smoothed = SpectralNoiseGate._smooth_frequency(masks)
+
+        np.testing.assert_allclose(smoothed[:, -1], 0.1)
+        np.testing.assert_allclose(smoothed[:, 0], 0.7)
+        np.testing.assert_allclose(smoothed[:, 1], 0.4)
@@ -0,0 +1,90 @@
+"""
+Тесты логирования VTTv2 (очередь, JSON, ротация)
+"""
+import json
+import logging
+import threading
+import time
+
+import pytest
+from src.utils.logger import log_context, setup_logging, stop_logging
+
+
+@pytest.fixture
+def restore_logging():
+    """Возврат конфигурации логирования pytest после теста"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestLogging:
+    """Тесты настройки логирования"""
+
+    def test_json_with_context(self, tmp_path, restore_logging):
+        """JSON-строки с полями контекста; сообщение форматируется с аргументами"""
+        log_file = tmp_path / "vtt2.log"
+        setup_logging("DEBUG", log_file=str(log_file), json_format=True)
+        logger = logging.getLogger("vtt2.test")
+        with log_context(job_id="job-1", stage="transcription"):
+            logger.info("Транскрипция: %d символов", 42)
+        try:
+            raise ValueError("сбой")
+        except ValueError:
+            logger.exception("Ошибка")
+        stop_logging()
+
+        entries = _lines(log_file)
+        entry = next(e for e in entries if e["msg"] == "Транскрипция: 42 символов")
+        assert (entry["level"], entry["service"], entry["job_id"], entry["stage"]) == (
+            "INFO", "vtt2.test", "job-1", "transcription"
+        )
+        error = entries[-1]
+        assert "job_id" not in error and "ValueError: сбой" in error["exc"]
+
+    def test_arguments_captured_at_call_time(self, tmp_path, restore_logging):
+        """Изменение аргумента после вызова не меняет запись в очереди"""
+        log_file = tmp_path / "vtt2.log"
+        setup_logging("INFO", format_string="%(message)s", log_file=str(log_file))
+        words = ["до"]
+        logging.getLogger("vtt2.test").info("Слова: %s", words)
+        words[0] = "после"
+        stop_logging()
+
+        assert "Слова: ['до']" in log_file.read_text(encoding="utf-8").splitlines()
+
+    def test_slow_handler_does_not_block_caller(self, tmp_path, restore_logging):
+        """Медленная запись в лог выполняется в потоке слушателя, а не у вызывающего"""
+        import src.utils.logger as logger_module
+        setup_logging("DEBUG", log_file=str(tmp_path / "vtt2.log"))
+        release = threading.Event()
+        slow = logging.Handler()
+        slow.emit = lambda record: release.wait(1.0)
+        logger_module._listener.handlers = (*logger_module._listener.handlers, slow)
+
+        start = time.perf_counter()
+        for i in range(100):
+            logging.getLogger("vtt2.test").debug("Кадр %d", i)
+        elapsed = time.perf_counter() - start
+        release.set()
+
+        assert elapsed < 0.5
+
+    def test_rotation(self, tmp_path, restore_logging):
+        """Файл логов ротируется по размеру"""
+        log_file = tmp_path / "vtt2.log"
+        setup_logging("INFO", log_file=str(log_file), max_bytes=2000, backup_count=2)
+        for i in range(200):
+            logging.getLogger("vtt2.test").info("Сообщение %d", i)
+        stop_logging()
+
+        assert (tmp_path / "vtt2.log.1").exists() and (tmp_path / "vtt2.log.2").exists()
+        assert not (tmp_path / "vtt2.log.3").exists()
+        assert log_file.stat().st_size <= 2000
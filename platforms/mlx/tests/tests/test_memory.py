@@ -0,0 +1,194 @@
+"""
+Тесты учета памяти по этапам и защиты памяти при декодировании
+"""
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from src.config.loader import (
+    DecodePolicyConfig,
+    MemoryGuardConfig,
+    PerformanceConfig,
+    PromptContextConfig,
+    TimeoutConfig,
+    TwoTierConfig,
+)
+from src.transcription.memory_guard import MB, MemoryGuard, chunk_bounds, estimate_model_mb
+from src.transcription.result import SegmentTable, TranscriptionResult, WordTable, merge_results
+from src.utils.memory import MemoryAccounting, current_rss_bytes
+
+
+class TestMemoryAccounting:
+    """Тесты учета памяти по этапам"""
+
+    def test_stage_peak_and_buffers(self):
+        """Временная копия внутри этапа видна в пике, буферы учитываются по nbytes"""
+        memory = MemoryAccounting()
+        audio = np.zeros(16000 * 60, dtype=np.float32)
+        with memory.stage("prepare", audio) as usage:
+            # Временный буфер больше текущего пика процесса - пик растет внутри этапа
+            scratch = np.ones(64 * MB, dtype=np.uint8)
+            del scratch
+            usage.add(None)
+        with memory.stage("prepare"):
+            pass
+
+        stats = memory.stats()["prepare"]
+        assert stats.calls == 2
+        assert stats.max_buffer_bytes == audio.nbytes
+        assert stats.max_growth >= 32 * MB
+        assert stats.peak_rss >= stats.last.rss_start
+
+    def test_current_rss(self):
+        """Текущая память процесса (Linux: /proc, иначе psutil)"""
+        rss = current_rss_bytes()
+        assert rss is None or rss > MB
+
+
+class TestMemoryGuard:
+    """Тесты защиты памяти"""
+
+    @staticmethod
+    def _guard(limit_mb=4096, rss_mb=1000, **overrides):
+        guard = MemoryGuard(MemoryGuardConfig(**overrides), limit_mb, 16000)
+        guard.rss = lambda: rss_mb * MB
+        return guard
+
+    def test_model_size_estimate(self, tmp_path):
+        """Размер модели: файл на диске, иначе по имени с учетом квантизации"""
+        model = tmp_path / "ggml-small.bin"
+        model.write_bytes(b"\0" * (3 * MB))
+        assert estimate_model_mb(str(model)) == pytest.approx(3.0)
+        assert estimate_model_mb("mlx-community/whisper-large-v3-turbo") == 1620
+        assert estimate_model_mb("mlx-community/whisper-medium") == 1530
+        assert estimate_model_mb("mlx-community/whisper-small-mlx-4bit") == pytest.approx(490 * 0.3)
+        assert estimate_model_mb("medium", compute_type="int8") == pytest.approx(1530 * 0.55)
+
+    def test_short_utterance_full(self):
+        """Короткая фраза с загруженной моделью - целиком"""
+        guard = self._guard()
+        plan = guard.plan(10.0, model_mb=1530, loaded=True)
+        assert plan.mode == "full" and plan.estimate_mb < 4096
+        assert guard.stats.full == 1
+
+    def test_long_recording_chunked(self):
+        """Часовая запись не укладывается целиком - фрагменты"""
+        guard = self._guard(limit_mb=3072, rss_mb=2000)
+        plan = guard.plan(3600.0, model_mb=1530, loaded=True, low_memory_mb=490)
+        assert plan.mode == "chunked" and plan.chunk_seconds == 300
+        assert plan.estimate_mb <= 3072 < guard.estimate_mb(3600.0, 1530, True, 2000)
+
+    def test_low_memory_model(self):
+        """Не укладываются и фрагменты - меньшая модель; без нее - фрагменты"""
+        guard = self._guard(limit_mb=2048, rss_mb=200)
+        plan = guard.plan(600.0, model_mb=3100, loaded=False, low_memory_mb=490)
+        assert plan.low_memory and plan.chunk_seconds == 300
+        plan = guard.plan(600.0, model_mb=3100, loaded=False)
+        assert plan.mode == "chunked"
+        assert (guard.stats.low_memory, guard.stats.chunked) == (1, 1)
+
+    def test_lowest_estimate_with_loaded_model(self):
+        """Загруженная основная модель: фрагменты, а не меньшая модель рядом с ней"""
+        guard = self._guard(limit_mb=4096, rss_mb=3500)
+        plan = guard.plan(1200.0, model_mb=1620, loaded=True, low_memory_mb=490)
+        assert plan.mode == "chunked" and plan.estimate_mb == pytest.approx(4100, abs=1)
+        assert plan.estimate_mb < guard.estimate_mb(300.0, 490, False, 3500)
+        # Меньшая модель выбирается, только если ее оценка ниже
+        guard = self._guard(limit_mb=2048, rss_mb=200)
+        plan = guard.plan(600.0, model_mb=3100, loaded=False, low_memory_mb=4000)
+        assert plan.mode == "chunked"
+
+    def test_observe_raises_estimate(self):
+        """Измеренный рост памяти выше оценки уточняет оценку на секунду аудио"""
+        guard = self._guard()
+        before = guard.bytes_per_second()
+        guard.plan(60.0, model_mb=1530, loaded=True)
+        guard.observe(int(512 * MB + 60 * before * 2))
+        assert guard.bytes_per_second() == pytest.approx(before * 2)
+        # Холодный запуск (загрузка модели) оценку не меняет
+        guard.plan(60.0, model_mb=1530, loaded=False)
+        guard.observe(4000 * MB)
+        assert guard.bytes_per_second() == pytest.approx(before * 2)
+
+    def test_chunk_bounds_cut_in_pause(self):
+        """Разрез фрагмента - в паузе перед границей"""
+        rate = 16000
+        audio = np.random.default_rng(0).uniform(-0.5, 0.5, 25 * rate).astype(np.float32)
+        audio[int(8.5 * rate):int(8.7 * rate)] = 0.0
+        bounds = chunk_bounds(audio, 10 * rate, rate)
+        assert bounds[0][0] == 0 and bounds[-1][1] == len(audio)
+        assert all(end - start <= 10 * rate for start, end in bounds)
+        assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+        assert 8.5 * rate <= bounds[0][1] <= 8.7 * rate
+        assert chunk_bounds(audio[:rate], 10 * rate, rate) == [(0, rate)]
+
+
+class TestChunkedDecoding:
+    """Тесты декодирования фрагментами"""
+
+    def test_merge_results(self):
+        """Тайминги фрагментов сдвигаются, уверенность - средняя по длительности"""
+        def chunk(text, logprob, duration):
+            segments = SegmentTable.builder()
+            segments.append(0.5, 1.5, text, logprob, 0.1)
+            words = WordTable.builder()
+            words.append(0.5, 1.5, text, 0.9, 0)
+            return TranscriptionResult(
+                text=text, avg_logprob=logprob, no_speech_prob=0.1, language="ru",
+                engine="mlx_whisper",
+                audio_duration=duration, elapsed=duration / 10, fallbacks=1,
+                segments=segments.build(), words=words.build()
+            )
+
+        result = merge_results(
+            [chunk("Первый.", -0.2, 300.0), chunk("Второй.", -0.5, 100.0)], [0.0, 300.0]
+        )
+        assert result.text == "Первый. Второй."
+        assert result.avg_logprob == pytest.approx(-0.275)
+        assert result.audio_duration == 400.0 and result.fallbacks == 2 and result.language == "ru"
+        assert [s.start for s in result.segments] == [0.5, 300.5]
+        assert [w.segment for w in result.words] == [0, 1]
+
+    def test_wrapper_decodes_long_recording_in_chunks(self):
+        """Обертка декодирует фрагментами; следующему фрагменту - конец предыдущего как prompt"""
+        from src.transcription.engine import TranscriptionEngineWrapper
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.engine = "mlx_whisper"
+        mock_config.transcription.mlx_whisper.model_name = "mlx-community/whisper-large-v3"
+        mock_config.transcription.mlx_whisper.beam_size = 5
+        mock_config.transcription.mlx_whisper.best_of = 5
+        mock_config.transcription.two_tier = TwoTierConfig()
+        mock_config.transcription.decode_policy = DecodePolicyConfig()
+        mock_config.transcription.timeout = TimeoutConfig()
+        mock_config.transcription.context = PromptContextConfig(enabled=False)
+        mock_config.transcription.fallback.engines = []
+        mock_config.transcription.fallback.failure_threshold = 3
+        mock_config.transcription.fallback.reset_timeout = 60.0
+        mock_config.performance = PerformanceConfig(
+            memory_limit_mb=4096, memory_guard=MemoryGuardConfig(chunk_seconds=60.0)
+        )
+
+        calls = []
+
+        def fake_transcribe(self, audio_data, options=None):
+            calls.append((len(audio_data), options.initial_prompt))
+            return TranscriptionResult(
+                text=f"Часть {len(calls)}.", audio_duration=len(audio_data) / 16000
+            )
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'), \
+                patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+            wrapper = TranscriptionEngineWrapper(mock_config)
+        wrapper.memory_guard.rss = lambda: 3000 * MB
+        audio = np.zeros(16000 * 150, dtype=np.float32)
+        with patch.object(MLXWhisperTranscriber, 'transcribe_detailed', fake_transcribe):
+            result = wrapper.transcribe_detailed(audio)
+
+        assert len(calls) == 3 and all(length <= 60 * 16000 for length, _ in calls)
+        assert [prompt for _, prompt in calls] == [None, "Часть 1.", "Часть 2."]
+        assert result.text == "Часть 1. Часть 2. Часть 3."
+        assert result.audio_duration == pytest.approx(150.0)
+        assert wrapper.memory_guard.stats.chunked == 1
@@ -0,0 +1,137 @@
+"""
+Тесты метрик VTTv2 (текстовый формат Prometheus)
+"""
+import time
+import urllib.request
+
+import pytest
+from src.utils.metrics import (
+    MetricFamily,
+    MetricsRegistry,
+    Sample,
+    engine_collector,
+    process_collector,
+    start_http_server,
+)
+
+
+class TestMetricsRegistry:
+    """Тесты реестра метрик"""
+
+    def test_counter_and_gauge(self):
+        """Счетчики и gauge с метками в формате Prometheus"""
+        registry = MetricsRegistry()
+        recordings = registry.counter("vtt2_recordings_total", "Записи", ["status"])
+        depth = registry.gauge("vtt2_queue_depth", "Очередь")
+        recordings.inc(status="ok")
+        recordings.inc(2, status="ok")
+        recordings.inc(status="failed")
+        depth.inc()
+        depth.inc()
+        depth.dec()
+
+        text = registry.render()
+        assert "# TYPE vtt2_recordings_total counter" in text
+        assert 'vtt2_recordings_total{status="ok"} 3' in text
+        assert 'vtt2_recordings_total{status="failed"} 1' in text
+        assert "vtt2_queue_depth 1" in text
+        with pytest.raises(ValueError):
+            recordings.inc(-1, status="ok")
+        with pytest.raises(ValueError):
+            recordings.inc(engine="mlx")
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Корзины гистограммы кумулятивные, граница le включительно"""
+        registry = MetricsRegistry()
+        decode = registry.histogram(
+            "vtt2_decode_seconds", "Транскрипция", ["engine"], buckets=(0.5, 1.0)
+        )
+        for value in (0.2, 0.5, 0.7, 3.0):
+            decode.observe(value, engine="mlx_whisper")
+
+        lines = registry.render().splitlines()
+        assert 'vtt2_decode_seconds_bucket{engine="mlx_whisper",le="0.5"} 2' in lines
+        assert 'vtt2_decode_seconds_bucket{engine="mlx_whisper",le="1"} 3' in lines
+        assert 'vtt2_decode_seconds_bucket{engine="mlx_whisper",le="+Inf"} 4' in lines
+        assert 'vtt2_decode_seconds_sum{engine="mlx_whisper"} 4.4' in lines
+        assert 'vtt2_decode_seconds_count{engine="mlx_whisper"} 4' in lines
+
+    def test_collectors(self):
+        """Коллекторы читаются при запросе; ошибка коллектора не ломает вывод"""
+        registry = MetricsRegistry()
+        loads = {"whisper_cpp": 1.5}
+        registry.add_collector(lambda: [MetricFamily(
+            "vtt2_model_load_seconds", "gauge", "Загрузка",
+            [Sample("", {"engine": name}, value) for name, value in loads.items()],
+        )])
+        registry.add_collector(lambda: 1 / 0)
+        registry.add_collector(process_collector)
+        loads["mlx_whisper"] = 2.25
+
+        text = registry.render()
+        assert 'vtt2_model_load_seconds{engine="mlx_whisper"} 2.25' in text
+        rss = next(
+            line
+            for line in text.splitlines()
+            if line.startswith("vtt2_process_resident_memory_bytes ")
+        )
+        assert int(rss.split()[1]) > 1024 * 1024
+
+    def test_engine_collector_breaker_and_fallback(self):
+        """Состояние circuit breaker по движкам и итоги резервирования"""
+        from types import SimpleNamespace
+
+        from src.transcription.fallback import CircuitBreaker, FallbackStats
+
+        broken = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+        broken.record_failure()
+
+        def slot(name, breaker):
+            return SimpleNamespace(name=name, breaker=breaker, calls=3, failures=1, timeouts=0)
+
+        engine = SimpleNamespace(
+            load_times={}, languages=None, fallback_stats=FallbackStats(recovered=2, failed=1),
+            slots=[slot("mlx_whisper", broken), slot("whisper_cpp", CircuitBreaker(3, 60.0))],
+        )
+        registry = MetricsRegistry()
+        registry.add_collector(engine_collector(engine))
+
+        lines = registry.render().splitlines()
+        assert 'vtt2_engine_breaker_open{engine="mlx_whisper"} 1' in lines
+        assert 'vtt2_engine_breaker_open{engine="whisper_cpp"} 0' in lines
+        assert 'vtt2_engine_breaker_opens_total{engine="mlx_whisper"} 1' in lines
+        assert "vtt2_fallback_recovered_total 2" in lines
+        assert "vtt2_fallback_failed_total 1" in lines
+        assert "# TYPE vtt2_engine_breaker_open gauge" in lines
+
+    def test_duplicate_name_rejected(self):
+        """Имя метрики регистрируется один раз"""
+        registry = MetricsRegistry()
+        registry.counter("vtt2_x_total", "x")
+        with pytest.raises(ValueError):
+            registry.gauge("vtt2_x_total", "x")
+
+    def test_update_is_cheap(self):
+        """Обновление метрик - единицы микросекунд (можно держать включенным)"""
+        registry = MetricsRegistry()
+        counter = registry.counter("vtt2_c_total", "c", ["status"])
+        histogram = registry.histogram("vtt2_h", "h", ["engine"])
+        start = time.perf_counter()
+        for _ in range(10000):
+            counter.inc(status="ok")
+            histogram.observe(0.3, engine="mlx_whisper")
+        assert (time.perf_counter() - start) / 10000 < 50e-6
+
+    def test_http_endpoint(self):
+        """Эндпоинт /metrics отдает текстовый формат"""
+        registry = MetricsRegistry()
+        registry.counter("vtt2_recordings_total", "Записи").inc()
+        server = start_http_server(registry, port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                assert "vtt2_recordings_total 1" in response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
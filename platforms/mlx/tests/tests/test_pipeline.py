@@ -0,0 +1,212 @@
+"""
+Тесты асинхронного ядра конвейера диктовки
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from src.pipeline.core import DictationPipeline, PipelineLoop
+from src.transcription.deadline import CancelToken, TranscriptionCancelledError
+from src.transcription.result import TranscriptionResult
+from src.utils.logger import _context, log_context
+from src.utils.memory import MemoryAccounting
+from src.utils.tracing import Tracer
+
+
+class FakeEngine:
+    """Движок с черновиком и задержкой декодирования"""
+
+    def __init__(self, delay=0.0, drafts=()):
+        self.delay = delay
+        self.drafts = drafts
+        self.memory_guard = None
+        self.calls = []
+        self.threads = []
+        self.contexts = []
+
+    cancel_token = staticmethod(CancelToken)
+
+    def transcribe_detailed(self, audio_data, on_draft=None, app_id=None, cancel=None):
+        self.calls.append(app_id)
+        self.threads.append(threading.current_thread().name)
+        self.contexts.append(_context.get())
+        for draft in self.drafts:
+            if on_draft:
+                on_draft(draft)
+        # Декодирование "по сегментам": отмена проверяется между ними
+        deadline = time.monotonic() + self.delay
+        while time.monotonic() < deadline:
+            cancel.check()
+            time.sleep(0.01)
+        return TranscriptionResult(text="привет мир", engine="fake")
+
+
+def make_pipeline(engine, **kwargs):
+    audio_processor = MagicMock()
+    audio_processor.prepare_for_whisper.side_effect = lambda audio: audio
+    return DictationPipeline(engine, audio_processor, MemoryAccounting(), Tracer(), **kwargs)
+
+
+AUDIO = np.zeros(16000, dtype=np.float32)
+
+
+class TestDictationPipeline:
+    """Тесты конвейера"""
+
+    def test_transcribe_in_worker_thread(self):
+        """Движок - в пуле потоков, контекст логов переходит в поток, этапы учтены"""
+        engine = FakeEngine()
+        text_processor = MagicMock()
+        text_processor.process.side_effect = str.capitalize
+        pipeline = make_pipeline(engine, text_processor=text_processor)
+
+        async def run():
+            with log_context(job_id="job-1"):
+                return await pipeline.transcribe(AUDIO, app_id="com.apple.TextEdit")
+
+        result = asyncio.run(run())
+
+        assert result.text == "Привет мир"
+        assert engine.calls == ["com.apple.TextEdit"]
+        assert engine.threads[0].startswith("transcribe")
+        assert engine.contexts[0]["job_id"] == "job-1"
+        assert set(pipeline.memory.stats()) == {"prepare", "transcription"}
+        assert not pipeline.busy
+
+    def test_stream_partials_then_final(self):
+        """Промежуточный текст (с постобработкой), затем результат"""
+        text_processor = MagicMock()
+        text_processor.process.side_effect = str.upper
+        pipeline = make_pipeline(
+            FakeEngine(drafts=["при", "привет"]), text_processor=text_processor
+        )
+
+        async def run():
+            return [event async for event in pipeline.stream(AUDIO)]
+
+        events = asyncio.run(run())
+
+        assert [(e.kind, e.text) for e in events] == [
+            ("partial", "ПРИ"), ("partial", "ПРИВЕТ"), ("final", "ПРИВЕТ МИР")
+        ]
+        assert events[-1].result.engine == "fake"
+
+    def test_timeout(self):
+        """Результат не получен за timeout - TimeoutError, декодирование прервано"""
+        pipeline = make_pipeline(FakeEngine(delay=5.0))
+        cancel = CancelToken()
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(pipeline.transcribe(AUDIO, timeout=0.05, cancel=cancel))
+        assert pipeline.active == 0
+        assert cancel.cancelled
+
+    def test_cancel_frees_worker(self):
+        """Отмена из другого потока (горячая клавиша) освобождает поток для следующей записи"""
+        engine = FakeEngine(delay=5.0)
+        pipeline = make_pipeline(engine, max_concurrent=1)
+        cancel = CancelToken()
+
+        async def run():
+            first = asyncio.ensure_future(pipeline.transcribe(AUDIO, app_id="long", cancel=cancel))
+            await asyncio.sleep(0.05)
+            threading.Thread(target=cancel.cancel).start()
+            with pytest.raises(TranscriptionCancelledError):
+                await first
+            engine.delay = 0.0
+            return await asyncio.wait_for(pipeline.transcribe(AUDIO, app_id="next"), 1.0)
+
+        start = time.monotonic()
+        result = asyncio.run(run())
+
+        assert result.text == "привет мир"
+        assert engine.calls == ["long", "next"]
+        assert time.monotonic() - start < 2
+
+    def test_concurrency_and_cancel_queued(self):
+        """max_concurrent=1: вторая запись ждет; отмененная из очереди не декодируется"""
+        engine = FakeEngine(delay=0.1)
+        pipeline = make_pipeline(engine, max_concurrent=1)
+
+        async def run():
+            first = asyncio.ensure_future(pipeline.transcribe(AUDIO, app_id="first"))
+            second = asyncio.ensure_future(pipeline.transcribe(AUDIO, app_id="second"))
+            await asyncio.sleep(0.02)
+            assert pipeline.active == 2 and pipeline.saturated
+            second.cancel()
+            await first
+            with pytest.raises(asyncio.CancelledError):
+                await second
+
+        asyncio.run(run())
+        pipeline.close()
+
+        assert engine.calls == ["first"]
+
+    def test_loop_from_sync_code(self):
+        """Синхронный вызывающий (меню, горячие клавиши) получает concurrent.futures.Future"""
+        loop = PipelineLoop()
+        pipeline = make_pipeline(FakeEngine())
+        try:
+            future = loop.submit(pipeline.transcribe(AUDIO))
+            assert future.result(timeout=5).text == "привет мир"
+        finally:
+            loop.stop()
+            pipeline.close()
+
+    def test_saturated_from_ui_thread(self):
+        """saturated читается из потока UI, пока цикл событий меняет счетчик"""
+        loop = PipelineLoop()
+        pipeline = make_pipeline(FakeEngine(delay=5.0), max_concurrent=1)
+        cancel = CancelToken()
+        try:
+            future = loop.submit(pipeline.transcribe(AUDIO, cancel=cancel))
+            deadline = time.monotonic() + 2
+            while not pipeline.saturated and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert pipeline.saturated and pipeline.busy
+
+            cancel.cancel()
+            with pytest.raises(TranscriptionCancelledError):
+                future.result(timeout=2)
+            assert not pipeline.saturated and pipeline.active == 0
+        finally:
+            loop.stop()
+            pipeline.close()
+
+    def test_spooled_before_queue_survives_prepare_error(self, tmp_path):
+        """Запись в спуле до очереди: ошибка подготовки не теряет ее, на диске - исходное аудио"""
+        from src.audio.processor import AudioProcessor
+        from src.config.loader import SpoolConfig
+        from src.storage.spool import AudioSpool
+
+        config = SpoolConfig(enabled=True, directory=str(tmp_path))
+        spool = AudioSpool(config, 16000)
+        audio = np.full(16000, 0.25, dtype=np.float32)
+        engine = FakeEngine()
+
+        # Подготовка нормализует копию - спул не видит изменений буфера
+        pipeline = make_pipeline(engine)
+        pipeline.audio_processor.prepare_for_whisper.side_effect = (
+            AudioProcessor.prepare_for_whisper
+        )
+        kept = spool.submit(audio, "a")
+        asyncio.run(pipeline.transcribe(audio, app_id="a"))
+        assert np.all(audio == 0.25)
+
+        failing = make_pipeline(engine)
+        failing.audio_processor.prepare_for_whisper.side_effect = RuntimeError("bad audio")
+        failed = spool.submit(np.full(16000, 0.25, dtype=np.float32), "b")
+        spool.mark_started(failed)
+        with pytest.raises(RuntimeError):
+            asyncio.run(failing.transcribe(audio, app_id="b"))
+        spool.close()
+
+        restarted = AudioSpool(config, 16000)
+        assert [job.job_id for job in restarted.pending()] == [kept, failed]
+        assert np.abs(restarted.load(kept) - 0.25).max() < 1e-3
+        assert engine.calls == ["a"]
+        restarted.close()
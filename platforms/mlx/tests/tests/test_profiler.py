@@ -0,0 +1,89 @@
+"""
+Тесты профилирования медленных фраз
+"""
+import json
+import time
+
+from src.config.loader import ProfilingConfig
+from src.utils.profiler import SlowJobProfiler
+
+
+def _stall(seconds):
+    """Зависание этапа (в профиле - этот кадр)"""
+    time.sleep(seconds)
+
+
+def _profiler(tmp_path, **overrides):
+    settings = {
+        "enabled": True, "threshold": 0.05, "interval_ms": 5, "directory": str(tmp_path),
+        **overrides
+    }
+    return SlowJobProfiler(ProfilingConfig(**settings))
+
+
+class TestSlowJobProfiler:
+    """Тесты профилировщика"""
+
+    def test_disabled(self, tmp_path):
+        """Выключенный профилировщик ничего не отслеживает"""
+        profiler = SlowJobProfiler(ProfilingConfig(enabled=False, directory=str(tmp_path)))
+        job = profiler.begin()
+        assert job is None
+        profiler.end(job, "job-1")
+        profiler.flush()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_fast_job_not_profiled(self, tmp_path):
+        """Фраза в пределах порога - без профиля"""
+        profiler = _profiler(tmp_path, threshold=1.0)
+        profiler.end(profiler.begin(), "fast")
+        time.sleep(0.05)
+        profiler.flush(timeout=5)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_speedscope(self, tmp_path):
+        """Медленная фраза - профиль speedscope с job_id в имени и зависшим кадром"""
+        profiler = _profiler(tmp_path)
+        job = profiler.begin()
+        _stall(0.3)
+        profiler.end(job, "20250101-120000-abc123")
+        profiler.flush(timeout=5)
+
+        [path] = tmp_path.iterdir()
+        assert path.name.startswith(
+            "slow-20250101-120000-abc123-"
+        ) and path.name.endswith(".speedscope.json")
+        data = json.loads(path.read_text(encoding="utf-8"))
+        assert data["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+        frames = data["shared"]["frames"]
+        main = next(p for p in data["profiles"] if p["name"] == "MainThread")
+        assert main["type"] == "sampled" and len(main["samples"]) == len(main["weights"])
+        assert 0.02 < main["endValue"] < 0.5
+        assert any(frames[i]["name"] == "_stall" for stack in main["samples"] for i in stack)
+
+    def test_collapsed(self, tmp_path):
+        """Collapsed stacks: поток;кадры число"""
+        profiler = _profiler(tmp_path, format="collapsed")
+        job = profiler.begin()
+        _stall(0.2)
+        profiler.end(job, None)
+        profiler.flush(timeout=5)
+
+        [path] = tmp_path.iterdir()
+        assert path.name.startswith("slow-job-") and path.name.endswith(".collapsed.txt")
+        lines = path.read_text(encoding="utf-8").splitlines()
+        stall = [
+            line
+            for line in lines
+            if line.startswith("MainThread;") and "_stall (test_profiler.py:" in line
+        ]
+        assert stall and all(int(line.rsplit(" ", 1)[1]) > 0 for line in stall)
+        assert not any("SlowJobProfiler._sample" in line for line in lines)
+
+    def test_begin_end_is_cheap(self, tmp_path):
+        """Отслеживание быстрой фразы - микросекунды"""
+        profiler = _profiler(tmp_path, threshold=60.0)
+        start = time.perf_counter()
+        for _ in range(1000):
+            profiler.end(profiler.begin(), "fast")
+        assert (time.perf_counter() - start) / 1000 < 200e-6
@@ -0,0 +1,218 @@
+"""
+Тесты хранения записей VTTv2 (спул аудио)
+"""
+import json
+import time
+
+import numpy as np
+import pytest
+from src.config.loader import SpoolConfig
+from src.storage.spool import AudioSpool
+
+
+def _speech(seconds: float = 1.0, sample_rate: int = 16000) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+class TestAudioSpool:
+    """Тесты спула записей"""
+
+    @staticmethod
+    def _spool(tmp_path, **overrides) -> AudioSpool:
+        return AudioSpool(SpoolConfig(directory=str(tmp_path), **overrides), 16000)
+
+    def test_submit_writes_compressed_audio(self, tmp_path):
+        """Запись сохраняется в FLAC и журналируется, буфер передается без копии"""
+        from unittest.mock import patch
+
+        import soundfile as sf
+
+        spool = self._spool(tmp_path)
+        audio = _speech()
+        job_id = spool.new_job_id()
+        with patch("src.storage.spool.sf.write", wraps=sf.write) as write:
+            assert spool.submit(audio, "com.apple.Notes", job_id) == job_id
+            spool.flush()
+
+        assert write.call_args[0][1] is audio
+
+        assert (tmp_path / f"{job_id}.flac").stat().st_size < audio.nbytes
+        restored = spool.load(job_id)
+        assert np.abs(restored - _speech()).max() < 1e-3
+        events = [
+            json.loads(line) for line in (tmp_path / "journal.jsonl").read_text().splitlines()
+        ]
+        assert events[-1]["state"] == "recorded" and events[-1]["app_id"] == "com.apple.Notes"
+        spool.close()
+
+    def test_unfinished_jobs_replayed_after_restart(self, tmp_path):
+        """После перезапуска незавершенные записи возвращаются, завершенные и отмененные - нет"""
+        spool = self._spool(tmp_path)
+        done = spool.submit(_speech(), "a")
+        crashed = spool.submit(_speech(), "b")
+        failed = spool.submit(_speech(), "c")
+        spool.mark_started(done)
+        spool.mark_done(done, 10)
+        spool.mark_started(crashed)
+        spool.mark_started(failed)
+        spool.mark_failed(failed, "Ошибка всех движков транскрипции")
+        cancelled = spool.submit(_speech(), "d")
+        spool.mark_started(cancelled)
+        spool.mark_cancelled(cancelled)
+        spool.close()
+
+        restarted = self._spool(tmp_path)
+        pending = restarted.pending()
+        assert [job.job_id for job in pending] == [crashed, failed]
+        assert pending[0].app_id == "b" and pending[0].attempts == 1
+        restarted.close()
+
+    def test_attempts_are_limited(self, tmp_path):
+        """Запись, ронявшая приложение max_attempts раз, больше не повторяется"""
+        spool = self._spool(tmp_path, max_attempts=2)
+        job_id = spool.submit(_speech())
+        spool.mark_started(job_id)
+        spool.mark_started(job_id)
+        spool.close()
+
+        assert self._spool(tmp_path, max_attempts=2).pending() == []
+
+    def test_orphan_audio_is_recovered(self, tmp_path):
+        """Аудио без записи в журнале (падение между файлом и журналом) восстанавливается"""
+        spool = self._spool(tmp_path)
+        job_id = spool.submit(_speech())
+        spool.close()
+        (tmp_path / "journal.jsonl").unlink()
+        (tmp_path / "partial.flac.tmp").write_bytes(b"\0")
+
+        restarted = self._spool(tmp_path)
+        assert [job.job_id for job in restarted.pending()] == [job_id]
+        assert not (tmp_path / "partial.flac.tmp").exists()
+        restarted.close()
+
+    def test_retention_by_age_and_size(self, tmp_path):
+        """Старые записи удаляются; сверх лимита размера - самые старые обработанные"""
+        spool = self._spool(tmp_path, max_size_mb=1, max_age_days=1)
+        old = spool.submit(_speech())
+        spool.flush()
+        stale = time.time() - 2 * 86400
+        spool._jobs[old].created = stale
+
+        noise = np.random.default_rng(0).uniform(-0.5, 0.5, 10 * 16000).astype(np.float32)
+        finished = []
+        for _ in range(3):
+            job_id = spool.submit(noise)  # ~0.3 MB FLAC (шум почти не сжимается)
+            spool.mark_done(job_id)
+            finished.append(job_id)
+        pending = spool.submit(noise)
+        spool.flush()
+
+        remaining = {path.stem for path in tmp_path.glob("*.flac")}
+        assert old not in remaining
+        assert pending in remaining
+        assert finished[0] not in remaining and finished[1] in remaining
+        assert sum(path.stat().st_size for path in tmp_path.glob("*.flac")) <= 1024 * 1024
+        # Журнал сжат до оставшихся задач
+        ids = {
+            json.loads(line)["id"] for line in (tmp_path / "journal.jsonl").read_text().splitlines()
+        }
+        assert old not in ids
+        spool.close()
+
+    def test_opus_format(self, tmp_path):
+        """Opus - в разы меньше FLAC"""
+        import soundfile as sf
+        if "OPUS" not in sf.available_subtypes("OGG"):
+            pytest.skip("libsndfile без Opus")
+
+        spool = self._spool(tmp_path, format="opus")
+        job_id = spool.submit(_speech(5.0))
+        spool.flush()
+
+        assert (tmp_path / f"{job_id}.opus").exists()
+        assert len(spool.load(job_id)) == pytest.approx(5 * 16000, rel=0.05)
+        spool.close()
+
+
+class TestTranscriptHistory:
+    """Тесты истории транскриптов (SQLite FTS5)"""
+
+    @staticmethod
+    def _history(tmp_path, **overrides):
+        from src.config.loader import HistoryConfig
+        from src.storage.history import TranscriptHistory
+        return TranscriptHistory(
+            HistoryConfig(path=str(tmp_path / "history.db"), flush_interval=0.0, **overrides)
+        )
+
+    def test_prefix_and_phrase_search(self, tmp_path):
+        """Слова ищутся по началу, фраза в кавычках - точно; новые записи первыми"""
+        history = self._history(tmp_path)
+        history.add(
+            "Транскрипция встречи по бюджету", app_id="com.apple.Notes", engine="mlx_whisper"
+        )
+        history.add("Бюджет встречи утвержден")
+        history.add("Совсем другой текст")
+        history.flush()
+
+        assert [e.text for e in history.search("бюдж встреч")] == [
+            "Бюджет встречи утвержден", "Транскрипция встречи по бюджету",
+        ]
+        assert [
+            e.text for e in history.search('"встречи по бюджету"')
+        ] == ["Транскрипция встречи по бюджету"]
+        entry = history.search("транс")[0]
+        assert entry.app_id == "com.apple.Notes" and entry.engine == "mlx_whisper"
+        history.close()
+
+    def test_query_syntax_is_escaped(self, tmp_path):
+        """Операторы FTS5 в запросе не ломают поиск"""
+        history = self._history(tmp_path)
+        history.add("NEAR(a b) OR текст")
+        history.flush()
+
+        assert len(history.search('NEAR( "OR" * -текст')) == 1
+        assert history.search('*:^()') == []
+        history.close()
+
+    def test_result_and_persistence(self, tmp_path):
+        """TranscriptionResult сохраняется с таймингами и доступен после перезапуска"""
+        from src.transcription.result import TranscriptionResult
+
+        history = self._history(tmp_path)
+        history.add_result(
+            TranscriptionResult(text="Привет", engine="whisper_cpp", model="ggml-small.bin",
+                                language="ru", audio_duration=2.0, elapsed=0.3),
+            app_id="com.apple.Notes", job_id="20261019-101010-abcdef",
+        )
+        history.close()
+
+        reopened = self._history(tmp_path)
+        entry = reopened.recent()[0]
+        assert (entry.model, entry.language, entry.audio_duration, entry.elapsed, entry.job_id) == (
+            "ggml-small.bin", "ru", 2.0, 0.3, "20261019-101010-abcdef"
+        )
+        assert "[com.apple.Notes] Привет" in entry.summary()
+        reopened.close()
+
+    def test_retention_keeps_last_entries(self, tmp_path):
+        """max_entries: старые записи удаляются вместе с индексом"""
+        history = self._history(tmp_path, max_entries=3)
+        for i in range(5):
+            history.add(f"запись номер{i}")
+        history.flush()
+
+        assert history.count() == 3
+        assert [e.text for e in history.search("запись")] == [
+            "запись номер4", "запись номер3", "запись номер2"
+        ]
+        assert history.search("номер0") == []
+        history.close()
+
+    def test_history_off_and_bounded_by_default(self):
+        """По умолчанию история выключена и ограничена по числу записей"""
+        from src.config.loader import HistoryConfig
+        config = HistoryConfig()
+        assert config.enabled is False
+        assert config.max_entries == 1000
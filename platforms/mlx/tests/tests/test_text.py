@@ -0,0 +1,121 @@
+"""
+Тесты постобработки текста VTTv2
+"""
+import random
+
+from src.config.loader import TextProcessingConfig
+from src.text.numbers import normalize_numbers
+from src.text.processor import StreamingTextProcessor, TextProcessor
+from src.text.vocabulary import VocabularyMatcher, load_vocabulary_file
+
+VOCABULARY = {
+    "джи пи ти": "GPT",
+    "пайтон": "Python",
+    "айфон": "iPhone",
+    "машинное обучение": "ML",
+    "open ai": "OpenAI",
+}
+
+
+def _processor(**overrides) -> TextProcessor:
+    return TextProcessor(TextProcessingConfig(enabled=True, vocabulary=VOCABULARY, **overrides))
+
+
+class TestVocabularyMatcher:
+    """Тесты автомата замен"""
+
+    def test_whole_words_case_insensitive(self):
+        """Замена по целым словам без учета регистра"""
+        matcher = VocabularyMatcher({"кот": "КОТ", "пи": "π"})
+        assert matcher.replace("Кот и котенок, пи и пирог") == "КОТ и котенок, π и пирог"
+
+    def test_leftmost_longest(self):
+        """Из пересекающихся фраз выбирается самая левая, затем самая длинная"""
+        matcher = VocabularyMatcher(
+            {"нью": "new", "нью йорк": "New York", "йорк сити": "York City"}
+        )
+        assert matcher.replace("нью йорк сити") == "New York сити"
+
+    def test_suffix_outputs(self):
+        """Фраза внутри другой фразы находится через fail-переходы"""
+        matcher = VocabularyMatcher({"abcd": "X", "bc": "Y", "c": "Z"})
+        assert matcher.replace("abce bc c") == "abce Y Z"
+
+    def test_removals_take_trailing_comma(self):
+        """Удаляемые фразы убираются вместе с запятой после них"""
+        matcher = VocabularyMatcher({}, removals=["э", "как бы"])
+        assert matcher.replace("Э, привет, как бы, мир") == "привет, мир"
+
+    def test_vocabulary_file(self, tmp_path):
+        """Файл словаря: фраза<TAB>замена, комментарии пропускаются"""
+        path = tmp_path / "vocabulary.tsv"
+        path.write_text("# термины\nвэ тэ тэ\tVTTv2\n\nкубер\tKubernetes\n", encoding="utf-8")
+        assert load_vocabulary_file(str(path)) == {"вэ тэ тэ": "VTTv2", "кубер": "Kubernetes"}
+
+
+class TestNumbers:
+    """Тесты нормализации чисел"""
+
+    def test_compound_numbers(self):
+        """Составные числа русские и английские"""
+        assert normalize_numbers("две тысячи двадцать шесть год") == "2026 год"
+        assert normalize_numbers("три миллиона пятьсот тысяч") == "3500000"
+        assert normalize_numbers("one hundred and twenty-one") == "121"
+
+    def test_small_and_ambiguous_left_as_words(self):
+        """Малые однословные, перечисления и составные порядковые остаются словами"""
+        assert normalize_numbers("один из них") == "один из них"
+        assert normalize_numbers("в пять двадцать") == "в пять двадцать"
+        assert normalize_numbers("двадцать третьем году") == "двадцать третьем году"
+        assert normalize_numbers("пятнадцать минут") == "15 минут"
+
+
+class TestTextProcessor:
+    """Тесты конвейера постобработки"""
+
+    def test_pipeline(self):
+        """Словарь, паразиты, числа и заглавные буквы"""
+        processor = _processor()
+        text = "Э, привет. айфон и пайтон стоят двадцать пять тысяч рублей, эм. um, open ai"
+        assert processor.process(text) == "Привет. iPhone и Python стоят 25000 рублей. OpenAI"
+
+    def test_steps_can_be_disabled(self):
+        """Отключенные шаги не применяются"""
+        processor = _processor(remove_fillers=False, capitalize=False, normalize_numbers=False)
+        assert processor.process("э, пайтон двадцать пять") == "э, Python двадцать пять"
+
+    def test_capitalization_keeps_mixed_case(self):
+        """Заглавная буква только у строчных слов в начале предложения"""
+        processor = _processor()
+        assert processor.process("айфон. example.com работает") == "iPhone. Example.com работает"
+
+    def test_streaming_matches_whole_text(self):
+        """Обработка по частям дает тот же результат, что и целиком"""
+        processor = _processor()
+        tokens = (
+            "э эм um привет как дела джи пи ти пайтон айфон машинное обучение open ai "
+            "двадцать пять тысяч сто one hundred and five третьем , . ?"
+        ).split()
+        rng = random.Random(0)
+        for _ in range(300):
+            text = ""
+            for token in (rng.choice(tokens) for _ in range(rng.randint(1, 20))):
+                text = text.rstrip() + token + " " if token in ",.?" else text + token + " "
+            text = text.strip()
+
+            streaming = StreamingTextProcessor(processor)
+            output, position = "", 0
+            while position < len(text):
+                size = rng.randint(1, 12)
+                output += streaming.feed(text[position:position + size])
+                position += size
+            output += streaming.finish()
+            assert output == processor.process(text), text
+
+    def test_streaming_emits_before_finish(self):
+        """Законченные слова отдаются до конца текста"""
+        streaming = StreamingTextProcessor(_processor())
+        emitted = streaming.feed("пайтон и джи пи ")
+        emitted += streaming.feed("ти и еще немного слов ")
+        assert emitted.startswith("Python и GPT")
+        assert emitted + streaming.finish() == "Python и GPT и еще немного слов"
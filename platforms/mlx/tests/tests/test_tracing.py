@@ -0,0 +1,128 @@
+"""
+Тесты трассировки VTTv2 (спаны в формате OTLP/JSON)
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from src.config.loader import TracingConfig
+from src.utils.tracing import Tracer
+
+
+def _spans(payload):
+    return {span["name"]: span for span in payload["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+
+
+def _attributes(span):
+    return {item["key"]: next(iter(item["value"].values())) for item in span["attributes"]}
+
+
+class TestTracer:
+    """Тесты трейсера"""
+
+    def test_disabled_is_noop(self, tmp_path):
+        """Выключенный трейсер не создает трасс и файлов"""
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(TracingConfig(enabled=False, path=str(path)))
+        trace = tracer.start_trace()
+        assert trace is None
+        with tracer.activate(trace), tracer.span("transcribe") as span:
+            span.set(engine="mlx_whisper")
+        tracer.end_trace(trace)
+        tracer.flush()
+        assert not path.exists()
+
+    def test_file_exporter(self, tmp_path):
+        """Трасса - одна строка OTLP/JSON; спаны связаны с корнем, ошибка этапа в статусе"""
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(TracingConfig(enabled=True, path=str(path), service_name="vtt2-test"))
+        trace = tracer.start_trace("dictation", replay=False)
+        with tracer.span("stop_recording", parent=trace):
+            pass
+
+        def worker():
+            # Этапы в другом потоке - потомки активированной трассы
+            with tracer.activate(trace):
+                with tracer.span("transcribe") as span:
+                    span.set(engine="mlx_whisper", rtf=0.25, audio_duration=3)
+                with pytest.raises(RuntimeError), tracer.span("paste_text"):
+                    raise RuntimeError("нет доступа")
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert tracer.span("orphan") is tracer.span("other")
+        tracer.end_trace(trace)
+        tracer.end_trace(trace)
+        tracer.flush()
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1
+        payload = json.loads(lines[0])
+        resource = payload["resourceSpans"][0]["resource"]
+        assert _attributes(resource) == {"service.name": "vtt2-test"}
+        spans = _spans(payload)
+        root = spans["dictation"]
+        assert len(root["traceId"]) == 32 and "parentSpanId" not in root
+        for name in ("stop_recording", "transcribe", "paste_text"):
+            assert spans[name]["traceId"] == root["traceId"]
+            assert spans[name]["parentSpanId"] == root["spanId"]
+        assert _attributes(spans["transcribe"]) == {
+            "engine": "mlx_whisper", "rtf": 0.25, "audio_duration": "3"
+        }
+        assert spans["paste_text"]["status"] == {"code": 2, "message": "RuntimeError: нет доступа"}
+        assert root["status"] == {"code": 1}
+        assert int(root["endTimeUnixNano"]) >= int(spans["paste_text"]["endTimeUnixNano"])
+
+    def test_trace_error(self, tmp_path):
+        """Ошибка фразы - в статусе корневого спана"""
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(TracingConfig(enabled=True, path=str(path)))
+        tracer.end_trace(tracer.start_trace(), error="Нет аудио данных")
+        tracer.flush()
+        root = _spans(json.loads(path.read_text(encoding="utf-8")))["dictation"]
+        assert root["status"] == {"code": 2, "message": "Нет аудио данных"}
+
+    def test_noop_overhead(self):
+        """Спан без трассы - единицы микросекунд"""
+        tracer = Tracer(TracingConfig(enabled=True, exporter="file"))
+        start = time.perf_counter()
+        for _ in range(10000):
+            with tracer.span("transcribe"):
+                pass
+        assert (time.perf_counter() - start) / 10000 < 20e-6
+
+    def test_otlp_exporter(self):
+        """OTLP/HTTP: POST JSON на эндпоинт коллектора"""
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                received.append((self.path, self.headers["Content-Type"], json.loads(body)))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            endpoint = f"http://127.0.0.1:{server.server_address[1]}/v1/traces"
+            tracer = Tracer(TracingConfig(enabled=True, exporter="otlp", endpoint=endpoint))
+            trace = tracer.start_trace()
+            with tracer.span("transcribe", parent=trace):
+                pass
+            tracer.end_trace(trace)
+            tracer.flush()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert len(received) == 1
+        path, content_type, payload = received[0]
+        assert (path, content_type) == ("/v1/traces", "application/json")
+        assert set(_spans(payload)) == {"dictation", "transcribe"}
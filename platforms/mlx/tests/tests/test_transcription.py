@@ -6,6 +6,8 @@ import numpy as np
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 import sys
+import time
+from pydantic import BaseModel
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
@@ -148,6 +150,7 @@ class TestTranscriptionEngineWrapper:
         
         mock_config = MagicMock()
         mock_config.transcription.engine = "mlx_whisper"
+        mock_config.transcription.two_tier.enabled = False
         mock_config.transcription.mlx_whisper.model_name = "mlx-community/whisper-medium"
         mock_config.transcription.mlx_whisper.language = "ru"
         mock_config.transcription.mlx_whisper.temperature = 0.0
@@ -160,6 +163,8 @@ class TestTranscriptionEngineWrapper:
             with patch.object(MLXWhisperTranscriber, '_check_model_cache'):
                 wrapper = TranscriptionEngineWrapper(mock_config)
                 assert wrapper.engine is not None
+                # Время загрузки движка - для метрики vtt2_model_load_seconds
+                assert list(wrapper.load_times) == ["mlx_whisper"]
     
     def test_engine_selection_invalid(self):
         """Тест выбора невалидного движка"""
@@ -171,3 +176,1355 @@ class TestTranscriptionEngineWrapper:
         with pytest.raises(ValueError, match="Неизвестный движок"):
             TranscriptionEngineWrapper(mock_config)
 
+
+
+
+class TestTwoTierDecoding:
+    """Тесты двухуровневого декодирования (быстрый черновик + проверка большой моделью)"""
+
+    @staticmethod
+    def _make_wrapper(draft, final, **two_tier):
+        """Обертка с подменными результатами черновика и большой модели"""
+        from src.config.loader import (
+            DecodePolicyConfig,
+            PerformanceConfig,
+            PromptContextConfig,
+            TimeoutConfig,
+            TwoTierConfig,
+        )
+        from src.transcription.engine import TranscriptionEngineWrapper
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.engine = "mlx_whisper"
+        mock_config.transcription.mlx_whisper.model_name = "mlx-community/whisper-large-v3"
+        mock_config.transcription.two_tier = TwoTierConfig(enabled=True, **two_tier)
+        mock_config.transcription.decode_policy = DecodePolicyConfig()
+        mock_config.transcription.timeout = TimeoutConfig()
+        mock_config.performance = PerformanceConfig()
+        mock_config.transcription.context = PromptContextConfig(enabled=False)
+        mock_config.transcription.mlx_whisper.beam_size = 5
+        mock_config.transcription.mlx_whisper.best_of = 5
+
+        def fake_transcribe(self, audio_data, options=None):
+            return draft if self.model_name == "mlx-community/whisper-tiny" else final
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'), \
+                patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+            wrapper = TranscriptionEngineWrapper(mock_config)
+        patcher = patch.object(MLXWhisperTranscriber, 'transcribe_detailed', fake_transcribe)
+        return wrapper, patcher
+
+    def test_confident_short_draft_skips_large_model(self):
+        """Короткий уверенный черновик возвращается без большой модели"""
+        from src.transcription.result import TranscriptionResult
+
+        draft = TranscriptionResult(text="да", avg_logprob=-0.1, no_speech_prob=0.05)
+        final = TranscriptionResult(text="Да.", avg_logprob=-0.05, no_speech_prob=0.01)
+        wrapper, patcher = self._make_wrapper(draft, final)
+        on_draft = Mock()
+
+        with patcher:
+            result = wrapper.transcribe(np.zeros(16000, dtype=np.float32), on_draft=on_draft)
+
+        assert result == "да"
+        on_draft.assert_not_called()
+        assert wrapper.tier_stats.fast_tier_ratio == 1.0
+
+    def test_low_confidence_draft_is_verified(self):
+        """Неуверенный черновик показывается и исправляется большой моделью"""
+        from src.transcription.result import TranscriptionResult
+
+        draft = TranscriptionResult(text="при вед", avg_logprob=-1.2, no_speech_prob=0.05)
+        final = TranscriptionResult(text="Привет", avg_logprob=-0.2, no_speech_prob=0.01)
+        wrapper, patcher = self._make_wrapper(draft, final)
+        on_draft = Mock()
+
+        with patcher:
+            result = wrapper.transcribe(np.zeros(16000, dtype=np.float32), on_draft=on_draft)
+
+        assert result == "Привет"
+        on_draft.assert_called_once_with("при вед")
+        assert wrapper.tier_stats.corrected == 1
+        assert wrapper.tier_stats.fast_tier_ratio == 0.0
+
+    def test_long_utterance_always_verified(self):
+        """Длинные фразы всегда проверяются большой моделью"""
+        from src.transcription.result import TranscriptionResult
+
+        draft = TranscriptionResult(text="черновик", avg_logprob=-0.1, no_speech_prob=0.0)
+        final = TranscriptionResult(text="финал", avg_logprob=-0.1, no_speech_prob=0.0)
+        wrapper, patcher = self._make_wrapper(draft, final, max_duration=2.0)
+
+        with patcher:
+            result = wrapper.transcribe(np.zeros(16000 * 3, dtype=np.float32))
+
+        assert result == "финал"
+
+    @patch('mlx_whisper.transcribe')
+    def test_mlx_result_confidence(self, mock_transcribe):
+        """MLX движок сообщает avg_logprob и no_speech_prob из сегментов"""
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        mock_transcribe.return_value = {
+            "text": "Привет мир",
+            "language": "ru",
+            "segments": [
+                {"text": "Привет", "avg_logprob": -0.2, "no_speech_prob": 0.1},
+                {"text": " мир", "avg_logprob": -0.4, "no_speech_prob": 0.3},
+            ],
+        }
+        mock_config = MagicMock()
+        mock_config.transcription.mlx_whisper.temperature = 0.0
+        mock_config.transcription.mlx_whisper.beam_size = 5
+        mock_config.transcription.mlx_whisper.best_of = 5
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'):
+            with patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+                transcriber = MLXWhisperTranscriber(
+                    mock_config, model_name="mlx-community/whisper-tiny"
+                )
+                result = transcriber.transcribe_detailed(np.zeros(16000, dtype=np.float32))
+
+        assert result.avg_logprob == pytest.approx(-0.3)
+        assert result.no_speech_prob == pytest.approx(0.3)
+        assert result.language == "ru"
+        assert mock_transcribe.call_args.kwargs["path_or_hf_repo"] == "mlx-community/whisper-tiny"
+
+
+
+class TestDecodePolicy:
+    """Тесты политики параметров декодирования"""
+
+    @staticmethod
+    def _speech(seconds, sample_rate=16000):
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        return (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    @staticmethod
+    def _policy(**overrides):
+        from src.config.loader import DecodePolicyConfig
+        from src.transcription.policy import DecodePolicy
+        return DecodePolicy(DecodePolicyConfig(**overrides))
+
+    def test_short_command_is_greedy(self):
+        """Короткая команда - жадное декодирование, fallback только при неудаче"""
+        options = self._policy().choose(self._speech(1.0))
+
+        assert options.beam_size == 1
+        assert options.temperature[0] == 0.0
+        assert options.has_fallback
+
+    def test_long_dictation_uses_beam(self):
+        """Длинная диктовка - beam search"""
+        options = self._policy().choose(self._speech(30.0), beam_size=5)
+
+        assert options.beam_size == 5
+
+    def test_latency_budget_disables_beam(self):
+        """Beam отключается, если оценка задержки не укладывается в бюджет"""
+        options = self._policy(latency_budget=1.0).choose(self._speech(30.0), beam_size=5)
+
+        assert options.beam_size == 1
+        assert "бюджет" in options.reason
+
+    def test_silence_has_no_fallback(self):
+        """Почти тишина - без повторов с повышенной температурой"""
+        audio = np.zeros(16000 * 5, dtype=np.float32)
+        audio[:160] = 0.5  # Щелчок
+
+        options = self._policy().choose(audio)
+
+        assert not options.has_fallback
+
+    def test_speech_ratio(self):
+        """Доля речи считается по энергии кадров"""
+        from src.transcription.policy import speech_ratio
+
+        audio = np.concatenate((self._speech(1.0), np.zeros(16000, dtype=np.float32)))
+
+        assert speech_ratio(audio, 16000) == pytest.approx(0.5, abs=0.05)
+
+    @patch('mlx_whisper.transcribe')
+    def test_mlx_receives_decode_options(self, mock_transcribe):
+        """Параметры декодирования передаются в mlx_whisper (без beam_size)"""
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+        from src.transcription.policy import DecodeOptions
+
+        mock_transcribe.return_value = {"text": "ok"}
+        mock_config = MagicMock()
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'):
+            with patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+                transcriber = MLXWhisperTranscriber(mock_config)
+                transcriber.transcribe(
+                    np.zeros(16000, dtype=np.float32),
+                    DecodeOptions(beam_size=5, best_of=3, temperature=(0.0, 0.2, 0.4))
+                )
+
+        kwargs = mock_transcribe.call_args.kwargs
+        assert kwargs["temperature"] == (0.0, 0.2, 0.4)
+        assert kwargs["best_of"] == 3
+        assert "beam_size" not in kwargs
+
+    def test_whisper_cpp_command_options(self):
+        """Параметры декодирования попадают в команду whisper.cpp"""
+        from src.transcription.policy import DecodeOptions
+        from src.transcription.whisper_cpp import WhisperCppTranscriber
+
+        mock_config = MagicMock()
+        mock_config.transcription.whisper_cpp.binary_path = "/usr/bin/whisper-cli"
+        mock_config.transcription.whisper_cpp.model_path = "/models/ggml-medium.bin"
+        mock_config.transcription.whisper_cpp.language = "ru"
+        mock_config.transcription.whisper_cpp.threads = 4
+
+        with patch.object(WhisperCppTranscriber, '_check_binary'):
+            with patch.object(WhisperCppTranscriber, '_check_model'):
+                transcriber = WhisperCppTranscriber(mock_config)
+
+        greedy, _ = transcriber._build_command("/tmp/a.wav", DecodeOptions())
+        beam, _ = transcriber._build_command(
+            "/tmp/a.wav", DecodeOptions(beam_size=5, best_of=5, temperature=(0.0, 0.2, 0.4))
+        )
+
+        assert "-nf" in greedy
+        assert greedy[greedy.index("-bs") + 1] == "1"
+        assert beam[beam.index("-bs") + 1] == "5"
+        assert beam[beam.index("-tpi") + 1] == "0.2"
+
+
+class TestPromptContext:
+    """Тесты контекста между фразами"""
+
+    @staticmethod
+    def _context(**overrides):
+        from src.config.loader import PromptContextConfig
+        from src.transcription.context import PromptContext
+        return PromptContext(PromptContextConfig(**overrides))
+
+    def test_context_is_per_app(self):
+        """Недавние фразы и словарь передаются только в своем приложении"""
+        context = self._context(
+            vocabulary=["VTTv2"], app_vocabulary={"com.apple.Terminal": ["pytest"]}
+        )
+        context.add("com.apple.Terminal", "Запусти тесты.")
+        context.add("com.apple.Notes", "Купить молоко.")
+
+        assert context.prompt("com.apple.Terminal") == "VTTv2, pytest. Запусти тесты."
+        assert context.prompt("com.apple.Notes") == "VTTv2. Купить молоко."
+        assert context.prompt(None) == "VTTv2."
+
+    def test_context_is_bounded(self):
+        """Хранятся только последние фразы, prompt не длиннее max_chars"""
+        context = self._context(max_utterances=2, max_chars=20)
+        for text in ("первая фраза", "вторая фраза", "третья фраза"):
+            context.add("app", text)
+
+        prompt = context.prompt("app")
+        assert "первая" not in prompt
+        assert len(prompt) <= 20
+        assert prompt.endswith("третья фраза")
+
+    def test_context_resets_after_idle(self):
+        """После долгой паузы контекст приложения сбрасывается"""
+        context = self._context(idle_reset_seconds=60)
+        context.add("app", "старый документ")
+
+        with patch('src.transcription.context.time.monotonic', return_value=time.monotonic() + 120):
+            assert context.prompt("app") is None
+
+    def test_wrapper_carries_prompt_and_counts_fallbacks(self):
+        """Обертка передает контекст в initial_prompt и считает повторы с контекстом и без"""
+        from src.config.loader import (
+            DecodePolicyConfig,
+            PerformanceConfig,
+            PromptContextConfig,
+            TimeoutConfig,
+            TwoTierConfig,
+        )
+        from src.transcription.engine import TranscriptionEngineWrapper
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+        from src.transcription.result import TranscriptionResult
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.engine = "mlx_whisper"
+        mock_config.transcription.two_tier = TwoTierConfig()
+        mock_config.transcription.decode_policy = DecodePolicyConfig()
+        mock_config.transcription.timeout = TimeoutConfig()
+        mock_config.performance = PerformanceConfig()
+        mock_config.transcription.context = PromptContextConfig()
+        mock_config.transcription.mlx_whisper.beam_size = 5
+        mock_config.transcription.mlx_whisper.best_of = 5
+
+        prompts = []
+
+        def fake_transcribe(self, audio_data, options=None):
+            prompts.append(options.initial_prompt)
+            return TranscriptionResult(
+                text=f"Фраза {len(prompts)}.", fallbacks=0 if options.initial_prompt else 2
+            )
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'), \
+                patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+            wrapper = TranscriptionEngineWrapper(mock_config)
+
+        audio = np.zeros(16000, dtype=np.float32)
+        with patch.object(MLXWhisperTranscriber, 'transcribe_detailed', fake_transcribe):
+            wrapper.transcribe(audio, app_id="com.apple.Notes")
+            wrapper.transcribe(audio, app_id="com.apple.Notes")
+
+        assert prompts == [None, "Фраза 1."]
+        stats = wrapper.context.stats
+        assert (
+            stats.cold, stats.cold_fallbacks, stats.prompted, stats.prompted_fallbacks
+        ) == (1, 2, 1, 0)
+        assert stats.fallbacks_avoided == pytest.approx(2.0)
+
+    @patch('mlx_whisper.transcribe')
+    def test_mlx_receives_initial_prompt(self, mock_transcribe):
+        """initial_prompt передается в mlx_whisper, повторы считаются по temperature сегментов"""
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+        from src.transcription.policy import DecodeOptions
+
+        mock_transcribe.return_value = {
+            "text": "ok",
+            "segments": [{"text": "ok", "temperature": 0.0}, {"text": "", "temperature": 0.4}],
+        }
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'):
+            with patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+                transcriber = MLXWhisperTranscriber(MagicMock())
+                result = transcriber.transcribe_detailed(
+                    np.zeros(16000, dtype=np.float32), DecodeOptions(initial_prompt="VTTv2.")
+                )
+
+        assert mock_transcribe.call_args.kwargs["initial_prompt"] == "VTTv2."
+        assert result.fallbacks == 1
+
+
+class TestLanguageCache:
+    """Тесты кэша языка при language: auto"""
+
+    @staticmethod
+    def _make_wrapper(results):
+        """Обертка MLX с language: auto и последовательностью результатов"""
+        from src.config.loader import (
+            DecodePolicyConfig,
+            LanguageCacheConfig,
+            MLXWhisperConfig,
+            PerformanceConfig,
+            PromptContextConfig,
+            TimeoutConfig,
+            TwoTierConfig,
+        )
+        from src.transcription.engine import TranscriptionEngineWrapper
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.engine = "mlx_whisper"
+        mock_config.transcription.mlx_whisper = MLXWhisperConfig(language="auto")
+        mock_config.transcription.two_tier = TwoTierConfig()
+        mock_config.transcription.decode_policy = DecodePolicyConfig()
+        mock_config.transcription.timeout = TimeoutConfig()
+        mock_config.performance = PerformanceConfig()
+        mock_config.transcription.context = PromptContextConfig(enabled=False)
+        mock_config.transcription.language_cache = LanguageCacheConfig()
+
+        languages = []
+
+        def fake_transcribe(self, audio_data, options=None):
+            languages.append(options.language)
+            return results.pop(0)
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'), \
+                patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+            wrapper = TranscriptionEngineWrapper(mock_config)
+        patcher = patch.object(MLXWhisperTranscriber, 'transcribe_detailed', fake_transcribe)
+        return wrapper, patcher, languages
+
+    def test_confident_language_is_reused(self):
+        """Уверенно определенный язык передается явно - определение пропускается"""
+        from src.transcription.result import TranscriptionResult
+
+        results = [
+            TranscriptionResult(text="Привет", language="ru", avg_logprob=-0.2) for _ in range(3)
+        ]
+        wrapper, patcher, languages = self._make_wrapper(results)
+
+        audio = np.zeros(16000, dtype=np.float32)
+        with patcher:
+            for _ in range(3):
+                wrapper.transcribe(audio, app_id="com.apple.Notes")
+
+        assert languages == [None, "ru", "ru"]
+        assert wrapper.languages.stats.hit_ratio == pytest.approx(2 / 3)
+
+    def test_low_confidence_triggers_redetection(self):
+        """Неуверенная фраза с языком из кэша декодируется повторно с определением"""
+        from src.transcription.result import TranscriptionResult
+
+        results = [
+            TranscriptionResult(text="Привет", language="ru", avg_logprob=-0.2),
+            TranscriptionResult(text="хеллоу ворлд", language="ru", avg_logprob=-1.5),
+            TranscriptionResult(text="Hello world", language="en", avg_logprob=-0.1),
+        ]
+        wrapper, patcher, languages = self._make_wrapper(results)
+
+        audio = np.zeros(16000, dtype=np.float32)
+        with patcher:
+            wrapper.transcribe(audio)
+            text = wrapper.transcribe(audio)
+
+        assert languages == [None, "ru", None]
+        assert text == "Hello world"
+        assert wrapper.languages.lookup(None) == "en"
+        assert wrapper.languages.stats.redetections == 1
+
+    def test_language_config_normalization(self):
+        """Код языка нормализуется, пустой язык - автоопределение"""
+        from src.config.loader import MLXWhisperConfig
+
+        assert MLXWhisperConfig(language=" RU ").language == "ru"
+        assert MLXWhisperConfig(language=None).language == "auto"
+
+    def test_whisper_cpp_auto_language(self):
+        """whisper.cpp: -l auto без -np, определенный язык - из stderr"""
+        from src.transcription.policy import DecodeOptions
+        from src.transcription.whisper_cpp import WhisperCppTranscriber
+
+        mock_config = MagicMock()
+        mock_config.transcription.whisper_cpp.binary_path = "/usr/bin/whisper-cli"
+        mock_config.transcription.whisper_cpp.model_path = "/models/ggml-medium.bin"
+        mock_config.transcription.whisper_cpp.language = "auto"
+        mock_config.transcription.whisper_cpp.threads = 4
+
+        with patch.object(WhisperCppTranscriber, '_check_binary'):
+            with patch.object(WhisperCppTranscriber, '_check_model'):
+                transcriber = WhisperCppTranscriber(mock_config)
+
+        auto, _ = transcriber._build_command("/tmp/a.wav", DecodeOptions())
+        cached, _ = transcriber._build_command("/tmp/a.wav", DecodeOptions(language="en"))
+
+        assert auto[auto.index("-l") + 1] == "auto" and "-np" not in auto
+        assert cached[cached.index("-l") + 1] == "en" and "-np" in cached
+        stderr = "whisper_full_with_state: auto-detected language: ru (p = 0.987654)\n"
+        assert WhisperCppTranscriber._parse_language(stderr) == ("ru", pytest.approx(0.987654))
+
+
+class TestFasterWhisperTranscription:
+    """Тесты движка faster-whisper (CTranslate2, CPU)"""
+
+    @staticmethod
+    def _make_transcriber(**overrides):
+        from src.config.loader import FasterWhisperConfig
+        from src.transcription import faster_whisper_engine
+
+        mock_config = MagicMock()
+        mock_config.transcription.faster_whisper = FasterWhisperConfig(**overrides)
+        model_class = MagicMock()
+        with patch.object(faster_whisper_engine, 'FASTER_WHISPER_AVAILABLE', True), \
+                patch.object(faster_whisper_engine, 'WhisperModel', model_class):
+            transcriber = faster_whisper_engine.FasterWhisperTranscriber(mock_config)
+        return transcriber, model_class
+
+    def test_model_loaded_once_with_int8_and_threads(self):
+        """Модель загружается при инициализации: int8, потоки из конфигурации"""
+        _, model_class = self._make_transcriber(cpu_threads=6)
+
+        model_class.assert_called_once()
+        kwargs = model_class.call_args.kwargs
+        assert kwargs["compute_type"] == "int8"
+        assert kwargs["cpu_threads"] == 6
+        assert kwargs["device"] == "cpu"
+
+    def test_transcribe_detailed(self):
+        """Сегменты собираются в текст, уверенность и повторы - из сегментов"""
+        from src.transcription.policy import DecodeOptions
+
+        transcriber, _ = self._make_transcriber(language="auto")
+        segments = [
+            Mock(
+                text=" Привет", start=0.0, end=0.8, avg_logprob=-0.2, no_speech_prob=0.1,
+                temperature=0.0
+            ),
+            Mock(
+                text=" мир", start=0.8, end=1.4, avg_logprob=-0.4, no_speech_prob=0.2,
+                temperature=0.2
+            ),
+        ]
+        info = Mock(language="ru", language_probability=0.97)
+        transcriber.model.transcribe.return_value = (iter(segments), info)
+
+        result = transcriber.transcribe_detailed(
+            np.zeros(16000, dtype=np.float32),
+            DecodeOptions(beam_size=5, best_of=5, temperature=(0.0, 0.2), initial_prompt="VTTv2.")
+        )
+
+        kwargs = transcriber.model.transcribe.call_args.kwargs
+        assert kwargs["language"] is None
+        assert kwargs["beam_size"] == 5
+        assert kwargs["temperature"] == [0.0, 0.2]
+        assert kwargs["initial_prompt"] == "VTTv2."
+        assert result.text == "Привет мир"
+        assert result.avg_logprob == pytest.approx(-0.3)
+        assert result.language == "ru"
+        assert result.language_prob == pytest.approx(0.97)
+        assert result.fallbacks == 1
+        assert result.segments.text(1) == " мир"
+        assert result.segments.end[1] == pytest.approx(1.4)
+
+    def test_missing_dependency(self):
+        """Без faster-whisper - RuntimeError"""
+        from src.transcription import faster_whisper_engine
+
+        with patch.object(faster_whisper_engine, 'FASTER_WHISPER_AVAILABLE', False):
+            with pytest.raises(RuntimeError):
+                faster_whisper_engine.FasterWhisperTranscriber(MagicMock())
+
+    def test_engine_config_default(self):
+        """engine: faster_whisper без секции - конфигурация по умолчанию"""
+        from src.config.loader import TranscriptionConfig
+
+        config = TranscriptionConfig(engine="faster_whisper")
+        assert config.faster_whisper.compute_type == "int8"
+
+
+class TestWhisperCppBindings:
+    """Тесты whisper.cpp в процессе (pywhispercpp)"""
+
+    @staticmethod
+    def _make_transcriber(tmp_path):
+        from src.transcription import whisper_cpp_bindings
+
+        model_file = tmp_path / "ggml-medium.bin"
+        model_file.write_bytes(b"ggml")
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.whisper_cpp.model_path = str(model_file)
+        mock_config.transcription.whisper_cpp.language = "ru"
+        mock_config.transcription.whisper_cpp.threads = 6
+        mock_config.transcription.whisper_cpp.temperature = 0.0
+        mock_config.transcription.whisper_cpp.beam_size = 5
+        mock_config.transcription.whisper_cpp.best_of = 5
+        mock_config.transcription.whisper_cpp.no_speech_threshold = 0.6
+        mock_config.transcription.whisper_cpp.compression_ratio_threshold = 2.4
+        mock_config.transcription.timestamps = "none"
+        model_class = MagicMock()
+        with patch.object(whisper_cpp_bindings, 'PYWHISPERCPP_AVAILABLE', True), \
+                patch.object(whisper_cpp_bindings, 'WhisperCppModel', model_class):
+            transcriber = whisper_cpp_bindings.WhisperCppBindingsTranscriber(mock_config)
+        return transcriber, model_class
+
+    def test_context_loaded_once_with_threads(self, tmp_path):
+        """Контекст загружается один раз, пул потоков - из whisper_cpp.threads"""
+        transcriber, model_class = self._make_transcriber(tmp_path)
+        transcriber.model.transcribe.return_value = []
+
+        audio = np.zeros(16000, dtype=np.float32)
+        transcriber.transcribe(audio)
+        transcriber.transcribe(audio)
+
+        model_class.assert_called_once()
+        assert model_class.call_args.kwargs["n_threads"] == 6
+        # Буфер NumPy передается напрямую, без копии
+        assert transcriber.model.transcribe.call_args.args[0] is audio
+
+    def test_params_match_subprocess_command(self, tmp_path):
+        """Параметры whisper_full соответствуют флагам whisper-cli"""
+        from src.transcription.policy import DecodeOptions
+
+        transcriber, _ = self._make_transcriber(tmp_path)
+        transcriber.model.transcribe.return_value = [Mock(text=" Привет"), Mock(text=" мир.")]
+
+        greedy = transcriber._build_params(DecodeOptions(), "ru")
+        beam = transcriber._build_params(
+            DecodeOptions(beam_size=5, best_of=5, temperature=(0.0, 0.2)), "ru"
+        )
+        text = transcriber.transcribe(np.zeros(16000, dtype=np.float32))
+
+        assert greedy["strategy"] == 0 and greedy["temperature_inc"] == 0.0
+        assert beam["strategy"] == 1 and beam["beam_search"]["beam_size"] == 5
+        assert beam["temperature_inc"] == 0.2
+        assert beam["n_threads"] == 6
+        # Как -otxt: сегмент на строку
+        assert text == "Привет\n мир."
+
+    def test_auto_language_reported(self, tmp_path):
+        """language=auto: определенный язык и его вероятность - в результате, как у whisper-cli"""
+        from src.transcription.policy import DecodeOptions
+
+        transcriber, _ = self._make_transcriber(tmp_path)
+        transcriber.model.auto_detect_language.return_value = (("ru", 0.93), {})
+        transcriber.model.transcribe.return_value = [Mock(text=" Привет")]
+
+        result = transcriber.transcribe_detailed(
+            np.zeros(16000, dtype=np.float32), DecodeOptions(language="auto")
+        )
+
+        assert (result.language, result.language_prob) == ("ru", pytest.approx(0.93))
+        # Декодирование - с определенным языком
+        assert transcriber.model.transcribe.call_args.kwargs["language"] == "ru"
+
+        transcriber.model.auto_detect_language.reset_mock()
+        result = transcriber.transcribe_detailed(np.zeros(16000, dtype=np.float32))
+        assert (result.language, result.language_prob) == ("ru", None)
+        transcriber.model.auto_detect_language.assert_not_called()
+
+    def test_missing_model(self, tmp_path):
+        """Нет модели - FileNotFoundError"""
+        from src.transcription import whisper_cpp_bindings
+
+        mock_config = MagicMock()
+        mock_config.transcription.whisper_cpp.model_path = str(tmp_path / "missing.bin")
+        with patch.object(whisper_cpp_bindings, 'PYWHISPERCPP_AVAILABLE', True):
+            with pytest.raises(FileNotFoundError):
+                whisper_cpp_bindings.WhisperCppBindingsTranscriber(mock_config)
+
+
+class TestTimestamps:
+    """Тесты таймингов сегментов и слов в результате"""
+
+    def test_segment_table_is_compact(self):
+        """Таблица сегментов: колонки float32, тексты одной строкой"""
+        from src.transcription.result import SegmentTable
+
+        builder = SegmentTable.builder()
+        for i in range(2000):
+            builder.append(i * 2.0, i * 2.0 + 1.5, f" фраза {i}", -0.3, 0.01)
+        table = builder.build()
+
+        assert len(table) == 2000
+        assert table.start.dtype == np.float32
+        assert table[5].text == " фраза 5"
+        assert table[-1].end == pytest.approx(3999.5)
+        assert table.at(10.5) == 5
+        assert table.at(11.8) == -1
+        # Примерно 16 байт колонок + ~20 байт текста на сегмент
+        assert table.nbytes < 2000 * 64
+
+    @patch('mlx_whisper.transcribe')
+    def test_mlx_word_timestamps(self, mock_transcribe):
+        """MLX: word_timestamps запрашиваются только в режиме word"""
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        mock_transcribe.return_value = {
+            "text": "Привет мир",
+            "segments": [{
+                "start": 0.0, "end": 1.2, "text": "Привет мир",
+                "avg_logprob": -0.2, "no_speech_prob": 0.1,
+                "words": [
+                    {"word": " Привет", "start": 0.0, "end": 0.6, "probability": 0.9},
+                    {"word": " мир", "start": 0.7, "end": 1.2, "probability": 0.8},
+                ],
+            }],
+        }
+        mock_config = MagicMock()
+        mock_config.transcription.timestamps = "word"
+        mock_config.transcription.mlx_whisper.temperature = 0.0
+        mock_config.transcription.mlx_whisper.beam_size = 5
+        mock_config.transcription.mlx_whisper.best_of = 5
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'):
+            with patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+                transcriber = MLXWhisperTranscriber(mock_config)
+                result = transcriber.transcribe_detailed(np.zeros(16000, dtype=np.float32))
+
+        assert mock_transcribe.call_args.kwargs["word_timestamps"] is True
+        assert len(result.segments) == 1
+        assert [w.text for w in result.words] == [" Привет", " мир"]
+        assert result.words[1].start == pytest.approx(0.7)
+        assert result.words[1].segment == 0
+
+    def test_whisper_cpp_json_output(self, tmp_path):
+        """whisper.cpp: -ojf в режиме word, сегменты и слова из JSON с токенами"""
+        import json
+
+        from src.transcription.whisper_cpp import WhisperCppTranscriber
+
+        mock_config = MagicMock()
+        mock_config.transcription.whisper_cpp.binary_path = "/usr/bin/whisper-cli"
+        mock_config.transcription.whisper_cpp.model_path = "/models/ggml-medium.bin"
+        mock_config.transcription.whisper_cpp.language = "ru"
+        mock_config.transcription.timestamps = "word"
+
+        with patch.object(WhisperCppTranscriber, '_check_binary'):
+            with patch.object(WhisperCppTranscriber, '_check_model'):
+                transcriber = WhisperCppTranscriber(mock_config)
+
+        cmd, output_file = transcriber._build_command("/tmp/a.wav")
+        assert "-ojf" in cmd and "-nt" not in cmd
+        assert output_file.endswith(".json")
+
+        def token(text, start, end, p):
+            return {"text": text, "offsets": {"from": start, "to": end}, "p": p}
+
+        output = tmp_path / "a.json"
+        output.write_text(json.dumps({
+            "result": {"language": "ru"},
+            "transcription": [
+                {"offsets": {"from": 0, "to": 1500}, "text": " Привет мир.", "tokens": [
+                    token(
+                        "[_BEG_]", 0, 0, 0.9
+                    ), token(" При", 0, 300, 0.9), token("вет", 300, 600, 0.7),
+                    token(" мир", 700, 1100, 0.8), token(".", 1100, 1200, 0.9),
+                ]},
+                {"offsets": {"from": 1500, "to": 2500}, "text": " Как дела?", "tokens": []},
+            ],
+        }, ensure_ascii=False), encoding="utf-8")
+
+        parsed = transcriber._parse_json(str(output))
+
+        assert parsed.text == "Привет мир.\n Как дела?"
+        assert parsed.language == "ru"
+        assert len(parsed.segments) == 2
+        assert parsed.segments[1].start == pytest.approx(1.5)
+        assert [w.text for w in parsed.words] == ["Привет", "мир."]
+        assert parsed.words[0].end == pytest.approx(0.6)
+        assert parsed.words[0].probability == pytest.approx(0.8)
+        assert parsed.avg_logprob < 0
+
+
+class TestEngineFallback:
+    """Тесты резервных движков и circuit breaker"""
+
+    @staticmethod
+    def _make_wrapper(fake_transcribe, **fallback):
+        """Обертка MLX large-v3 с резервной MLX small"""
+        from src.config.loader import (
+            DecodePolicyConfig,
+            FallbackConfig,
+            FallbackEngineConfig,
+            PerformanceConfig,
+            PromptContextConfig,
+            TimeoutConfig,
+            TwoTierConfig,
+        )
+        from src.transcription.engine import TranscriptionEngineWrapper
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.engine = "mlx_whisper"
+        mock_config.transcription.mlx_whisper.model_name = "mlx-community/whisper-large-v3"
+        mock_config.transcription.mlx_whisper.beam_size = 5
+        mock_config.transcription.mlx_whisper.best_of = 5
+        mock_config.transcription.two_tier = TwoTierConfig()
+        mock_config.transcription.decode_policy = DecodePolicyConfig()
+        mock_config.transcription.timeout = TimeoutConfig()
+        mock_config.performance = PerformanceConfig()
+        mock_config.transcription.context = PromptContextConfig(enabled=False)
+        mock_config.transcription.fallback = FallbackConfig(
+            engines=[
+                FallbackEngineConfig(engine="mlx_whisper", model="mlx-community/whisper-small")
+            ], **fallback
+        )
+
+        with patch.object(MLXWhisperTranscriber, '_check_dependencies'), \
+                patch.object(MLXWhisperTranscriber, '_check_model_cache'):
+            wrapper = TranscriptionEngineWrapper(mock_config)
+        # Резервный движок создается при первой ошибке основного
+        patcher = patch.multiple(
+            MLXWhisperTranscriber,
+            transcribe_detailed=fake_transcribe,
+            _check_dependencies=Mock(),
+            _check_model_cache=Mock(),
+        )
+        return wrapper, patcher
+
+    def test_circuit_breaker_states(self):
+        """closed -> open после серии ошибок -> half_open после паузы -> closed"""
+        from src.transcription.fallback import CircuitBreaker
+
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0, clock=lambda: now[0])
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+
+        now[0] = 31.0
+        assert breaker.state == "half_open" and breaker.allow()
+        # Неудачный пробный вызов - снова пауза
+        breaker.record_failure()
+        assert breaker.state == "open" and breaker.opens == 2
+
+        now[0] = 62.0
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_utterance_goes_to_next_engine(self):
+        """Ошибка основного движка - та же фраза транскрибируется резервным"""
+        from src.transcription.result import TranscriptionResult
+
+        calls = []
+
+        def fake_transcribe(self, audio_data, options=None):
+            calls.append(self.model_name)
+            if self.model_name == "mlx-community/whisper-large-v3":
+                raise RuntimeError(
+                    "Ошибка транскрипции MLX: [metal::malloc] Resource limit exceeded"
+                )
+            return TranscriptionResult(text="Привет", model=self.model_name)
+
+        wrapper, patcher = self._make_wrapper(fake_transcribe, failure_threshold=2)
+        audio = np.zeros(16000, dtype=np.float32)
+        with patcher:
+            results = [wrapper.transcribe_detailed(audio) for _ in range(3)]
+
+        assert all(r.model == "mlx-community/whisper-small" for r in results)
+        # После двух ошибок основной движок отключен - третья фраза сразу идет на резервный
+        assert calls.count("mlx-community/whisper-large-v3") == 2
+        primary, backup = wrapper.slots
+        assert primary.breaker.state == "open" and primary.failures == 2
+        assert backup.served == 3
+        assert wrapper.fallback_stats.recovered == 3
+
+    def test_all_engines_failed(self):
+        """Отказ всех движков - RuntimeError и учет потерянной фразы"""
+        def fake_transcribe(self, audio_data, options=None):
+            raise RuntimeError("Ошибка транскрипции MLX")
+
+        wrapper, patcher = self._make_wrapper(fake_transcribe)
+        with patcher:
+            with pytest.raises(RuntimeError, match="всех движков"):
+                wrapper.transcribe(np.zeros(16000, dtype=np.float32))
+
+        assert wrapper.fallback_stats.failed == 1
+
+    def test_unavailable_primary_engine(self):
+        """Основной движок не создается - приложение работает на резервном"""
+        from src.config.loader import (
+            DecodePolicyConfig,
+            FallbackConfig,
+            FallbackEngineConfig,
+            PerformanceConfig,
+            PromptContextConfig,
+            TimeoutConfig,
+            TwoTierConfig,
+        )
+        from src.transcription import mlx_engine
+        from src.transcription.engine import TranscriptionEngineWrapper
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.engine = "faster_whisper"
+        mock_config.transcription.two_tier = TwoTierConfig()
+        mock_config.transcription.decode_policy = DecodePolicyConfig()
+        mock_config.transcription.timeout = TimeoutConfig()
+        mock_config.performance = PerformanceConfig()
+        mock_config.transcription.context = PromptContextConfig(enabled=False)
+        mock_config.transcription.fallback = FallbackConfig(
+            engines=[FallbackEngineConfig(engine="mlx_whisper")]
+        )
+
+        with patch('src.transcription.faster_whisper_engine.FASTER_WHISPER_AVAILABLE', False):
+            wrapper = TranscriptionEngineWrapper(mock_config)
+
+        assert wrapper.engine is None
+        assert wrapper.slots[0].breaker.state == "open"
+        with patch.object(mlx_engine.MLXWhisperTranscriber, '_check_dependencies'), \
+                patch.object(mlx_engine.MLXWhisperTranscriber, '_check_model_cache'), \
+                patch.object(
+                    mlx_engine.MLXWhisperTranscriber, 'transcribe_detailed',
+                    return_value=Mock(text="ok")
+                ):
+            assert wrapper.transcribe(np.zeros(16000, dtype=np.float32)) == "ok"
+        assert wrapper.fallback_stats.recovered == 1
+
+    def test_whisper_cpp_missing_binary_raises(self, tmp_path):
+        """Нет бинарника whisper.cpp - FileNotFoundError вместо выхода из процесса"""
+        from src.transcription.whisper_cpp import WhisperCppTranscriber
+
+        mock_config = MagicMock()
+        mock_config.transcription.whisper_cpp.binary_path = str(tmp_path / "whisper-cli")
+
+        with pytest.raises(FileNotFoundError):
+            WhisperCppTranscriber(mock_config)
+
+
+class TestDeadlines:
+    """Тесты дедлайнов транскрипции по скользящему RTF"""
+
+    def test_timeout_follows_measured_rtf(self):
+        """Дедлайн = длительность x перцентиль RTF x запас, в пределах min/max"""
+        from src.config.loader import TimeoutConfig
+        from src.transcription.deadline import RTFTracker
+
+        tracker = RTFTracker(
+            TimeoutConfig(safety_factor=2.0, min_timeout=1.0, max_timeout=100.0, percentile=100)
+        )
+        assert tracker.timeout("mlx_whisper", 3.0) == 300.0  # Холодный движок - загрузка модели
+
+        tracker.record("mlx_whisper", 30.0, 3.0)  # Первый вызов с загрузкой не учитывается
+        assert tracker.estimate("mlx_whisper") is None
+        tracker.record("mlx_whisper", 0.3, 3.0)
+        tracker.record("mlx_whisper", 0.6, 3.0)
+
+        assert tracker.estimate("mlx_whisper") == pytest.approx(0.2)
+        assert tracker.timeout("mlx_whisper", 10.0) == pytest.approx(4.0)
+        assert tracker.timeout("mlx_whisper", 1.0) == 1.0
+        assert tracker.timeout("mlx_whisper", 3600.0) == 100.0
+
+    def test_runner_timeout_and_busy(self):
+        """Зависший вызов прерывается по дедлайну, движок занят до его завершения"""
+        import threading
+
+        from src.transcription.deadline import (
+            DeadlineRunner,
+            EngineBusyError,
+            TranscriptionTimeoutError,
+        )
+
+        release = threading.Event()
+        runner = DeadlineRunner("test")
+
+        with pytest.raises(TranscriptionTimeoutError):
+            runner.run(release.wait, timeout=0.05)
+        assert runner.busy
+        with pytest.raises(EngineBusyError, match="занят"):
+            runner.run(lambda: "ok", timeout=1.0)
+
+        release.set()
+        runner._pending.join(1.0)
+        assert runner.run(lambda: "ok", timeout=1.0) == "ok"
+
+    def test_timed_out_engine_falls_back(self):
+        """Превышение дедлайна - фраза транскрибируется резервным движком"""
+        from src.transcription.deadline import TranscriptionTimeoutError
+        from src.transcription.result import TranscriptionResult
+
+        def fake_transcribe(self, audio_data, options=None):
+            assert options.timeout is not None
+            if self.model_name == "mlx-community/whisper-large-v3":
+                raise TranscriptionTimeoutError(f"превышен дедлайн {options.timeout:.1f}с")
+            return TranscriptionResult(text="Привет", model=self.model_name)
+
+        wrapper, patcher = TestEngineFallback._make_wrapper(fake_transcribe)
+        with patcher:
+            result = wrapper.transcribe_detailed(np.zeros(16000, dtype=np.float32))
+
+        assert result.model == "mlx-community/whisper-small"
+        assert wrapper.slots[0].timeouts == 1
+
+    def test_faster_whisper_stops_between_segments(self):
+        """faster-whisper: дедлайн проверяется между сегментами, генератор закрывается"""
+        from src.transcription.deadline import TranscriptionTimeoutError
+        from src.transcription.faster_whisper_engine import FasterWhisperTranscriber
+
+        decoded = []
+
+        def segments():
+            for i in range(10):
+                decoded.append(i)
+                time.sleep(0.02)
+                yield Mock()
+
+        transcriber = FasterWhisperTranscriber.__new__(FasterWhisperTranscriber)
+        with pytest.raises(TranscriptionTimeoutError):
+            transcriber._collect_segments(segments(), time.time(), timeout=0.03)
+        assert len(decoded) < 10
+
+    @staticmethod
+    def _whisper_cpp(tmp_path):
+        """whisper.cpp, у которого whisper-cli - долгий процесс"""
+        from src.transcription.whisper_cpp import WhisperCppTranscriber
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.audio.max_recording_duration = 3600
+        mock_config.transcription.timestamps = "none"
+
+        with patch.object(WhisperCppTranscriber, '_check_binary'), \
+                patch.object(WhisperCppTranscriber, '_check_model'):
+            transcriber = WhisperCppTranscriber(mock_config)
+        # Как whisper-cli с -oj: файл результата создан до завершения декодирования
+        output_file = tmp_path / "a.json"
+        command = [
+            sys.executable, "-c",
+            f"import time; open({str(output_file)!r}, 'w').write('{{'); time.sleep(30)",
+        ]
+        return transcriber, patch.object(
+            transcriber, '_build_command', return_value=(command, str(output_file))
+        )
+
+    @staticmethod
+    def _spawned(processes):
+        """Popen, запоминающий запущенные процессы"""
+        import subprocess
+
+        popen = subprocess.Popen
+
+        def spawn(*args, **kwargs):
+            processes.append(popen(*args, **kwargs))
+            return processes[-1]
+        return patch('subprocess.Popen', side_effect=spawn)
+
+    def test_whisper_cpp_uses_deadline(self, tmp_path):
+        """whisper.cpp: дедлайн - таймаут процесса, по таймауту процесс завершается с ошибкой"""
+        from src.transcription.deadline import TranscriptionTimeoutError
+        from src.transcription.policy import DecodeOptions
+
+        transcriber, command = self._whisper_cpp(tmp_path)
+        processes = []
+        with command, self._spawned(processes):
+            start = time.monotonic()
+            with pytest.raises(TranscriptionTimeoutError):
+                transcriber.transcribe_detailed(
+                    np.zeros(16000, dtype=np.float32), DecodeOptions(timeout=0.2)
+                )
+
+        assert time.monotonic() - start < 5
+        assert processes[0].returncode is not None
+        assert not (tmp_path / "a.json").exists()
+
+    def test_whisper_cpp_cancel_kills_process(self, tmp_path):
+        """Отмена фразы завершает процесс whisper-cli сразу, а не по таймауту"""
+        import threading
+
+        from src.transcription.deadline import CancelToken, TranscriptionCancelledError
+        from src.transcription.policy import DecodeOptions
+
+        transcriber, command = self._whisper_cpp(tmp_path)
+        cancel = CancelToken()
+        threading.Timer(0.2, cancel.cancel).start()
+        processes = []
+        with command, self._spawned(processes):
+            start = time.monotonic()
+            with pytest.raises(TranscriptionCancelledError):
+                transcriber.transcribe_detailed(
+                    np.zeros(16000, dtype=np.float32), DecodeOptions(timeout=60.0, cancel=cancel)
+                )
+
+        assert time.monotonic() - start < 5
+        assert processes[0].returncode is not None
+        assert not (tmp_path / "a.json").exists()
+
+    def test_runner_cancel(self):
+        """Непрерываемый вызов (MLX, libwhisper): по отмене вызов завершается, поток не бросается"""
+        import threading
+
+        from src.transcription.deadline import (
+            CancelToken,
+            DeadlineRunner,
+            TranscriptionCancelledError,
+        )
+
+        runner = DeadlineRunner("test")
+        cancel = CancelToken()
+        threading.Timer(0.05, cancel.cancel).start()
+
+        with pytest.raises(TranscriptionCancelledError):
+            runner.run(lambda: time.sleep(0.2), timeout=5.0, cancel=cancel)
+        assert not runner.busy
+
+        with pytest.raises(TranscriptionCancelledError):
+            runner.run(lambda: "ok", timeout=1.0, cancel=cancel)
+
+        # Вызов не завершился и к дедлайну - брошен, движок занят до его завершения
+        release = threading.Event()
+        cancel = CancelToken()
+        threading.Timer(0.05, cancel.cancel).start()
+        with pytest.raises(TranscriptionCancelledError):
+            runner.run(release.wait, timeout=0.2, cancel=cancel)
+        assert runner.busy
+        release.set()
+        runner._pending.join(1.0)
+
+    def test_faster_whisper_stops_on_cancel(self):
+        """faster-whisper: отмена проверяется между сегментами"""
+        from src.transcription.deadline import CancelToken, TranscriptionCancelledError
+        from src.transcription.faster_whisper_engine import FasterWhisperTranscriber
+
+        cancel = CancelToken()
+
+        def segments():
+            for i in range(10):
+                if i == 2:
+                    cancel.cancel()
+                yield Mock()
+
+        transcriber = FasterWhisperTranscriber.__new__(FasterWhisperTranscriber)
+        with pytest.raises(TranscriptionCancelledError):
+            transcriber._collect_segments(segments(), time.time(), timeout=None, cancel=cancel)
+
+    def test_cancelled_utterance_skips_fallback(self):
+        """Отмененная фраза не уходит на резервный движок и не считается ошибкой"""
+        from src.transcription.deadline import TranscriptionCancelledError
+
+        calls = []
+
+        def fake_transcribe(self, audio_data, options=None):
+            calls.append(self.model_name)
+            options.cancel.cancel()
+            options.cancel.check()
+
+        wrapper, patcher = TestEngineFallback._make_wrapper(fake_transcribe)
+        with patcher, pytest.raises(TranscriptionCancelledError):
+            wrapper.transcribe_detailed(
+                np.zeros(16000, dtype=np.float32), cancel=wrapper.cancel_token()
+            )
+
+        assert calls == ["mlx-community/whisper-large-v3"]
+        assert wrapper.slots[0].failures == 0
+
+    @staticmethod
+    def _mlx_windows(mock_transcribe, on_window=None):
+        """
+        mlx_whisper с кэшем модели: transcribe вызывает model.decode на каждое окно 30 с
+
+        Returns:
+            (патч модулей, список длин вызовов transcribe, список окон)
+        """
+        from types import SimpleNamespace
+
+        class Model:
+            def decode(self, segment, options):
+                return None
+
+        model = Model()
+        holder = SimpleNamespace(get_model=lambda path, dtype: model)
+        calls, windows = [], []
+
+        def decode(audio, **kwargs):
+            calls.append(len(audio))
+            for start in range(0, len(audio), 30 * 16000):
+                model.decode(audio[start:start + 30 * 16000], None)
+                windows.append(start)
+                if on_window:
+                    on_window(len(windows))
+            return {"text": "Привет", "segments": []}
+
+        mock_transcribe.side_effect = decode
+        core = SimpleNamespace(float16="float16")
+        modules = patch.dict(sys.modules, {
+            "mlx_whisper.transcribe": SimpleNamespace(ModelHolder=holder),
+            "mlx": SimpleNamespace(core=core),
+            "mlx.core": core,
+        })
+        return modules, calls, windows
+
+    @patch('mlx_whisper.transcribe')
+    def test_long_decode_with_unused_token_is_one_call(self, mock_transcribe):
+        """MLX: запись с неиспользованной отменой декодируется одним вызовом, без нарезки"""
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        wrapper, patcher = TestEngineFallback._make_wrapper(
+            MLXWhisperTranscriber.transcribe_detailed
+        )
+        modules, calls, windows = self._mlx_windows(mock_transcribe)
+        with patcher, modules:
+            result = wrapper.transcribe_detailed(
+                np.zeros(16000 * 60, dtype=np.float32), cancel=wrapper.cancel_token()
+            )
+
+        assert calls == [16000 * 60] and len(windows) == 2
+        assert result.model == "mlx-community/whisper-large-v3"
+
+    @patch('mlx_whisper.transcribe')
+    def test_cancel_then_dictate_keeps_breaker_closed(self, mock_transcribe):
+        """MLX: отмена останавливает декодирование между окнами, дальше снова основной движок"""
+        from src.transcription.deadline import TranscriptionCancelledError
+        from src.transcription.mlx_engine import MLXWhisperTranscriber
+
+        wrapper, patcher = TestEngineFallback._make_wrapper(
+            MLXWhisperTranscriber.transcribe_detailed
+        )
+        cancel = wrapper.cancel_token()
+
+        def on_window(count):
+            if count == 2:
+                cancel.cancel()
+            time.sleep(0.05)
+
+        modules, calls, windows = self._mlx_windows(mock_transcribe, on_window)
+        with patcher, modules:
+            with pytest.raises(TranscriptionCancelledError):
+                wrapper.transcribe_detailed(np.zeros(16000 * 120, dtype=np.float32), cancel=cancel)
+            assert calls == [16000 * 120] and len(windows) == 2
+            assert not wrapper.engine._runner.busy
+
+            for _ in range(3):
+                result = wrapper.transcribe_detailed(
+                    np.zeros(16000 * 3, dtype=np.float32), cancel=wrapper.cancel_token()
+                )
+                assert result.model == "mlx-community/whisper-large-v3"
+
+        primary = wrapper.slots[0]
+        assert (primary.failures, primary.timeouts, primary.breaker.state) == (0, 0, "closed")
+
+    def test_busy_engine_skipped_without_failure(self):
+        """Движок, занятый брошенным вызовом, пропускается без учета в circuit breaker"""
+        from src.transcription.deadline import EngineBusyError
+        from src.transcription.result import TranscriptionResult
+
+        def fake_transcribe(self, audio_data, options=None):
+            if self.model_name == "mlx-community/whisper-large-v3":
+                raise EngineBusyError("MLX Whisper занят брошенной фразой")
+            return TranscriptionResult(text="Привет", model=self.model_name)
+
+        wrapper, patcher = TestEngineFallback._make_wrapper(fake_transcribe, failure_threshold=1)
+        with patcher:
+            for _ in range(3):
+                assert wrapper.transcribe_detailed(
+                    np.zeros(16000, dtype=np.float32)
+                ).model == "mlx-community/whisper-small"
+
+        primary = wrapper.slots[0]
+        assert (primary.failures, primary.timeouts, primary.breaker.state) == (0, 0, "closed")
+
+
+from src.transcription.registry import EngineCapabilities  # noqa: E402
+
+
+class _EchoOptions(BaseModel):
+    """Схема настроек тестового движка-плагина"""
+    model: str = "echo-small"
+    language: str = "ru"
+    temperature: float = 0.0
+    beam_size: int = 1
+    best_of: int = 1
+
+
+class _EchoEngine:
+    """Тестовый движок-плагин: потоковый и пакетный"""
+    DESCRIPTION = "Echo"
+    OPTIONS = _EchoOptions
+    CAPABILITIES = EngineCapabilities(streaming=True, batching=True)
+
+    def __init__(self, config, model=None, options=None):
+        self.options = options
+        self.model_name = model or options.model
+        self.batches = []
+
+    def transcribe_detailed(self, audio_data, options=None, on_partial=None):
+        from src.transcription.result import TranscriptionResult
+
+        if on_partial:
+            on_partial("При")
+        return TranscriptionResult(text="Привет", model=self.model_name)
+
+    def transcribe_batch(self, chunks, options=None):
+        from src.transcription.result import TranscriptionResult
+
+        self.batches.append(len(chunks))
+        return [
+            TranscriptionResult(text=f"часть {i}", model=self.model_name)
+            for i in range(len(chunks))
+        ]
+
+
+class TestEngineRegistry:
+    """Тесты реестра движков и возможностей"""
+
+    @staticmethod
+    def _entry_point(name, obj):
+        entry_point = Mock(value=f"tests:{obj.__name__}")
+        entry_point.name = name
+        entry_point.load.return_value = obj
+        return entry_point
+
+    @staticmethod
+    def _make_wrapper(**two_tier):
+        """Обертка с движком-плагином echo из entry point"""
+        from src.config.loader import (
+            DecodePolicyConfig,
+            FallbackConfig,
+            PerformanceConfig,
+            PromptContextConfig,
+            TimeoutConfig,
+            TwoTierConfig,
+        )
+        from src.transcription.engine import TranscriptionEngineWrapper
+        from src.transcription.registry import EngineRegistry
+
+        mock_config = MagicMock()
+        mock_config.audio.sample_rate = 16000
+        mock_config.transcription.engine = "echo"
+        mock_config.transcription.engine_options = {"echo": {"model": "echo-large"}}
+        mock_config.transcription.two_tier = TwoTierConfig(**two_tier)
+        mock_config.transcription.decode_policy = DecodePolicyConfig()
+        mock_config.transcription.timeout = TimeoutConfig()
+        mock_config.transcription.context = PromptContextConfig(enabled=False)
+        mock_config.transcription.fallback = FallbackConfig(engines=[])
+        mock_config.performance = PerformanceConfig()
+
+        registry = EngineRegistry()
+        with patch('src.transcription.registry.entry_points',
+                   return_value=[TestEngineRegistry._entry_point("echo", _EchoEngine)]), \
+                patch('src.transcription.engine.REGISTRY', registry):
+            wrapper = TranscriptionEngineWrapper(mock_config)
+        return wrapper
+
+    def test_builtin_engine_imported_lazily(self):
+        """Встроенный движок - строка импорта, модуль загружается при первом запросе"""
+        from src.transcription.registry import EngineRegistry, EngineSpec
+
+        registry = EngineRegistry()
+        registry.register(
+            EngineSpec("faster_whisper", ".faster_whisper_engine:FasterWhisperTranscriber")
+        )
+        assert registry._factories == {}
+
+        from src.transcription.faster_whisper_engine import FasterWhisperTranscriber
+        assert registry.factory("faster_whisper") is FasterWhisperTranscriber
+
+    def test_unknown_engine(self):
+        """Неизвестный движок - ошибка со списком доступных"""
+        from src.transcription.registry import REGISTRY
+
+        with patch('src.transcription.registry.entry_points', return_value=[]):
+            with pytest.raises(ValueError, match="mlx_whisper"):
+                REGISTRY.spec("vosk")
+
+    def test_plugin_options_validated(self):
+        """Настройки плагина проверяются его схемой"""
+        from pydantic import ValidationError
+        from src.transcription.registry import EngineRegistry
+
+        registry = EngineRegistry()
+        transcription = Mock(engine_options={"echo": {"beam_size": "много"}})
+        with patch('src.transcription.registry.entry_points',
+                   return_value=[self._entry_point("echo", _EchoEngine)]):
+            assert "echo" in registry.names()
+            assert registry.description("echo") == "Echo"
+            with pytest.raises(ValidationError):
+                registry.options("echo", transcription)
+            transcription.engine_options = {}
+            engine = registry.create("echo", Mock(transcription=transcription), model="echo-tiny")
+
+        assert engine.model_name == "echo-tiny"
+        assert engine.options.language == "ru"
+
+    def test_streaming_engine_replaces_draft_model(self):
+        """Потоковый движок: черновик - его промежуточный текст, модель черновика не загружается"""
+        wrapper = self._make_wrapper(enabled=True)
+        assert wrapper.draft_engine is None
+        assert wrapper.capabilities.streaming
+
+        drafts = []
+        result = wrapper.transcribe_detailed(
+            np.zeros(16000, dtype=np.float32), on_draft=drafts.append
+        )
+
+        assert result.text == "Привет"
+        assert result.model == "echo-large"
+        assert drafts == ["При"]
+
+    def test_batching_engine_decodes_chunks_in_one_call(self):
+        """Пакетный движок: фрагменты длинной записи - одним вызовом"""
+        from src.transcription.memory_guard import chunk_bounds
+
+        wrapper = self._make_wrapper()
+        audio = np.random.default_rng(0).normal(0, 0.1, 48000).astype(np.float32)
+        chunks = len(chunk_bounds(audio, 16000, 16000))
+
+        result = wrapper._transcribe_chunked(
+            audio, wrapper._decode_options(audio), 1.0, wrapper.slots
+        )
+
+        assert chunks > 1
+        assert wrapper.engine.batches == [chunks]
+        assert result.text.startswith("часть 0 часть 1")